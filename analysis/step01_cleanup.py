@@ -11,11 +11,14 @@ import time
 import copy
 from typing import Dict, Any, List
 
+from utils.profiling import traced
+
 def load_config():
     """設定ファイルの読み込み"""
     with open('config.yaml', 'r') as f:
         return yaml.safe_load(f)
 
+@traced('step01_cleanup')
 def apply(input_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     ステップ1: クリーンアップ処理を適用
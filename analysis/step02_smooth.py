@@ -10,6 +10,8 @@ import yaml
 import time
 import copy
 from typing import Dict, Any, List
+
+from utils.profiling import traced
 from scipy import signal
 
 def load_config():
@@ -65,6 +67,7 @@ def apply_moving_average(data: np.ndarray, window_size: int) -> np.ndarray:
     # 畳み込みによる移動平均
     return np.convolve(data, kernel, mode='same')
 
+@traced('step02_smooth')
 def apply(input_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     ステップ2: 平滑化処理を適用
@@ -13,6 +13,8 @@ import copy
 import math
 from typing import Dict, Any, List, Tuple
 
+from utils.profiling import traced
+
 def load_config():
     """設定ファイルの読み込み"""
     with open('config.yaml', 'r') as f:
@@ -170,6 +172,7 @@ def normalize_landmarks(landmarks: Dict[str, Dict[str, float]]) -> Dict[str, Dic
     
     return normalized_landmarks
 
+@traced('step03_normalize')
 def apply(input_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     ステップ3: 正規化処理を適用
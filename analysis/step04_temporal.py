@@ -10,14 +10,25 @@ import json
 import yaml
 import time
 import copy
-import math
 from typing import Dict, Any, List, Tuple
 
+from utils.profiling import traced
+from utils.kinematics import (
+    JOINT_TRIPLETS, Kinematics, derivative, landmarks_to_array, point_angle, triplet_angles
+)
+
 def load_config():
     """設定ファイルの読み込み"""
     with open('config.yaml', 'r') as f:
         return yaml.safe_load(f)
 
+# ステップ4で扱う関節（定義は共通カーネルの JOINT_TRIPLETS を使用）
+STEP04_JOINTS = {
+    name: JOINT_TRIPLETS[name]
+    for name in ['left_elbow', 'right_elbow', 'left_shoulder', 'right_shoulder',
+                 'left_hip', 'right_hip', 'left_knee', 'right_knee', 'torso']
+}
+
 def calculate_angle(p1: Dict[str, float], p2: Dict[str, float], p3: Dict[str, float]) -> float:
     """
     3点間の角度を計算（p2が頂点）
@@ -28,31 +39,7 @@ def calculate_angle(p1: Dict[str, float], p2: Dict[str, float], p3: Dict[str, fl
     Returns:
         角度（度）
     """
-    # ベクトル計算
-    v1 = (p1['x'] - p2['x'], p1['y'] - p2['y'], p1['z'] - p2['z'])
-    v2 = (p3['x'] - p2['x'], p3['y'] - p2['y'], p3['z'] - p2['z'])
-    
-    # ベクトルの長さ
-    len_v1 = math.sqrt(v1[0]**2 + v1[1]**2 + v1[2]**2)
-    len_v2 = math.sqrt(v2[0]**2 + v2[1]**2 + v2[2]**2)
-    
-    # ゼロ除算を防ぐ
-    if len_v1 < 0.0001 or len_v2 < 0.0001:
-        return 0.0
-    
-    # 内積計算
-    dot_product = v1[0]*v2[0] + v1[1]*v2[1] + v1[2]*v2[2]
-    
-    # コサイン値（角度）
-    cos_angle = dot_product / (len_v1 * len_v2)
-    
-    # 数値誤差を防ぐ
-    cos_angle = max(-1.0, min(1.0, cos_angle))
-    
-    # ラジアンから度に変換
-    angle_deg = math.degrees(math.acos(cos_angle))
-    
-    return angle_deg
+    return point_angle(p1, p2, p3)
 
 def calculate_joint_angles(landmarks: Dict[str, Dict[str, float]]) -> Dict[str, float]:
     """
@@ -62,105 +49,10 @@ def calculate_joint_angles(landmarks: Dict[str, Dict[str, float]]) -> Dict[str,
         landmarks: フレームのランドマークデータ
     
     Returns:
-        関節角度の辞書
+        関節角度の辞書（必要なランドマークが揃っている関節のみ）
     """
-    angles = {}
-    
-    # 左肘の角度（肩-肘-手首）
-    if all(key in landmarks for key in ['LEFT_SHOULDER', 'LEFT_ELBOW', 'LEFT_WRIST']):
-        angles['left_elbow'] = calculate_angle(
-            landmarks['LEFT_SHOULDER'],
-            landmarks['LEFT_ELBOW'],
-            landmarks['LEFT_WRIST']
-        )
-    
-    # 右肘の角度（肩-肘-手首）
-    if all(key in landmarks for key in ['RIGHT_SHOULDER', 'RIGHT_ELBOW', 'RIGHT_WRIST']):
-        angles['right_elbow'] = calculate_angle(
-            landmarks['RIGHT_SHOULDER'],
-            landmarks['RIGHT_ELBOW'],
-            landmarks['RIGHT_WRIST']
-        )
-    
-    # 左肩の角度（肘-肩-腰）
-    if all(key in landmarks for key in ['LEFT_ELBOW', 'LEFT_SHOULDER', 'LEFT_HIP']):
-        angles['left_shoulder'] = calculate_angle(
-            landmarks['LEFT_ELBOW'],
-            landmarks['LEFT_SHOULDER'],
-            landmarks['LEFT_HIP']
-        )
-    
-    # 右肩の角度（肘-肩-腰）
-    if all(key in landmarks for key in ['RIGHT_ELBOW', 'RIGHT_SHOULDER', 'RIGHT_HIP']):
-        angles['right_shoulder'] = calculate_angle(
-            landmarks['RIGHT_ELBOW'],
-            landmarks['RIGHT_SHOULDER'],
-            landmarks['RIGHT_HIP']
-        )
-    
-    # 左股関節の角度（肩-腰-膝）
-    if all(key in landmarks for key in ['LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_KNEE']):
-        angles['left_hip'] = calculate_angle(
-            landmarks['LEFT_SHOULDER'],
-            landmarks['LEFT_HIP'],
-            landmarks['LEFT_KNEE']
-        )
-    
-    # 右股関節の角度（肩-腰-膝）
-    if all(key in landmarks for key in ['RIGHT_SHOULDER', 'RIGHT_HIP', 'RIGHT_KNEE']):
-        angles['right_hip'] = calculate_angle(
-            landmarks['RIGHT_SHOULDER'],
-            landmarks['RIGHT_HIP'],
-            landmarks['RIGHT_KNEE']
-        )
-    
-    # 左膝の角度（腰-膝-足首）
-    if all(key in landmarks for key in ['LEFT_HIP', 'LEFT_KNEE', 'LEFT_ANKLE']):
-        angles['left_knee'] = calculate_angle(
-            landmarks['LEFT_HIP'],
-            landmarks['LEFT_KNEE'],
-            landmarks['LEFT_ANKLE']
-        )
-    
-    # 右膝の角度（腰-膝-足首）
-    if all(key in landmarks for key in ['RIGHT_HIP', 'RIGHT_KNEE', 'RIGHT_ANKLE']):
-        angles['right_knee'] = calculate_angle(
-            landmarks['RIGHT_HIP'],
-            landmarks['RIGHT_KNEE'],
-            landmarks['RIGHT_ANKLE']
-        )
-    
-    # 体幹の角度（肩-腰の傾き）
-    if all(key in landmarks for key in ['LEFT_SHOULDER', 'RIGHT_SHOULDER', 'LEFT_HIP', 'RIGHT_HIP']):
-        # 肩の中点
-        shoulder_mid = {
-            'x': (landmarks['LEFT_SHOULDER']['x'] + landmarks['RIGHT_SHOULDER']['x']) / 2,
-            'y': (landmarks['LEFT_SHOULDER']['y'] + landmarks['RIGHT_SHOULDER']['y']) / 2,
-            'z': (landmarks['LEFT_SHOULDER']['z'] + landmarks['RIGHT_SHOULDER']['z']) / 2
-        }
-        
-        # 腰の中点
-        hip_mid = {
-            'x': (landmarks['LEFT_HIP']['x'] + landmarks['RIGHT_HIP']['x']) / 2,
-            'y': (landmarks['LEFT_HIP']['y'] + landmarks['RIGHT_HIP']['y']) / 2,
-            'z': (landmarks['LEFT_HIP']['z'] + landmarks['RIGHT_HIP']['z']) / 2
-        }
-        
-        # 体幹のZ軸（奥行き）に対する角度
-        # 垂直方向の参照点
-        vertical_ref = {
-            'x': hip_mid['x'],
-            'y': hip_mid['y'] - 1.0,  # Y軸下方向に1単位
-            'z': hip_mid['z']
-        }
-        
-        angles['torso'] = calculate_angle(
-            shoulder_mid,
-            hip_mid,
-            vertical_ref
-        )
-    
-    return angles
+    points = landmarks_to_array([landmarks])
+    return Kinematics(angles=triplet_angles(points, STEP04_JOINTS)).frame(0)
 
 def calculate_derivatives(angle_series: List[float], window_size: int) -> Tuple[List[float], List[float]]:
     """
@@ -173,41 +65,11 @@ def calculate_derivatives(angle_series: List[float], window_size: int) -> Tuple[
     Returns:
         (delta_angles, delta2_angles): 一次微分と二次微分のリスト
     """
-    n = len(angle_series)
-    delta_angles = [0.0] * n
-    delta2_angles = [0.0] * n
-    
-    # 一次微分 (中心差分法)
-    half_window = window_size // 2
-    for i in range(n):
-        if i < half_window:
-            # 前方差分
-            if i + 1 < n:
-                delta_angles[i] = angle_series[i+1] - angle_series[i]
-        elif i >= n - half_window:
-            # 後方差分
-            if i > 0:
-                delta_angles[i] = angle_series[i] - angle_series[i-1]
-        else:
-            # 中心差分
-            delta_angles[i] = (angle_series[i+half_window] - angle_series[i-half_window]) / window_size
-    
-    # 二次微分 (デルタ角度の一次微分)
-    for i in range(n):
-        if i < half_window:
-            # 前方差分
-            if i + 1 < n:
-                delta2_angles[i] = delta_angles[i+1] - delta_angles[i]
-        elif i >= n - half_window:
-            # 後方差分
-            if i > 0:
-                delta2_angles[i] = delta_angles[i] - delta_angles[i-1]
-        else:
-            # 中心差分
-            delta2_angles[i] = (delta_angles[i+half_window] - delta_angles[i-half_window]) / window_size
-    
-    return delta_angles, delta2_angles
+    delta_angles = derivative(angle_series, window_size)
+    delta2_angles = derivative(delta_angles, window_size)
+    return delta_angles.tolist(), delta2_angles.tolist()
 
+@traced('step04_temporal')
 def apply(input_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     ステップ4: 時系列特徴量計算処理を適用
@@ -273,20 +135,9 @@ def apply(input_data: Dict[str, Any]) -> Dict[str, Any]:
         "RIGHT_FOOT_INDEX": "RIGHT_FOOT_INDEX",
     }
     
-    # 各関節角度の時系列データを収集
-    angle_series = {
-        'left_elbow': [],
-        'right_elbow': [],
-        'left_shoulder': [],
-        'right_shoulder': [],
-        'left_hip': [],
-        'right_hip': [],
-        'left_knee': [],
-        'right_knee': [],
-        'torso': []
-    }
-    
-    # 各フレームの関節角度を計算・収集
+    # ランドマークを持つフレームを (frames, 33, 3) 配列にまとめて一括計算
+    angle_frame_ids = []
+    frame_landmarks_list = []
     for frame_id in frame_ids:
         str_frame_id = str(frame_id)
         
@@ -294,48 +145,32 @@ def apply(input_data: Dict[str, Any]) -> Dict[str, Any]:
             frame_landmarks = input_data[str_frame_id]['landmarks']
             
             # ランドマークの名前と値のマッピングを作成
-            named_landmarks = {}
-            for landmark_name, landmark_id in landmark_name_to_id.items():
-                if landmark_id in frame_landmarks:
-                    named_landmarks[landmark_name] = frame_landmarks[landmark_id]
-            
-            # 関節角度を計算
+            named_landmarks = {
+                landmark_name: frame_landmarks[landmark_id]
+                for landmark_name, landmark_id in landmark_name_to_id.items()
+                if landmark_id in frame_landmarks
+            }
             if named_landmarks:
-                joint_angles = calculate_joint_angles(named_landmarks)
-                
-                # 各関節角度を時系列データに追加
-                for angle_name in angle_series.keys():
-                    angle_series[angle_name].append(joint_angles.get(angle_name, 0.0))
-                
-                # 出力データに関節角度を追加
-                if 'joint_angles' not in output_data[str_frame_id]:
-                    output_data[str_frame_id]['joint_angles'] = {}
-                
-                output_data[str_frame_id]['joint_angles'] = joint_angles
+                angle_frame_ids.append(str_frame_id)
+                frame_landmarks_list.append(named_landmarks)
     
-    # 一次微分と二次微分の計算
+    # 全フレーム・全関節の角度を一括計算（欠損ランドマークを含む関節は NaN）
+    angle_names = list(STEP04_JOINTS)
+    angles = triplet_angles(landmarks_to_array(frame_landmarks_list), STEP04_JOINTS)
+    angle_matrix = np.column_stack([angles[name] for name in angle_names])
+    present = ~np.isnan(angle_matrix)
+    
+    # 一次微分と二次微分は同じ窓で計算（欠損した角度は 0 として扱う）
     delta_window = config['delta_window']
-    delta2_window = config['delta2_window']
+    delta_matrix = derivative(np.where(present, angle_matrix, 0.0), delta_window)
+    delta2_matrix = derivative(delta_matrix, delta_window)
     
-    for angle_name, angles in angle_series.items():
-        delta_angles, delta2_angles = calculate_derivatives(angles, delta_window)
-        
-        # 微分値を各フレームに追加
-        for i, frame_id in enumerate(frame_ids):
-            str_frame_id = str(frame_id)
-            
-            if str_frame_id in output_data and 'joint_angles' in output_data[str_frame_id]:
-                # 一次微分
-                if 'delta_angles' not in output_data[str_frame_id]:
-                    output_data[str_frame_id]['delta_angles'] = {}
-                
-                output_data[str_frame_id]['delta_angles'][angle_name] = delta_angles[i]
-                
-                # 二次微分
-                if 'delta2_angles' not in output_data[str_frame_id]:
-                    output_data[str_frame_id]['delta2_angles'] = {}
-                
-                output_data[str_frame_id]['delta2_angles'][angle_name] = delta2_angles[i]
+    for i, str_frame_id in enumerate(angle_frame_ids):
+        output_data[str_frame_id]['joint_angles'] = {
+            name: float(angle_matrix[i, j]) for j, name in enumerate(angle_names) if present[i, j]
+        }
+        output_data[str_frame_id]['delta_angles'] = dict(zip(angle_names, delta_matrix[i].tolist()))
+        output_data[str_frame_id]['delta2_angles'] = dict(zip(angle_names, delta2_matrix[i].tolist()))
     
     # 処理時間を記録
     elapsed_time = time.time() - start_time
@@ -11,6 +11,8 @@ import yaml
 import time
 import copy
 from typing import Dict, Any, List, Tuple
+
+from utils.profiling import traced
 from collections import Counter
 
 def load_config():
@@ -112,6 +114,7 @@ def hmm_smoothing(labels: List[str], transition_prob: float, min_state_duration:
     
     return smoothed_labels
 
+@traced('step05_voting')
 def apply(input_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     ステップ5: 多数決とHMM後処理を適用
@@ -13,6 +13,8 @@ import copy
 import math
 from typing import Dict, Any, List, Tuple
 
+from utils.profiling import traced
+
 def load_config():
     """設定ファイルの読み込み"""
     with open('config.yaml', 'r') as f:
@@ -246,6 +248,7 @@ def apply_rule_based_classification(frame_data: Dict[str, Any], config_rules: Di
     # ルールに該当しない場合は空文字列
     return ""
 
+@traced('step06_rulegate')
 def apply(input_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     ステップ6: ルールベース優先判定ゲートを適用
@@ -6,8 +6,10 @@ import logging
 import math
 from typing import Dict, List, Any, Tuple, Optional
 import mediapipe as mp
-from scipy.signal import find_peaks
 from .training_analysis_check_functions import *
+from utils.profiling import trace, span
+from utils.kinematics import landmarks_to_array, point_angle, triplet_angles
+from utils.rep_counter import REP_JOINT_BY_EXERCISE, RepSegments, count_reps, rep_start_at
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +31,21 @@ EXERCISE_NAMES = {
     'overhead_press': 'オーバーヘッドプレス'
 }
 
+# 回数・可動域の推定に使う関節（MediaPipeインデックスで 端点, 頂点, 端点）
+TRAINING_JOINTS = {
+    'knee_angle': (23, 25, 27),      # 股関節、膝、足首
+    'hip_angle': (11, 23, 25),       # 肩、股関節、膝
+    'elbow_angle': (11, 13, 15),     # 肩、肘、手首
+    'shoulder_angle': (23, 11, 13),  # 股関節、肩、肘
+}
+
+# 種目ごとのレップ検出に使う関節（utils.rep_counter の定義に合わせる）
+REP_ANGLE_BY_EXERCISE = {
+    exercise: f'{joint}_angle'
+    for exercise, joint in REP_JOINT_BY_EXERCISE.items()
+    if f'{joint}_angle' in TRAINING_JOINTS
+}
+
 class TrainingAnalyzer:
     def __init__(self, exercise_type: str = 'squat', body_metrics: dict = None):
         self.exercise_type = exercise_type
@@ -81,7 +98,8 @@ class TrainingAnalyzer:
             ) as pose:
                 frame_idx = 0
                 while cap.isOpened():
-                    success, image = cap.read()
+                    with span('decode'):
+                        success, image = cap.read()
                     if not success:
                         break
                         
@@ -91,22 +109,25 @@ class TrainingAnalyzer:
                         continue
                     
                     # BGR→RGB変換
-                    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                    with span('color_convert'):
+                        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
                     h, w, _ = image.shape
                     
                     # ポーズ検出を実行
-                    results = pose.process(image_rgb)
+                    with span('pose_process'):
+                        results = pose.process(image_rgb)
                     
                     if results.pose_landmarks:
                         # ランドマークをディクショナリに変換
-                        frame_landmarks = {}
-                        for idx, landmark in enumerate(results.pose_landmarks.landmark):
-                            frame_landmarks[idx] = {
-                                'x': landmark.x * w,
-                                'y': landmark.y * h,
-                                'z': landmark.z * w,  # zもスケーリング
-                                'visibility': landmark.visibility
-                            }
+                        with span('landmark_convert'):
+                            frame_landmarks = {}
+                            for idx, landmark in enumerate(results.pose_landmarks.landmark):
+                                frame_landmarks[idx] = {
+                                    'x': landmark.x * w,
+                                    'y': landmark.y * h,
+                                    'z': landmark.z * w,  # zもスケーリング
+                                    'visibility': landmark.visibility
+                                }
                         
                         landmarks_data[frame_idx] = frame_landmarks
                     
@@ -132,12 +153,26 @@ class TrainingAnalyzer:
             # 分析結果を格納する辞書
             metrics = {}
             
-            # フレーム毎の関節角度を計算
-            joint_angles = self._calculate_joint_angles(landmarks_data)
+            # フレーム毎の関節角度を1回だけ計算（欠損フレームは NaN）
+            angle_arrays = self._calculate_joint_angle_arrays(landmarks_data)
+            joint_angles = {
+                name: values[~np.isnan(values)].tolist()
+                for name, values in angle_arrays.items()
+            }
             
-            # 反復回数を推定
-            rep_count = self._estimate_reps(joint_angles)
-            metrics['rep_count'] = rep_count
+            # 反復回数とレップごとの統計を推定（間引きフレームは実効FPSで扱う）
+            frame_keys = list(landmarks_data.keys())
+            frame_step = max(1, int(np.median(np.diff(frame_keys)))) if len(frame_keys) > 1 else 1
+            reps = self._segment_reps(angle_arrays, frame_step)
+            metrics['rep_count'] = max(1, reps.count)  # 最低1回は返す
+            rep_summary = reps.summary()
+            for rep in rep_summary['reps']:
+                # 系列のインデックスを動画のフレーム番号に戻す
+                for key in ('start_frame', 'turn_frame', 'end_frame'):
+                    rep[key] = int(frame_keys[rep[key]])
+            metrics['reps'] = rep_summary['reps']
+            if reps.count >= 2:
+                metrics['tempo_consistency'] = rep_summary['tempo_consistency']
             
             # 種目ごとの最大/最小角度
             if self.exercise_type == 'squat':
@@ -177,129 +212,40 @@ class TrainingAnalyzer:
             logger.error(f"Error analyzing pose landmarks: {e}")
             return {}
             
+    def _calculate_joint_angle_arrays(self, landmarks_data: Dict[int, Dict[int, Dict[str, float]]]) -> Dict[str, np.ndarray]:
+        """全フレームの重要な関節角度を配列で一括計算（ランドマーク欠損フレームは NaN）"""
+        points = landmarks_to_array(landmarks_data.values(), dims=2)
+        return triplet_angles(points, TRAINING_JOINTS)
+        
     def _calculate_joint_angles(self, landmarks_data: Dict[int, Dict[int, Dict[str, float]]]) -> Dict[str, List[float]]:
-        """全フレームの重要な関節角度を計算"""
-        joint_angles = {
-            'knee_angle': [],
-            'hip_angle': [],
-            'elbow_angle': [],
-            'shoulder_angle': []
+        """全フレームの重要な関節角度を計算（必要なランドマークが揃っているフレームのみ）"""
+        return {
+            name: values[~np.isnan(values)].tolist()
+            for name, values in self._calculate_joint_angle_arrays(landmarks_data).items()
         }
         
-        for frame_idx, landmarks in landmarks_data.items():
-            # 膝の角度（大腿と下腿のなす角度）
-            if all(idx in landmarks for idx in [23, 25, 27]):  # 右足: 股関節、膝、足首
-                right_knee = self._calculate_angle(
-                    landmarks[23], landmarks[25], landmarks[27]
-                )
-                joint_angles['knee_angle'].append(right_knee)
-            
-            # 股関節の角度（胴体と大腿のなす角度）
-            if all(idx in landmarks for idx in [11, 23, 25]):  # 右側: 腰、股関節、膝
-                right_hip = self._calculate_angle(
-                    landmarks[11], landmarks[23], landmarks[25]
-                )
-                joint_angles['hip_angle'].append(right_hip)
-            
-            # 肘の角度（上腕と前腕のなす角度）
-            if all(idx in landmarks for idx in [11, 13, 15]):  # 右腕: 肩、肘、手首
-                right_elbow = self._calculate_angle(
-                    landmarks[11], landmarks[13], landmarks[15]
-                )
-                joint_angles['elbow_angle'].append(right_elbow)
-            
-            # 肩の角度（胴体と上腕のなす角度）
-            if all(idx in landmarks for idx in [23, 11, 13]):  # 右側: 腰、肩、肘
-                right_shoulder = self._calculate_angle(
-                    landmarks[23], landmarks[11], landmarks[13]
-                )
-                joint_angles['shoulder_angle'].append(right_shoulder)
-        
-        return joint_angles
-        
     def _calculate_angle(self, p1: Dict[str, float], p2: Dict[str, float], p3: Dict[str, float]) -> float:
         """3点間の角度を計算（p2が頂点）"""
         try:
-            # 2つのベクトルを計算
-            v1 = [p1['x'] - p2['x'], p1['y'] - p2['y']]
-            v2 = [p3['x'] - p2['x'], p3['y'] - p2['y']]
-            
-            # ベクトルの大きさ
-            v1_mag = math.sqrt(v1[0]**2 + v1[1]**2)
-            v2_mag = math.sqrt(v2[0]**2 + v2[1]**2)
-            
-            if v1_mag == 0 or v2_mag == 0:
-                return 0
-            
-            # 内積
-            dot_product = v1[0] * v2[0] + v1[1] * v2[1]
-            
-            # コサイン
-            cos_angle = dot_product / (v1_mag * v2_mag)
-            
-            # 角度（ラジアン）
-            angle_rad = math.acos(max(-1, min(cos_angle, 1)))
-            
-            # 角度（度）
-            angle_deg = math.degrees(angle_rad)
-            
-            return angle_deg
+            return point_angle(p1, p2, p3, dims=2)
         except Exception as e:
             logger.error(f"Error calculating angle: {e}")
             return 0
             
-    def _estimate_reps(self, joint_angles: Dict[str, List[float]]) -> int:
+    def _segment_reps(self, joint_angles: Dict[str, Any], frame_step: int = 1) -> RepSegments:
+        """種目に対応する関節角度系列からレップ境界と統計を求める（frame_step: フレームの間引き間隔）"""
+        angle_series = joint_angles.get(REP_ANGLE_BY_EXERCISE.get(self.exercise_type), [])
+        return count_reps(angle_series, fps=(self.video_fps or 30) / frame_step,
+                          start_at=rep_start_at(self.exercise_type))
+            
+    def _estimate_reps(self, joint_angles: Dict[str, Any]) -> int:
         """関節角度の変化から反復回数を推定"""
         try:
-            # 種目ごとに適切な関節角度を選択
-            if self.exercise_type == 'squat':
-                angle_series = joint_angles.get('knee_angle', [])
-            elif self.exercise_type == 'bench_press':
-                angle_series = joint_angles.get('elbow_angle', [])
-            elif self.exercise_type == 'deadlift':
-                angle_series = joint_angles.get('hip_angle', [])
-            elif self.exercise_type == 'overhead_press':
-                angle_series = joint_angles.get('shoulder_angle', [])
-            else:
-                angle_series = []
-                
-            if not angle_series:
-                return 0
-                
-            # 角度データをスムージング
-            smoothed = self._smooth_data(angle_series, window_size=5)
-            
-            # ピークと谷を検出
-            peaks, _ = find_peaks(smoothed)
-            valleys, _ = find_peaks([-x for x in smoothed])
-            
-            # 反復回数はピークと谷の少ない方に基づく
-            rep_count = min(len(peaks), len(valleys))
-            
-            # 反復回数が異常に多い場合は上限設定
-            if rep_count > 30:
-                rep_count = int(len(smoothed) / (self.video_fps * 2))  # 平均2秒で1回と仮定
-                
-            return max(1, rep_count)  # 最低1回は返す
-            
+            return max(1, self._segment_reps(joint_angles).count)  # 最低1回は返す
         except Exception as e:
             logger.error(f"Error estimating reps: {e}")
             return 1
             
-    def _smooth_data(self, data: List[float], window_size: int = 5) -> List[float]:
-        """移動平均でデータをスムージング"""
-        if len(data) < window_size:
-            return data
-            
-        smoothed = []
-        for i in range(len(data)):
-            start = max(0, i - window_size // 2)
-            end = min(len(data), i + window_size // 2 + 1)
-            window = data[start:end]
-            smoothed.append(sum(window) / len(window))
-            
-        return smoothed
-            
     def _calculate_balance_index(self, landmarks_data: Dict[int, Dict[int, Dict[str, float]]]) -> float:
         """左右の対称性を評価（低いほど対称）"""
         try:
@@ -341,6 +287,9 @@ class TrainingAnalyzer:
             assessment["form_score"] = 80  # デフォルト
             assessment["depth_score"] = 75
             assessment["tempo_score"] = 80
+            if "tempo_consistency" in metrics:
+                # レップ間の所要時間のばらつきが小さいほど高評価
+                assessment["tempo_score"] = int(round(50 + 50 * metrics["tempo_consistency"]))
             assessment["balance_score"] = max(0, 100 - metrics.get("balance_index", 0) * 10)
             assessment["stability_score"] = 75
             
@@ -458,41 +407,51 @@ class TrainingAnalyzer:
             return {"error": "Video not found."}
         
         try:
-            # MediaPipeを使用してポーズ推定
-            landmarks_data = self._extract_pose_landmarks(video_path)
-            
-            if not landmarks_data or len(landmarks_data) == 0:
-                logger.warning("No pose landmarks detected in video")
-                return self._generate_sample_analysis()  # フォールバックとしてサンプル分析を返す
-            
-            # 分析結果を生成
-            metrics = self._analyze_pose_landmarks(landmarks_data)
-            
-            # この種目に関する具体的な評価
-            assessment = self._assess_exercise_form(landmarks_data, metrics)
-            
-            # 最終的な分析結果を作成
-            results = {
-                "exercise_type": self.exercise_type,
-                "exercise_name": self._get_exercise_name(),
-                "form_score": assessment.get("form_score", 75),
-                "depth_score": assessment.get("depth_score", 70),
-                "tempo_score": assessment.get("tempo_score", 80),
-                "balance_score": assessment.get("balance_score", 75),
-                "stability_score": assessment.get("stability_score", 82),
-                "issues": assessment.get("issues", []),
-                "strengths": assessment.get("strengths", []),
-                "rep_count": metrics.get("rep_count", 5),
-                "max_depth": metrics.get("max_depth", 0.0),
-                "advice": assessment.get("advice", [])
-            }
-            
-            # 視覚的な分析（ポーズの比較と軌跡）を生成
-            visualizations = self._generate_visualizations(landmarks_data, video_path)
+            with trace('training_analysis', video=os.path.basename(video_path),
+                       exercise_type=self.exercise_type) as pipeline_trace:
+                # MediaPipeを使用してポーズ推定
+                with span('extract_landmarks'):
+                    landmarks_data = self._extract_pose_landmarks(video_path)
+                
+                if not landmarks_data or len(landmarks_data) == 0:
+                    logger.warning("No pose landmarks detected in video")
+                    return self._generate_sample_analysis()  # フォールバックとしてサンプル分析を返す
+                
+                # 分析結果を生成
+                with span('analyze_metrics'):
+                    metrics = self._analyze_pose_landmarks(landmarks_data)
+                
+                # この種目に関する具体的な評価
+                with span('assess_form'):
+                    assessment = self._assess_exercise_form(landmarks_data, metrics)
+                
+                # 最終的な分析結果を作成
+                results = {
+                    "exercise_type": self.exercise_type,
+                    "exercise_name": self._get_exercise_name(),
+                    "form_score": assessment.get("form_score", 75),
+                    "depth_score": assessment.get("depth_score", 70),
+                    "tempo_score": assessment.get("tempo_score", 80),
+                    "balance_score": assessment.get("balance_score", 75),
+                    "stability_score": assessment.get("stability_score", 82),
+                    "issues": assessment.get("issues", []),
+                    "strengths": assessment.get("strengths", []),
+                    "rep_count": metrics.get("rep_count", 5),
+                    "reps": metrics.get("reps", []),
+                    "max_depth": metrics.get("max_depth", 0.0),
+                    "advice": assessment.get("advice", [])
+                }
+                
+                # 視覚的な分析（ポーズの比較と軌跡）を生成
+                with span('visualization'):
+                    visualizations = self._generate_visualizations(landmarks_data, video_path)
+                
+                # 結果に視覚化情報を追加
+                if visualizations:
+                    results["visualizations"] = visualizations
             
-            # 結果に視覚化情報を追加
-            if visualizations:
-                results["visualizations"] = visualizations
+            # ステージ別の処理時間内訳
+            results["profiling"] = pipeline_trace.breakdown()
             
             return results
             
@@ -1881,29 +1840,7 @@ class TrainingAnalyzer:
             角度（度）
         """
         try:
-            # ベクトルを計算
-            v1 = [p1['x'] - p2['x'], p1['y'] - p2['y']]
-            v2 = [p3['x'] - p2['x'], p3['y'] - p2['y']]
-            
-            # ベクトルの長さ
-            v1_len = math.sqrt(v1[0]**2 + v1[1]**2)
-            v2_len = math.sqrt(v2[0]**2 + v2[1]**2)
-            
-            if v1_len == 0 or v2_len == 0:
-                return 0
-            
-            # 内積
-            dot_product = v1[0]*v2[0] + v1[1]*v2[1]
-            
-            # 余弦から角度を計算
-            cos_angle = max(-1.0, min(1.0, dot_product / (v1_len * v2_len)))
-            angle_radians = math.acos(cos_angle)
-            
-            # ラジアンから度に変換
-            angle_degrees = math.degrees(angle_radians)
-            
-            return angle_degrees
-            
+            return point_angle(p1, p2, p3, dims=2)
         except Exception as e:
             logger.error(f"角度計算エラー: {e}")
             return 0
@@ -2191,7 +2128,7 @@ class TrainingAnalyzer:
         os.makedirs('results', exist_ok=True)
         path = os.path.join('results', filename)
         try:
-            with open(path, 'w', encoding='utf-8') as f:
+            with span('save_json'), open(path, 'w', encoding='utf-8') as f:
                 json.dump(results, f, ensure_ascii=False, indent=2)
             return path
         except Exception as e:
@@ -0,0 +1,208 @@
+# api/v3/analysis_graph.py
+"""
+サブ分析の依存グラフ実行器
+各ノードが入力（依存ノード）を宣言し、依存関係のないノードを
+共有スレッドプールで並行実行する。ノードごとのタイムアウトと実行時間を記録し、
+非クリティカルなノードの失敗時は部分結果を返す
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+# ノードごとの既定タイムアウト（秒、ノードの実行開始から数える）
+DEFAULT_NODE_TIMEOUT = 10.0
+# 全リクエストで共有するワーカースレッド数
+MAX_WORKERS = 8
+# タイムアウト後も動き続けるノードがこの数に達したら共有プールを作り直す
+MAX_ABANDONED = MAX_WORKERS // 2
+# 実行開始前のノードがあるときの完了待ちの間隔（秒）
+START_POLL_INTERVAL = 0.05
+
+_executor: Optional[ThreadPoolExecutor] = None
+_abandoned: Set[Future] = set()
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """共有スレッドプールの取得（初回呼び出し時に生成）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='analysis')
+        return _executor
+
+
+def _abandon(future: Future):
+    """タイムアウトしたノードの記録
+
+    スレッドは止められないため、占有されたワーカーが MAX_ABANDONED に達したら
+    以降の投入を新しいプールに切り替え、他のリクエストが待たされないようにする。
+    古いプールは投入済みのノードを実行し終えると終了する
+    """
+    global _executor, _abandoned
+    with _executor_lock:
+        if future.done():
+            return
+        _abandoned.add(future)
+        if len(_abandoned) >= MAX_ABANDONED and _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+            _abandoned = set()
+    future.add_done_callback(_release_abandoned)
+
+
+def _release_abandoned(future: Future):
+    with _executor_lock:
+        _abandoned.discard(future)
+
+
+class AnalysisGraphError(Exception):
+    """クリティカルなノードの失敗、またはグラフ定義の誤り"""
+
+    def __init__(self, message, node_timings=None):
+        super().__init__(message)
+        self.node_timings = node_timings or {}
+
+
+@dataclass
+class AnalysisNode:
+    """サブ分析1件（funcは依存ノードの結果を宣言順の位置引数で受け取る）"""
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    critical: bool = True
+    timeout: float = DEFAULT_NODE_TIMEOUT
+
+
+@dataclass
+class GraphResult:
+    """グラフ実行結果"""
+    results: Dict[str, Any]
+    node_timings: Dict[str, Dict[str, Any]]
+    errors: Dict[str, str] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.errors)
+
+    def execution_report(self) -> Dict[str, Any]:
+        """レスポンスに含める実行情報"""
+        return {
+            "total_ms": self.total_ms,
+            "partial": self.partial,
+            "failed_nodes": sorted(self.errors),
+            "nodes": self.node_timings
+        }
+
+
+class AnalysisGraph:
+    """依存関係を宣言したサブ分析を並行実行するグラフ"""
+
+    def __init__(self):
+        self.nodes: Dict[str, AnalysisNode] = {}
+
+    def add(self, name, func, inputs=(), critical=True, timeout=DEFAULT_NODE_TIMEOUT):
+        """ノードの追加（依存先は先に追加されている必要がある）"""
+        if name in self.nodes:
+            raise AnalysisGraphError(f"Duplicate node: {name}")
+        unknown = [dep for dep in inputs if dep not in self.nodes]
+        if unknown:
+            raise AnalysisGraphError(f"Node {name} depends on unknown nodes: {', '.join(unknown)}")
+        self.nodes[name] = AnalysisNode(name, func, tuple(inputs), critical, timeout)
+        return self
+
+    def run(self, executor: Optional[ThreadPoolExecutor] = None) -> GraphResult:
+        """グラフの実行
+
+        依存ノードが揃ったノードから順に投入し、完了を待って次を投入する。
+        タイムアウトはノードの実行開始から数え、プールの空き待ちの時間は含めない。
+        タイムアウトしたノードは失敗扱いとする（スレッド自体は完了まで動き続ける）。
+
+        Args:
+            executor: 実行に使うプール（省略時は共有プール）
+
+        Raises:
+            AnalysisGraphError: クリティカルなノードが失敗・タイムアウト・スキップされた場合
+        """
+        started = time.perf_counter()
+
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        pending = dict(self.nodes)
+        running: Dict[Future, AnalysisNode] = {}
+        # ノード名 -> 実行開始時刻（ワーカーが開始時に1度だけ書き込む）
+        node_started: Dict[str, float] = {}
+
+        def elapsed_ms(since):
+            return round((time.perf_counter() - since) * 1000, 2)
+
+        def fail(node, status, message):
+            errors[node.name] = message
+            timings.setdefault(node.name, {})["status"] = status
+            if node.critical:
+                raise AnalysisGraphError(f"Critical analysis '{node.name}' {status}: {message}", timings)
+
+        def timed(node):
+            # 所要時間はワーカー側で測り、結果と一緒に返す
+            def call(*args):
+                node_started[node.name] = time.perf_counter()
+                value = node.func(*args)
+                return value, time.perf_counter()
+            return call
+
+        while pending or running:
+            # 依存先が失敗したノードはスキップ、揃ったノードは投入
+            for name, node in list(pending.items()):
+                failed = [dep for dep in node.inputs if dep in errors]
+                if failed:
+                    del pending[name]
+                    fail(node, "skipped", f"input failed: {', '.join(failed)}")
+                elif all(dep in results for dep in node.inputs):
+                    del pending[name]
+                    # 共有プールは作り直されることがあるため投入のたびに取得する
+                    pool = executor or get_executor()
+                    future = pool.submit(timed(node), *[results[dep] for dep in node.inputs])
+                    running[future] = node
+
+            if not running:
+                break
+
+            now = time.perf_counter()
+            deadlines = [node_started[node.name] + node.timeout
+                         for node in running.values() if node.name in node_started]
+            if len(deadlines) < len(running):
+                # 開始前のノードの開始を見逃さないよう定期的に確認する
+                deadlines.append(now + START_POLL_INTERVAL)
+            done, _ = wait(list(running), timeout=max(0.0, min(deadlines) - now),
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                node = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    results[node.name], node_finished = future.result()
+                    timings[node.name] = {
+                        "status": "ok",
+                        "start_ms": round((node_started[node.name] - started) * 1000, 2),
+                        "duration_ms": round((node_finished - node_started[node.name]) * 1000, 2)
+                    }
+                else:
+                    timings[node.name] = {"duration_ms": elapsed_ms(node_started.get(node.name, started))}
+                    fail(node, "failed", f"{type(error).__name__}: {error}")
+
+            now = time.perf_counter()
+            for future, node in list(running.items()):
+                node_start = node_started.get(node.name)
+                if node_start is not None and now - node_start >= node.timeout:
+                    del running[future]
+                    if executor is None:
+                        _abandon(future)
+                    timings[node.name] = {"duration_ms": elapsed_ms(node_start)}
+                    fail(node, "timeout", f"exceeded {node.timeout}s")
+
+        return GraphResult(results, timings, errors, elapsed_ms(started))
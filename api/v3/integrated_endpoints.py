@@ -5,21 +5,30 @@ TENAX FIT v3.0 統合APIエンドポイント
 """
 
 from flask import Blueprint, request, jsonify
+import copy
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+import numpy as np
+
 # Core engines
 from core.body_composition_engine import BodyCompositionEngine
 from core.metabolism_engine import MetabolismEngine
 from core.nutrition_engine import NutritionEngine
 from core.training_engine import TrainingEngine
 from core.safety_engine import SafetyEngine
+from core.scientific_calculations import MAX_BATCH_PROFILES, ScientificCalculationEngine
+from core.workout_plan_templates import get_workout_plan_templates
 
 # Existing AI features integration
 from core.pose_analyzer import PoseAnalyzer
 from ml.models.phase_detector import PhaseDetector
 from ml.api.food_analyzer import FoodAnalyzer
 
+from .analysis_graph import AnalysisGraph, AnalysisGraphError
+
 api_v3 = Blueprint('api_v3', __name__, url_prefix='/api/v3')
 
 # エンジンのグローバルインスタンス（実際の実装ではDIを使用）
@@ -28,6 +37,14 @@ metabolism_engine = MetabolismEngine()
 nutrition_engine = NutritionEngine()
 training_engine = TrainingEngine()
 safety_engine = SafetyEngine()
+# トレーニングプランのテンプレートは起動時に読み込む
+workout_templates = get_workout_plan_templates()
+
+# 同一プロフィール（数値は0.1単位に量子化）の分析結果を保持する件数
+ANALYSIS_CACHE_SIZE = 1024
+
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
 
 @api_v3.route('/comprehensive_analysis', methods=['POST'])
 def comprehensive_fitness_analysis():
@@ -45,213 +62,443 @@ def comprehensive_fitness_analysis():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
-        # 1. 身体組成分析
-        bmi = body_engine.calculate_bmi(data['weight'], data['height'])
-        bmi_category = body_engine.get_bmi_category(bmi)
+        # 計算結果は入力のみで決まるため、量子化した入力で計算してメモ化する
+        quantized = _quantize_analysis_input(data)
+        cache_key = _analysis_cache_key(quantized)
+        cached = _get_cached_analysis(cache_key)
+        if cached is not None:
+            comprehensive_result = copy.deepcopy(cached)
+            # ノードごとの実行時間は最初の計算時のものなので返さない
+            comprehensive_result["execution"] = {"cache_hit": True, "partial": False, "failed_nodes": []}
+        else:
+            comprehensive_result, execution = _build_comprehensive_analysis(quantized)
+            if not execution.partial:
+                _store_cached_analysis(cache_key, copy.deepcopy(comprehensive_result))
+            comprehensive_result["execution"] = {**execution.execution_report(), "cache_hit": False}
         
-        # 体脂肪率の推定（複数の方法）
-        estimated_bf_tanita = body_engine.estimate_body_fat_tanita(
-            data['weight'], data['height'], data['age'], data['gender']
-        )
+        # プロフィールは量子化前の入力をそのまま返す
+        comprehensive_result["user_profile"]["basic_info"] = _basic_info(data)
         
-        # より正確な推定が可能な場合
-        if all(key in data for key in ['waist_cm', 'neck_cm']):
-            hip_cm = data.get('hip_cm') if data['gender'] == 'female' else None
-            estimated_bf_navy = body_engine.estimate_body_fat_navy(
-                data['waist_cm'], data['neck_cm'], data['height'], hip_cm, data['gender']
-            )
-            estimated_bf = (estimated_bf_tanita + estimated_bf_navy) / 2
-        else:
-            estimated_bf = estimated_bf_tanita
+        comprehensive_result["analysis_id"] = f"TENAX-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        comprehensive_result["generated_at"] = datetime.now().isoformat()
         
-        # 除脂肪体重とFFMI計算
-        body_composition = body_engine.calculate_lean_body_mass(data['weight'], estimated_bf)
-        ffmi_data = body_engine.calculate_ffmi(data['weight'], data['height'], estimated_bf)
+        return jsonify(comprehensive_result), 200
         
-        # 理想体重範囲
-        ideal_weight = body_engine.calculate_ideal_weight_range(data['height'], data['gender'])
+    except AnalysisGraphError as e:
+        return jsonify({
+            "error": "Analysis failed",
+            "message": str(e),
+            "execution": {"nodes": e.node_timings}
+        }), 500
+    except Exception as e:
+        return jsonify({
+            "error": "Analysis failed",
+            "message": str(e)
+        }), 500
+
+@api_v3.route('/comprehensive_analysis/batch', methods=['POST'])
+def batch_profile_analysis():
+    """複数プロフィールの一括計算エンドポイント
+    
+    BMI・体脂肪率・BMR・TDEE・目標カロリー・PFC・カロリー安全性を
+    NumPy配列演算でまとめて計算する（計算式変更後の全ユーザー再計算用）
+    """
+    try:
+        profiles = (request.json or {}).get('profiles')
+        if not isinstance(profiles, list) or not profiles:
+            return jsonify({"error": "profiles must be a non-empty list"}), 400
+        if len(profiles) > MAX_BATCH_PROFILES:
+            return jsonify({"error": f"At most {MAX_BATCH_PROFILES} profiles per request"}), 400
         
-        # 2. 代謝計算（全方法で計算）
-        bmr_all = metabolism_engine.calculate_all_bmr_methods(
-            data['weight'], data['height'], data['age'], data['gender'], estimated_bf
-        )
+        required_fields = ['weight', 'height', 'age', 'gender', 'activity_level', 'goal']
+        for i, profile in enumerate(profiles):
+            missing = [field for field in required_fields if field not in profile]
+            if missing:
+                return jsonify({"error": f"Profile {i} is missing: {', '.join(missing)}"}), 400
+        
+        columns = {field: [profile[field] for profile in profiles] for field in required_fields}
+        try:
+            results = ScientificCalculationEngine.calculate_profiles_batch(
+                columns['weight'], columns['height'], columns['age'],
+                columns['gender'], columns['activity_level'], columns['goal']
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
         
-        # TDEEとカロリー目標
-        tdee_data = metabolism_engine.calculate_tdee(
-            bmr_all['recommended'], 
-            data['activity_level'],
-            data.get('neat_factor', 1.0)
-        )
+        results["bmi_category"] = _bmi_categories(results["bmi"])
+        columns = {name: values.tolist() for name, values in results.items()}
+        rows = [dict(zip(columns, row)) for row in zip(*columns.values())]
         
-        calorie_goals = metabolism_engine.calculate_calorie_goals(
-            tdee_data['total_tdee'], 
-            data['goal'],
-            data.get('timeframe_weeks', 12),
-            data['weight']
-        )
+        return jsonify({
+            "count": len(rows),
+            "results": rows,
+            "generated_at": datetime.now().isoformat()
+        }), 200
         
-        # 3. 栄養計算
-        pfc_macros = nutrition_engine.calculate_pfc_macros(
-            calorie_goals['target_calories'], 
-            data['goal']
+    except Exception as e:
+        return jsonify({
+            "error": "Batch analysis failed",
+            "message": str(e)
+        }), 500
+
+def _quantize_analysis_input(data):
+    """浮動小数点の入力を0.1単位に量子化"""
+    return {
+        key: round(value, 1) if isinstance(value, float) else value
+        for key, value in data.items()
+    }
+
+def _analysis_cache_key(quantized):
+    """量子化済みの入力から作るキャッシュキー"""
+    return json.dumps(quantized, sort_keys=True, ensure_ascii=False, default=str)
+
+def _get_cached_analysis(cache_key):
+    """メモ化済みの分析結果（呼び出し側でdeepcopyして使用すること）"""
+    with _analysis_cache_lock:
+        result = _analysis_cache.get(cache_key)
+        if result is not None:
+            _analysis_cache.move_to_end(cache_key)
+        return result
+
+def _store_cached_analysis(cache_key, result):
+    """分析結果のメモ化（部分結果は保存しない）"""
+    with _analysis_cache_lock:
+        _analysis_cache[cache_key] = result
+        _analysis_cache.move_to_end(cache_key)
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+
+def _bmi_categories(bmi):
+    """BMI配列をカテゴリー名の配列に変換"""
+    thresholds = body_engine.bmi_thresholds
+    names = ["underweight", "normal", "overweight", "obese_1", "obese_2"]
+    bins = [thresholds[name] for name in names]
+    return np.array(names + ["obese_3"])[np.digitize(bmi, bins)]
+
+def _basic_info(data):
+    """レスポンスに含める利用者の基本情報"""
+    return {
+        "age": data['age'],
+        "gender": data['gender'],
+        "height": data['height'],
+        "weight": data['weight'],
+        "activity_level": data['activity_level'],
+        "experience": data.get('experience', 'intermediate')
+    }
+
+def _build_comprehensive_analysis(data):
+    """統合分析の本体（入力のみに依存する純粋な計算）
+    
+    各サブ分析を依存グラフとして宣言し、独立したものは並行実行する。
+    非クリティカルなサブ分析が失敗した場合、その項目はNoneになる
+    
+    Returns:
+        (結果, GraphResult)
+    """
+    graph = AnalysisGraph()
+    
+    # 1. 身体組成分析
+    graph.add('body_fat', lambda: _estimate_body_fat(data))
+    graph.add('body_composition', lambda bf: _analyze_body_composition(data, bf),
+              inputs=['body_fat'], critical=False)
+    
+    # 2. 代謝計算（全方法で計算）
+    graph.add('metabolism', lambda bf: _calculate_metabolism(data, bf), inputs=['body_fat'])
+    
+    # 3. 栄養計算
+    graph.add('macros', lambda bf, metabolism: _calculate_macros(data, bf, metabolism),
+              inputs=['body_fat', 'metabolism'])
+    graph.add('meal_plan', lambda metabolism, macros: _generate_meal_plans(data, metabolism, macros),
+              inputs=['metabolism', 'macros'], critical=False)
+    
+    # 4. トレーニングプラン生成
+    graph.add('workout_plan', lambda: _generate_workout(data))
+    graph.add('exercise_calories', lambda: _calculate_planned_exercise_calories(data), critical=False)
+    
+    # 5. 安全性チェック
+    graph.add('safety', lambda bf, metabolism, macros, workout: _run_safety_check(
+        data, bf, metabolism, macros, workout
+    ), inputs=['body_fat', 'metabolism', 'macros', 'workout_plan'])
+    
+    execution = graph.run()
+    results = execution.results
+    
+    body_fat = results['body_fat']
+    metabolism = results['metabolism']
+    macros = results['macros']
+    meal_plans = results.get('meal_plan') or {}
+    workout = results['workout_plan']
+    safety_analysis = results['safety']
+    
+    # 6. 既存AI機能との統合ポイント
+    integration_features = {
+        "pose_analysis_ready": True,
+        "meal_photo_analysis": True,
+        "exercise_phase_detection": True,
+        "progress_tracking": True,
+        "ai_recommendations": _generate_ai_recommendations(data, safety_analysis)
+    }
+    
+    # 7. 包括的な結果を構築
+    comprehensive_result = {
+        "user_profile": {
+            "basic_info": _basic_info(data)
+        },
+        "body_composition": {
+            "bmi": round(body_fat['bmi'], 1),
+            "bmi_category": body_fat['bmi_category'],
+            "estimated_body_fat": round(body_fat['estimated_bf'], 1),
+            **(results.get('body_composition') or {
+                "lean_body_mass": None,
+                "ffmi": None,
+                "ideal_weight_range": None,
+                "health_warnings": None
+            })
+        },
+        "metabolism": {
+            "bmr_calculations": metabolism['bmr_all'],
+            "tdee": metabolism['tdee_data'],
+            "calorie_goals": metabolism['calorie_goals'],
+            "metabolic_type": _determine_metabolic_type(metabolism['bmr_all'], data)
+        },
+        "nutrition": {
+            "daily_macros": macros['pfc_macros'],
+            "protein_requirements": macros['protein_needs'],
+            "meal_plan": meal_plans.get('meal_plan'),
+            "workout_nutrition": meal_plans.get('workout_nutrition'),
+            "high_protein_foods": meal_plans.get('high_protein_foods'),
+            "hydration": {
+                "daily_water_ml": round(data['weight'] * 35),
+                "training_addition_ml": 500
+            }
+        },
+        "training": {
+            "workout_plan": workout['workout_plan'],
+            "exercise_calories": results.get('exercise_calories'),
+            "recovery_needs": workout['recovery_needs'],
+            "form_analysis_integration": {
+                "enabled": True,
+                "supported_exercises": ["squat", "deadlift", "bench_press"],
+                "real_time_feedback": True
+            }
+        },
+        "safety_analysis": safety_analysis,
+        "ai_integration": integration_features,
+        "next_steps": _generate_action_plan(safety_analysis, data['goal'])
+    }
+    
+    return comprehensive_result, execution
+
+# 統合分析のサブ分析（依存グラフの各ノード）
+def _estimate_body_fat(data):
+    """BMIと体脂肪率の推定（複数の方法）"""
+    bmi = body_engine.calculate_bmi(data['weight'], data['height'])
+    
+    estimated_bf_tanita = body_engine.estimate_body_fat_tanita(
+        data['weight'], data['height'], data['age'], data['gender']
+    )
+    
+    # より正確な推定が可能な場合
+    if all(key in data for key in ['waist_cm', 'neck_cm']):
+        hip_cm = data.get('hip_cm') if data['gender'] == 'female' else None
+        estimated_bf_navy = body_engine.estimate_body_fat_navy(
+            data['waist_cm'], data['neck_cm'], data['height'], hip_cm, data['gender']
         )
-        
-        protein_needs = nutrition_engine.calculate_protein_needs(
-            data['weight'], 
-            data['goal'], 
-            data['activity_level'],
-            estimated_bf
+        estimated_bf = (estimated_bf_tanita + estimated_bf_navy) / 2
+    else:
+        estimated_bf = estimated_bf_tanita
+    
+    return {
+        "bmi": bmi,
+        "bmi_category": body_engine.get_bmi_category(bmi),
+        "estimated_bf": estimated_bf
+    }
+
+def _analyze_body_composition(data, body_fat):
+    """除脂肪体重・FFMI・理想体重範囲・健康警告"""
+    estimated_bf = body_fat['estimated_bf']
+    return {
+        "lean_body_mass": body_engine.calculate_lean_body_mass(data['weight'], estimated_bf),
+        "ffmi": body_engine.calculate_ffmi(data['weight'], data['height'], estimated_bf),
+        "ideal_weight_range": body_engine.calculate_ideal_weight_range(data['height'], data['gender']),
+        "health_warnings": body_engine.generate_health_warnings(
+            data.get('target_body_fat', estimated_bf), 
+            estimated_bf, 
+            data['gender']
         )
-        
-        # 食事プラン生成
-        meal_plan = nutrition_engine.generate_sample_meal_plan(
-            calorie_goals['target_calories'],
-            pfc_macros,
-            data.get('meal_timing', 'general')
+    }
+
+def _calculate_metabolism(data, body_fat):
+    """BMR（全方法）・TDEE・カロリー目標"""
+    bmr_all = metabolism_engine.calculate_all_bmr_methods(
+        data['weight'], data['height'], data['age'], data['gender'], body_fat['estimated_bf']
+    )
+    
+    tdee_data = metabolism_engine.calculate_tdee(
+        bmr_all['recommended'], 
+        data['activity_level'],
+        data.get('neat_factor', 1.0)
+    )
+    
+    calorie_goals = metabolism_engine.calculate_calorie_goals(
+        tdee_data['total_tdee'], 
+        data['goal'],
+        data.get('timeframe_weeks', 12),
+        data['weight']
+    )
+    
+    return {"bmr_all": bmr_all, "tdee_data": tdee_data, "calorie_goals": calorie_goals}
+
+def _calculate_macros(data, body_fat, metabolism):
+    """PFCバランスとタンパク質必要量"""
+    pfc_macros = nutrition_engine.calculate_pfc_macros(
+        metabolism['calorie_goals']['target_calories'], 
+        data['goal']
+    )
+    
+    protein_needs = nutrition_engine.calculate_protein_needs(
+        data['weight'], 
+        data['goal'], 
+        data['activity_level'],
+        body_fat['estimated_bf']
+    )
+    
+    return {"pfc_macros": pfc_macros, "protein_needs": protein_needs}
+
+def _generate_meal_plans(data, metabolism, macros):
+    """食事プランとワークアウト前後の栄養"""
+    meal_plan = nutrition_engine.generate_sample_meal_plan(
+        metabolism['calorie_goals']['target_calories'],
+        macros['pfc_macros'],
+        data.get('meal_timing', 'general')
+    )
+    
+    if data.get('workout_planned'):
+        workout_nutrition = nutrition_engine.calculate_pre_post_workout_nutrition(
+            data.get('workout_duration', 60),
+            data.get('workout_intensity', 'moderate')
         )
-        
-        # ワークアウト前後の栄養
-        if data.get('workout_planned'):
-            workout_nutrition = nutrition_engine.calculate_pre_post_workout_nutrition(
-                data.get('workout_duration', 60),
-                data.get('workout_intensity', 'moderate')
-            )
-        else:
-            workout_nutrition = None
-        
-        # 4. トレーニングプラン生成
-        workout_plan = training_engine.generate_workout_plan(
-            data.get('experience', 'intermediate'),
-            data['goal'],
-            data.get('available_days', 4),
-            data.get('equipment', 'full_gym')
+    else:
+        workout_nutrition = None
+    
+    return {
+        "meal_plan": meal_plan,
+        "workout_nutrition": workout_nutrition,
+        "high_protein_foods": nutrition_engine.get_high_protein_foods()
+    }
+
+def _generate_workout(data):
+    """トレーニングプランと回復の推奨"""
+    workout_plan = training_engine.generate_workout_plan(
+        data.get('experience', 'intermediate'),
+        data['goal'],
+        data.get('available_days', 4),
+        data.get('equipment', 'full_gym')
+    )
+    
+    frequency_days = int(workout_plan['frequency'].split('日')[0])
+    
+    return {
+        "workout_plan": workout_plan,
+        "frequency_days": frequency_days,
+        "recovery_needs": training_engine._get_recovery_recommendations(frequency_days)
+    }
+
+def _calculate_planned_exercise_calories(data):
+    """予定している運動の消費カロリー"""
+    if not data.get('planned_exercises'):
+        return None
+    
+    exercise_calories = []
+    for exercise in data['planned_exercises']:
+        cal_data = training_engine.calculate_exercise_calories(
+            exercise['type'],
+            exercise['intensity'],
+            data['weight'],
+            exercise['duration']
         )
-        
-        # 運動カロリー計算の例
-        if data.get('planned_exercises'):
-            exercise_calories = []
-            for exercise in data['planned_exercises']:
-                cal_data = training_engine.calculate_exercise_calories(
-                    exercise['type'],
-                    exercise['intensity'],
-                    data['weight'],
-                    exercise['duration']
-                )
-                exercise_calories.append({
-                    "exercise": exercise['name'],
-                    "calories": cal_data
-                })
-        else:
-            exercise_calories = None
-        
-        # 5. 安全性チェック
-        user_data_for_safety = {
-            **data,
-            'bmr': bmr_all['recommended'],
-            'tdee': tdee_data['total_tdee'],
-            'current_body_fat': estimated_bf
-        }
-        
-        goals_for_safety = {
-            'target_body_fat': data.get('target_body_fat'),
-            'weekly_weight_change': calorie_goals['weekly_weight_change_kg']
-        }
-        
-        plan_for_safety = {
-            'target_calories': calorie_goals['target_calories'],
-            'training_plan': {
-                'weekly_duration_hours': float(workout_plan['frequency'].split('-')[0]) * 1.25,
-                'frequency_days': int(workout_plan['frequency'].split('日')[0])
-            },
-            'nutrition_plan': {
-                **pfc_macros,
-                'total_calories': calorie_goals['target_calories']
-            }
+        exercise_calories.append({
+            "exercise": exercise['name'],
+            "calories": cal_data
+        })
+    return exercise_calories
+
+def _run_safety_check(data, body_fat, metabolism, macros, workout):
+    """計画全体の安全性チェック"""
+    calorie_goals = metabolism['calorie_goals']
+    
+    user_data_for_safety = {
+        **data,
+        'bmr': metabolism['bmr_all']['recommended'],
+        'tdee': metabolism['tdee_data']['total_tdee'],
+        'current_body_fat': body_fat['estimated_bf']
+    }
+    
+    goals_for_safety = {
+        'target_body_fat': data.get('target_body_fat'),
+        'weekly_weight_change': calorie_goals['weekly_weight_change_kg']
+    }
+    
+    plan_for_safety = {
+        'target_calories': calorie_goals['target_calories'],
+        'training_plan': {
+            'weekly_duration_hours': workout['frequency_days'] * 1.25,
+            'frequency_days': workout['frequency_days']
+        },
+        'nutrition_plan': {
+            **macros['pfc_macros'],
+            'total_calories': calorie_goals['target_calories']
         }
-        
-        safety_analysis = safety_engine.comprehensive_safety_check(
-            user_data_for_safety,
-            goals_for_safety,
-            plan_for_safety
+    }
+    
+    return safety_engine.comprehensive_safety_check(
+        user_data_for_safety,
+        goals_for_safety,
+        plan_for_safety
+    )
+
+def _is_positive_number(value):
+    """正の数値か（bool は除く）"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+@api_v3.route('/workout_plan', methods=['POST'])
+def workout_plan():
+    """トレーニングプラン取得エンドポイント
+    
+    事前生成したテンプレートに体重ベースの消費カロリー見積もりを付加して返す
+    """
+    try:
+        data = request.json or {}
+        experience = data.get('experience', 'intermediate')
+        goal = data.get('goal', 'hypertrophy')
+        available_days = data.get('available_days', 4)
+        weight = data.get('weight')
+        session_minutes = data.get('session_minutes')
+        
+        if experience not in training_engine.experience_levels:
+            return jsonify({"error": f"Invalid experience: {experience}"}), 400
+        if goal not in training_engine.training_parameters:
+            return jsonify({"error": f"Invalid goal: {goal}"}), 400
+        if not isinstance(available_days, int) or not 1 <= available_days <= 7:
+            return jsonify({"error": "available_days must be an integer between 1 and 7"}), 400
+        if weight is not None and not _is_positive_number(weight):
+            return jsonify({"error": "weight must be a positive number"}), 400
+        if session_minutes is not None and not _is_positive_number(session_minutes):
+            return jsonify({"error": "session_minutes must be a positive number"}), 400
+        
+        plan = workout_templates.personalize(
+            experience,
+            goal,
+            available_days,
+            data.get('equipment', 'full_gym'),
+            weight_kg=weight,
+            session_minutes=session_minutes
         )
         
-        # 6. 既存AI機能との統合ポイント
-        integration_features = {
-            "pose_analysis_ready": True,
-            "meal_photo_analysis": True,
-            "exercise_phase_detection": True,
-            "progress_tracking": True,
-            "ai_recommendations": _generate_ai_recommendations(data, safety_analysis)
-        }
-        
-        # 7. 包括的な結果を構築
-        comprehensive_result = {
-            "analysis_id": f"TENAX-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-            "user_profile": {
-                "basic_info": {
-                    "age": data['age'],
-                    "gender": data['gender'],
-                    "height": data['height'],
-                    "weight": data['weight'],
-                    "activity_level": data['activity_level'],
-                    "experience": data.get('experience', 'intermediate')
-                }
-            },
-            "body_composition": {
-                "bmi": round(bmi, 1),
-                "bmi_category": bmi_category,
-                "estimated_body_fat": round(estimated_bf, 1),
-                "lean_body_mass": body_composition,
-                "ffmi": ffmi_data,
-                "ideal_weight_range": ideal_weight,
-                "health_warnings": body_engine.generate_health_warnings(
-                    data.get('target_body_fat', estimated_bf), 
-                    estimated_bf, 
-                    data['gender']
-                )
-            },
-            "metabolism": {
-                "bmr_calculations": bmr_all,
-                "tdee": tdee_data,
-                "calorie_goals": calorie_goals,
-                "metabolic_type": _determine_metabolic_type(bmr_all, data)
-            },
-            "nutrition": {
-                "daily_macros": pfc_macros,
-                "protein_requirements": protein_needs,
-                "meal_plan": meal_plan,
-                "workout_nutrition": workout_nutrition,
-                "high_protein_foods": nutrition_engine.get_high_protein_foods(),
-                "hydration": {
-                    "daily_water_ml": round(data['weight'] * 35),
-                    "training_addition_ml": 500
-                }
-            },
-            "training": {
-                "workout_plan": workout_plan,
-                "exercise_calories": exercise_calories,
-                "recovery_needs": training_engine._get_recovery_recommendations(
-                    int(workout_plan['frequency'].split('日')[0])
-                ),
-                "form_analysis_integration": {
-                    "enabled": True,
-                    "supported_exercises": ["squat", "deadlift", "bench_press"],
-                    "real_time_feedback": True
-                }
-            },
-            "safety_analysis": safety_analysis,
-            "ai_integration": integration_features,
-            "next_steps": _generate_action_plan(safety_analysis, data['goal']),
-            "generated_at": datetime.now().isoformat()
-        }
-        
-        return jsonify(comprehensive_result), 200
+        return jsonify(plan), 200
         
     except Exception as e:
-        return jsonify({
-            "error": "Analysis failed",
-            "message": str(e)
-        }), 500
+        return jsonify({"error": str(e)}), 500
 
 @api_v3.route('/update_goals', methods=['POST'])
 def update_fitness_goals():
@@ -343,55 +590,54 @@ def integrate_ai_analysis():
     try:
         data = request.json
         analysis_type = data.get('type')  # 'pose', 'meal', 'phase'
+        user_id = data.get('user_id')
+        graph = AnalysisGraph()
         
         if analysis_type == 'pose':
-            # 姿勢分析結果との統合
+            # 姿勢分析結果との統合（実際の測定値で身体組成を更新）
             pose_data = data.get('pose_results')
-            body_metrics = _extract_body_metrics_from_pose(pose_data)
-            
-            # 実際の測定値で身体組成を更新
-            updated_composition = _update_composition_with_measurements(
-                data.get('user_id'), body_metrics
-            )
-            
-            return jsonify({
-                "success": True,
-                "integrated_analysis": updated_composition,
-                "recommendations": _generate_posture_based_recommendations(pose_data)
-            }), 200
+            graph.add('body_metrics', lambda: _extract_body_metrics_from_pose(pose_data))
+            graph.add('integrated_analysis', lambda metrics: _update_composition_with_measurements(
+                user_id, metrics
+            ), inputs=['body_metrics'])
+            graph.add('recommendations', lambda: _generate_posture_based_recommendations(pose_data),
+                      critical=False)
+            sections = ['integrated_analysis', 'recommendations']
             
         elif analysis_type == 'meal':
             # 食事分析結果との統合
             meal_data = data.get('meal_analysis')
-            daily_nutrition = _integrate_meal_to_daily_nutrition(
-                data.get('user_id'), meal_data
-            )
-            
-            return jsonify({
-                "success": True,
-                "daily_nutrition_update": daily_nutrition,
-                "remaining_macros": _calculate_remaining_macros(
-                    data.get('user_id'), daily_nutrition
-                )
-            }), 200
+            graph.add('daily_nutrition_update', lambda: _integrate_meal_to_daily_nutrition(
+                user_id, meal_data
+            ))
+            graph.add('remaining_macros', lambda daily: _calculate_remaining_macros(user_id, daily),
+                      inputs=['daily_nutrition_update'], critical=False)
+            sections = ['daily_nutrition_update', 'remaining_macros']
             
         elif analysis_type == 'phase':
             # 運動位相検出との統合
             phase_data = data.get('phase_detection')
-            workout_quality = _analyze_workout_quality(phase_data)
-            
-            return jsonify({
-                "success": True,
-                "workout_analysis": workout_quality,
-                "form_improvements": _generate_form_improvements(phase_data),
-                "calories_burned_adjusted": _adjust_calories_for_form_quality(
-                    phase_data, workout_quality
-                )
-            }), 200
+            graph.add('workout_analysis', lambda: _analyze_workout_quality(phase_data))
+            graph.add('form_improvements', lambda: _generate_form_improvements(phase_data),
+                      critical=False)
+            graph.add('calories_burned_adjusted', lambda quality: _adjust_calories_for_form_quality(
+                phase_data, quality
+            ), inputs=['workout_analysis'], critical=False)
+            sections = ['workout_analysis', 'form_improvements', 'calories_burned_adjusted']
             
         else:
             return jsonify({"error": "Invalid analysis type"}), 400
-            
+        
+        execution = graph.run()
+        
+        return jsonify({
+            "success": True,
+            **{section: execution.results.get(section) for section in sections},
+            "execution": execution.execution_report()
+        }), 200
+        
+    except AnalysisGraphError as e:
+        return jsonify({"error": str(e), "execution": {"nodes": e.node_timings}}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -405,34 +651,43 @@ def generate_comprehensive_report():
         if not user_id:
             return jsonify({"error": "User ID required"}), 400
         
-        # ユーザーデータの集約
-        user_data = _get_user_current_data(user_id)
-        historical_data = _get_historical_data(user_id, report_type)
-        
-        # レポート生成
         if report_type == 'weekly':
-            report = _generate_weekly_report(user_data, historical_data)
+            build_report = _generate_weekly_report
         elif report_type == 'monthly':
-            report = _generate_monthly_report(user_data, historical_data)
+            build_report = _generate_monthly_report
         else:
-            report = _generate_progress_report(user_data, historical_data)
+            build_report = _generate_progress_report
+        
+        graph = AnalysisGraph()
+        
+        # ユーザーデータの集約（現在値と履歴は独立に取得）
+        graph.add('user_data', lambda: _get_user_current_data(user_id))
+        graph.add('historical_data', lambda: _get_historical_data(user_id, report_type))
+        
+        # レポート生成
+        graph.add('report_data', build_report, inputs=['user_data', 'historical_data'])
         
         # 安全性レポートも含める
-        safety_report = safety_engine.generate_safety_report(
+        graph.add('safety_report', lambda user_data: safety_engine.generate_safety_report(
             user_data,
             user_data.get('goals', {}),
             user_data.get('current_plan', {}),
             {}
-        )
+        ), inputs=['user_data'], critical=False)
+        
+        execution = graph.run()
         
         return jsonify({
             "report_type": report_type,
             "generated_at": datetime.now().isoformat(),
-            "report_data": report,
-            "safety_report": safety_report,
-            "export_formats": ["PDF", "JSON", "CSV"]
+            "report_data": execution.results['report_data'],
+            "safety_report": execution.results.get('safety_report'),
+            "export_formats": ["PDF", "JSON", "CSV"],
+            "execution": execution.execution_report()
         }), 200
         
+    except AnalysisGraphError as e:
+        return jsonify({"error": str(e), "execution": {"nodes": e.node_timings}}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
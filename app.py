@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_from_directory, flash, session, make_response
+from flask import Flask, render_template, request, redirect, url_for, jsonify, send_from_directory, flash, session, make_response, Response, stream_with_context
 
 # flask-corsが利用できない場合の対応
 try:
@@ -53,7 +53,8 @@ from core.exercise_classifier import ExerciseClassifier
 from utils.workout_models import workout_db
 from core.exercise_database import (
     EXERCISE_DATABASE, get_all_exercises, search_exercises, 
-    get_exercises_by_category, get_exercise_by_id, COMMON_WEIGHTS, get_weight_suggestions
+    get_exercises_by_category, get_exercise_by_id, COMMON_WEIGHTS, get_weight_suggestions,
+    exercise_catalog, add_custom_exercise
 )
 from utils.auth_models import AuthManager
 auth_manager = AuthManager()
@@ -988,19 +989,9 @@ def ml_train_model():
                 'error': '機械学習モジュールが利用できません'
             }), 400
         
-        # バックグラウンドでの学習実行（実際の実装では非同期処理を推奨）
-        try:
-            from ml.scripts.train_model import ModelTrainer
-            trainer = ModelTrainer()
-            result = trainer.full_training_pipeline(days)
-            
-            return jsonify(result)
-            
-        except ImportError:
-            return jsonify({
-                'success': False,
-                'error': '学習スクリプトモジュールが利用できません'
-            }), 500
+        # 学習はバックグラウンドジョブとして実行し、ジョブIDを返す
+        # 学習済みモデルはレジストリに新バージョンとして公開され、各ワーカーが再起動なしで切り替える
+        return _submit_background_job('ml_train', {'days': days})
         
     except Exception as e:
         logger.error(f"ML学習エラー: {e}")
@@ -1323,33 +1314,38 @@ def export_training_data():
         date_from = request.args.get('date_from')
         date_to = request.args.get('date_to')
         format_type = request.args.get('format', 'csv')
+        compress = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')
         
         # 実際の運用では管理者認証が必要
         
         if COLLECTION_AVAILABLE and DATA_COLLECTOR:
-            exported_data = DATA_COLLECTOR.export_training_data(
+            from ml.data.export_formats import CONTENT_TYPES, export_filename
+            
+            # サーバーサイドカーソルから逐次エンコードし、チャンク転送で返す（メモリ使用量は一定）
+            # 形式の検証とクエリの実行はここで行われるため、エラーはストリーム開始前に返る
+            chunks = DATA_COLLECTOR.stream_training_data(
                 exercise_filter=exercise_filter,
                 date_from=date_from,
                 date_to=date_to,
-                format=format_type
+                format=format_type,
+                compress=compress
             )
             
-            # レスポンスヘッダー設定
-            if format_type.lower() == 'csv':
-                response = make_response(exported_data)
-                response.headers['Content-Type'] = 'text/csv'
-                response.headers['Content-Disposition'] = 'attachment; filename=training_data.csv'
-            else:
-                response = make_response(exported_data)
-                response.headers['Content-Type'] = 'application/json'
-                response.headers['Content-Disposition'] = 'attachment; filename=training_data.json'
-            
+            format_type = format_type.lower()
+            response = Response(stream_with_context(chunks), mimetype=CONTENT_TYPES[format_type])
+            if compress:
+                response.headers['Content-Type'] = 'application/gzip'
+            response.headers['Content-Disposition'] = (
+                f'attachment; filename={export_filename(format_type, compress)}'
+            )
             return response
         else:
             return jsonify({
                 'error': 'データ収集システムが利用できません'
             }), 503
             
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"データエクスポートエラー: {e}")
         return jsonify({'error': str(e)}), 500
@@ -1426,6 +1422,14 @@ def quick_health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/metrics/prometheus')
+def prometheus_metrics():
+    """解析パイプラインのステージ別レイテンシ（Prometheus テキスト形式）"""
+    from utils.profiling import get_metrics_registry
+    registry = get_metrics_registry()
+    body = registry.render_prometheus() if registry is not None else ''
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/system/diagnostics', methods=['POST'])
 def run_system_diagnostics():
     """システム診断とトラブルシューティング"""
@@ -1541,6 +1545,85 @@ def _generate_comprehensive_recommendations(health_status):
     
     return list(set(recommendations))  # 重複除去
 
+# ===== バックグラウンドジョブAPI =====
+
+def _submit_background_job(pipeline, params, inputs=None):
+    """パイプラインをバックグラウンドジョブとして投入し、202（実行中なら409）を返す
+
+    大きな入力データは inputs で渡す（状態ファイルではなくジョブディレクトリに保存される）
+    """
+    try:
+        from ml.api.training_jobs import training_job_manager, JobConflictError
+    except ImportError:
+        return jsonify({
+            'success': False,
+            'error': 'ジョブ実行モジュールが利用できません'
+        }), 500
+    
+    try:
+        job = training_job_manager.submit(pipeline, params, inputs=inputs)
+    except JobConflictError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'active_job_id': e.active_job_id,
+            'status_url': f"/api/jobs/{e.active_job_id}"
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'job_id': job['job_id'],
+        'job': job,
+        'status_url': f"/api/jobs/{job['job_id']}"
+    }), 202
+
+@app.route('/api/jobs')
+def list_background_jobs():
+    """バックグラウンドジョブ一覧"""
+    try:
+        from ml.api.training_jobs import training_job_manager
+        
+        pipeline = request.args.get('pipeline')
+        limit = request.args.get('limit', 20, type=int)
+        return jsonify({
+            'success': True,
+            'jobs': training_job_manager.list_jobs(pipeline, limit)
+        })
+        
+    except Exception as e:
+        logger.error(f"ジョブ一覧取得エラー: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>')
+def get_background_job(job_id):
+    """バックグラウンドジョブの状態（終了済みなら結果を含む）"""
+    try:
+        from ml.api.training_jobs import training_job_manager
+        
+        status = training_job_manager.status(job_id)
+        if status is None:
+            return jsonify({'error': 'ジョブが見つかりません'}), 404
+        return jsonify({'success': True, 'job': status})
+        
+    except Exception as e:
+        logger.error(f"ジョブ状態取得エラー: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_background_job(job_id):
+    """バックグラウンドジョブのキャンセル"""
+    try:
+        from ml.api.training_jobs import training_job_manager
+        
+        status = training_job_manager.cancel(job_id)
+        if status is None:
+            return jsonify({'error': 'ジョブが見つかりません'}), 404
+        return jsonify({'success': True, 'job': status})
+        
+    except Exception as e:
+        logger.error(f"ジョブキャンセルエラー: {e}")
+        return jsonify({'error': str(e)}), 500
+
 # ===== データ前処理API =====
 
 @app.route('/api/preprocessing/run', methods=['POST'])
@@ -1553,60 +1636,19 @@ def run_preprocessing_pipeline():
         augmentation_factor = data.get('augmentation_factor', 2)
         
         if COLLECTION_AVAILABLE and DATA_COLLECTOR:
-            # 前処理パイプラインを実行
-            try:
-                from ml.scripts.preprocessing import TrainingDataPreprocessor
-                
-                preprocessor = TrainingDataPreprocessor()
-                
-                # 1. 生データの読み込み
-                raw_data = preprocessor.load_raw_data(
-                    exercise_filter=exercise_filter,
-                    limit=data_limit
-                )
-                
-                if not raw_data:
-                    return jsonify({
-                        'success': False,
-                        'error': '処理対象のデータが見つかりません'
-                    }), 400
-                
-                # 2. データクリーニング
-                cleaned_data = preprocessor.clean_data(raw_data)
-                
-                # 3. 特徴量エンジニアリング
-                featured_data = preprocessor.extract_features(cleaned_data)
-                
-                # 4. 正規化
-                normalized_data = preprocessor.normalize_data(featured_data)
-                
-                # 5. データ拡張
-                augmented_data = preprocessor.augment_data(
-                    normalized_data, 
-                    augmentation_factor=augmentation_factor
-                )
-                
-                # 6. 保存
-                preprocessor.save_processed_data(augmented_data)
-                
-                return jsonify({
-                    'success': True,
-                    'message': '前処理パイプラインが完了しました',
-                    'statistics': {
-                        'raw_samples': len(raw_data),
-                        'cleaned_samples': len(cleaned_data),
-                        'featured_samples': len(featured_data),
-                        'final_samples': len(augmented_data),
-                        'processing_date': datetime.now().isoformat()
-                    }
+            # 前処理パイプラインはバックグラウンドジョブとして実行（進捗は /api/jobs/<job_id> で確認）
+            if data.get('corpus'):
+                # 件数上限なしでコーパス全体をバッチ単位・並列で処理
+                return _submit_background_job('corpus_preprocessing', {
+                    'exercise_filter': exercise_filter,
+                    'augmentation_factor': augmentation_factor,
+                    'batch_size': data.get('batch_size', 2000)
                 })
-                
-            except ImportError:
-                return jsonify({
-                    'success': False,
-                    'error': '前処理モジュールが利用できません'
-                }), 500
-                
+            return _submit_background_job('preprocessing', {
+                'exercise_filter': exercise_filter,
+                'limit': data_limit,
+                'augmentation_factor': augmentation_factor
+            })
         else:
             return jsonify({
                 'success': False,
@@ -1660,38 +1702,11 @@ def run_feature_engineering():
                 'error': 'ポーズデータが必要です'
             }), 400
         
-        try:
-            from ml.scripts.feature_engineering import AdvancedFeatureEngineer
-            
-            engineer = AdvancedFeatureEngineer()
-            
-            # フォーム品質特徴量の抽出
-            form_features = engineer.extract_form_quality_features(
-                pose_data, exercise, metadata
-            )
-            
-            # 時系列特徴量の抽出（複数フレームの場合）
-            temporal_features = {}
-            if isinstance(pose_data[0], list) and len(pose_data) > 1:
-                temporal_features = engineer.extract_temporal_features(
-                    pose_data, exercise
-                )
-            
-            # 特徴量を統合
-            all_features = {**form_features, **temporal_features}
-            
-            return jsonify({
-                'success': True,
-                'features': all_features,
-                'feature_count': len(all_features),
-                'exercise': exercise
-            })
-            
-        except ImportError:
-            return jsonify({
-                'success': False,
-                'error': '特徴量エンジニアリングモジュールが利用できません'
-            }), 500
+        # 特徴量抽出はバックグラウンドジョブとして実行（結果は /api/jobs/<job_id> で取得）
+        return _submit_background_job('feature_engineering', {
+            'exercise': exercise,
+            'metadata': metadata
+        }, inputs={'pose_data': pose_data})
             
     except Exception as e:
         logger.error(f"特徴量エンジニアリングエラー: {e}")
@@ -2040,8 +2055,9 @@ def get_exercise_categories():
 def get_exercises_by_category_api(category):
     """部位別で種目を取得"""
     try:
-        exercises = get_exercises_by_category(category)
-        return jsonify({'exercises': exercises})
+        # 事前にシリアライズ済みのレスポンスを返す
+        return Response(exercise_catalog.serialized(category),
+                        mimetype='application/json; charset=utf-8')
     except Exception as e:
         logger.error(f"カテゴリー別種目取得エラー: {e}")
         return jsonify({'error': str(e)}), 500
@@ -2051,10 +2067,12 @@ def search_exercises_api():
     """種目検索API"""
     try:
         query = request.args.get('q', '')
+        limit = min(request.args.get('limit', 50, type=int), 200)
         if not query:
             return jsonify({'exercises': []})
         
-        exercises = search_exercises(query)
+        # ログイン中ならユーザー定義の種目も含めて検索
+        exercises = search_exercises(query, limit=limit, owner=session.get('user_email'))
         return jsonify({'exercises': exercises})
     except Exception as e:
         logger.error(f"種目検索エラー: {e}")
@@ -2064,12 +2082,35 @@ def search_exercises_api():
 def get_all_exercises_api():
     """全種目を取得"""
     try:
-        exercises = get_all_exercises()
-        return jsonify({'exercises': exercises})
+        # 事前にシリアライズ済みのレスポンスを返す
+        return Response(exercise_catalog.serialized(),
+                        mimetype='application/json; charset=utf-8')
     except Exception as e:
         logger.error(f"全種目取得エラー: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/exercises/custom', methods=['POST'])
+def add_custom_exercise_api():
+    """ユーザー定義の種目を追加"""
+    user_email = session.get('user_email')
+    if not user_email:
+        return jsonify({'error': 'ログインが必要です'}), 401
+    
+    data = request.get_json() or {}
+    if not data.get('id') or not data.get('name'):
+        return jsonify({'error': 'id と name は必須です'}), 400
+    
+    try:
+        add_custom_exercise(
+            {'id': data['id'], 'name': data['name'], 'type': data.get('type', 'compound')},
+            data.get('category', ''),
+            data.get('subcategory', ''),
+            owner=user_email
+        )
+        return jsonify({'success': True, 'exercise': get_exercise_by_id(data['id'], owner=user_email)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/api/weights/suggestions')
 def get_weight_suggestions_api():
     """重量選択候補を取得"""
@@ -2195,21 +2236,9 @@ def analyze_pose():
 
 def calculate_angle(point1, point2, point3):
     """3点から角度を計算"""
-    import numpy as np
-    
-    # ベクトルを計算
-    a = np.array([point1['x'], point1['y']])
-    b = np.array([point2['x'], point2['y']])
-    c = np.array([point3['x'], point3['y']])
-    
-    ba = a - b
-    bc = c - b
-    
-    # 角度を計算
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
+    from utils.kinematics import point_angle
     
-    return np.degrees(angle)
+    return point_angle(point1, point2, point3, dims=2)
 
 def calculate_back_angle(shoulder, hip):
     """背中の傾きを計算"""
@@ -4,8 +4,6 @@ FastAPI routes for pose analysis and form evaluation
 """
 import asyncio
 import logging
-import tempfile
-import os
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, BackgroundTasks, Request
 from fastapi.responses import JSONResponse
@@ -18,6 +16,7 @@ from ..database import get_db
 from ..models.workout import WorkoutSession, FormAnalysis
 from sqlalchemy.orm import Session, joinedload
 from ..services.cache_service import cached
+from ..utils.uploads import read_upload_bytes, video_upload
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -65,8 +64,8 @@ async def analyze_single_frame(
                 detail="File must be an image"
             )
         
-        # Read image data
-        image_data = await file.read()
+        # Read image data (size-capped)
+        image_data = await read_upload_bytes(file)
         
         # Convert to OpenCV format
         nparr = np.frombuffer(image_data, np.uint8)
@@ -139,7 +138,8 @@ async def analyze_video_sequence(
     exercise_type: str = "squat",
     session_id: Optional[str] = None,
     user_id: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    request: Request = None
 ):
     """
     Analyze a video file for comprehensive form analysis
@@ -148,37 +148,18 @@ async def analyze_video_sequence(
     start_time = time.time()
     
     try:
-        # Validate file type
-        if not file.content_type.startswith('video/'):
-            raise HTTPException(
-                status_code=400,
-                detail="File must be a video"
-            )
-        
-        # Save uploaded video to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-        
-        try:
-            # Extract frames from video
-            frames = await extract_video_frames(temp_path)
-            
-            if not frames:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Could not extract frames from video"
-                )
-            
-            # Analyze video sequence
-            result = await analyzer.process_video_sequence(frames, exercise_type)
+        # Stream the upload to disk; type, size, duration and readability
+        # are checked before any frames are decoded
+        async with video_upload(file) as upload:
+            # Identical uploads reuse the previous analysis
+            cache_service = getattr(request.app.state, 'cache_service', None) if request else None
+            cache_key = f"video_analysis:{upload.sha256}:{exercise_type}"
+            result = cache_service.get(cache_key) if cache_service else None
             
-            if not result.get("success"):
-                raise HTTPException(
-                    status_code=400,
-                    detail=result.get("error", "Video analysis failed")
-                )
+            if result is None:
+                result = await _analyze_video_file(upload.path, exercise_type)
+                if cache_service:
+                    cache_service.set(cache_key, result, ttl=3600)
             
             # Save comprehensive analysis to database
             if session_id and user_id:
@@ -197,15 +178,10 @@ async def analyze_video_sequence(
                 success=True,
                 sequence_analysis=result.get("sequence_analysis"),
                 aggregated_feedback=result.get("aggregated_feedback", []),
-                best_frame_analysis=result.get("best_frame_analysis").__dict__ if result.get("best_frame_analysis") else None,
+                best_frame_analysis=result.get("best_frame_analysis"),
                 processing_time=processing_time,
                 session_id=session_id
             )
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
         
     except HTTPException:
         raise
@@ -218,6 +194,36 @@ async def analyze_video_sequence(
             session_id=session_id
         )
 
+async def _analyze_video_file(video_path: str, exercise_type: str) -> dict:
+    """
+    Run sequence analysis on a stored video
+    
+    Returns:
+        Analyzer result with best_frame_analysis converted to a plain dict
+    """
+    # Extract frames from video
+    frames = await extract_video_frames(video_path)
+    
+    if not frames:
+        raise HTTPException(
+            status_code=400,
+            detail="Could not extract frames from video"
+        )
+    
+    # Analyze video sequence
+    result = await analyzer.process_video_sequence(frames, exercise_type)
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=400,
+            detail=result.get("error", "Video analysis failed")
+        )
+    
+    best_frame = result.get("best_frame_analysis")
+    if best_frame is not None and not isinstance(best_frame, dict):
+        result["best_frame_analysis"] = best_frame.__dict__
+    return result
+
 @router.get("/exercises/supported")
 async def get_supported_exercises(request: Request = None):
     """
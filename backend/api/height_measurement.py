@@ -3,8 +3,6 @@ Height Measurement API Endpoints
 Video-based and manual height measurement
 """
 import logging
-import tempfile
-import os
 from typing import Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
 from pydantic import BaseModel
@@ -14,6 +12,7 @@ import numpy as np
 from ..database import get_db
 from ..models.user import User, UserBodyMeasurement
 from ..api.auth import get_current_user
+from ..utils.uploads import receive_video_upload
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
@@ -100,18 +99,10 @@ async def measure_height_from_video(
     Measure height from video using AI analysis
     """
     try:
-        # Validate file type
-        if not file.content_type.startswith('video/'):
-            raise HTTPException(
-                status_code=400,
-                detail="File must be a video"
-            )
-        
-        # Save uploaded video to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
+        # Stream the uploaded video to a temporary file (validates type,
+        # size, duration and readability)
+        upload = await receive_video_upload(file)
+        temp_path = upload.path
         
         try:
             # Analyze video for height measurement
@@ -159,8 +150,7 @@ async def measure_height_from_video(
             
         finally:
             # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            upload.cleanup()
         
     except HTTPException:
         raise
@@ -292,6 +282,7 @@ async def delete_height_measurement(
 
 # Import the enhanced height analyzer
 from ..services.height_analyzer import HeightAnalyzer
+from ..services.reference_tracking import get_session_calibration, set_session_calibration
 
 # Update the video analysis endpoint to use request body
 class VideoHeightRequest(BaseModel):
@@ -303,6 +294,7 @@ async def measure_height_from_video_upload(
     file: UploadFile = File(...),
     reference_object: Optional[str] = None,
     reference_height_mm: Optional[float] = None,
+    session_id: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -313,15 +305,11 @@ async def measure_height_from_video_upload(
     - credit_card: Standard credit card (85.6mm x 53.98mm)
     - a4_paper: A4 paper (297mm x 210mm)
     - custom: Custom marker with specified height
+    
+    With a session_id, the reference calibration is cached and reused by
+    later recordings (and form analyses) in the same session.
     """
     try:
-        # Validate file type
-        if not file.content_type.startswith('video/'):
-            raise HTTPException(
-                status_code=400,
-                detail="File must be a video"
-            )
-        
         # Validate reference object
         valid_objects = ["credit_card", "a4_paper", "smartphone", "door_frame", "custom"]
         if reference_object and reference_object not in valid_objects:
@@ -330,21 +318,26 @@ async def measure_height_from_video_upload(
                 detail=f"Invalid reference object. Must be one of: {', '.join(valid_objects)}"
             )
         
-        # Save uploaded video to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
+        # Stream the uploaded video to a temporary file (validates type,
+        # size, duration and readability)
+        upload = await receive_video_upload(file)
+        temp_path = upload.path
         
         try:
             # Use enhanced height analyzer
+            session_key = f"{current_user.id}:{session_id}" if session_id else None
             analyzer = HeightAnalyzer()
             height_result = analyzer.analyze_video(
                 temp_path, 
                 reference_object,
-                reference_height_mm
+                reference_height_mm,
+                calibration=get_session_calibration(session_key) if session_key else None
             )
             
+            calibration = height_result.pop("calibration", None)
+            if session_key and calibration:
+                set_session_calibration(session_key, calibration)
+            
             if not height_result["success"]:
                 raise HTTPException(
                     status_code=400,
@@ -390,8 +383,7 @@ async def measure_height_from_video_upload(
             
         finally:
             # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            upload.cleanup()
         
     except HTTPException:
         raise
@@ -418,4 +410,6 @@ async def analyze_height_from_video(
     else:
         reference_object = None
         
-    return analyzer.analyze_video(video_path, reference_object, reference_height)
\ No newline at end of file
+    result = analyzer.analyze_video(video_path, reference_object, reference_height)
+    result.pop("calibration", None)
+    return result
\ No newline at end of file
@@ -3,6 +3,7 @@ API Performance Monitoring Endpoints
 For internal monitoring and optimization
 """
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from typing import Optional
 from datetime import datetime, timedelta
 
@@ -34,6 +35,17 @@ async def get_performance_metrics(
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """
+    Latency histograms and counters in the Prometheus text format
+    (routes, DB statements, cache operations, pipeline stages)
+    """
+    return PlainTextResponse(
+        perf_monitor.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 @router.get("/health/detailed")
 async def get_detailed_health():
     """
@@ -9,7 +9,8 @@ import base64
 import logging
 from datetime import datetime
 
-from backend.services.unified_theory_service import UnifiedTheoryService
+from backend.core.unified_theory import OptimizationEngine
+from backend.services.unified_theory_service import UnifiedTheoryService, DEFAULT_SESSION_ID
 from backend.utils.auth import get_current_user
 from backend.models.analysis import AnalysisSession
 from backend.database import SessionLocal
@@ -18,10 +19,15 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v3", tags=["unified-theory"])
 
-# Service instance
+# Service instance (movement history is kept per session)
 unified_service = UnifiedTheoryService()
 
 
+def _session_key(current_user: dict, session_id: Optional[str]) -> str:
+    """Scope a client-supplied session ID to the authenticated user."""
+    return f"{current_user.get('uid', 'anonymous')}:{session_id or DEFAULT_SESSION_ID}"
+
+
 @router.post("/analyze-frame")
 async def analyze_frame(
     frame_data: Dict[str, Any],
@@ -42,6 +48,7 @@ async def analyze_frame(
         user_profile = frame_data.get('userProfile', {})
         exercise_type = frame_data.get('exerciseType', 'squat')
         calibration_data = frame_data.get('calibrationData')
+        session_key = _session_key(current_user, frame_data.get('sessionId'))
         
         if not frame_base64:
             raise HTTPException(status_code=400, detail="Frame data is required")
@@ -56,7 +63,8 @@ async def analyze_frame(
             
         # Perform unified analysis
         result = await unified_service.analyze_frame_unified(
-            frame, exercise_type, user_profile, calibration_data
+            frame, exercise_type, user_profile, calibration_data,
+            session_id=session_key
         )
         
         # Convert annotated frame to base64 if present
@@ -66,6 +74,8 @@ async def analyze_frame(
             
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in unified frame analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -89,6 +99,7 @@ async def unified_theory_assessment(
         movement_sequence = assessment_data.get('movementSequence', [])
         exercise_type = assessment_data.get('exerciseType', 'squat')
         user_profile = assessment_data.get('userProfile', {})
+        session_key = _session_key(current_user, assessment_data.get('sessionId'))
         
         if not movement_sequence:
             raise HTTPException(status_code=400, detail="Movement sequence is required")
@@ -108,7 +119,7 @@ async def unified_theory_assessment(
         # Analyze sequence
         if frames:
             result = await unified_service.analyze_movement_sequence(
-                frames, exercise_type, user_profile
+                frames, exercise_type, user_profile, session_id=session_key
             )
         else:
             # Aggregate existing analysis results
@@ -143,7 +154,7 @@ async def unified_theory_assessment(
         
         # Track progress
         progress_tracking = _calculate_progress_tracking(
-            unified_service.analysis_results_history, exercise_type
+            unified_service.get_results_history(session_key), exercise_type
         )
         
         return {
@@ -159,6 +170,24 @@ async def unified_theory_assessment(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.delete("/sessions/{session_id}")
+async def end_analysis_session(
+    session_id: str,
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Discard the in-memory movement history of an analysis session.
+    
+    Args:
+        session_id: Client session ID used in analyze-frame requests
+        current_user: Authenticated user
+        
+    Returns:
+        Whether a session was removed
+    """
+    removed = unified_service.end_session(_session_key(current_user, session_id))
+    return {'session_id': session_id, 'removed': removed}
+
+
 @router.get("/unified-scores/{session_id}")
 async def get_unified_scores(
     session_id: str,
@@ -233,8 +262,8 @@ async def calculate_optimal_form(
         user_profile = form_data.get('userProfile', {})
         exercise_type = form_data.get('exerciseType', 'squat')
         
-        # Initialize optimization engine
-        optimization_engine = unified_service.optimization_engine
+        # The engine keeps the objectives/constraints it solves with, so each request gets its own
+        optimization_engine = OptimizationEngine()
         
         # Define objectives
         objectives = optimization_engine.define_objective_functions(user_profile)
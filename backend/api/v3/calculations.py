@@ -3,11 +3,11 @@ V3 Calculations API - Scientific calculation endpoints for TENAX FIT
 """
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field, validator
-from typing import Literal, Dict
+from typing import Literal, Dict, List
 from sqlalchemy.orm import Session
 
 from ...app.database import get_db
-from core.scientific_calculations import ScientificCalculationEngine
+from core.scientific_calculations import MAX_BATCH_PROFILES, ScientificCalculationEngine
 
 
 router = APIRouter()
@@ -142,6 +142,59 @@ class TargetCaloriesResponse(BaseModel):
         }
 
 
+class ProfileInput(BaseModel):
+    """Input model for a full profile calculation"""
+    weight: float = Field(..., gt=0, le=300, description="Weight in kilograms")
+    height: float = Field(..., gt=0, le=300, description="Height in centimeters")
+    age: int = Field(..., gt=0, le=120, description="Age in years")
+    gender: Literal["male", "female"] = Field(..., description="Biological sex")
+    activity_level: Literal["sedentary", "light", "moderate", "active", "very_active"] = Field(
+        ..., description="Activity level"
+    )
+    goal: Literal["muscle_gain", "fat_loss", "maintenance"] = Field(
+        ..., description="Fitness goal"
+    )
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "weight": 70.0,
+                "height": 170.0,
+                "age": 25,
+                "gender": "male",
+                "activity_level": "moderate",
+                "goal": "muscle_gain"
+            }
+        }
+
+
+class ProfileBatchInput(BaseModel):
+    """Input model for batch profile calculation"""
+    profiles: List[ProfileInput] = Field(
+        ..., min_items=1, max_items=MAX_BATCH_PROFILES, description="User profiles"
+    )
+
+
+class ProfileResult(BaseModel):
+    """Derived metrics for one profile"""
+    bmi: float
+    body_fat_percentage: float
+    bmr: float
+    tdee: float
+    target_calories: float
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+    percentage_of_bmr: float
+    severity: Literal["low", "medium", "high", "critical"]
+
+
+class ProfileBatchResponse(BaseModel):
+    """Response model for batch profile calculation"""
+    count: int = Field(..., description="Number of profiles computed")
+    results: List[ProfileResult] = Field(..., description="Results in input order")
+
+
 # API Endpoints
 @router.post("/bmr", response_model=BMRResponse, summary="Calculate Basal Metabolic Rate")
 async def calculate_bmr(data: BMRInput):
@@ -257,4 +310,54 @@ async def calculate_target_calories(data: TargetCaloriesInput):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal calculation error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal calculation error")
+
+
+@router.post("/profile", summary="Calculate All Metrics for a Profile")
+async def calculate_profile(data: ProfileInput):
+    """
+    Calculate BMI, body fat, BMR, TDEE, target calories, macros and calorie
+    safety in one call. Results are memoized on quantized inputs.
+    """
+    try:
+        return ScientificCalculationEngine.calculate_profile(
+            weight=data.weight,
+            height=data.height,
+            age=data.age,
+            gender=data.gender,
+            activity_level=data.activity_level,
+            goal=data.goal
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal calculation error")
+
+
+@router.post("/batch", response_model=ProfileBatchResponse,
+            summary="Calculate Metrics for Many Profiles")
+async def calculate_profiles_batch(data: ProfileBatchInput):
+    """
+    Calculate the profile metrics for up to 10,000 profiles in one request.
+    
+    All formulas are evaluated as vectorized array expressions, which makes
+    recalculating a whole user base (e.g. after a formula change) cheap.
+    """
+    profiles = data.profiles
+    try:
+        results = ScientificCalculationEngine.calculate_profiles_batch(
+            weights=[p.weight for p in profiles],
+            heights=[p.height for p in profiles],
+            ages=[p.age for p in profiles],
+            genders=[p.gender for p in profiles],
+            activity_levels=[p.activity_level for p in profiles],
+            goals=[p.goal for p in profiles]
+        )
+        columns = {name: values.tolist() for name, values in results.items()}
+        rows = [dict(zip(columns, row)) for row in zip(*columns.values())]
+        
+        return ProfileBatchResponse(count=len(rows), results=rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal calculation error")
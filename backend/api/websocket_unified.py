@@ -10,7 +10,7 @@ import base64
 import logging
 from datetime import datetime
 
-from backend.services.unified_theory_service import UnifiedTheoryService
+from backend.services.unified_theory_service import UnifiedTheoryService, DEFAULT_SESSION_ID
 from backend.utils.auth import verify_ws_token
 
 logger = logging.getLogger(__name__)
@@ -196,8 +196,10 @@ async def unified_theory_ws(
                     # Update user profile
                     user_profile = msg_data.get('profile', {})
                     
-                    # Reinitialize optimization objectives
-                    service.optimization_engine.define_objective_functions(user_profile)
+                    # Reinitialize the session's optimization objectives
+                    service.sessions.get(DEFAULT_SESSION_ID).optimization_engine.define_objective_functions(
+                        user_profile
+                    )
                     
                     await websocket.send_json({
                         "type": "status",
@@ -227,9 +229,10 @@ async def unified_theory_ws(
                     
                 elif msg_type == 'get_summary':
                     # Get analysis summary
-                    if service.analysis_results_history:
+                    results_history = service.get_results_history()
+                    if results_history:
                         summary = service._aggregate_sequence_results(
-                            service.analysis_results_history[-50:],  # Last 50 frames
+                            results_history[-50:],  # Last 50 frames
                             exercise_type
                         )
                         
@@ -3,7 +3,12 @@ Configuration settings for MuscleFormAnalyzer Backend
 """
 import os
 from typing import List
-from pydantic import BaseSettings, validator
+from pydantic import validator
+
+try:
+    from pydantic_settings import BaseSettings
+except ImportError:  # pydantic v1
+    from pydantic import BaseSettings
 
 class Settings(BaseSettings):
     """Application settings"""
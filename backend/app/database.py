@@ -12,6 +12,7 @@ from typing import Generator
 import ssl
 
 from .config import settings
+from ..utils.metrics import instrument_engine
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +71,9 @@ else:
             connect_args=connect_args
         )
 
+# Per-statement latency histograms
+instrument_engine(engine)
+
 # Session configuration
 SessionLocal = sessionmaker(
     autocommit=False, 
@@ -33,7 +33,8 @@ from .middleware import (
     ResponseTimeMiddleware,
     SecurityHeadersMiddleware,
     RateLimitMiddleware,
-    GZipMiddleware
+    CompressionMiddleware,
+    MetricsMiddleware
 )
 from ..services.cache_service import CacheService
 
@@ -212,7 +213,8 @@ app.state.environment = settings.ENVIRONMENT
 app.add_middleware(RequestIDMiddleware)
 app.add_middleware(ResponseTimeMiddleware)
 app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(GZipMiddleware, minimum_size=500)  # Compress responses > 500 bytes
+app.add_middleware(CompressionMiddleware, minimum_size=500)  # Stream-compress responses > 500 bytes (br/gzip)
+app.add_middleware(MetricsMiddleware)  # Per-route latency histograms
 
 # Add rate limiting in production
 if settings.ENVIRONMENT == "production":
@@ -3,13 +3,22 @@ Custom middleware for the API
 """
 import time
 import uuid
+import zlib
 import logging
-from typing import Callable
+from typing import Callable, Optional
+import anyio
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
-import gzip
-from io import BytesIO
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.metrics import MetricsRegistry, metrics_registry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 logger = logging.getLogger(__name__)
 
@@ -141,54 +150,246 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         return await call_next(request)
 
-class GZipMiddleware(BaseHTTPMiddleware):
-    """Compress responses with gzip"""
-    
-    def __init__(self, app, minimum_size: int = 1000):
-        super().__init__(app)
+class MetricsMiddleware:
+    """Record per-route latency histograms
+
+    Routes are labelled by their template (``/api/form/analysis/{id}``) rather
+    than the concrete path so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or metrics_registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            label = f"{scope['method']} {self._route_template(scope)}"
+            self.registry.observe("http_route", label, time.perf_counter() - start_time)
+            self.registry.increment("http_requests", f"{status_code // 100}xx")
+
+    @staticmethod
+    def _route_template(scope: Scope) -> str:
+        route = scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is not None:
+            return getattr(endpoint, "__name__", "endpoint")
+        return "unmatched"
+
+
+class CompressionMiddleware:
+    """Stream-compress responses with brotli or gzip
+
+    Implemented as a plain ASGI middleware so the body is compressed chunk by
+    chunk as the application produces it instead of being buffered in full.
+    Responses that are already encoded or carry binary media are passed
+    through untouched.
+    """
+
+    COMPRESSIBLE_TYPES = (
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "application/x-ndjson",
+        "image/svg+xml",
+        "text/",
+    )
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        offload_threshold: int = 256 * 1024,
+    ):
+        """
+        Args:
+            app: Wrapped ASGI application
+            minimum_size: Single-chunk bodies smaller than this are sent as-is
+            gzip_level: zlib compression level (1-9)
+            brotli_quality: Brotli quality (0-11)
+            offload_threshold: Chunks at least this large are compressed in a
+                worker thread so the event loop stays responsive
+        """
+        self.app = app
         self.minimum_size = minimum_size
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Check if client accepts gzip
-        accept_encoding = request.headers.get("accept-encoding", "")
-        
-        response = await call_next(request)
-        
-        # Only compress if client accepts gzip and response is large enough
-        if "gzip" not in accept_encoding.lower():
-            return response
-            
-        # Only compress JSON and text responses
-        content_type = response.headers.get("content-type", "")
-        if not any(ct in content_type for ct in ["application/json", "text/"]):
-            return response
-            
-        # Read response body
-        body = b""
-        async for chunk in response.body_iterator:
-            body += chunk
-            
-        # Check size threshold
-        if len(body) < self.minimum_size:
-            # Return original response
-            return Response(
-                content=body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.offload_threshold = offload_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        # Without an acceptable encoding the responder only adds the Vary header
+        encoding = self.negotiate_encoding(headers.get("accept-encoding", ""))
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    @staticmethod
+    def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+        """Pick the preferred supported encoding from an Accept-Encoding header"""
+        preferences = {}
+        for item in accept_encoding.lower().split(","):
+            parts = [p.strip() for p in item.split(";")]
+            if not parts[0]:
+                continue
+            quality = 1.0
+            for param in parts[1:]:
+                if param.startswith("q="):
+                    try:
+                        quality = float(param[2:])
+                    except ValueError:
+                        quality = 0.0
+            preferences[parts[0]] = quality
+
+        wildcard = preferences.get("*", 0.0)
+        candidates = []
+        if brotli is not None:
+            candidates.append("br")
+        candidates.append("gzip")
+
+        best, best_quality = None, 0.0
+        for candidate in candidates:
+            quality = preferences.get(candidate, wildcard)
+            if quality > best_quality:
+                best, best_quality = candidate, quality
+        return best
+
+    def is_compressible(self, headers: Headers) -> bool:
+        """Only compress textual media that is not already encoded"""
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return any(content_type.startswith(ct) for ct in self.COMPRESSIBLE_TYPES)
+
+
+class _StreamCompressor:
+    """Incremental compressor with a common interface for gzip and brotli"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 emits a gzip header and trailer
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything compressed so far without ending the stream"""
+        if self.encoding == "br":
+            return self._compressor.flush()
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class _CompressionResponder:
+    """Per-response state machine used by CompressionMiddleware"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_StreamCompressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Hold the start message until the first body chunk tells us
+            # whether compressing is worthwhile
+            self.start_message = message
+            return
+
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            compressible = self.middleware.is_compressible(headers)
+            if (
+                self.encoding is None
+                or not compressible
+                or (not more_body and len(body) < self.middleware.minimum_size)
+            ):
+                self.passthrough = True
+                if compressible:
+                    # Other clients may get this resource compressed
+                    headers.add_vary_header("Accept-Encoding")
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            self.compressor = _StreamCompressor(
+                self.encoding,
+                self.middleware.gzip_level,
+                self.middleware.brotli_quality,
             )
-        
-        # Compress body
-        compressed = gzip.compress(body)
-        
-        # Update headers
-        headers = dict(response.headers)
-        headers["content-encoding"] = "gzip"
-        headers["content-length"] = str(len(compressed))
-        
-        return Response(
-            content=compressed,
-            status_code=response.status_code,
-            headers=headers,
-            media_type=response.media_type
-        )
\ No newline at end of file
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self._send(self.start_message)
+
+        data = await self._compress(body, more_body)
+        if data or not more_body:
+            await self._send({
+                "type": "http.response.body",
+                "body": data,
+                "more_body": more_body,
+            })
+
+    async def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= self.middleware.offload_threshold:
+            return await anyio.to_thread.run_sync(self._encode, body, more_body)
+        return self._encode(body, more_body)
+
+    def _encode(self, body: bytes, more_body: bool) -> bytes:
+        """Compress one chunk and flush it so streamed chunks reach the client promptly"""
+        if not more_body:
+            return self.compressor.compress(body) + self.compressor.finish()
+        if not body:
+            return b""
+        return self.compressor.compress(body) + self.compressor.flush()
+
+
+# Backward compatible name for the previous buffering implementation
+GZipMiddleware = CompressionMiddleware
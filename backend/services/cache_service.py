@@ -9,6 +9,8 @@ from functools import wraps
 import logging
 from datetime import timedelta
 
+from ..utils.metrics import metrics_registry
+
 logger = logging.getLogger(__name__)
 
 class CacheService:
@@ -50,11 +52,15 @@ class CacheService:
             return None
             
         try:
-            value = self.redis_client.get(key)
+            with metrics_registry.timer("cache_operation", "get"):
+                value = self.redis_client.get(key)
             if value:
+                metrics_registry.increment("cache_hits")
                 return json.loads(value)
+            metrics_registry.increment("cache_misses")
         except Exception as e:
             logger.error(f"Cache get error: {e}")
+            metrics_registry.increment("cache_errors", "get")
         
         return None
     
@@ -65,14 +71,17 @@ class CacheService:
             
         try:
             ttl = ttl or self.default_ttl
-            self.redis_client.setex(
-                key,
-                timedelta(seconds=ttl),
-                json.dumps(value)
-            )
+            payload = json.dumps(value)
+            with metrics_registry.timer("cache_operation", "set"):
+                self.redis_client.setex(
+                    key,
+                    timedelta(seconds=ttl),
+                    payload
+                )
             return True
         except Exception as e:
             logger.error(f"Cache set error: {e}")
+            metrics_registry.increment("cache_errors", "set")
             return False
     
     def delete(self, key: str) -> bool:
@@ -81,7 +90,8 @@ class CacheService:
             return False
             
         try:
-            self.redis_client.delete(key)
+            with metrics_registry.timer("cache_operation", "delete"):
+                self.redis_client.delete(key)
             return True
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
@@ -2,13 +2,16 @@
 Height Analyzer Service
 Provides accurate height measurement from video using computer vision
 """
+import heapq
 import logging
-from typing import Optional, List, Tuple, Dict
+from typing import Callable, Optional, List, Tuple, Dict
 import cv2
 import numpy as np
 import mediapipe as mp
 from dataclasses import dataclass
 
+from .reference_tracking import BBox, ReferenceCalibration, ReferenceObjectTracker
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -27,17 +30,41 @@ REFERENCE_OBJECTS = {
     "door_frame": ReferenceObject("Standard Door Frame", 2030.0, 900.0, "line_detection"),
 }
 
+# The light model screens every sampled frame; the heavy model with
+# segmentation only runs on the best candidates
+COARSE_MODEL_COMPLEXITY = 0
+FINE_MODEL_COMPLEXITY = 2
+
 class HeightAnalyzer:
-    def __init__(self):
+    def __init__(
+        self,
+        top_k: int = 40,
+        min_measurements: int = 20,
+        convergence_tolerance_cm: float = 1.0,
+        pose_factory: Optional[Callable] = None
+    ):
+        """
+        Args:
+            top_k: Candidate frames refined with the full model
+            min_measurements: Refined measurements before convergence is checked
+            convergence_tolerance_cm: 95% confidence half-width of the
+                IQR-filtered estimate at which refinement stops
+            pose_factory: Creates pose estimators (defaults to MediaPipe Pose)
+        """
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
         self.pose = None
+        self.pose_factory = pose_factory or self.mp_pose.Pose
+        self.top_k = top_k
+        self.min_measurements = min_measurements
+        self.convergence_tolerance_cm = convergence_tolerance_cm
         
     def analyze_video(
         self, 
         video_path: str, 
         reference_object: Optional[str] = None,
-        reference_height_mm: Optional[float] = None
+        reference_height_mm: Optional[float] = None,
+        calibration: Optional[ReferenceCalibration] = None
     ) -> Dict:
         """
         Analyze video to estimate person's height
@@ -46,59 +73,111 @@ class HeightAnalyzer:
             video_path: Path to video file
             reference_object: Type of reference object (if any)
             reference_height_mm: Custom reference object height in mm
+            calibration: Reference calibration from an earlier recording in
+                the same session; reused if the object is still in place
             
         Returns:
-            Dictionary with height estimation results
+            Dictionary with height estimation results ("calibration" holds
+            the ReferenceCalibration to cache, if any)
         """
+        cap = None
         try:
-            self.pose = self.mp_pose.Pose(
-                static_image_mode=False,
-                model_complexity=2,
-                enable_segmentation=True,
-                min_detection_confidence=0.7,
-                min_tracking_confidence=0.7
-            )
-            
             cap = cv2.VideoCapture(video_path)
             if not cap.isOpened():
                 return {"success": False, "error": "Failed to open video file"}
             
-            fps = cap.get(cv2.CAP_PROP_FPS)
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             
             # Sample frames at intervals
             sample_interval = max(1, int(fps / 10))  # 10 samples per second
-            frame_measurements = []
-            reference_scale = None
+            
+            # Coarse pass: find upright, full-body, stable frames with the light model
+            self.pose = self.pose_factory(
+                static_image_mode=False,
+                model_complexity=COARSE_MODEL_COMPLEXITY,
+                enable_segmentation=False,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+            # Min-heap of (score, frame_idx); frames are decoded again for the
+            # fine pass so that only top_k indices are held, not top_k frames
+            candidates = []
+            tracker = None
+            if reference_object or calibration:
+                tracker = ReferenceObjectTracker(
+                    lambda f: self._detect_reference_object(
+                        f, reference_object or calibration.reference_object, reference_height_mm
+                    ),
+                    reference_object or calibration.reference_object,
+                    calibration=calibration
+                )
+            previous_points = None
+            frames_scanned = 0
             
             frame_idx = 0
-            while cap.isOpened():
+            while True:
+                if frame_idx % sample_interval != 0:
+                    # Skipped frames are not decoded
+                    if not cap.grab():
+                        break
+                    frame_idx += 1
+                    continue
+                
                 ret, frame = cap.read()
                 if not ret:
                     break
+                frames_scanned += 1
                 
-                if frame_idx % sample_interval == 0:
-                    # Detect reference object if specified
-                    if reference_object and reference_scale is None:
-                        scale_result = self._detect_reference_object(
-                            frame, reference_object, reference_height_mm
-                        )
-                        if scale_result:
-                            reference_scale = scale_result
-                            logger.info(f"Reference object detected: scale={reference_scale:.4f}")
-                    
-                    # Analyze pose
-                    height_result = self._analyze_frame_height(frame, reference_scale)
-                    if height_result:
-                        frame_measurements.append(height_result)
+                # Detect the reference object on a few frames, then track it
+                if tracker:
+                    tracker.update(frame)
+                
+                body_points = self._detect_body_points(frame)
+                if body_points:
+                    score = self._candidate_score(body_points, previous_points, frame.shape[0])
+                    if len(candidates) < self.top_k:
+                        heapq.heappush(candidates, (score, frame_idx))
+                    elif score > candidates[0][0]:
+                        heapq.heapreplace(candidates, (score, frame_idx))
+                previous_points = body_points
                 
                 frame_idx += 1
                 
                 # Limit analysis to prevent excessive processing
-                if frame_idx > total_frames * 0.8 or len(frame_measurements) > 100:
+                if frame_idx > total_frames * 0.8 or frames_scanned > 500:
                     break
             
-            cap.release()
+            self.pose.close()
+            self.pose = None
+            reference_scale = tracker.mm_per_pixel if tracker else None
+            
+            # Fine pass: full model with segmentation on the best candidates only
+            self.pose = self.pose_factory(
+                static_image_mode=True,  # Candidates are not consecutive frames
+                model_complexity=FINE_MODEL_COMPLEXITY,
+                enable_segmentation=True,
+                min_detection_confidence=0.7
+            )
+            frame_measurements = []
+            converged = False
+            
+            for _, candidate_idx in sorted(candidates, key=lambda c: (-c[0], c[1])):
+                frame = self._read_frame(cap, candidate_idx)
+                if frame is None:
+                    continue
+                height_result = self._analyze_frame_height(frame, reference_scale)
+                if not height_result:
+                    continue
+                frame_measurements.append(height_result)
+                
+                # Stop once the IQR-filtered estimate is precise enough
+                if len(frame_measurements) >= self.min_measurements:
+                    estimate = self._calculate_final_height(frame_measurements)
+                    margin = 1.96 * estimate["height_std"] / np.sqrt(estimate["filtered_count"])
+                    if margin <= self.convergence_tolerance_cm:
+                        converged = True
+                        break
             
             if not frame_measurements:
                 return {
@@ -108,8 +187,11 @@ class HeightAnalyzer:
             
             # Calculate final height estimation
             result = self._calculate_final_height(frame_measurements)
-            result["reference_object_used"] = reference_object is not None
+            result["reference_object_used"] = tracker is not None
             result["reference_scale"] = reference_scale
+            result["calibration"] = tracker.calibration if tracker else None
+            result["frames_screened"] = frames_scanned
+            result["converged"] = converged
             
             return result
             
@@ -117,26 +199,58 @@ class HeightAnalyzer:
             logger.error(f"Height analysis error: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
         finally:
+            if cap is not None:
+                cap.release()
             if self.pose:
                 self.pose.close()
+                self.pose = None
+
+    @staticmethod
+    def _read_frame(cap, frame_idx: int) -> Optional[np.ndarray]:
+        """Decode a sampled frame again by its index"""
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        ret, frame = cap.read()
+        return frame if ret else None
     
-    def _analyze_frame_height(
-        self, 
-        frame: np.ndarray, 
-        reference_scale: Optional[float] = None
-    ) -> Optional[Dict]:
-        """Analyze single frame for height estimation"""
+    def _detect_body_points(self, frame: np.ndarray) -> Optional[Dict]:
+        """Run the current pose model and extract body keypoints"""
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.pose.process(rgb_frame)
         
         if not results.pose_landmarks:
             return None
         
-        landmarks = results.pose_landmarks.landmark
         h, w = frame.shape[:2]
+        return self._extract_body_keypoints(results.pose_landmarks.landmark, h, w)
+    
+    def _candidate_score(
+        self,
+        body_points: Dict,
+        previous_points: Optional[Dict],
+        frame_height: int
+    ) -> float:
+        """Score a frame for measurement: visible, level, fully in frame and still"""
+        in_frame = body_points["head_top_y"] > 0 and body_points["feet_y"] < frame_height
+        
+        if previous_points:
+            change = abs(body_points["pixel_height"] - previous_points["pixel_height"])
+            stability = max(0.0, 1.0 - change / body_points["pixel_height"] * 20)
+        else:
+            stability = 0.5
+        
+        return (body_points["confidence"] * max(body_points["pose_quality"], 0.0) *
+                stability * (1.0 if in_frame else 0.5))
+    
+    def _analyze_frame_height(
+        self, 
+        frame: np.ndarray, 
+        reference_scale: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Analyze single frame for height estimation"""
+        h = frame.shape[0]
         
         # Extract key body points
-        body_points = self._extract_body_keypoints(landmarks, h, w)
+        body_points = self._detect_body_points(frame)
         if not body_points:
             return None
         
@@ -260,8 +374,8 @@ class HeightAnalyzer:
         frame: np.ndarray, 
         object_type: str,
         custom_height_mm: Optional[float] = None
-    ) -> Optional[float]:
-        """Detect reference object and calculate scale factor"""
+    ) -> Optional[Tuple[float, BBox]]:
+        """Detect reference object and return (mm per pixel, bounding box)"""
         if object_type == "credit_card":
             return self._detect_credit_card(frame, custom_height_mm)
         elif object_type == "a4_paper":
@@ -275,7 +389,7 @@ class HeightAnalyzer:
         self, 
         frame: np.ndarray,
         height_mm: Optional[float] = None
-    ) -> Optional[float]:
+    ) -> Optional[Tuple[float, BBox]]:
         """Detect credit card using edge detection and aspect ratio"""
         height_mm = height_mm or REFERENCE_OBJECTS["credit_card"].height_mm
         
@@ -306,7 +420,7 @@ class HeightAnalyzer:
                     # Found credit card
                     pixel_height = height
                     scale = height_mm / pixel_height  # mm per pixel
-                    return scale
+                    return scale, cv2.boundingRect(contour)
         
         return None
     
@@ -314,7 +428,7 @@ class HeightAnalyzer:
         self, 
         frame: np.ndarray,
         height_mm: Optional[float] = None
-    ) -> Optional[float]:
+    ) -> Optional[Tuple[float, BBox]]:
         """Detect A4 paper using contour detection"""
         height_mm = height_mm or REFERENCE_OBJECTS["a4_paper"].height_mm
         
@@ -351,12 +465,12 @@ class HeightAnalyzer:
                 aspect_ratio = width / height
                 if 1.3 < aspect_ratio < 1.5 and area > max_area:
                     max_area = area
-                    best_rect = (width, height)
+                    best_rect = (width, height, cv2.boundingRect(contour))
         
         if best_rect:
             pixel_height = best_rect[1]
             scale = height_mm / pixel_height
-            return scale
+            return scale, best_rect[2]
         
         return None
     
@@ -364,7 +478,7 @@ class HeightAnalyzer:
         self, 
         frame: np.ndarray, 
         height_mm: float
-    ) -> Optional[float]:
+    ) -> Optional[Tuple[float, BBox]]:
         """Detect custom ArUco marker for precise calibration"""
         try:
             import cv2.aruco as aruco
@@ -384,7 +498,7 @@ class HeightAnalyzer:
                 
                 # Calculate scale
                 scale = height_mm / marker_height
-                return scale
+                return scale, cv2.boundingRect(marker_corners.astype(np.float32))
                 
         except ImportError:
             logger.warning("ArUco not available for custom marker detection")
@@ -0,0 +1,201 @@
+"""
+Reference Object Tracking
+Detects a static calibration object on a few frames, then follows it with a
+cheap template check and only re-runs the full detector when the match degrades
+"""
+import logging
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+BBox = Tuple[int, int, int, int]  # x, y, width, height
+# A detector returns (mm per pixel, bounding box) or None
+Detector = Callable[[np.ndarray], Optional[Tuple[float, BBox]]]
+
+
+@dataclass
+class ReferenceCalibration:
+    """Pixel scale derived from a reference object"""
+    reference_object: str
+    mm_per_pixel: float
+    bbox: BBox
+    frame_size: Tuple[int, int]  # height, width
+    template: np.ndarray = field(repr=False)
+
+    @property
+    def pixels_per_cm(self) -> float:
+        return 10.0 / self.mm_per_pixel
+
+    def to_dict(self) -> dict:
+        return {
+            "reference_object": self.reference_object,
+            "mm_per_pixel": self.mm_per_pixel,
+            "pixels_per_cm": round(self.pixels_per_cm, 3),
+            "bbox": list(self.bbox)
+        }
+
+
+def _gray(frame: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+class ReferenceObjectTracker:
+    """Confirms a reference object over a few detections, then tracks it by template matching"""
+
+    def __init__(
+        self,
+        detector: Detector,
+        reference_object: str,
+        calibration: Optional[ReferenceCalibration] = None,
+        confirm_detections: int = 3,
+        max_detection_attempts: int = 50,
+        check_interval: int = 5,
+        match_threshold: float = 0.8,
+        search_margin: float = 0.5
+    ):
+        """
+        Args:
+            detector: Full (expensive) reference object detector
+            reference_object: Reference object type
+            calibration: Calibration cached from an earlier recording, verified before use
+            confirm_detections: Detections combined into the calibration
+            max_detection_attempts: Frames searched before giving up on an absent object
+            check_interval: Frames between template checks once calibrated
+            match_threshold: Normalized correlation below which the object is re-detected
+            search_margin: Search window around the last box, relative to its size
+        """
+        self.detector = detector
+        self.reference_object = reference_object
+        # Copied: tracking moves the box, the cached calibration stays as it was
+        self.calibration = replace(calibration) if calibration else None
+        self.confirm_detections = confirm_detections
+        self.max_detection_attempts = max_detection_attempts
+        self.check_interval = check_interval
+        self.match_threshold = match_threshold
+        self.search_margin = search_margin
+
+        self._detections: List[Tuple[float, BBox, np.ndarray]] = []
+        self._frames_since_check = 0
+        # A cached calibration must match the first frame before it is trusted
+        self._verified = calibration is None
+        self.detector_calls = 0
+        self.template_checks = 0
+
+    @property
+    def mm_per_pixel(self) -> Optional[float]:
+        """Current scale (provisional median until the object is confirmed)"""
+        if self.calibration is not None and self._verified:
+            return self.calibration.mm_per_pixel
+        if self._detections:
+            return float(np.median([scale for scale, _, _ in self._detections]))
+        return None
+
+    def update(self, frame: np.ndarray) -> Optional[float]:
+        """Process a frame and return the current mm-per-pixel scale"""
+        if self.calibration is not None and not self._verified:
+            if (self.calibration.frame_size == frame.shape[:2] and
+                    self._match(frame) >= self.match_threshold):
+                self._verified = True
+                return self.calibration.mm_per_pixel
+            logger.info("Cached reference calibration no longer matches; re-detecting")
+            self.calibration = None
+            self._verified = True
+
+        if self.calibration is None:
+            self._detect(frame)
+            return self.mm_per_pixel
+
+        self._frames_since_check += 1
+        if self._frames_since_check < self.check_interval:
+            return self.mm_per_pixel
+        self._frames_since_check = 0
+
+        if self._match(frame) < self.match_threshold:
+            # Moved, occluded or lighting changed: look for it again
+            detection = self._run_detector(frame)
+            if detection:
+                self.calibration = self._calibration_from([detection], frame.shape[:2])
+        return self.mm_per_pixel
+
+    def _run_detector(self, frame: np.ndarray) -> Optional[Tuple[float, BBox, np.ndarray]]:
+        self.detector_calls += 1
+        result = self.detector(frame)
+        if result is None:
+            return None
+        scale, (x, y, w, h) = result
+        template = _gray(frame)[y:y + h, x:x + w].copy()
+        if template.size == 0:
+            return None
+        return scale, (x, y, w, h), template
+
+    def _detect(self, frame: np.ndarray):
+        if self.detector_calls >= self.max_detection_attempts:
+            return
+        detection = self._run_detector(frame)
+        if detection:
+            self._detections.append(detection)
+        if len(self._detections) >= self.confirm_detections:
+            self.calibration = self._calibration_from(self._detections, frame.shape[:2])
+            self._detections = []
+            logger.info(f"Reference object confirmed: {self.calibration.mm_per_pixel:.4f} mm/px")
+
+    def _calibration_from(self, detections, frame_size) -> ReferenceCalibration:
+        # The detection closest to the median scale supplies the box and template
+        median = np.median([scale for scale, _, _ in detections])
+        _, bbox, template = min(detections, key=lambda d: abs(d[0] - median))
+        return ReferenceCalibration(
+            reference_object=self.reference_object,
+            mm_per_pixel=float(median),
+            bbox=bbox,
+            frame_size=tuple(frame_size),
+            template=template
+        )
+
+    def _match(self, frame: np.ndarray) -> float:
+        """Best normalized correlation of the template near its last position"""
+        self.template_checks += 1
+        x, y, w, h = self.calibration.bbox
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        gray = _gray(frame)
+        roi = gray[max(0, y - my):y + h + my, max(0, x - mx):x + w + mx]
+        template = self.calibration.template
+        if roi.shape[0] < template.shape[0] or roi.shape[1] < template.shape[1]:
+            return 0.0
+
+        scores = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(np.nan_to_num(scores))
+        if best >= self.match_threshold:
+            self.calibration.bbox = (max(0, x - mx) + bx, max(0, y - my) + by, w, h)
+        return float(best)
+
+
+def _calibration_bytes(state: dict) -> int:
+    return sum(calibration.template.nbytes for calibration in state.values())
+
+
+# Calibrations are reused by later height measurements in the same session.
+# Templates are crops of full frames, so the store is bounded by bytes as well as count
+session_calibrations: SessionStore = SessionStore(
+    dict,
+    max_sessions=1000,
+    idle_timeout_seconds=3600,
+    max_bytes=64 * 1024 * 1024,
+    sizeof=_calibration_bytes
+)
+
+
+def get_session_calibration(session_key: str) -> Optional[ReferenceCalibration]:
+    """Return the cached reference calibration of a session, if any"""
+    state = session_calibrations.peek(session_key)
+    return state.get("reference") if state else None
+
+
+def set_session_calibration(session_key: str, calibration: ReferenceCalibration):
+    """Cache a session's reference calibration"""
+    session_calibrations.put(session_key, {"reference": calibration})
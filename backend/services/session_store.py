@@ -0,0 +1,218 @@
+"""Session-keyed state for stateful analysis services.
+
+``SessionStore`` keeps one state object per session in a bounded LRU with
+idle eviction, so concurrent callers never share temporal history and memory
+stays bounded however many sessions are opened. ``ResourcePool`` hands out
+exclusive instances of resources that are not safe to share between
+concurrent requests (e.g. stateless model instances).
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SessionStore(Generic[T]):
+    """Bounded LRU of per-session state with idle eviction."""
+
+    def __init__(self, factory: Callable[[], T],
+                 max_sessions: int = 1000,
+                 idle_timeout_seconds: float = 1800.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 on_evict: Optional[Callable[[T], None]] = None,
+                 max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[T], int]] = None):
+        """Initialize the store.
+
+        Args:
+            factory: Creates the state for a new session
+            max_sessions: Sessions kept before the least recently used is dropped
+            idle_timeout_seconds: Sessions untouched for longer are dropped
+            clock: Monotonic time source
+            on_evict: Called with the state of each session dropped by the
+                LRU bound or the idle timeout (not for ``pop``)
+            max_bytes: Total state size kept before the least recently used
+                sessions are dropped (requires ``sizeof``)
+            sizeof: Size of a state in bytes, measured when it is stored
+        """
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("max_bytes requires sizeof")
+
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.clock = clock
+        self.on_evict = on_evict
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        self._sessions: "OrderedDict[str, T]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evicted_count = 0
+
+    def get(self, session_id: str) -> T:
+        """Return the session's state, creating it if needed, and mark it as used."""
+        now = self.clock()
+        with self._lock:
+            self._evict_idle(now)
+
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self.factory()
+                self._store(session_id, state, now)
+            else:
+                self._sessions.move_to_end(session_id)
+                self._last_access[session_id] = now
+            return state
+
+    def put(self, session_id: str, state: T):
+        """Replace the session's state and mark it as used.
+
+        Use this rather than mutating the result of ``get`` when the store
+        has a byte budget, so the new size is accounted for.
+        """
+        now = self.clock()
+        with self._lock:
+            self._evict_idle(now)
+            self._discard(session_id)
+            self._store(session_id, state, now)
+
+    def _store(self, session_id: str, state: T, now: float):
+        self._sessions[session_id] = state
+        self._last_access[session_id] = now
+        if self.sizeof is not None:
+            self._sizes[session_id] = self.sizeof(state)
+            self._total_bytes += self._sizes[session_id]
+
+        # The session just stored is never dropped, even if it alone exceeds the budget
+        while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or
+                (self.max_bytes is not None and self._total_bytes > self.max_bytes)):
+            oldest = next(iter(self._sessions))
+            evicted = self._discard(oldest)
+            self.evicted_count += 1
+            self._evicted(evicted)
+
+    def _discard(self, session_id: str) -> Optional[T]:
+        self._last_access.pop(session_id, None)
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+        return self._sessions.pop(session_id, None)
+
+    def peek(self, session_id: str) -> Optional[T]:
+        """Return the session's state without creating it or refreshing its age."""
+        with self._lock:
+            self._evict_idle(self.clock())
+            return self._sessions.get(session_id)
+
+    def pop(self, session_id: str) -> Optional[T]:
+        """Remove a session and return its state."""
+        with self._lock:
+            return self._discard(session_id)
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle longer than the timeout.
+
+        Returns:
+            Number of sessions removed
+        """
+        with self._lock:
+            return self._evict_idle(self.clock())
+
+    def _evict_idle(self, now: float) -> int:
+        # The OrderedDict is in access order, so idle sessions are at the front
+        removed = 0
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if now - self._last_access[oldest] <= self.idle_timeout_seconds:
+                break
+            evicted = self._discard(oldest)
+            removed += 1
+            self._evicted(evicted)
+        self.evicted_count += removed
+        return removed
+
+    def _evicted(self, state: T):
+        if self.on_evict is not None:
+            self.on_evict(state)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store occupancy."""
+        with self._lock:
+            return {
+                'active_sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'idle_timeout_seconds': self.idle_timeout_seconds,
+                'evicted_sessions': self.evicted_count
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+
+class ResourcePool(Generic[T]):
+    """Fixed-size pool of lazily created, exclusively leased resources."""
+
+    def __init__(self, factory: Callable[[], T], size: int = 2):
+        """Initialize the pool.
+
+        Args:
+            factory: Creates a resource the first time the pool needs one
+            size: Maximum number of resources in existence
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self.factory = factory
+        self.size = size
+        self._idle: List[T] = []
+        self._created = 0
+        self._available: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[T]:
+        """Lease a resource for the duration of the ``async with`` block."""
+        if self._available is None:
+            self._available = asyncio.Semaphore(self.size)
+
+        async with self._available:
+            if self._idle:
+                resource = self._idle.pop()
+            else:
+                resource = self.factory()
+                self._created += 1
+            try:
+                yield resource
+            finally:
+                self._idle.append(resource)
+
+    def close(self):
+        """Close idle resources that expose ``close()`` or ``cleanup()``."""
+        while self._idle:
+            resource = self._idle.pop()
+            closer = getattr(resource, 'close', None) or getattr(resource, 'cleanup', None)
+            if closer:
+                closer()
+        self._created = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return pool usage."""
+        return {
+            'size': self.size,
+            'created': self._created,
+            'idle': len(self._idle)
+        }
@@ -4,7 +4,9 @@ This service integrates physics, biomechanics, complex systems, and optimization
 engines to provide scientifically-grounded form analysis and recommendations.
 """
 
+import asyncio
 import numpy as np
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Any
 import logging
 from datetime import datetime
@@ -17,29 +19,80 @@ from backend.core.unified_theory import (
     MovementPhase
 )
 from backend.services.mediapipe_service import MediaPipeService
+from backend.services.session_store import SessionStore
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SESSION_ID = "default"
+HISTORY_LENGTH = 100
+
+
+@dataclass
+class UnifiedSessionState:
+    """Temporal analysis state belonging to a single session."""
+    movement_history: List[Dict[str, np.ndarray]] = field(default_factory=list)
+    analysis_results_history: List[Dict[str, Any]] = field(default_factory=list)
+    # The engine keeps the objectives/constraints of the last solve
+    optimization_engine: OptimizationEngine = field(default_factory=OptimizationEngine)
+    # Video-mode pose tracking carries landmarks from frame to frame, so each
+    # session gets its own backend (created on its first frame)
+    pose_backend: Optional[Any] = None
+    # Frames of one session are analyzed in arrival order
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
 
 class UnifiedTheoryService:
     """Service that applies unified theory principles to form analysis."""
     
-    def __init__(self):
-        """Initialize the unified theory service."""
-        self.mediapipe_service = MediaPipeService()
+    def __init__(self, max_sessions: int = 1000,
+                 session_idle_seconds: float = 1800.0,
+                 pose_backend_factory=MediaPipeService):
+        """Initialize the unified theory service.
+        
+        Args:
+            max_sessions: Session histories kept in memory (least recently used are dropped)
+            session_idle_seconds: Session histories untouched for longer are dropped
+            pose_backend_factory: Creates the pose estimation backend of a session
+        """
+        self.pose_backend_factory = pose_backend_factory
         self.physics_engine = PhysicsEngine()
         self.biomechanics_analyzer = BiomechanicsAnalyzer()
         self.complex_systems_analyzer = ComplexSystemsAnalyzer()
-        self.optimization_engine = OptimizationEngine()
         
-        # Analysis history for temporal analysis
-        self.movement_history = []
-        self.analysis_results_history = []
+        # Analysis history for temporal analysis, kept per session
+        self.sessions = SessionStore(
+            UnifiedSessionState,
+            max_sessions=max_sessions,
+            idle_timeout_seconds=session_idle_seconds,
+            on_evict=self._close_pose_backend
+        )
+    
+    def get_results_history(self, session_id: str = DEFAULT_SESSION_ID) -> List[Dict[str, Any]]:
+        """Return a copy of a session's analysis results (empty for unknown sessions)."""
+        state = self.sessions.peek(session_id)
+        return list(state.analysis_results_history) if state else []
+    
+    def end_session(self, session_id: str) -> bool:
+        """Discard a session's history. Returns False if it did not exist."""
+        state = self.sessions.pop(session_id)
+        if state is None:
+            return False
+        self._close_pose_backend(state)
+        return True
+
+    @staticmethod
+    def _close_pose_backend(state: UnifiedSessionState):
+        """Release the pose estimation backend of a dropped session."""
+        backend, state.pose_backend = state.pose_backend, None
+        closer = getattr(backend, 'close', None) or getattr(backend, 'cleanup', None)
+        if closer:
+            closer()
         
     async def analyze_frame_unified(self, frame: np.ndarray,
                                    exercise_type: str,
                                    user_profile: Dict[str, Any],
-                                   calibration_data: Optional[Dict] = None) -> Dict[str, Any]:
+                                   calibration_data: Optional[Dict] = None,
+                                   session_id: str = DEFAULT_SESSION_ID) -> Dict[str, Any]:
         """Analyze a single frame using unified theory principles.
         
         Args:
@@ -47,12 +100,27 @@ class UnifiedTheoryService:
             exercise_type: Type of exercise being performed
             user_profile: User's physical measurements and goals
             calibration_data: Optional calibration information
+            session_id: Session whose movement history the frame extends
             
         Returns:
             Comprehensive analysis results
         """
+        state = self.sessions.get(session_id)
+        async with state.lock:
+            return await self._analyze_frame(
+                state, frame, exercise_type, user_profile, calibration_data
+            )
+    
+    async def _analyze_frame(self, state: UnifiedSessionState,
+                             frame: np.ndarray,
+                             exercise_type: str,
+                             user_profile: Dict[str, Any],
+                             calibration_data: Optional[Dict] = None) -> Dict[str, Any]:
+        """Analyze a frame against the given session state."""
         # Get basic pose detection from MediaPipe
-        basic_analysis = await self.mediapipe_service.analyze_frame(
+        if state.pose_backend is None:
+            state.pose_backend = self.pose_backend_factory()
+        basic_analysis = await state.pose_backend.analyze_frame(
             frame, exercise_type
         )
         
@@ -71,28 +139,29 @@ class UnifiedTheoryService:
         
         # Apply physics engine
         physics_results = self._apply_physics_analysis(
-            landmarks, user_profile, calibration_data
+            state, landmarks, user_profile, calibration_data
         )
         
         # Apply biomechanics analysis
         biomechanics_results = self._apply_biomechanics_analysis(
-            landmarks, physics_results, exercise_type
+            state, landmarks, physics_results, exercise_type
         )
         
         # Update movement history
-        self.movement_history.append(landmarks)
-        if len(self.movement_history) > 100:  # Keep last 100 frames
-            self.movement_history.pop(0)
+        state.movement_history.append(landmarks)
+        if len(state.movement_history) > HISTORY_LENGTH:  # Keep last 100 frames
+            state.movement_history.pop(0)
             
         # Apply complex systems analysis if enough history
         complex_systems_results = {}
-        if len(self.movement_history) >= 10:
+        if len(state.movement_history) >= 10:
             complex_systems_results = self._apply_complex_systems_analysis(
-                self.movement_history, exercise_type
+                state, state.movement_history, exercise_type
             )
             
         # Apply optimization engine
         optimization_results = self._apply_optimization(
+            state,
             physics_results.get('joint_angles', {}),
             user_profile,
             exercise_type
@@ -118,7 +187,7 @@ class UnifiedTheoryService:
         result = {
             'success': True,
             'timestamp': datetime.now().isoformat(),
-            'frame_number': len(self.movement_history),
+            'frame_number': len(state.movement_history),
             'exercise_type': exercise_type,
             'landmarks': self._landmarks_to_dict(landmarks),
             'basic_analysis': basic_analysis,
@@ -132,33 +201,42 @@ class UnifiedTheoryService:
         }
         
         # Store in history
-        self.analysis_results_history.append(result)
-        if len(self.analysis_results_history) > 100:
-            self.analysis_results_history.pop(0)
+        state.analysis_results_history.append(result)
+        if len(state.analysis_results_history) > HISTORY_LENGTH:
+            state.analysis_results_history.pop(0)
             
         return result
     
     async def analyze_movement_sequence(self, frames: List[np.ndarray],
                                       exercise_type: str,
-                                      user_profile: Dict[str, Any]) -> Dict[str, Any]:
+                                      user_profile: Dict[str, Any],
+                                      session_id: Optional[str] = None) -> Dict[str, Any]:
         """Analyze a complete movement sequence.
         
         Args:
             frames: List of video frames
             exercise_type: Type of exercise
             user_profile: User profile
+            session_id: Session to extend; by default the sequence is analyzed
+                from an empty history so the result depends only on the frames
             
         Returns:
             Comprehensive sequence analysis
         """
         sequence_results = []
+        state = self.sessions.get(session_id) if session_id else UnifiedSessionState()
         
         # Analyze each frame
-        for frame in frames:
-            result = await self.analyze_frame_unified(
-                frame, exercise_type, user_profile
-            )
-            sequence_results.append(result)
+        try:
+            async with state.lock:
+                for frame in frames:
+                    result = await self._analyze_frame(
+                        state, frame, exercise_type, user_profile
+                    )
+                    sequence_results.append(result)
+        finally:
+            if not session_id:
+                self._close_pose_backend(state)
             
         # Aggregate results
         aggregated = self._aggregate_sequence_results(
@@ -223,7 +301,8 @@ class UnifiedTheoryService:
                     
         return landmarks
     
-    def _apply_physics_analysis(self, landmarks: Dict[str, np.ndarray],
+    def _apply_physics_analysis(self, state: UnifiedSessionState,
+                              landmarks: Dict[str, np.ndarray],
                               user_profile: Dict[str, Any],
                               calibration_data: Optional[Dict]) -> Dict[str, Any]:
         """Apply physics engine analysis."""
@@ -251,26 +330,27 @@ class UnifiedTheoryService:
         )
         
         # Energy efficiency (requires movement history)
-        if len(self.movement_history) > 1:
-            time_stamps = [i * 0.033 for i in range(len(self.movement_history))]  # 30fps
+        if len(state.movement_history) > 1:
+            time_stamps = [i * 0.033 for i in range(len(state.movement_history))]  # 30fps
             results['energy_efficiency'] = self.physics_engine.assess_energy_efficiency(
-                self.movement_history[-10:], time_stamps[-10:]
+                state.movement_history[-10:], time_stamps[-10:]
             )
         else:
             results['energy_efficiency'] = 0.5
             
         return results
     
-    def _apply_biomechanics_analysis(self, landmarks: Dict[str, np.ndarray],
+    def _apply_biomechanics_analysis(self, state: UnifiedSessionState,
+                                    landmarks: Dict[str, np.ndarray],
                                     physics_results: Dict[str, Any],
                                     exercise_type: str) -> Dict[str, Any]:
         """Apply biomechanics analyzer."""
         results = {}
         
         # Detect movement phase
-        if len(self.movement_history) > 1:
+        if len(state.movement_history) > 1:
             phases = self.biomechanics_analyzer.detect_movement_phases(
-                self.movement_history[-10:], exercise_type
+                state.movement_history[-10:], exercise_type
             )
             results['current_phase'] = phases[-1] if phases else MovementPhase.SETUP
             results['phase_history'] = phases
@@ -285,14 +365,14 @@ class UnifiedTheoryService:
         )
         
         # Movement quality analysis
-        if len(self.movement_history) >= 5:
+        if len(state.movement_history) >= 5:
             results['movement_quality'] = self.biomechanics_analyzer.analyze_movement_quality(
-                self.movement_history[-20:], exercise_type
+                state.movement_history[-20:], exercise_type
             )
             
             # Neuromuscular coordination
             movement_data = []
-            for i, landmarks in enumerate(self.movement_history[-20:]):
+            for i, landmarks in enumerate(state.movement_history[-20:]):
                 movement_data.append({
                     'phase': results.get('phase_history', [MovementPhase.SETUP])[min(i, len(results.get('phase_history', [])) - 1)],
                     'muscle_activation': results['muscle_activation']
@@ -312,7 +392,8 @@ class UnifiedTheoryService:
             
         return results
     
-    def _apply_complex_systems_analysis(self, movement_history: List[Dict[str, np.ndarray]],
+    def _apply_complex_systems_analysis(self, state: UnifiedSessionState,
+                                      movement_history: List[Dict[str, np.ndarray]],
                                       exercise_type: str) -> Dict[str, Any]:
         """Apply complex systems analyzer."""
         results = {}
@@ -333,14 +414,14 @@ class UnifiedTheoryService:
         )
         
         # Detect self-organization (if we have practice history)
-        if len(self.analysis_results_history) >= 5:
+        if len(state.analysis_results_history) >= 5:
             practice_data = [
                 {
                     'performance_score': r.get('unified_scores', {}).get('overall', 0),
                     'movement_variability': r.get('complex_systems', {}).get('variability', {}).get('adaptive_variability', 0),
                     'movement_pattern': r.get('physics', {}).get('joint_angles', {})
                 }
-                for r in self.analysis_results_history[-20:]
+                for r in state.analysis_results_history[-20:]
             ]
             results['self_organization'] = self.complex_systems_analyzer.detect_self_organization(
                 practice_data
@@ -356,14 +437,15 @@ class UnifiedTheoryService:
             
         return results
     
-    def _apply_optimization(self, current_joint_angles: Dict[str, float],
+    def _apply_optimization(self, state: UnifiedSessionState,
+                          current_joint_angles: Dict[str, float],
                           user_profile: Dict[str, Any],
                           exercise_type: str) -> Dict[str, Any]:
         """Apply optimization engine."""
         results = {}
         
         # Define objectives based on user profile
-        objectives = self.optimization_engine.define_objective_functions(user_profile)
+        objectives = state.optimization_engine.define_objective_functions(user_profile)
         results['objectives'] = {
             name: {'weight': obj.weight, 'minimize': obj.minimize}
             for name, obj in objectives.items()
@@ -371,12 +453,12 @@ class UnifiedTheoryService:
         
         # Apply constraints
         user_measurements = user_profile.get('physicalMeasurements', {})
-        constraints = self.optimization_engine.apply_constraints(user_measurements)
+        constraints = state.optimization_engine.apply_constraints(user_measurements)
         results['constraints'] = [c.name for c in constraints.values()]
         
         # Solve for optimal form
         if current_joint_angles:
-            optimal_form = self.optimization_engine.solve_form_optimization(
+            optimal_form = state.optimization_engine.solve_form_optimization(
                 current_joint_angles, constraints, exercise_type
             )
             
@@ -388,13 +470,13 @@ class UnifiedTheoryService:
             }
             
             # Calculate improvement priorities
-            improvements = self.optimization_engine.calculate_improvement_priority(
+            improvements = state.optimization_engine.calculate_improvement_priority(
                 current_joint_angles, optimal_form, user_profile
             )
             results['improvement_priorities'] = improvements[:3]  # Top 3
             
             # Generate personalized path
-            path = self.optimization_engine.generate_personalized_path(
+            path = state.optimization_engine.generate_personalized_path(
                 current_joint_angles, optimal_form, time_steps=5
             )
             results['improvement_path'] = path
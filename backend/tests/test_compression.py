@@ -0,0 +1,120 @@
+"""
+Response Compression Middleware Tests
+"""
+import asyncio
+import gzip
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from fastapi.testclient import TestClient
+
+from backend.app.middleware import CompressionMiddleware
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500, offload_threshold=1024)
+
+    @app.get("/large")
+    async def large():
+        return JSONResponse({"items": [{"id": i, "name": f"item-{i}"} for i in range(500)]})
+
+    @app.get("/small")
+    async def small():
+        return JSONResponse({"ok": True})
+
+    @app.get("/stream")
+    async def stream():
+        async def generate():
+            for i in range(200):
+                yield f'{{"row": {i}, "payload": "{"x" * 50}"}}\n'.encode()
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    @app.get("/binary")
+    async def binary():
+        return Response(content=b"\x00" * 4096, media_type="video/mp4")
+
+    @app.get("/precompressed")
+    async def precompressed():
+        body = gzip.compress(b"a" * 4096)
+        return Response(content=body, media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    return app
+
+
+@pytest.fixture
+def compression_client():
+    return TestClient(_build_app())
+
+
+class TestCompressionMiddleware:
+    """Test streaming response compression"""
+
+    def test_large_json_is_gzipped(self, compression_client):
+        response = compression_client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert len(response.json()["items"]) == 500
+
+    def test_small_response_not_compressed(self, compression_client):
+        response = compression_client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json() == {"ok": True}
+
+    def test_streaming_response_compressed(self, compression_client):
+        response = compression_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        lines = response.text.strip().split("\n")
+        assert len(lines) == 200
+
+    def test_binary_media_passthrough(self, compression_client):
+        response = compression_client.get("/binary", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.content == b"\x00" * 4096
+
+    def test_already_encoded_passthrough(self, compression_client):
+        response = compression_client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.content == b"a" * 4096
+
+    def test_no_accept_encoding(self, compression_client):
+        response = compression_client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+
+    def test_each_streamed_chunk_is_flushed(self):
+        chunks = [f'{{"row": {i}}}\n'.encode() for i in range(3)]
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/x-ndjson")]})
+            for chunk in chunks:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            return {"type": "http.request"}
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+
+        # Every chunk decompresses on arrival instead of waiting in the compressor
+        decompressor = zlib.decompressobj(31)
+        bodies = [m["body"] for m in sent if m["type"] == "http.response.body"]
+        for chunk, body in zip(chunks, bodies):
+            assert decompressor.decompress(body) == chunk
+
+    def test_negotiation_respects_quality(self):
+        negotiate = CompressionMiddleware.negotiate_encoding
+        assert negotiate("gzip;q=0, deflate") is None
+        assert negotiate("deflate, gzip;q=0.5") == "gzip"
+        assert negotiate("*") in ("br", "gzip")
@@ -0,0 +1,101 @@
+"""
+Coarse-to-fine Height Analyzer Tests
+"""
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from backend.services.height_analyzer import (  # noqa: E402
+    COARSE_MODEL_COMPLEXITY, FINE_MODEL_COMPLEXITY, HeightAnalyzer
+)
+
+# Normalized y of the landmarks used for height; x of shoulders/eyes
+STANDING_Y = {0: 0.15, 2: 0.14, 5: 0.14, 11: 0.25, 12: 0.25, 23: 0.5, 24: 0.5,
+              27: 0.85, 28: 0.85, 29: 0.87, 30: 0.87}
+STANDING_X = {2: 0.48, 5: 0.52, 11: 0.4, 12: 0.6, 23: 0.45, 24: 0.55}
+
+
+class SyntheticPose:
+    """Pose model reading the frame index encoded in the first pixel"""
+
+    calls = []
+
+    def __init__(self, model_complexity=1, enable_segmentation=False, **kwargs):
+        self.complexity = model_complexity
+        self.segmentation = enable_segmentation
+
+    def process(self, rgb):
+        SyntheticPose.calls.append((self.complexity, self.segmentation))
+        index = int(rgb[0, 0, 0]) + 256 * int(rgb[0, 0, 1])
+        rng = np.random.default_rng(index * 10 + self.complexity)
+        noise = 0.002 if self.complexity == FINE_MODEL_COMPLEXITY else 0.01
+        # The subject leans and bobs in every third 40-frame block
+        moving = (index // 40) % 3 == 1
+        tilt = 0.04 if moving else 0.0
+        scale = 1.0 - (0.15 * np.sin(index / 3) if moving else 0.0)
+
+        landmarks = []
+        for i in range(33):
+            y = STANDING_Y.get(i, 0.5) + (tilt if i in (12, 24) else 0.0)
+            landmarks.append(SimpleNamespace(
+                x=STANDING_X.get(i, 0.5) + rng.normal(0, noise),
+                y=0.5 + (y - 0.5) * scale + rng.normal(0, noise),
+                z=0.0,
+                visibility=0.95
+            ))
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmarks))
+
+    def close(self):
+        pass
+
+
+def write_video(path, frames=600):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"FFV1"), 30, (64, 64))
+    for i in range(frames):
+        frame = np.zeros((64, 64, 3), dtype=np.uint8)
+        frame[..., 2] = i % 256  # red channel after BGR -> RGB
+        frame[..., 1] = i // 256
+        writer.write(frame)
+    writer.release()
+
+
+class TestCoarseToFineHeight:
+    """Test that only the best frames reach the heavy model"""
+
+    def test_refines_few_frames_with_same_estimate(self, tmp_path):
+        video = tmp_path / "standing.avi"
+        write_video(video)
+
+        # Reference: the heavy model on every frame where the subject stands still
+        reference = HeightAnalyzer(pose_factory=SyntheticPose)
+        reference.pose = SyntheticPose(model_complexity=FINE_MODEL_COMPLEXITY)
+        standing = []
+        for i in range(480):
+            if (i // 40) % 3 == 1:
+                continue
+            frame = np.zeros((64, 64, 3), dtype=np.uint8)
+            frame[..., 2] = i % 256
+            frame[..., 1] = i // 256
+            standing.append(reference._analyze_frame_height(frame)["height_cm"])
+
+        SyntheticPose.calls = []
+        result = HeightAnalyzer(pose_factory=SyntheticPose).analyze_video(str(video))
+
+        assert result["success"]
+        assert result["height_cm"] == pytest.approx(np.mean(standing), abs=1.5)
+
+        fine_calls = SyntheticPose.calls.count((FINE_MODEL_COMPLEXITY, True))
+        coarse_calls = SyntheticPose.calls.count((COARSE_MODEL_COMPLEXITY, False))
+        assert fine_calls == result["measurements_count"] <= 40
+        assert coarse_calls == result["frames_screened"]
+        assert len(SyntheticPose.calls) == fine_calls + coarse_calls
+
+    def test_unreadable_video(self, tmp_path):
+        path = tmp_path / "broken.mp4"
+        path.write_bytes(b"not a video")
+        result = HeightAnalyzer(pose_factory=SyntheticPose).analyze_video(str(path))
+        assert not result["success"]
@@ -0,0 +1,99 @@
+"""
+Latency Histogram and Metrics Registry Tests
+"""
+import random
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.utils.metrics import LatencyHistogram, MetricsRegistry, instrument_engine, statement_label
+from backend.utils.performance import PerformanceMonitor
+
+
+class TestLatencyHistogram:
+    """Test fixed-bucket histogram percentiles"""
+
+    def test_percentiles_close_to_exact(self):
+        rng = random.Random(42)
+        samples = [rng.uniform(0.001, 0.2) for _ in range(5000)]
+        hist = LatencyHistogram()
+        for value in samples:
+            hist.record(value)
+
+        samples.sort()
+        for q in (50, 95, 99):
+            exact = samples[int(q / 100 * len(samples)) - 1]
+            assert hist.percentile(q) == pytest.approx(exact, rel=0.15)
+
+        assert hist.count == 5000
+        assert hist.min_value == pytest.approx(min(samples))
+        assert hist.max_value == pytest.approx(max(samples))
+
+    def test_empty_histogram(self):
+        hist = LatencyHistogram()
+        assert hist.percentile(99) == 0.0
+        assert hist.summary()["count"] == 0
+
+    def test_overflow_bucket(self):
+        hist = LatencyHistogram()
+        hist.record(120.0)
+        assert 60.0 <= hist.percentile(50) <= 120.0
+        assert hist.percentile(100) == pytest.approx(120.0)
+
+
+class TestMetricsRegistry:
+    """Test registry summary and exposition"""
+
+    def test_summary_and_prometheus(self):
+        registry = MetricsRegistry()
+        for _ in range(10):
+            registry.observe("http_route", "GET /api/form/analysis/{id}", 0.02)
+        registry.increment("cache_hits")
+
+        summary = registry.summary()
+        route = summary["latency"]["http_route"]["GET /api/form/analysis/{id}"]
+        assert route["count"] == 10
+        assert summary["counters"]["cache_hits"][""] == 1
+
+        output = registry.render_prometheus()
+        assert "# TYPE muscleform_http_route_duration_seconds histogram" in output
+        assert 'le="+Inf"} 10' in output
+        assert "muscleform_cache_hits_total 1" in output
+
+    def test_sqlalchemy_statements_recorded(self):
+        registry = MetricsRegistry()
+        engine = create_engine("sqlite://")
+        instrument_engine(engine, registry)
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+        statements = registry.summary()["latency"]["db_statement"]
+        assert statements["SELECT ?"]["count"] == 2
+
+    def test_statement_label_normalization(self):
+        label = statement_label("SELECT *  FROM users\nWHERE id IN (1, 2, 3) AND name = 'x'")
+        assert label == "SELECT * FROM users WHERE id IN (?) AND name = ?"
+        assert statement_label.cache_info().currsize > 0
+
+    def test_endpoint_avg_times_from_histograms(self):
+        monitor = PerformanceMonitor(MetricsRegistry())
+        for duration in (0.01, 0.02, 0.03):
+            monitor.record_endpoint_time("GET /api/health", duration)
+
+        summary = monitor.get_metrics_summary()
+        assert summary["endpoint_avg_times"]["GET /api/health"] == {
+            "avg": pytest.approx(0.02), "min": 0.01, "max": 0.03, "count": 3
+        }
+        assert summary["endpoint_times"]["GET /api/health"]["count"] == 3
+
+    def test_metrics_import_does_not_load_the_fastapi_app(self):
+        # utils/profiling imports the registry inside the Flask process
+        code = (
+            "import sys, backend.utils.metrics; "
+            "print([m for m in ('fastapi', 'cv2', 'backend.app.config') if m in sys.modules])"
+        )
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert output.stdout.strip() == "[]"
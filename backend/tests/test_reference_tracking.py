@@ -0,0 +1,97 @@
+"""
+Reference Object Tracking Tests
+"""
+import cv2
+import numpy as np
+import pytest
+
+from backend.services.reference_tracking import (
+    ReferenceObjectTracker, get_session_calibration, session_calibrations, set_session_calibration
+)
+
+CARD_HEIGHT_MM = 53.98
+
+
+def make_frame(card_xy=(200, 150), seed=0, card=True):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 40, size=(360, 480, 3), dtype=np.uint8)
+    if card:
+        x, y = card_xy
+        frame[y:y + 54, x:x + 86] = 220
+        cv2.putText(frame, "VISA", (x + 10, y + 35), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (40, 40, 40), 2)
+    return frame
+
+
+class CountingDetector:
+    """Bright-rectangle detector that counts how often it runs"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, frame):
+        self.calls += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        return CARD_HEIGHT_MM / h, (x, y, w, h)
+
+
+class TestReferenceObjectTracker:
+    """Test detect-then-track behaviour"""
+
+    def test_static_object_is_detected_only_on_first_frames(self):
+        detector = CountingDetector()
+        tracker = ReferenceObjectTracker(detector, "credit_card")
+
+        scales = [tracker.update(make_frame(seed=i)) for i in range(100)]
+
+        assert detector.calls == 3
+        assert tracker.template_checks == 19
+        assert scales[-1] == pytest.approx(CARD_HEIGHT_MM / 54)
+        assert tracker.calibration.pixels_per_cm == pytest.approx(540 / CARD_HEIGHT_MM)
+
+    def test_moved_object_is_redetected(self):
+        detector = CountingDetector()
+        tracker = ReferenceObjectTracker(detector, "credit_card", check_interval=1)
+        for i in range(5):
+            tracker.update(make_frame(seed=i))
+        calls = detector.calls
+
+        # Small drift is followed by the template search
+        tracker.update(make_frame((210, 155), seed=10))
+        assert detector.calls == calls
+        assert tracker.calibration.bbox[:2] == (210, 155)
+
+        # A jump outside the search window triggers a fresh detection
+        tracker.update(make_frame((20, 250), seed=11))
+        assert detector.calls == calls + 1
+        assert tracker.calibration.bbox[:2] == (20, 250)
+
+    def test_absent_object_gives_up(self):
+        detector = CountingDetector()
+        tracker = ReferenceObjectTracker(detector, "credit_card", max_detection_attempts=10)
+        for i in range(30):
+            assert tracker.update(make_frame(seed=i, card=False)) is None
+        assert detector.calls == 10
+
+    def test_session_calibration_is_reused_when_still_valid(self):
+        first = ReferenceObjectTracker(CountingDetector(), "credit_card")
+        for i in range(3):
+            first.update(make_frame(seed=i))
+        set_session_calibration("user:session", first.calibration)
+
+        detector = CountingDetector()
+        cached = get_session_calibration("user:session")
+        reused = ReferenceObjectTracker(detector, "credit_card", calibration=cached)
+        assert reused.update(make_frame(seed=50)) == pytest.approx(CARD_HEIGHT_MM / 54)
+        assert detector.calls == 0
+
+        # The camera moved since: the cached calibration is dropped
+        moved = ReferenceObjectTracker(detector, "credit_card", calibration=cached)
+        moved.update(make_frame((20, 250), seed=51))
+        assert detector.calls == 1
+        assert get_session_calibration("other:session") is None
+        assert session_calibrations.stats()["total_bytes"] >= cached.template.nbytes
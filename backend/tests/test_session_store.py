@@ -0,0 +1,129 @@
+"""
+Session Store and Resource Pool Tests
+"""
+import asyncio
+
+import pytest
+
+from backend.services.session_store import ResourcePool, SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSessionStore:
+    """Test per-session isolation, LRU bound and idle eviction"""
+
+    def test_sessions_are_isolated(self):
+        store = SessionStore(list)
+        store.get("alice").append(1)
+        store.get("bob").append(2)
+        store.get("alice").append(3)
+        assert store.get("alice") == [1, 3]
+        assert store.get("bob") == [2]
+
+    def test_least_recently_used_session_is_dropped(self):
+        store = SessionStore(list, max_sessions=2)
+        store.get("a")
+        store.get("b")
+        store.get("a")
+        store.get("c")
+        assert "a" in store and "c" in store and "b" not in store
+        assert store.stats()["evicted_sessions"] == 1
+
+    def test_idle_sessions_expire(self):
+        clock = FakeClock()
+        store = SessionStore(list, idle_timeout_seconds=60, clock=clock)
+        store.get("old").append("frame")
+        clock.now = 30
+        store.get("recent")
+        clock.now = 61
+        assert store.peek("old") is None
+        assert store.peek("recent") == []
+        assert store.get("old") == []  # recreated empty
+        clock.now = 200
+        assert store.evict_idle() == 2
+        assert len(store) == 0
+
+    def test_evicted_states_are_handed_to_callback(self):
+        clock = FakeClock()
+        evicted = []
+        store = SessionStore(list, max_sessions=2, idle_timeout_seconds=60,
+                             clock=clock, on_evict=evicted.append)
+        store.get("a").append("a")
+        store.get("b").append("b")
+        store.get("c").append("c")
+        assert evicted == [["a"]]
+        clock.now = 100
+        store.evict_idle()
+        assert sorted(evicted) == [["a"], ["b"], ["c"]]
+        store.get("d")
+        store.pop("d")
+        assert len(evicted) == 3
+
+    def test_pop(self):
+        store = SessionStore(dict)
+        store.get("a")["k"] = 1
+        assert store.pop("a") == {"k": 1}
+        assert store.pop("a") is None
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        evicted = []
+        store = SessionStore(dict, max_bytes=100, sizeof=lambda state: state.get("size", 0),
+                             on_evict=evicted.append)
+        store.put("a", {"size": 40})
+        store.put("b", {"size": 40})
+        store.get("a")
+        store.put("c", {"size": 40})
+        assert "b" not in store
+        assert evicted == [{"size": 40}]
+        assert store.stats()["total_bytes"] == 80
+
+        # Replacing a state re-measures it; an oversized state is still kept
+        store.put("a", {"size": 500})
+        assert list(store._sessions) == ["a"]
+        assert store.stats()["total_bytes"] == 500
+        store.pop("a")
+        assert store.stats()["total_bytes"] == 0
+
+    def test_rejects_empty_bound(self):
+        with pytest.raises(ValueError):
+            SessionStore(list, max_sessions=0)
+        with pytest.raises(ValueError):
+            SessionStore(list, max_bytes=100)
+
+
+class TestResourcePool:
+    """Test exclusive, bounded resource leasing"""
+
+    def test_never_exceeds_size_and_reuses_resources(self):
+        created = []
+        in_use = set()
+        peak = []
+
+        def factory():
+            created.append(object())
+            return created[-1]
+
+        pool = ResourcePool(factory, size=2)
+
+        async def work():
+            async with pool.acquire() as resource:
+                assert resource not in in_use
+                in_use.add(resource)
+                peak.append(len(in_use))
+                await asyncio.sleep(0.001)
+                in_use.discard(resource)
+
+        async def run():
+            await asyncio.gather(*(work() for _ in range(20)))
+
+        asyncio.run(run())
+        assert len(created) == 2
+        assert max(peak) == 2
+        assert pool.stats() == {"size": 2, "created": 2, "idle": 2}
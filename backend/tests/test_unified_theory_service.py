@@ -0,0 +1,73 @@
+"""
+Unified Theory Service Tests
+"""
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.services.unified_theory_service import UnifiedTheoryService
+
+
+class FakePoseBackend:
+    """Video-mode tracker stand-in: remembers every frame it has seen"""
+
+    instances = []
+
+    def __init__(self):
+        self.frames_seen = 0
+        self.closed = False
+        FakePoseBackend.instances.append(self)
+
+    async def analyze_frame(self, frame, exercise_type):
+        self.frames_seen += 1
+        landmarks = [SimpleNamespace(x=0.5, y=i / 33, z=0.0) for i in range(33)]
+        return {'pose_landmarks': landmarks}
+
+    def close(self):
+        self.closed = True
+
+
+class TestPoseBackendPerSession:
+    """Test that tracking state is never shared between sessions"""
+
+    def setup_method(self):
+        FakePoseBackend.instances = []
+
+    def test_each_session_keeps_its_own_backend(self):
+        service = UnifiedTheoryService(max_sessions=2, pose_backend_factory=FakePoseBackend)
+        frame = np.zeros((4, 4, 3), dtype=np.uint8)
+
+        async def run():
+            for session_id in ('alice', 'bob', 'alice'):
+                await service.analyze_frame_unified(frame, 'squat', {}, session_id=session_id)
+
+        asyncio.run(run())
+        alice = service.sessions.peek('alice').pose_backend
+        bob = service.sessions.peek('bob').pose_backend
+        assert alice is not bob
+        assert (alice.frames_seen, bob.frames_seen) == (2, 1)
+
+    def test_backend_is_closed_when_session_ends_or_is_evicted(self):
+        service = UnifiedTheoryService(max_sessions=1, pose_backend_factory=FakePoseBackend)
+        frame = np.zeros((4, 4, 3), dtype=np.uint8)
+
+        async def run(session_id):
+            await service.analyze_frame_unified(frame, 'squat', {}, session_id=session_id)
+
+        asyncio.run(run('alice'))
+        asyncio.run(run('bob'))
+        alice, bob = FakePoseBackend.instances
+        assert alice.closed and not bob.closed
+
+        assert service.end_session('bob')
+        assert bob.closed
+
+    def test_sequence_without_session_uses_a_fresh_backend(self):
+        service = UnifiedTheoryService(pose_backend_factory=FakePoseBackend)
+        frames = [np.zeros((4, 4, 3), dtype=np.uint8)] * 3
+
+        asyncio.run(service.analyze_movement_sequence(frames, 'squat', {}))
+        asyncio.run(service.analyze_movement_sequence(frames, 'squat', {}))
+        assert [b.frames_seen for b in FakePoseBackend.instances] == [3, 3]
+        assert all(b.closed for b in FakePoseBackend.instances)
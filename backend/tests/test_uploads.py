@@ -0,0 +1,95 @@
+"""
+Streaming Upload Ingestion Tests
+"""
+import asyncio
+import hashlib
+import io
+import os
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import Headers, UploadFile
+
+from backend.utils.uploads import receive_video_upload, stream_upload_to_disk, video_upload
+
+
+def make_upload(data: bytes, content_type: str = "video/mp4", size=None) -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(data),
+        size=size,
+        filename="clip.mp4",
+        headers=Headers({"content-type": content_type})
+    )
+
+
+def write_video(path, frames: int, fps: float = 10.0) -> bytes:
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), i * 5 % 255, dtype=np.uint8))
+    writer.release()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class TestStreamUploadToDisk:
+    """Test chunked copy, hashing and size limits"""
+
+    def test_copies_and_hashes_in_chunks(self):
+        data = os.urandom(300_000)
+        upload = asyncio.run(stream_upload_to_disk(make_upload(data), chunk_size=4096))
+        try:
+            assert upload.size == len(data)
+            assert upload.sha256 == hashlib.sha256(data).hexdigest()
+            with open(upload.path, "rb") as f:
+                assert f.read() == data
+        finally:
+            upload.cleanup()
+        assert not os.path.exists(upload.path)
+
+    def test_rejects_oversized_stream_and_removes_partial_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(stream_upload_to_disk(make_upload(b"x" * 5000), max_bytes=4096, chunk_size=1024))
+        assert exc.value.status_code == 413
+        assert list(tmp_path.iterdir()) == []
+
+    def test_rejects_declared_size_before_reading(self):
+        upload = make_upload(b"", size=10 * 1024 * 1024)
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(stream_upload_to_disk(upload, max_bytes=1024))
+        assert exc.value.status_code == 413
+
+
+class TestReceiveVideoUpload:
+    """Test video validation before analysis"""
+
+    def test_probes_valid_video(self, tmp_path):
+        data = write_video(tmp_path / "clip.avi", frames=20)
+        paths = []
+
+        async def run():
+            async with video_upload(make_upload(data, "video/x-msvideo")) as upload:
+                paths.append(upload.path)
+                assert upload.path.endswith(".avi")
+                assert (upload.video.width, upload.video.height) == (64, 48)
+                assert upload.video.duration_seconds == pytest.approx(2.0, abs=0.2)
+
+        asyncio.run(run())
+        assert not os.path.exists(paths[0])
+
+    def test_rejects_long_video(self, tmp_path):
+        data = write_video(tmp_path / "clip.avi", frames=30)
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(receive_video_upload(make_upload(data, "video/x-msvideo"), max_duration_seconds=1))
+        assert exc.value.status_code == 413
+
+    def test_rejects_non_video_and_undecodable_files(self):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(receive_video_upload(make_upload(b"hello", "text/plain")))
+        assert exc.value.status_code == 400
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(receive_video_upload(make_upload(b"not a video" * 100)))
+        assert exc.value.status_code == 400
@@ -4,6 +4,7 @@ Backend utilities package
 from .response_utils import slim_response, paginate_response, compress_json, format_datetime_fields
 from .db_utils import optimize_query, batch_query, get_query_count, optimize_pagination
 from .performance import measure_performance, profile_memory, optimize_memory, PerformanceMonitor
+from .metrics import LatencyHistogram, MetricsRegistry, metrics_registry, instrument_engine
 
 __all__ = [
     'slim_response',
@@ -17,5 +18,9 @@ __all__ = [
     'measure_performance',
     'profile_memory',
     'optimize_memory',
-    'PerformanceMonitor'
+    'PerformanceMonitor',
+    'LatencyHistogram',
+    'MetricsRegistry',
+    'metrics_registry',
+    'instrument_engine'
 ]
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""
+Histogram-based latency metrics
+
+Fixed-bucket histograms per route, DB statement, cache operation and
+pipeline stage, with percentile estimates and Prometheus text exposition.
+"""
+import re
+import time
+import logging
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _default_bounds() -> Tuple[float, ...]:
+    """Log-spaced bucket upper bounds from 50us to ~60s (about 12% width)"""
+    bounds = []
+    value = 0.00005
+    while value < 60.0:
+        bounds.append(round(value, 7))
+        value *= 1.12
+    bounds.append(60.0)
+    return tuple(bounds)
+
+
+DEFAULT_BOUNDS = _default_bounds()
+
+# Prometheus bucket boundaries are reported on a coarser, conventional grid
+PROMETHEUS_BOUNDS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram
+
+    Counts live in a preallocated ``array`` so recording is a bisect plus a
+    few in-place increments: no locks and no per-sample containers. Under
+    free threading a concurrent increment may very rarely be lost, which is
+    acceptable for monitoring data.
+    """
+
+    __slots__ = ("bounds", "counts", "total", "count", "min_value", "max_value")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BOUNDS):
+        self.bounds = bounds
+        # Final slot is the +Inf overflow bucket
+        self.counts = array("Q", bytes(8 * (len(bounds) + 1)))
+        self.total = 0.0
+        self.count = 0
+        self.min_value = 0.0
+        self.max_value = 0.0
+
+    def record(self, seconds: float):
+        """Record a single duration in seconds"""
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if seconds < self.min_value or self.count == 1:
+            self.min_value = seconds
+        if seconds > self.max_value:
+            self.max_value = seconds
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-th percentile (0-100) by interpolating within a bucket"""
+        if self.count == 0:
+            return 0.0
+
+        rank = q / 100.0 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count == 0:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max_value
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max_value)
+            cumulative += bucket_count
+        return self.max_value
+
+    def summary(self) -> Dict[str, float]:
+        """Summary statistics for JSON responses"""
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max_value,
+        }
+
+    def cumulative_counts(self, bounds: Tuple[float, ...]) -> List[int]:
+        """Cumulative counts re-binned onto coarser upper bounds"""
+        result = []
+        cumulative = 0
+        index = 0
+        for upper in bounds:
+            while index < len(self.bounds) and self.bounds[index] <= upper:
+                cumulative += self.counts[index]
+                index += 1
+            result.append(cumulative)
+        return result
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.total = 0.0
+        self.count = 0
+        self.min_value = 0.0
+        self.max_value = 0.0
+
+
+class MetricsRegistry:
+    """
+    Process-wide registry of latency histograms and counters
+
+    Metrics are grouped into families (``http_route``, ``db_statement``,
+    ``cache_operation``, ``pipeline_stage``) and keyed by a label within the
+    family. Lookups use ``dict.setdefault`` so no lock is taken on the hot
+    path once a histogram exists.
+    """
+
+    FAMILY_DESCRIPTIONS = {
+        "http_route": "HTTP request latency by route template",
+        "db_statement": "Database statement latency",
+        "cache_operation": "Cache operation latency",
+        "pipeline_stage": "Analysis pipeline stage latency",
+    }
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self._histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def histogram(self, family: str, label: str) -> LatencyHistogram:
+        """Get or create the histogram for a family/label pair"""
+        family_histograms = self._histograms.get(family)
+        if family_histograms is None:
+            family_histograms = self._histograms.setdefault(family, {})
+
+        histogram = family_histograms.get(label)
+        if histogram is None:
+            histogram = family_histograms.setdefault(label, LatencyHistogram(self.bounds))
+        return histogram
+
+    def histograms(self, family: str) -> Dict[str, LatencyHistogram]:
+        """All histograms of a family, keyed by label"""
+        return self._histograms.get(family, {})
+
+    def observe(self, family: str, label: str, seconds: float):
+        """Record a duration"""
+        self.histogram(family, label).record(seconds)
+
+    def increment(self, name: str, label: str = "", amount: int = 1):
+        """Increment a counter"""
+        counters = self._counters.get(name)
+        if counters is None:
+            counters = self._counters.setdefault(name, {})
+        counters[label] = counters.get(label, 0) + amount
+
+    def counter_value(self, name: str, label: str = "") -> int:
+        return self._counters.get(name, {}).get(label, 0)
+
+    @contextmanager
+    def timer(self, family: str, label: str) -> Iterator[None]:
+        """Context manager recording the wrapped block's duration"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(family, label, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Percentile summary of every histogram and counter"""
+        return {
+            "latency": {
+                family: {label: hist.summary() for label, hist in list(histograms.items())}
+                for family, histograms in list(self._histograms.items())
+            },
+            "counters": {
+                name: dict(values) for name, values in list(self._counters.items())
+            },
+        }
+
+    def render_prometheus(self, namespace: str = "muscleform") -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+
+        for family, histograms in sorted(self._histograms.items()):
+            metric = f"{namespace}_{family}_duration_seconds"
+            description = self.FAMILY_DESCRIPTIONS.get(family, f"{family} latency")
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} histogram")
+
+            for label, hist in sorted(histograms.items()):
+                label_value = _escape_label(label)
+                for upper, cumulative in zip(PROMETHEUS_BOUNDS, hist.cumulative_counts(PROMETHEUS_BOUNDS)):
+                    lines.append(f'{metric}_bucket{{name="{label_value}",le="{upper}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{name="{label_value}",le="+Inf"}} {hist.count}')
+                lines.append(f'{metric}_sum{{name="{label_value}"}} {hist.total}')
+                lines.append(f'{metric}_count{{name="{label_value}"}} {hist.count}')
+
+        for name, values in sorted(self._counters.items()):
+            metric = f"{namespace}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for label, value in sorted(values.items()):
+                if label:
+                    lines.append(f'{metric}{{name="{_escape_label(label)}"}} {value}')
+                else:
+                    lines.append(f"{metric} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        self._histograms = {}
+        self._counters = {}
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", " ")
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"\bIN\s*\([^)]*\)", re.IGNORECASE)
+_LITERAL_RE = re.compile(r"'[^']*'|\b\d+\b")
+
+
+@lru_cache(maxsize=1024)
+def statement_label(statement: str, max_length: int = 120) -> str:
+    """Normalize a SQL statement into a low-cardinality metric label
+
+    Memoized: an application issues a small set of distinct statements, so
+    the regexes run once per statement rather than once per query.
+    """
+    label = _WHITESPACE_RE.sub(" ", statement).strip()
+    label = _IN_LIST_RE.sub("IN (?)", label)
+    label = _LITERAL_RE.sub("?", label)
+    return label[:max_length]
+
+
+def instrument_engine(engine, registry: Optional[MetricsRegistry] = None):
+    """
+    Record per-statement latency for a SQLAlchemy engine via event hooks
+
+    Args:
+        engine: SQLAlchemy Engine to instrument
+        registry: Target registry (defaults to the global one)
+    """
+    from sqlalchemy import event
+
+    registry = registry or metrics_registry
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_metrics_query_start")
+        if not starts:
+            return
+        registry.observe("db_statement", statement_label(statement), time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        starts = exception_context.connection.info.get("_metrics_query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+        registry.increment("db_errors")
+
+    logger.info("SQLAlchemy engine instrumented for statement metrics")
+    return engine
+
+
+# Global metrics registry instance
+metrics_registry = MetricsRegistry()
@@ -9,58 +9,71 @@ import asyncio
 import psutil
 import gc
 
+from .metrics import MetricsRegistry, metrics_registry
+
 logger = logging.getLogger(__name__)
 
 class PerformanceMonitor:
-    """Monitor API performance metrics"""
-    
-    def __init__(self):
-        self.metrics = {
-            "endpoint_times": {},
-            "db_query_times": {},
-            "cache_hits": 0,
-            "cache_misses": 0,
-            "total_requests": 0
-        }
+    """Monitor API performance metrics
+
+    Thin facade over the histogram-based ``MetricsRegistry`` so existing
+    callers keep working while percentiles come from fixed-bucket histograms.
+    """
+    
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or metrics_registry
     
     def record_endpoint_time(self, endpoint: str, duration: float):
         """Record endpoint response time"""
-        if endpoint not in self.metrics["endpoint_times"]:
-            self.metrics["endpoint_times"][endpoint] = []
-        
-        self.metrics["endpoint_times"][endpoint].append(duration)
-        
-        # Keep only last 100 entries per endpoint
-        if len(self.metrics["endpoint_times"][endpoint]) > 100:
-            self.metrics["endpoint_times"][endpoint] = self.metrics["endpoint_times"][endpoint][-100:]
+        self.registry.observe("http_route", endpoint, duration)
+    
+    def record_db_query_time(self, statement: str, duration: float):
+        """Record database statement time"""
+        self.registry.observe("db_statement", statement, duration)
     
     def record_cache_hit(self):
         """Record a cache hit"""
-        self.metrics["cache_hits"] += 1
+        self.registry.increment("cache_hits")
     
     def record_cache_miss(self):
         """Record a cache miss"""
-        self.metrics["cache_misses"] += 1
+        self.registry.increment("cache_misses")
     
     def get_metrics_summary(self) -> Dict[str, Any]:
-        """Get performance metrics summary"""
-        summary = {
-            "cache_hit_rate": self.metrics["cache_hits"] / max(1, self.metrics["cache_hits"] + self.metrics["cache_misses"]),
-            "total_requests": self.metrics["total_requests"],
-            "endpoint_avg_times": {}
-        }
+        """Get performance metrics summary with p50/p95/p99 per metric"""
+        cache_hits = self.registry.counter_value("cache_hits")
+        cache_misses = self.registry.counter_value("cache_misses")
+        registry_summary = self.registry.summary()
+        latency = registry_summary["latency"]
         
-        # Calculate average times per endpoint
-        for endpoint, times in self.metrics["endpoint_times"].items():
-            if times:
-                summary["endpoint_avg_times"][endpoint] = {
-                    "avg": sum(times) / len(times),
-                    "min": min(times),
-                    "max": max(times),
-                    "count": len(times)
-                }
+        # Kept for existing dashboards; derived from the route histograms
+        endpoint_avg_times = {
+            endpoint: {
+                "avg": hist.total / hist.count,
+                "min": hist.min_value,
+                "max": hist.max_value,
+                "count": hist.count
+            }
+            for endpoint, hist in list(self.registry.histograms("http_route").items())
+            if hist.count
+        }
         
-        return summary
+        return {
+            "cache_hit_rate": cache_hits / max(1, cache_hits + cache_misses),
+            "cache_hits": cache_hits,
+            "cache_misses": cache_misses,
+            "total_requests": sum(registry_summary["counters"].get("http_requests", {}).values()),
+            "endpoint_avg_times": endpoint_avg_times,
+            "endpoint_times": latency.get("http_route", {}),
+            "db_query_times": latency.get("db_statement", {}),
+            "cache_operation_times": latency.get("cache_operation", {}),
+            "pipeline_stage_times": latency.get("pipeline_stage", {}),
+            "counters": registry_summary["counters"],
+        }
+    
+    def render_prometheus(self) -> str:
+        """Render metrics in the Prometheus text format"""
+        return self.registry.render_prometheus()
 
 # Global performance monitor instance
 perf_monitor = PerformanceMonitor()
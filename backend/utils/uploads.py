@@ -0,0 +1,236 @@
+"""
+Streaming upload ingestion
+
+Copies ``UploadFile`` bodies to disk in fixed-size chunks (never holding the
+whole file in memory), enforces size limits while copying, hashes the
+content on the way through, and probes video container metadata with
+OpenCV so unusable files are rejected before any analysis runs.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, BinaryIO, Optional, Tuple
+
+import cv2
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from ..app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB copy buffer
+
+MAX_UPLOAD_BYTES = settings.MAX_UPLOAD_SIZE
+MAX_VIDEO_DURATION_SECONDS = float(os.getenv("MAX_VIDEO_DURATION", "300"))
+
+VIDEO_SUFFIXES = {
+    "video/mp4": ".mp4",
+    "video/quicktime": ".mov",
+    "video/webm": ".webm",
+    "video/x-msvideo": ".avi",
+    "video/x-matroska": ".mkv",
+}
+
+
+@dataclass
+class VideoMetadata:
+    """Container metadata read by ``probe_video``"""
+    width: int
+    height: int
+    fps: float
+    frame_count: int
+    duration_seconds: float
+
+
+@dataclass
+class StoredUpload:
+    """An upload that has been written to a temporary file"""
+    path: str
+    size: int
+    sha256: str
+    content_type: Optional[str] = None
+    filename: Optional[str] = None
+    video: Optional[VideoMetadata] = field(default=None)
+
+    def cleanup(self):
+        """Remove the temporary file"""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _copy_to_disk(source: BinaryIO, destination: BinaryIO, max_bytes: int,
+                  chunk_size: int) -> Tuple[int, str]:
+    """Copy chunk by chunk, hashing as we go. Stops as soon as max_bytes is exceeded."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {max_bytes // (1024 * 1024)}MB upload limit"
+            )
+        digest.update(chunk)
+        destination.write(chunk)
+    return size, digest.hexdigest()
+
+
+async def stream_upload_to_disk(
+    file: UploadFile,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    suffix: str = "",
+    chunk_size: int = CHUNK_SIZE
+) -> StoredUpload:
+    """
+    Write an upload to a temporary file without reading it into memory.
+
+    Args:
+        file: Uploaded file
+        max_bytes: Maximum accepted size
+        suffix: Temporary file suffix (e.g. ".mp4")
+        chunk_size: Copy buffer size
+
+    Returns:
+        The stored upload; the caller is responsible for ``cleanup()``
+
+    Raises:
+        HTTPException: 413 if the upload is larger than max_bytes
+    """
+    # Reject early when the size is already known from the request
+    known_size = getattr(file, "size", None)
+    if known_size is not None and known_size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the {max_bytes // (1024 * 1024)}MB upload limit"
+        )
+
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as destination:
+            await run_in_threadpool(file.file.seek, 0)
+            size, sha256 = await run_in_threadpool(
+                _copy_to_disk, file.file, destination, max_bytes, chunk_size
+            )
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    return StoredUpload(
+        path=path,
+        size=size,
+        sha256=sha256,
+        content_type=file.content_type,
+        filename=file.filename
+    )
+
+
+def probe_video(path: str) -> Optional[VideoMetadata]:
+    """
+    Read container metadata and decode the first frame
+
+    Returns:
+        Metadata, or None if OpenCV cannot open or decode the file
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        ok, _ = cap.read()
+        if not ok:
+            return None
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        return VideoMetadata(
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            fps=fps,
+            frame_count=frame_count,
+            duration_seconds=frame_count / fps if fps > 0 else 0.0
+        )
+    finally:
+        cap.release()
+
+
+async def receive_video_upload(
+    file: UploadFile,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    max_duration_seconds: float = MAX_VIDEO_DURATION_SECONDS
+) -> StoredUpload:
+    """
+    Validate, store and probe an uploaded video
+
+    Raises:
+        HTTPException: 400 for non-video or undecodable files, 413 when the
+            size or duration limit is exceeded
+    """
+    if not (file.content_type or "").startswith("video/"):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be a video"
+        )
+
+    upload = await stream_upload_to_disk(
+        file, max_bytes=max_bytes, suffix=VIDEO_SUFFIXES.get(file.content_type, ".mp4")
+    )
+    try:
+        upload.video = await run_in_threadpool(probe_video, upload.path)
+        if upload.video is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Could not read video file"
+            )
+        if upload.video.duration_seconds > max_duration_seconds:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Video exceeds the {max_duration_seconds:.0f} second limit"
+            )
+    except BaseException:
+        upload.cleanup()
+        raise
+
+    logger.info(
+        f"Received video {upload.sha256[:12]}: {upload.size} bytes, "
+        f"{upload.video.duration_seconds:.1f}s at {upload.video.width}x{upload.video.height}"
+    )
+    return upload
+
+
+@asynccontextmanager
+async def video_upload(file: UploadFile, **limits) -> AsyncIterator[StoredUpload]:
+    """``async with`` form of ``receive_video_upload`` that always removes the temporary file"""
+    upload = await receive_video_upload(file, **limits)
+    try:
+        yield upload
+    finally:
+        upload.cleanup()
+
+
+async def read_upload_bytes(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES,
+                            chunk_size: int = CHUNK_SIZE) -> bytes:
+    """
+    Read a small upload (e.g. a single image) into memory with a size cap
+
+    Raises:
+        HTTPException: 413 if the upload is larger than max_bytes
+    """
+    buffer = bytearray()
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return bytes(buffer)
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {max_bytes // (1024 * 1024)}MB upload limit"
+            )
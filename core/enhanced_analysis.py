@@ -13,6 +13,9 @@ from datetime import datetime
 from .enhanced_scale import EnhancedScaleCalculator
 from .pose_filters import PoseFilterManager, VelocityFilter, SymmetryEnforcer
 from .form_evaluator import ExerciseFormEvaluator, ExerciseType, FormFeedback
+from utils.profiling import trace, span
+from utils.kinematics import JOINT_TRIPLETS, point_angle
+from utils.rep_counter import REP_JOINTS, RepCounter, rep_start_at
 
 try:
     mp_pose = mp.solutions.pose
@@ -79,92 +82,111 @@ class EnhancedBodyAnalyzer:
         Returns:
             Comprehensive analysis results
         """
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        if fps <= 0:
-            fps = 30
-            
-        # Initialize MediaPipe
-        pose = mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=2,  # Use highest complexity for accuracy
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        # Results accumulator
-        all_results = {
-            'metadata': {
-                'user_height_cm': self.user_height_cm,
-                'exercise_type': self.exercise_type.value if self.exercise_type else 'unknown',
-                'video_fps': fps,
-                'total_frames': frame_count,
-                'analysis_date': datetime.now().isoformat()
-            },
-            'frame_analyses': [],
-            'summary': {},
-            'form_evaluation': {},
-            'measurements': {}
-        }
-        
-        # Video writer for visualization
-        out_video = None
-        if output_visualization:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out_path = os.path.join(self.results_dir, 'analysis_visualization.mp4')
-            out_video = cv2.VideoWriter(out_path, fourcc, fps, 
-                                       (int(cap.get(3)), int(cap.get(4))))
-        
-        frame_idx = 0
-        rep_count = 0
-        best_form_score = 0
-        worst_form_score = 100
-        
-        while cap.isOpened():
-            success, image = cap.read()
-            if not success:
-                break
+        with trace('enhanced_analysis', video=os.path.basename(video_path)) as pipeline_trace:
+            cap = cv2.VideoCapture(video_path)
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            
+            if fps <= 0:
+                fps = 30
                 
-            # Process frame
-            frame_results = self._process_frame(
-                image, pose, frame_idx, fps
+            # Initialize MediaPipe
+            pose = mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=2,  # Use highest complexity for accuracy
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
             )
             
-            if frame_results:
-                all_results['frame_analyses'].append(frame_results)
+            # Results accumulator
+            all_results = {
+                'metadata': {
+                    'user_height_cm': self.user_height_cm,
+                    'exercise_type': self.exercise_type.value if self.exercise_type else 'unknown',
+                    'video_fps': fps,
+                    'total_frames': frame_count,
+                    'analysis_date': datetime.now().isoformat()
+                },
+                'frame_analyses': [],
+                'summary': {},
+                'form_evaluation': {},
+                'measurements': {}
+            }
+            
+            # Video writer for visualization
+            out_video = None
+            if output_visualization:
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                out_path = os.path.join(self.results_dir, 'analysis_visualization.mp4')
+                out_video = cv2.VideoWriter(out_path, fourcc, fps, 
+                                           (int(cap.get(3)), int(cap.get(4))))
+            
+            frame_idx = 0
+            rep_counter = RepCounter(
+                fps=fps,
+                start_at=rep_start_at(self.exercise_type.value if self.exercise_type else None)
+            )
+            best_form_score = 0
+            worst_form_score = 100
+            
+            while cap.isOpened():
+                with span('decode'):
+                    success, image = cap.read()
+                if not success:
+                    break
+                    
+                # Process frame
+                frame_results = self._process_frame(
+                    image, pose, frame_idx, fps
+                )
+                
+                # Feed the rep counter every frame so rep boundaries are video frame indices
+                rep_counter.update(
+                    self._rep_angle(frame_results['landmarks_cm']) if frame_results else None
+                )
                 
-                # Update statistics
-                if 'form_score' in frame_results:
-                    best_form_score = max(best_form_score, frame_results['form_score'])
-                    worst_form_score = min(worst_form_score, frame_results['form_score'])
+                if frame_results:
+                    frame_results['rep_count'] = rep_counter.count
+                    all_results['frame_analyses'].append(frame_results)
+                    
+                    # Update statistics
+                    if 'form_score' in frame_results:
+                        best_form_score = max(best_form_score, frame_results['form_score'])
+                        worst_form_score = min(worst_form_score, frame_results['form_score'])
+                    
+                    # Visualize if requested
+                    if output_visualization and out_video:
+                        with span('visualization'):
+                            viz_frame = self._create_visualization(
+                                image, frame_results
+                            )
+                            out_video.write(viz_frame)
                 
-                # Visualize if requested
-                if output_visualization and out_video:
-                    viz_frame = self._create_visualization(
-                        image, frame_results
-                    )
-                    out_video.write(viz_frame)
-            
-            frame_idx += 1
-            
-            # Show progress
-            if frame_idx % 30 == 0:
-                progress = (frame_idx / frame_count) * 100
-                print(f"Processing: {progress:.1f}% complete")
-        
-        # Cleanup
-        cap.release()
-        if out_video:
-            out_video.release()
-        pose.close()
-        
-        # Generate summary
-        all_results['summary'] = self._generate_summary(all_results['frame_analyses'])
-        
-        # Save results
-        self._save_results(all_results)
+                frame_idx += 1
+                
+                # Show progress
+                if frame_idx % 30 == 0:
+                    progress = (frame_idx / frame_count) * 100
+                    print(f"Processing: {progress:.1f}% complete")
+            
+            # Cleanup
+            cap.release()
+            if out_video:
+                out_video.release()
+            pose.close()
+            
+            # Generate summary
+            with span('summary'):
+                all_results['summary'] = self._generate_summary(all_results['frame_analyses'])
+                rep_counter.finish()
+                all_results['summary']['reps'] = rep_counter.segments().summary()
+            
+            # Save results
+            with span('save_json'):
+                self._save_results(all_results)
+        
+        # Per-stage timing breakdown
+        all_results['profiling'] = pipeline_trace.breakdown()
         
         return all_results
     
@@ -173,68 +195,74 @@ class EnhancedBodyAnalyzer:
         """Process single frame with all enhancements"""
         
         # Convert BGR to RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        with span('color_convert'):
+            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         h, w, _ = image.shape
         
         # Detect pose
-        results = pose.process(image_rgb)
+        with span('pose_process'):
+            results = pose.process(image_rgb)
         
         if not results.pose_landmarks:
             return None
             
         # Convert landmarks to dict format
-        landmarks_raw = {}
-        for idx, landmark in enumerate(results.pose_landmarks.landmark):
-            landmarks_raw[idx] = {
-                'x': landmark.x,
-                'y': landmark.y,
-                'z': landmark.z,
-                'visibility': landmark.visibility
-            }
-        
-        # Apply noise reduction
-        landmarks_filtered = self.pose_filter.process_landmarks(landmarks_raw)
+        with span('landmark_convert'):
+            landmarks_raw = {}
+            for idx, landmark in enumerate(results.pose_landmarks.landmark):
+                landmarks_raw[idx] = {
+                    'x': landmark.x,
+                    'y': landmark.y,
+                    'z': landmark.z,
+                    'visibility': landmark.visibility
+                }
+        
+        with span('filtering'):
+            # Apply noise reduction
+            landmarks_filtered = self.pose_filter.process_landmarks(landmarks_raw)
+            
+            # Apply velocity constraints
+            if self.scale_calculator.scale_px_per_cm:
+                landmarks_filtered = self.velocity_filter.filter_landmarks(
+                    landmarks_filtered, self.scale_calculator.scale_px_per_cm
+                )
+            
+            # Apply symmetry enforcement
+            landmarks_filtered = self.symmetry_enforcer.enforce_symmetry(landmarks_filtered)
         
-        # Apply velocity constraints
-        if self.scale_calculator.scale_px_per_cm:
-            landmarks_filtered = self.velocity_filter.filter_landmarks(
-                landmarks_filtered, self.scale_calculator.scale_px_per_cm
+        with span('scaling'):
+            # Calculate scale with multiple references
+            scale = self.scale_calculator.calculate_multi_reference_scale(
+                landmarks_filtered, h, w
             )
-        
-        # Apply symmetry enforcement
-        landmarks_filtered = self.symmetry_enforcer.enforce_symmetry(landmarks_filtered)
-        
-        # Calculate scale with multiple references
-        scale = self.scale_calculator.calculate_multi_reference_scale(
-            landmarks_filtered, h, w
-        )
-        
-        if not scale:
-            return None
             
-        # Convert to cm coordinates
-        landmarks_cm = self.scale_calculator.convert_landmarks_to_cm_enhanced(
-            landmarks_filtered, (w, h)
-        )
-        
-        # Calculate body measurements
-        measurements = self._calculate_enhanced_measurements(
-            landmarks_filtered, (w, h)
-        )
-        
-        # Detect exercise phase
-        phase = self.phase_detector.detect_phase(
-            landmarks_cm, self.exercise_type, self.frame_history
-        )
-        
-        # Evaluate form if exercise type is known
-        form_score = 50.0
-        form_feedback = []
+            if not scale:
+                return None
+                
+            # Convert to cm coordinates
+            landmarks_cm = self.scale_calculator.convert_landmarks_to_cm_enhanced(
+                landmarks_filtered, (w, h)
+            )
+            
+            # Calculate body measurements
+            measurements = self._calculate_enhanced_measurements(
+                landmarks_filtered, (w, h)
+            )
         
-        if self.exercise_type and phase:
-            form_score, form_feedback = self.form_evaluator.evaluate_form(
-                self.exercise_type, landmarks_cm, phase
+        with span('form_evaluation'):
+            # Detect exercise phase
+            phase = self.phase_detector.detect_phase(
+                landmarks_cm, self.exercise_type, self.frame_history
             )
+            
+            # Evaluate form if exercise type is known
+            form_score = 50.0
+            form_feedback = []
+            
+            if self.exercise_type and phase:
+                form_score, form_feedback = self.form_evaluator.evaluate_form(
+                    self.exercise_type, landmarks_cm, phase
+                )
         
         # Store frame results
         frame_results = {
@@ -253,6 +281,19 @@ class EnhancedBodyAnalyzer:
         
         return frame_results
     
+    def _rep_angle(self, landmarks_cm: Dict[str, Dict[str, float]]) -> Optional[float]:
+        """Primary joint angle used for rep segmentation (left/right average)"""
+        if not self.exercise_type:
+            return None
+        
+        angles = []
+        for joint in REP_JOINTS.get(self.exercise_type.value, ()):
+            points = [landmarks_cm.get(name) for name in JOINT_TRIPLETS[joint]]
+            if all(points):
+                angles.append(point_angle(*points, dims=2))
+        
+        return sum(angles) / len(angles) if angles else None
+    
     def _calculate_enhanced_measurements(self, landmarks: Dict[int, Dict[str, float]], 
                                        frame_dim: Tuple[int, int]) -> Dict[str, float]:
         """Calculate enhanced body measurements"""
@@ -27,6 +27,8 @@ from analysis import step03_normalize
 from analysis import step04_temporal
 from analysis import step05_voting
 from analysis import step06_rulegate
+from utils.profiling import trace, span
+from utils.rep_counter import RepSegments, count_reps, rep_angle_series, rep_start_at
 
 class ExerciseClassifier:
     """
@@ -53,7 +55,9 @@ class ExerciseClassifier:
         # 結果格納用
         self.landmarks_by_frame = {}
         self.frame_dimensions = (0, 0)  # (width, height)
+        self.video_fps = 30.0
         self.processed_data = None
+        self._angle_table = None  # (元データ, フレームID, 関節名, 角度配列)
     
     def load_config(self) -> None:
         """設定ファイルの読み込み"""
@@ -74,36 +78,41 @@ class ExerciseClassifier:
         """
         start_time = time.time()
         
-        # 動画を開く
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"動画を開けませんでした: {video_path}")
-        
-        self.frame_dimensions = (
-            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        )
-        
-        # ランドマークの抽出
-        self.landmarks_by_frame = self._extract_landmarks(cap)
-        cap.release()
-        
-        # 抽出が成功したか確認
-        if not self.landmarks_by_frame:
-            raise ValueError("ランドマークを抽出できませんでした")
-        
-        # 6ステップパイプラインの適用
-        self.processed_data = self._apply_pipeline()
-        
-        # 処理時間を記録
-        elapsed_time = time.time() - start_time
-        if '_metadata' not in self.processed_data:
-            self.processed_data['_metadata'] = {}
-        self.processed_data['_metadata']['total_processing_time'] = elapsed_time
-        
-        # 結果を保存（指定された場合）
-        if output_path:
-            self._save_results(output_path)
+        with trace('exercise_classifier', video=os.path.basename(video_path)) as pipeline_trace:
+            # 動画を開く
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                raise ValueError(f"動画を開けませんでした: {video_path}")
+            
+            self.frame_dimensions = (
+                int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            )
+            self.video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            
+            # ランドマークの抽出
+            with span('extract_landmarks'):
+                self.landmarks_by_frame = self._extract_landmarks(cap)
+            cap.release()
+            
+            # 抽出が成功したか確認
+            if not self.landmarks_by_frame:
+                raise ValueError("ランドマークを抽出できませんでした")
+            
+            # 6ステップパイプラインの適用
+            self.processed_data = self._apply_pipeline()
+            
+            # 処理時間を記録
+            elapsed_time = time.time() - start_time
+            if '_metadata' not in self.processed_data:
+                self.processed_data['_metadata'] = {}
+            self.processed_data['_metadata']['total_processing_time'] = elapsed_time
+            self.processed_data['_metadata']['profiling'] = pipeline_trace.breakdown()
+            
+            # 結果を保存（指定された場合）
+            if output_path:
+                with span('save_json'):
+                    self._save_results(output_path)
         
         return self.processed_data
     
@@ -121,24 +130,28 @@ class ExerciseClassifier:
         frame_id = 0
         
         while cap.isOpened():
-            success, image = cap.read()
+            with span('decode'):
+                success, image = cap.read()
             if not success:
                 break
             
             # MediaPipe処理のためにBGR->RGB変換
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            with span('color_convert'):
+                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
             # MediaPipe Poseでランドマーク検出
-            results = self.pose.process(image_rgb)
+            with span('pose_process'):
+                results = self.pose.process(image_rgb)
             
             if results.pose_landmarks:
                 # このフレームのランドマークを格納
-                landmarks_by_frame[str(frame_id)] = {
-                    'landmarks': self._convert_landmarks_to_dict(
-                        results.pose_landmarks, self.frame_dimensions
-                    ),
-                    'timestamp': frame_id / cap.get(cv2.CAP_PROP_FPS),
-                }
+                with span('landmark_convert'):
+                    landmarks_by_frame[str(frame_id)] = {
+                        'landmarks': self._convert_landmarks_to_dict(
+                            results.pose_landmarks, self.frame_dimensions
+                        ),
+                        'timestamp': frame_id / cap.get(cv2.CAP_PROP_FPS),
+                    }
             
             frame_id += 1
             
@@ -378,6 +391,10 @@ class ExerciseClassifier:
         # セグメント分割
         segments = self.get_exercise_segments()
         
+        # 関節角度は動画全体で1回だけ配列化し、セグメントは行の切り出しで扱う
+        table_frame_ids, joint_names, angles = self._joint_angle_table()
+        row_of_frame = {frame_id: row for row, frame_id in enumerate(table_frame_ids)}
+        
         metrics = {}
         
         for segment in segments:
@@ -386,32 +403,80 @@ class ExerciseClassifier:
             if exercise not in metrics:
                 metrics[exercise] = {}
             
-            # 各関節の角度範囲を計算
-            joint_range = {}
-            
-            for frame_id in segment["frames"]:
-                str_frame_id = str(frame_id)
-                
-                if 'joint_angles' in self.processed_data[str_frame_id]:
-                    joint_angles = self.processed_data[str_frame_id]['joint_angles']
-                    
-                    for joint_name, angle in joint_angles.items():
-                        if joint_name not in joint_range:
-                            joint_range[joint_name] = {"min": angle, "max": angle}
-                        else:
-                            joint_range[joint_name]["min"] = min(joint_range[joint_name]["min"], angle)
-                            joint_range[joint_name]["max"] = max(joint_range[joint_name]["max"], angle)
+            rows = [row_of_frame[frame_id] for frame_id in segment["frames"] if frame_id in row_of_frame]
+            segment_angles = angles[rows]
             
             # 関節の動作範囲を計算
             rom = {}  # Range of Motion
-            for joint_name, range_data in joint_range.items():
-                rom[joint_name] = range_data["max"] - range_data["min"]
+            for column, joint_name in enumerate(joint_names):
+                values = segment_angles[:, column]
+                values = values[~np.isnan(values)]
+                if values.size:
+                    rom[joint_name] = float(values.max() - values.min())
             
             metrics[exercise]["joint_rom"] = rom
-            metrics[exercise]["rep_count"] = self._estimate_rep_count(segment, exercise)
+            
+            reps = self._segment_reps(segment_angles, joint_names, exercise)
+            metrics[exercise]["rep_count"] = reps.count if reps is not None else 0
+            if reps is not None:
+                metrics[exercise]["reps"] = reps.summary()["reps"]
         
         return metrics
     
+    def _joint_angle_table(self) -> Tuple[List[int], List[str], np.ndarray]:
+        """
+        全フレームの関節角度を (フレーム数, 関節数) の配列にまとめる
+        
+        処理済みデータごとに1回だけ構築し、以降の指標計算で使い回す。
+        
+        Returns:
+            Tuple[List[int], List[str], np.ndarray]: フレームID、関節名、角度配列（欠損は NaN）
+        """
+        if self._angle_table is not None and self._angle_table[0] is self.processed_data:
+            return self._angle_table[1:]
+        
+        frame_ids = sorted([int(k) for k in self.processed_data.keys() if k != '_metadata'])
+        
+        joint_names = []
+        joint_column = {}
+        per_frame = []
+        for frame_id in frame_ids:
+            joint_angles = self.processed_data[str(frame_id)].get('joint_angles', {})
+            for joint_name in joint_angles:
+                if joint_name not in joint_column:
+                    joint_column[joint_name] = len(joint_names)
+                    joint_names.append(joint_name)
+            per_frame.append(joint_angles)
+        
+        angles = np.full((len(frame_ids), len(joint_names)), np.nan)
+        for row, joint_angles in enumerate(per_frame):
+            for joint_name, angle in joint_angles.items():
+                angles[row, joint_column[joint_name]] = angle
+        
+        self._angle_table = (self.processed_data, frame_ids, joint_names, angles)
+        return frame_ids, joint_names, angles
+    
+    def _segment_reps(self, segment_angles: np.ndarray, joint_names: List[str],
+                      exercise: str) -> Optional[RepSegments]:
+        """
+        セグメントの関節角度からレップ境界と統計を求める
+        
+        Args:
+            segment_angles (np.ndarray): セグメント内の角度配列 (フレーム数, 関節数)
+            joint_names (List[str]): 列に対応する関節名
+            exercise (str): 運動タイプ
+        
+        Returns:
+            Optional[RepSegments]: 対象関節がない・フレームが少ない場合は None
+        """
+        series = rep_angle_series(
+            {name: segment_angles[:, column] for column, name in enumerate(joint_names)},
+            exercise
+        )
+        if series is None or len(series) < 10:
+            return None
+        return count_reps(series, fps=self.video_fps, start_at=rep_start_at(exercise))
+    
     def _estimate_rep_count(self, segment: Dict[str, Any], exercise: str) -> int:
         """
         セグメント内の反復回数を推定
@@ -423,80 +488,27 @@ class ExerciseClassifier:
         Returns:
             int: 推定反復回数
         """
-        frames = segment["frames"]
-        
-        # 関節角度の時系列データを取得
-        knee_angles = []
-        hip_angles = []
-        elbow_angles = []
-        shoulder_angles = []
+        table_frame_ids, joint_names, angles = self._joint_angle_table()
+        row_of_frame = {frame_id: row for row, frame_id in enumerate(table_frame_ids)}
+        rows = [row_of_frame[frame_id] for frame_id in segment["frames"] if frame_id in row_of_frame]
         
-        for frame_id in frames:
-            str_frame_id = str(frame_id)
-            
-            if 'joint_angles' in self.processed_data[str_frame_id]:
-                joint_angles = self.processed_data[str_frame_id]['joint_angles']
-                
-                # 膝の角度（左右の平均）
-                left_knee = joint_angles.get('left_knee', 0)
-                right_knee = joint_angles.get('right_knee', 0)
-                knee_angles.append((left_knee + right_knee) / 2)
-                
-                # 股関節の角度（左右の平均）
-                left_hip = joint_angles.get('left_hip', 0)
-                right_hip = joint_angles.get('right_hip', 0)
-                hip_angles.append((left_hip + right_hip) / 2)
-                
-                # 肘の角度（左右の平均）
-                left_elbow = joint_angles.get('left_elbow', 0)
-                right_elbow = joint_angles.get('right_elbow', 0)
-                elbow_angles.append((left_elbow + right_elbow) / 2)
-                
-                # 肩の角度（左右の平均）
-                left_shoulder = joint_angles.get('left_shoulder', 0)
-                right_shoulder = joint_angles.get('right_shoulder', 0)
-                shoulder_angles.append((left_shoulder + right_shoulder) / 2)
-        
-        # 運動タイプに応じた反復回数の推定
-        if exercise == 'squat':
-            return self._count_peaks_and_valleys(knee_angles)
-        elif exercise == 'pushup':
-            return self._count_peaks_and_valleys(elbow_angles)
-        elif exercise == 'deadlift':
-            return self._count_peaks_and_valleys(hip_angles)
-        elif exercise == 'overhead_press' or exercise == 'bench_press':
-            return self._count_peaks_and_valleys(shoulder_angles)
-        else:
-            return 0
+        reps = self._segment_reps(angles[rows], joint_names, exercise)
+        return reps.count if reps is not None else 0
     
-    def _count_peaks_and_valleys(self, angle_series: List[float]) -> int:
+    def _count_peaks_and_valleys(self, angle_series: List[float], exercise: Optional[str] = None) -> int:
         """
-        角度の時系列データからピークと谷を数えて反復回数を推定
+        角度の時系列データからヒステリシス付き極値検出で反復回数を推定
         
         Args:
             angle_series (List[float]): 角度の時系列データ
+            exercise (Optional[str]): 運動タイプ（レップ開始の極値の判定に使用）
         
         Returns:
             int: 推定反復回数
         """
         if len(angle_series) < 10:
             return 0
-        
-        # 移動平均を適用してノイズを低減
-        window_size = min(15, len(angle_series) // 5)
-        smoothed = np.convolve(angle_series, np.ones(window_size)/window_size, mode='valid')
-        
-        # ピークと谷を検出
-        from scipy.signal import find_peaks
-        
-        # ピークの検出
-        peaks, _ = find_peaks(smoothed, distance=window_size)
-        
-        # 谷の検出（-1を掛けて反転）
-        valleys, _ = find_peaks(-smoothed, distance=window_size)
-        
-        # ピークと谷の数の少ない方を反復回数として採用
-        return min(len(peaks), len(valleys))
+        return count_reps(angle_series, fps=self.video_fps, start_at=rep_start_at(exercise)).count
 
 def main():
     """メインの実行関数"""
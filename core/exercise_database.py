@@ -2,6 +2,10 @@
 トレーニング種目データベース
 部位別種目分類とデータ管理
 """
+import json
+import threading
+import unicodedata
+from collections import Counter, defaultdict
 
 # 部位別種目データベース
 EXERCISE_DATABASE = {
@@ -210,58 +214,332 @@ EXERCISE_DATABASE = {
     }
 }
 
+def normalize_search_text(text):
+    """検索用の正規化（NFKC・小文字化・ひらがな→カタカナ）"""
+    text = unicodedata.normalize("NFKC", text).lower().strip()
+    return "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in text)
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        # この接頭辞を持つトークンの上位候補 [(rank_key, target)]
+        self.top = []
+
+
+class ExerciseCatalog:
+    """
+    インデックス付き種目カタログ
+
+    ID→種目のハッシュマップ、部位別・筋肉別の転置インデックス、
+    接頭辞トライ（各ノードに上位候補を保持するため、補完は接頭辞長にのみ依存）
+    とトライグラム索引（部分一致・あいまい検索、2文字の入力はバイグラム）を持つ
+    """
+
+    MAX_PREFIX_CANDIDATES = 32
+    MIN_FUZZY_SIMILARITY = 0.3
+
+    # トークン種別ごとの優先度（小さいほど上位）
+    TIER_NAME, TIER_ID, TIER_MUSCLE, TIER_CATEGORY = range(4)
+
+    def __init__(self, database=None):
+        self._lock = threading.RLock()
+        self._reset()
+        if database:
+            self.load(database)
+
+    def _reset(self):
+        self.entries = {}
+        self.by_category = defaultdict(list)
+        self.by_muscle = defaultdict(list)
+        self.category_names = {}
+        self.muscle_names = {}
+        self._root = _TrieNode()
+        self._trigram_index = defaultdict(set)
+        self._bigram_index = defaultdict(set)
+        self._char_index = defaultdict(set)
+        self._entry_trigrams = {}
+        self._serialized = {}
+
+    def load(self, database):
+        """EXERCISE_DATABASE 形式の辞書を読み込む"""
+        with self._lock:
+            for category_key, category in database.items():
+                for subcategory_key, subcategory in category["subcategories"].items():
+                    for exercise in subcategory["exercises"]:
+                        self._add({
+                            **exercise,
+                            "category": category_key,
+                            "category_name": category["name"],
+                            "subcategory": subcategory_key,
+                            "subcategory_name": subcategory["name"]
+                        })
+
+    def add_exercise(self, entry):
+        """
+        種目を追加（category/subcategory とその表示名を含むフラットな辞書）
+
+        Raises:
+            ValueError: ID が重複している場合
+        """
+        with self._lock:
+            if entry["id"] in self.entries:
+                raise ValueError(f"種目IDが重複しています: {entry['id']}")
+            self._add(dict(entry))
+
+    def remove_exercise(self, exercise_id):
+        """種目を削除（索引は再構築する）"""
+        with self._lock:
+            if exercise_id not in self.entries:
+                return False
+            remaining = [e for e in self.entries.values() if e["id"] != exercise_id]
+            self._reset()
+            for entry in remaining:
+                self._add(entry)
+            return True
+
+    def _add(self, entry):
+        exercise_id = entry["id"]
+        self.entries[exercise_id] = entry
+        self._serialized.clear()
+
+        category, muscle = entry["category"], entry["subcategory"]
+        self.by_category[category].append(exercise_id)
+        self.by_muscle[muscle].append(exercise_id)
+
+        # 部位・筋肉名は初出時にのみトライへ登録
+        if category not in self.category_names:
+            self.category_names[category] = entry["category_name"]
+            for token in (category, entry["category_name"]):
+                self._insert(token, self.TIER_CATEGORY, ("category", category))
+        if muscle not in self.muscle_names:
+            self.muscle_names[muscle] = entry["subcategory_name"]
+            for token in (muscle, entry["subcategory_name"]):
+                self._insert(token, self.TIER_MUSCLE, ("muscle", muscle))
+
+        self._insert(entry["name"], self.TIER_NAME, ("exercise", exercise_id))
+        id_words = exercise_id.replace("_", " ")
+        for token in {exercise_id, id_words, *id_words.split()}:
+            self._insert(token, self.TIER_ID, ("exercise", exercise_id))
+
+        trigrams, bigrams, chars = set(), set(), set()
+        for text in (entry["name"], id_words):
+            text = normalize_search_text(text)
+            trigrams |= _ngrams(text, 3)
+            bigrams |= _ngrams(text, 2)
+            chars |= set(text)
+        # あいまい一致の類似度は種目名・IDのみで計算する
+        self._entry_trigrams[exercise_id] = set(trigrams)
+        # 部位名・筋肉名の部分一致（「胸筋」「三頭」等）でも種目が見つかるようにする
+        for text in (entry["category_name"], entry["subcategory_name"]):
+            text = normalize_search_text(text)
+            trigrams |= _ngrams(text, 3)
+            bigrams |= _ngrams(text, 2)
+            chars |= set(text)
+        for trigram in trigrams:
+            self._trigram_index[trigram].add(exercise_id)
+        for bigram in bigrams:
+            self._bigram_index[bigram].add(exercise_id)
+        for char in chars - {" "}:
+            self._char_index[char].add(exercise_id)
+
+    def _insert(self, token, tier, target):
+        token = normalize_search_text(token)
+        if not token:
+            return
+        item = ((tier, len(token), token), target)
+        node = self._root
+        for char in token:
+            node = node.children.setdefault(char, _TrieNode())
+            if item not in node.top:
+                # 読み取り側がロックなしで見られるよう、リストは差し替える
+                node.top = sorted(node.top + [item])[:self.MAX_PREFIX_CANDIDATES]
+
+    def _find(self, prefix):
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def scored_search(self, query, limit=20):
+        """検索してスコア付きの [(score, exercise_id)] を返す"""
+        q = normalize_search_text(query)
+        if not q:
+            return []
+
+        scores = {}
+
+        def hit(exercise_id, score):
+            if score > scores.get(exercise_id, 0.0):
+                scores[exercise_id] = score
+
+        # 接頭辞一致（種目名 > ID > 筋肉 > 部位）
+        node = self._find(q)
+        if node is not None:
+            for (tier, length, _), (kind, key) in node.top:
+                if kind == "exercise":
+                    hit(key, 1.0 if length == len(q) else 0.9 - 0.1 * tier)
+                else:
+                    index = self.by_muscle if kind == "muscle" else self.by_category
+                    for exercise_id in index[key][:limit]:
+                        hit(exercise_id, 0.5 if kind == "muscle" else 0.4)
+
+        # 部分一致・あいまい一致（トライグラム）
+        if len(scores) < limit and len(q) == 1:
+            for exercise_id in self._char_index.get(q, ()):
+                hit(exercise_id, 0.7)
+        elif len(scores) < limit and len(q) == 2:
+            for exercise_id in self._bigram_index.get(q, ()):
+                hit(exercise_id, 0.7)
+        elif len(scores) < limit and len(q) >= 3:
+            query_trigrams = _ngrams(q, 3)
+            common = Counter()
+            for trigram in query_trigrams:
+                common.update(self._trigram_index.get(trigram, ()))
+            for exercise_id, count in common.items():
+                if count == len(query_trigrams):
+                    hit(exercise_id, 0.7)
+                    continue
+                similarity = 2 * count / (len(query_trigrams) + len(self._entry_trigrams[exercise_id]))
+                if similarity >= self.MIN_FUZZY_SIMILARITY:
+                    hit(exercise_id, 0.6 * similarity)
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], len(self.entries[item[0]]["name"]), item[0])
+        )
+        return [(score, exercise_id) for exercise_id, score in ranked[:limit]]
+
+    def search(self, query, limit=20):
+        """検索結果（スコア順の種目リスト）"""
+        return [dict(self.entries[exercise_id]) for _, exercise_id in self.scored_search(query, limit)]
+
+    def get(self, exercise_id):
+        entry = self.entries.get(exercise_id)
+        return dict(entry) if entry else None
+
+    def all_exercises(self):
+        return [dict(entry) for entry in self.entries.values()]
+
+    def exercises_in(self, category=None, muscle=None):
+        """部位別・筋肉別の種目リスト"""
+        if category is not None:
+            ids = self.by_category.get(category, [])
+        else:
+            ids = self.by_muscle.get(muscle, [])
+        return [dict(self.entries[exercise_id]) for exercise_id in ids]
+
+    def serialized(self, category=None):
+        """未フィルタの一覧レスポンス（JSON bytes）。追加・削除までキャッシュする"""
+        if category is not None and category not in self.by_category:
+            return b'{"exercises": []}'
+        response = self._serialized.get(category)
+        if response is None:
+            if category is None:
+                exercises = self.all_exercises()
+            else:
+                exercises = [
+                    {k: v for k, v in entry.items() if k not in ("category", "category_name")}
+                    for entry in self.exercises_in(category=category)
+                ]
+            response = json.dumps({"exercises": exercises}, ensure_ascii=False).encode("utf-8")
+            self._serialized[category] = response
+        return response
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, exercise_id):
+        return exercise_id in self.entries
+
+
+# 起動時に一度だけ構築する
+exercise_catalog = ExerciseCatalog(EXERCISE_DATABASE)
+
+# ユーザー定義のカスタム種目（ユーザーごとのカタログ）
+_custom_catalogs = {}
+_custom_lock = threading.Lock()
+
+
+def add_custom_exercise(exercise, category, subcategory, owner):
+    """
+    ユーザー定義の種目を追加
+
+    Args:
+        exercise: {"id", "name", "type"} を含む辞書
+        category: 部位キー（EXERCISE_DATABASE のキー）
+        subcategory: 筋肉キー
+        owner: 所有ユーザーID
+
+    Raises:
+        ValueError: 部位・筋肉が存在しない、または ID が重複している場合
+    """
+    try:
+        category_data = EXERCISE_DATABASE[category]
+        subcategory_name = category_data["subcategories"][subcategory]["name"]
+    except KeyError:
+        raise ValueError(f"不明な部位です: {category}/{subcategory}")
+    if exercise["id"] in exercise_catalog:
+        raise ValueError(f"種目IDが重複しています: {exercise['id']}")
+
+    with _custom_lock:
+        catalog = _custom_catalogs.setdefault(owner, ExerciseCatalog())
+    catalog.add_exercise({
+        **exercise,
+        "custom": True,
+        "category": category,
+        "category_name": category_data["name"],
+        "subcategory": subcategory,
+        "subcategory_name": subcategory_name
+    })
+
+
+def remove_custom_exercise(exercise_id, owner):
+    """ユーザー定義の種目を削除"""
+    catalog = _custom_catalogs.get(owner)
+    return catalog.remove_exercise(exercise_id) if catalog else False
+
+
 def get_all_exercises():
     """全ての種目をフラットなリストで取得"""
-    exercises = []
-    for category_key, category in EXERCISE_DATABASE.items():
-        for subcategory_key, subcategory in category["subcategories"].items():
-            for exercise in subcategory["exercises"]:
-                exercises.append({
-                    **exercise,
-                    "category": category_key,
-                    "category_name": category["name"],
-                    "subcategory": subcategory_key,
-                    "subcategory_name": subcategory["name"]
-                })
-    return exercises
-
-def search_exercises(query):
-    """種目名で検索"""
-    all_exercises = get_all_exercises()
-    query_lower = query.lower()
-    
-    results = []
-    for exercise in all_exercises:
-        if (query_lower in exercise["name"].lower() or 
-            query_lower in exercise["category_name"].lower() or
-            query_lower in exercise["subcategory_name"].lower()):
-            results.append(exercise)
-    
-    return results
+    return exercise_catalog.all_exercises()
+
+def search_exercises(query, limit=50, owner=None):
+    """種目名・部位名で検索（接頭辞一致 > 部分一致 > あいまい一致の順）"""
+    custom = _custom_catalogs.get(owner) if owner is not None else None
+    if custom is None:
+        return exercise_catalog.search(query, limit)
+
+    ranked = [(score, exercise_catalog, eid) for score, eid in exercise_catalog.scored_search(query, limit)]
+    ranked += [(score, custom, eid) for score, eid in custom.scored_search(query, limit)]
+    ranked.sort(key=lambda item: (-item[0], len(item[1].entries[item[2]]["name"]), item[2]))
+    return [catalog.get(eid) for _, catalog, eid in ranked[:limit]]
 
 def get_exercises_by_category(category):
     """部位別で種目を取得"""
-    if category not in EXERCISE_DATABASE:
-        return []
-    
-    exercises = []
-    for subcategory_key, subcategory in EXERCISE_DATABASE[category]["subcategories"].items():
-        for exercise in subcategory["exercises"]:
-            exercises.append({
-                **exercise,
-                "subcategory": subcategory_key,
-                "subcategory_name": subcategory["name"]
-            })
-    
-    return exercises
+    return [
+        {k: v for k, v in entry.items() if k not in ("category", "category_name")}
+        for entry in exercise_catalog.exercises_in(category=category)
+    ]
+
+def get_exercises_by_muscle(muscle):
+    """筋肉別で種目を取得"""
+    return exercise_catalog.exercises_in(muscle=muscle)
 
-def get_exercise_by_id(exercise_id):
+def get_exercise_by_id(exercise_id, owner=None):
     """IDから種目情報を取得"""
-    all_exercises = get_all_exercises()
-    for exercise in all_exercises:
-        if exercise["id"] == exercise_id:
-            return exercise
-    return None
+    exercise = exercise_catalog.get(exercise_id)
+    if exercise is None and owner is not None and owner in _custom_catalogs:
+        exercise = _custom_catalogs[owner].get(exercise_id)
+    return exercise
 
 # よく使われる重量のリスト（kg単位）
 COMMON_WEIGHTS = [
@@ -7,6 +7,8 @@ from dataclasses import dataclass
 from enum import Enum
 import mediapipe as mp
 
+from utils.kinematics import point_angle
+
 try:
     mp_pose = mp.solutions.pose
     PoseLandmark = mp_pose.PoseLandmark
@@ -434,22 +436,8 @@ class ExerciseFormEvaluator:
         """Calculate angle between three points"""
         if not all([p1, p2, p3]):
             return None
-            
-        # Convert to numpy arrays
-        a = np.array([p1['x'], p1['y'], p1['z']])
-        b = np.array([p2['x'], p2['y'], p2['z']])
-        c = np.array([p3['x'], p3['y'], p3['z']])
-        
-        # Calculate vectors
-        ba = a - b
-        bc = c - b
-        
-        # Calculate angle
-        cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-        cosine_angle = np.clip(cosine_angle, -1.0, 1.0)
-        angle = np.degrees(np.arccos(cosine_angle))
         
-        return angle
+        return point_angle(p1, p2, p3)
     
     def _calculate_angle_from_vertical(self, p1: Dict[str, float], 
                                      p2: Dict[str, float]) -> float:
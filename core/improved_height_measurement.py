@@ -1,9 +1,10 @@
 """
 Improved height measurement system with enhanced accuracy
 """
+import heapq
 import numpy as np
 import mediapipe as mp
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, Iterator, List, Tuple, Optional, Any
 from dataclasses import dataclass
 from collections import deque
 from scipy import stats
@@ -16,6 +17,11 @@ logger = logging.getLogger(__name__)
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 
+# Coarse-to-fine video processing: a light model screens sampled frames and
+# the heavy model only runs on the best candidates
+COARSE_MODEL_COMPLEXITY = 0
+FINE_MODEL_COMPLEXITY = 2
+
 
 @dataclass
 class CameraValidation:
@@ -278,8 +284,8 @@ class MultiFrameHeightMeasurement:
         )
         self.measurements.append(measurement)
     
-    def get_stable_height(self) -> Optional[float]:
-        """Get stable height from multiple measurements"""
+    def _filtered_heights(self) -> Optional[List[float]]:
+        """Confident heights with IQR outliers removed (None if too few)"""
         if len(self.measurements) < 10:
             return None
         
@@ -307,13 +313,26 @@ class MultiFrameHeightMeasurement:
             if lower_bound <= h <= upper_bound
         ]
         
-        if not filtered_heights:
-            # If all are outliers, use median of original
-            return np.median(heights)
+        # If all are outliers, fall back to the original heights
+        return filtered_heights or heights
+    
+    def get_stable_height(self) -> Optional[float]:
+        """Get stable height from multiple measurements"""
+        filtered_heights = self._filtered_heights()
+        if filtered_heights is None:
+            return None
         
         # Return median of filtered heights
         return np.median(filtered_heights)
     
+    def get_stable_height_margin(self) -> Optional[float]:
+        """95% confidence half-width of the stable height (None until stable)"""
+        filtered_heights = self._filtered_heights()
+        if filtered_heights is None:
+            return None
+        
+        return 1.96 * np.std(filtered_heights) / np.sqrt(len(filtered_heights))
+    
     def get_confidence(self) -> float:
         """Get overall confidence score"""
         if len(self.measurements) < 5:
@@ -347,15 +366,21 @@ class MultiFrameHeightMeasurement:
 class AccurateHeightMeasurementSystem:
     """Main height measurement system"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        model_complexity: int = FINE_MODEL_COMPLEXITY,
+        enable_segmentation: bool = False,
+        static_image_mode: bool = False
+    ):
         self.multi_frame = MultiFrameHeightMeasurement()
         self.calibration_factor: Optional[float] = None
         self.user_height: Optional[float] = None
         self.is_calibrated = False
         self.pose = mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=2,
+            static_image_mode=static_image_mode,
+            model_complexity=model_complexity,
             smooth_landmarks=True,
+            enable_segmentation=enable_segmentation,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
@@ -526,51 +551,155 @@ class AccurateHeightMeasurementSystem:
 
 
 # Utility functions for video processing
+def _sample_frames(cap: cv2.VideoCapture, interval: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield every interval-th frame; skipped frames are grabbed but not decoded"""
+    frame_index = 0
+    while True:
+        if frame_index % interval == 0:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield frame_index, frame
+        elif not cap.grab():
+            return
+        frame_index += 1
+
+
+def _read_frame(cap: cv2.VideoCapture, frame_index: int) -> Optional[np.ndarray]:
+    """Decode a sampled frame again by its index"""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    ret, frame = cap.read()
+    return frame if ret else None
+
+
+def _screening_score(landmarks: Any, previous_height: Optional[float]) -> Tuple[float, float]:
+    """Score how suitable a frame is for measurement (upright, full body, stable)
+
+    Returns:
+        (score, normalized head-to-feet height)
+    """
+    _, head_y, _ = ImprovedHeightMeasurement.find_accurate_head_top(landmarks)
+    _, feet_y, _ = ImprovedHeightMeasurement.find_accurate_feet(landmarks)
+    body_height = abs(feet_y - head_y)
+
+    validation = CameraCalibration.validate_camera_setup(landmarks)
+    if not validation.valid:
+        # Still ranked so that setup feedback is produced when nothing is valid
+        return 0.1 * validation.confidence, body_height
+
+    left_shoulder = landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER]
+    right_shoulder = landmarks.landmark[mp_pose.PoseLandmark.RIGHT_SHOULDER]
+    uprightness = max(0.0, 1.0 - abs(left_shoulder.y - right_shoulder.y) * 10)
+    in_frame = 1.0 if head_y > 0 and feet_y < 1 else 0.5
+
+    # A subject who is still has nearly the same height as in the previous sample
+    if previous_height:
+        stability = max(0.0, 1.0 - abs(body_height - previous_height) / previous_height * 20)
+    else:
+        stability = 0.5
+
+    return validation.confidence * uprightness * in_frame * stability, body_height
+
+
 def process_video_for_height(
     video_path: str,
     reference_height: Optional[float] = None,
-    progress_callback: Optional[callable] = None
+    progress_callback: Optional[callable] = None,
+    top_k: int = 30,
+    min_measurements: int = 20,
+    convergence_tolerance_cm: float = 1.0
 ) -> Dict[str, Any]:
-    """Process entire video for height measurement"""
-    
-    system = AccurateHeightMeasurementSystem()
+    """Process entire video for height measurement
+
+    A light pose model screens the video for upright, full-body, stable
+    frames. The full model (with segmentation) then refines only the top_k
+    candidates, best first, and stops once the stable height is known to
+    within convergence_tolerance_cm (95% confidence).
+    """
     cap = cv2.VideoCapture(video_path)
     
     if not cap.isOpened():
         raise ValueError(f"Cannot open video: {video_path}")
     
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
     
     # Process every nth frame to reduce computation
     frame_skip = max(1, int(fps / 5))  # Process 5 frames per second
     
-    results = []
-    frame_count = 0
-    
+    # Coarse pass: keep the top_k frames in a min-heap of (score, index).
+    # Only indices are held; the fine pass decodes the chosen frames again.
+    candidates: List[Tuple[float, int]] = []
+    last_sample: Optional[int] = None
+    previous_height = None
+    frames_scanned = 0
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_skip == 0:
+        screening_pose = mp_pose.Pose(
+            static_image_mode=False,
+            model_complexity=COARSE_MODEL_COMPLEXITY,
+            smooth_landmarks=True,
+            enable_segmentation=False,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        
+        try:
+            for frame_index, frame in _sample_frames(cap, frame_skip):
+                frames_scanned += 1
+                last_sample = frame_index
+                results = screening_pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                
+                if results.pose_landmarks:
+                    score, previous_height = _screening_score(results.pose_landmarks, previous_height)
+                    if len(candidates) < top_k:
+                        heapq.heappush(candidates, (score, frame_index))
+                    elif score > candidates[0][0]:
+                        heapq.heapreplace(candidates, (score, frame_index))
+                else:
+                    previous_height = None
+                
+                if progress_callback and total_frames:
+                    progress_callback(min(frame_index / total_frames, 1.0) * 90)
+                
+                # Limit processing to avoid very long videos
+                if frames_scanned > 500:
+                    break
+        finally:
+            screening_pose.close()
+        
+        if not candidates and last_sample is not None:
+            # No pose anywhere; measure one frame so the caller gets feedback
+            candidates.append((0.0, last_sample))
+        
+        # Fine pass over the best candidates
+        system = AccurateHeightMeasurementSystem(
+            model_complexity=FINE_MODEL_COMPLEXITY,
+            enable_segmentation=True,
+            static_image_mode=True  # Candidates are not consecutive frames
+        )
+        results = []
+        converged = False
+        
+        try:
+            for _, frame_index in sorted(candidates, key=lambda c: (-c[0], c[1])):
+                frame = _read_frame(cap, frame_index)
+                if frame is None:
+                    continue
                 result = system.process_frame(frame, reference_height)
                 results.append(result)
                 
-                if progress_callback:
-                    progress = (frame_count / total_frames) * 100
-                    progress_callback(progress)
-            
-            frame_count += 1
-            
-            # Limit processing to avoid very long videos
-            if len(results) > 100:
-                break
-    
+                if len(results) >= min_measurements:
+                    margin = system.multi_frame.get_stable_height_margin()
+                    if margin is not None and margin <= convergence_tolerance_cm:
+                        converged = True
+                        break
+        finally:
+            system.close()
     finally:
         cap.release()
-        system.close()
+    
+    if progress_callback:
+        progress_callback(100.0)
     
     # Find best result
     if not results:
@@ -592,7 +721,9 @@ def process_video_for_height(
         'confidence': best_result.confidence,
         'calibration_status': best_result.calibration_status,
         'recommendations': best_result.recommendations,
-        'total_frames_processed': len(results)
+        'total_frames_processed': len(results),
+        'frames_screened': frames_scanned,
+        'converged': converged
     }
 
 
@@ -8,6 +8,8 @@ from enum import Enum
 from collections import deque
 import time
 
+from utils.kinematics import vector_angle
+
 @dataclass
 class SafetyAlert:
     """Safety alert for dangerous form"""
@@ -369,10 +371,7 @@ class RealtimeSafetyMonitor:
             ])
             
             # Calculate angle
-            cos_angle = np.dot(upper_vector, lower_vector) / (
-                np.linalg.norm(upper_vector) * np.linalg.norm(lower_vector)
-            )
-            flexion_angle = np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
+            flexion_angle = vector_angle(upper_vector, lower_vector)
             
             # Return deviation from straight line (180 degrees)
             return abs(180 - flexion_angle)
@@ -445,11 +444,7 @@ class RealtimeSafetyMonitor:
             ])
             
             # Calculate angle from vertical (neutral neck)
-            vertical = np.array([0, 1, 0])
-            cos_angle = np.dot(neck_vector, vertical) / np.linalg.norm(neck_vector)
-            angle = np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
-            
-            return angle
+            return vector_angle(neck_vector, (0.0, 1.0, 0.0))
         
         return None
     
@@ -475,10 +470,7 @@ class RealtimeSafetyMonitor:
             ])
             
             # Calculate angle
-            cos_angle = np.dot(forearm, hand) / (
-                np.linalg.norm(forearm) * np.linalg.norm(hand)
-            )
-            deviation = np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
+            deviation = vector_angle(forearm, hand)
             
             # Return deviation from straight (180 degrees)
             return abs(180 - deviation)
@@ -507,12 +499,7 @@ class RealtimeSafetyMonitor:
             ])
             
             # Calculate angle
-            cos_angle = np.dot(upper_arm, torso) / (
-                np.linalg.norm(upper_arm) * np.linalg.norm(torso)
-            )
-            angle = np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
-            
-            return angle
+            return vector_angle(upper_arm, torso)
         
         return None
     
@@ -2,9 +2,21 @@
 Scientific Calculation Engine for TENAX FIT v3.0
 Implements medically-validated formulas for fitness calculations
 """
-from typing import Literal, Dict, Tuple
+from functools import lru_cache
+from typing import Literal, Dict, Sequence, Tuple
 import math
 
+import numpy as np
+
+# Inputs are quantized before memoization so that float noise from clients
+# (e.g. 70.00000001 kg) maps onto the same cache entry
+WEIGHT_STEP_KG = 0.1
+HEIGHT_STEP_CM = 0.1
+PROFILE_CACHE_SIZE = 65536
+
+# Most profiles accepted by one batch request (shared by the Flask and FastAPI endpoints)
+MAX_BATCH_PROFILES = 10000
+
 
 class ScientificCalculationEngine:
     """
@@ -292,4 +304,160 @@ class ScientificCalculationEngine:
             result["category"] = "高め"
             result["recommendations"].append("健康リスク低減のため、体脂肪率の改善を検討してください。")
             
-        return result
\ No newline at end of file
+        return result
+    
+    @staticmethod
+    def calculate_profile(weight: float, height: float, age: int,
+                          gender: Literal["male", "female"],
+                          activity_level: str, goal: str) -> Dict[str, any]:
+        """
+        Calculate the full metric chain (BMI, body fat, BMR, TDEE, target
+        calories, macros, calorie safety) for one user profile.
+        
+        Weight and height are quantized to 0.1 kg / 0.1 cm and the result is
+        memoized, so repeated profiles are served from an LRU cache.
+        
+        Returns:
+            Dictionary with the derived metrics (a fresh copy per call)
+        """
+        key = (
+            _quantize(weight, WEIGHT_STEP_KG),
+            _quantize(height, HEIGHT_STEP_CM),
+            int(age), gender, activity_level, goal
+        )
+        return _unpack_profile(_profile_core(*key))
+    
+    @staticmethod
+    def calculate_profiles_batch(weights: Sequence[float], heights: Sequence[float],
+                                 ages: Sequence[int], genders: Sequence[str],
+                                 activity_levels: Sequence[str],
+                                 goals: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Vectorized version of calculate_profile for many profiles at once.
+        
+        Every formula is evaluated as a NumPy array expression, so recomputing
+        a whole user base costs a handful of array operations instead of one
+        Python call chain per user. Rounding follows round() exactly (see
+        _round_half_even), so results equal calculate_profile.
+        
+        Returns:
+            Dictionary of arrays (one element per profile); "severity" holds strings
+        """
+        weight = _quantize(np.asarray(weights, dtype=float), WEIGHT_STEP_KG)
+        height = _quantize(np.asarray(heights, dtype=float), HEIGHT_STEP_CM)
+        age = np.asarray(ages, dtype=float)
+        genders = np.asarray(genders)
+        activity_levels = np.asarray(activity_levels)
+        goals = np.asarray(goals)
+        
+        n = weight.shape[0]
+        if any(a.shape != (n,) for a in (height, age, genders, activity_levels, goals)):
+            raise ValueError("All profile arrays must be one-dimensional and of equal length")
+        if n and (np.any(weight <= 0) or np.any(height <= 0) or np.any(age <= 0)):
+            raise ValueError("Weight, height, and age must be positive values")
+        
+        is_male = genders == "male"
+        if not np.all(is_male | (genders == "female")):
+            raise ValueError("Gender must be 'male' or 'female'")
+        
+        engine = ScientificCalculationEngine
+        coefficient = _lookup(engine.ACTIVITY_COEFFICIENTS, activity_levels, "activity level")
+        adjustment = _lookup(engine.GOAL_ADJUSTMENTS, goals, "goal")
+        protein_ratio = _lookup({g: r["protein"] for g, r in engine.PFC_RATIOS.items()}, goals, "goal")
+        fat_ratio = _lookup({g: r["fat"] for g, r in engine.PFC_RATIOS.items()}, goals, "goal")
+        carbs_ratio = _lookup({g: r["carbs"] for g, r in engine.PFC_RATIOS.items()}, goals, "goal")
+        
+        # Same rounding chain as the scalar methods: each step uses the rounded previous value
+        bmi = weight / (height / 100) ** 2
+        body_fat = 1.2 * bmi + 0.23 * age - 10.8 * is_male - 5.4
+        body_fat = _round_half_even(np.maximum(body_fat, np.where(is_male, 3, 10)))
+        bmr = _round_half_even(10 * weight + 6.25 * height - 5 * age + np.where(is_male, 5, -161))
+        tdee = _round_half_even(bmr * coefficient)
+        target = _round_half_even(tdee * adjustment)
+        percentage_of_bmr = target / bmr * 100
+        
+        return {
+            "bmi": _round_half_even(bmi),
+            "body_fat_percentage": body_fat,
+            "bmr": bmr,
+            "tdee": tdee,
+            "target_calories": target,
+            "protein_g": _round_half_even(target * protein_ratio / 4),
+            "fat_g": _round_half_even(target * fat_ratio / 9),
+            "carbs_g": _round_half_even(target * carbs_ratio / 4),
+            "percentage_of_bmr": _round_half_even(percentage_of_bmr),
+            "severity": np.select(
+                [percentage_of_bmr < 50, percentage_of_bmr < 70,
+                 (percentage_of_bmr < 80) | (percentage_of_bmr > 300)],
+                ["critical", "high", "medium"],
+                default="low"
+            ),
+        }
+
+
+def _quantize(value, step: float):
+    """Snap a measurement (scalar or array) onto the cache grid."""
+    if isinstance(value, np.ndarray):
+        return np.round(np.round(value / step) * step, 6)
+    return round(round(value / step) * step, 6)
+
+
+def _round_half_even(values: np.ndarray, decimals: int = 1) -> np.ndarray:
+    """
+    Round an array exactly like round(value, decimals).
+
+    np.round scales by 10**decimals first, which can turn a value just
+    below a tie (e.g. 1.15 == 1.149999...) into an exact tie and round it
+    the other way. Those few near-tie elements are rounded with round().
+    """
+    scaled = values * 10 ** decimals
+    result = np.round(scaled) / 10 ** decimals
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        result[near_tie] = [round(value, decimals) for value in values[near_tie].tolist()]
+    return result
+
+
+def _lookup(table: Dict[str, float], keys: np.ndarray, name: str) -> np.ndarray:
+    """Map an array of category names onto their coefficients."""
+    unknown = set(np.unique(keys)) - table.keys()
+    if unknown:
+        raise ValueError(f"Invalid {name}: {sorted(unknown)}. Must be one of: {list(table.keys())}")
+    names = sorted(table)
+    values = np.array([table[k] for k in names])
+    return values[np.searchsorted(names, keys)]
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _profile_core(weight: float, height: float, age: int, gender: str,
+                  activity_level: str, goal: str) -> Tuple:
+    """Pure, memoized metric chain; returns immutable data so cached values cannot be mutated."""
+    engine = ScientificCalculationEngine
+    bmr = engine.calculate_bmr(weight, height, age, gender)
+    tdee = engine.calculate_tdee(bmr, activity_level)
+    target = engine.calculate_target_calories(tdee, goal)
+    safety = engine.check_calorie_safety(bmr, target)
+    macros = engine.calculate_pfc_balance(target, goal)
+    return (
+        ("bmi", round(weight / (height / 100) ** 2, 1)),
+        ("body_fat_percentage", engine.estimate_body_fat(weight, height, age, gender)),
+        ("bmr", bmr),
+        ("tdee", tdee),
+        ("target_calories", target),
+        ("macros", tuple((macro, tuple(values.items())) for macro, values in macros.items())),
+        ("calorie_safety", (
+            ("is_safe", safety["is_safe"]),
+            ("percentage_of_bmr", safety["percentage_of_bmr"]),
+            ("warnings", tuple(safety["warnings"])),
+            ("severity", safety["severity"]),
+        )),
+    )
+
+
+def _unpack_profile(core: Tuple) -> Dict[str, any]:
+    result = dict(core)
+    result["macros"] = {macro: dict(values) for macro, values in result["macros"]}
+    safety = dict(result["calorie_safety"])
+    safety["warnings"] = list(safety["warnings"])
+    result["calorie_safety"] = safety
+    return result
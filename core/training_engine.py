@@ -92,7 +92,12 @@ class TrainingEngine:
         }
     
     def generate_workout_plan(self, experience, goal, available_days, equipment="full_gym"):
-        """個別化トレーニングプラン生成"""
+        """個別化トレーニングプラン生成（事前生成テンプレートのコピーを返す）"""
+        from .workout_plan_templates import get_workout_plan_templates
+        return get_workout_plan_templates().plan(experience, goal, available_days, equipment)
+    
+    def build_workout_plan(self, experience, goal, available_days, equipment="full_gym"):
+        """トレーニングプランの生成（テンプレートを使わず毎回組み立てる）"""
         level_config = self.experience_levels[experience]
         
         # 週間頻度の決定
@@ -137,8 +142,9 @@ class TrainingEngine:
             "full_body": self._create_full_body_program,
             "upper_lower": self._create_upper_lower_split,
             "push_pull_legs": self._create_ppl_split,
-            "push_pull_legs_upper": self._create_ppl_upper_split,
-            "body_part": self._create_body_part_split
+            # 上級者向けのPPL+上半身・部位別スプリットは未実装のためPPLで代替
+            "push_pull_legs_upper": self._create_ppl_split,
+            "body_part": self._create_ppl_split
         }
         
         program_func = programs.get(split_type, self._create_full_body_program)
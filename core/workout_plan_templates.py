@@ -0,0 +1,195 @@
+# core/workout_plan_templates.py
+"""
+トレーニングプランのテンプレート
+(経験, 目標, 利用可能日数, 器具) の全組み合わせについてプランを事前生成し、
+リクエスト時は参照と利用者ごとの値（体重に基づく消費カロリー）の付加のみを行う
+
+テンプレートの再生成:
+    python -m core.workout_plan_templates [--output PATH] [--check]
+"""
+
+import argparse
+import copy
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from . import training_engine
+from .training_engine import TrainingEngine
+
+logger = logging.getLogger(__name__)
+
+# テンプレートを生成する器具の種類と日数の上限（範囲外は都度生成）
+TEMPLATE_EQUIPMENT = ("full_gym", "bodyweight")
+MAX_AVAILABLE_DAYS = 7
+
+DEFAULT_TEMPLATE_PATH = Path(
+    os.getenv('WORKOUT_TEMPLATE_PATH', Path(__file__).with_name('workout_plan_templates.json'))
+)
+
+# 目標ごとの筋トレ強度（METsキー strength_<強度>）
+GOAL_INTENSITY = {
+    "strength": "intense",
+    "hypertrophy": "moderate",
+    "endurance": "circuit"
+}
+
+
+def template_key(experience, goal, available_days, equipment="full_gym"):
+    """テンプレートのキー"""
+    return f"{experience}|{goal}|{available_days}|{equipment}"
+
+
+def engine_fingerprint():
+    """プラン生成ロジックのハッシュ（保存済みテンプレートの鮮度確認用）"""
+    source = inspect.getsource(training_engine)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+
+
+def compile_templates(engine=None):
+    """全パラメータの組み合わせについてプランを生成"""
+    engine = engine or TrainingEngine()
+    templates = {}
+    for experience in engine.experience_levels:
+        for goal in engine.training_parameters:
+            for available_days in range(1, MAX_AVAILABLE_DAYS + 1):
+                for equipment in TEMPLATE_EQUIPMENT:
+                    key = template_key(experience, goal, available_days, equipment)
+                    templates[key] = engine.build_workout_plan(
+                        experience, goal, available_days, equipment
+                    )
+    return templates
+
+
+def save_templates(templates, path=DEFAULT_TEMPLATE_PATH):
+    """テンプレートをJSONファイルに保存"""
+    payload = {
+        "fingerprint": engine_fingerprint(),
+        "generated_at": datetime.now().isoformat(),
+        "templates": templates
+    }
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_templates(path=DEFAULT_TEMPLATE_PATH, engine=None):
+    """保存済みテンプレートの読み込み
+
+    ファイルがない、または生成ロジックが変わっている場合はその場で生成する
+    """
+    path = Path(path)
+    if path.exists():
+        try:
+            with open(path, encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get("fingerprint") == engine_fingerprint():
+                return payload["templates"]
+            logger.warning(f"Workout plan templates at {path} are stale; recompiling")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load workout plan templates from {path}: {e}")
+    return compile_templates(engine)
+
+
+class WorkoutPlanTemplates:
+    """事前生成したプランの参照と利用者ごとの調整"""
+
+    def __init__(self, templates, engine=None):
+        self.templates = templates
+        self.engine = engine or TrainingEngine()
+
+    def get(self, experience, goal, available_days, equipment="full_gym"):
+        """テンプレートの参照（範囲外の組み合わせはNone）
+
+        返り値は全利用者で共有されるため変更しないこと
+        """
+        return self.templates.get(template_key(experience, goal, available_days, equipment))
+
+    def plan(self, experience, goal, available_days, equipment="full_gym"):
+        """プランの取得（テンプレートがなければ都度生成）
+
+        テンプレートの深いコピーを返すため、呼び出し側で自由に変更してよい
+        """
+        template = self.get(experience, goal, available_days, equipment)
+        if template is None:
+            return self.engine.build_workout_plan(experience, goal, available_days, equipment)
+        return copy.deepcopy(template)
+
+    def personalize(self, experience, goal, available_days, equipment="full_gym",
+                    weight_kg=None, session_minutes=None):
+        """利用者の体重に基づく消費カロリー見積もりを付加したプラン"""
+        plan = self.plan(experience, goal, available_days, equipment)
+        if weight_kg is None:
+            return plan
+
+        if session_minutes is None:
+            # 経験レベルの標準時間（"45-60" 等）の中央値
+            low, high = self.engine.experience_levels[experience]["duration"].split('-')
+            session_minutes = (float(low) + float(high)) / 2
+
+        frequency_days = int(plan["frequency"].split('日')[0])
+        session_calories = self.engine.calculate_exercise_calories(
+            "strength", GOAL_INTENSITY.get(goal, "moderate"), weight_kg, session_minutes
+        )
+        plan["calorie_estimates"] = {
+            "weight_kg": weight_kg,
+            "session_minutes": session_minutes,
+            "per_session": session_calories,
+            "weekly_total": session_calories["total_calories"] * frequency_days
+        }
+        return plan
+
+
+_templates = None
+_templates_lock = threading.Lock()
+
+
+def get_workout_plan_templates():
+    """プロセス共通のテンプレート（初回呼び出し時に読み込み）"""
+    global _templates
+    if _templates is not None:
+        return _templates
+    with _templates_lock:
+        if _templates is None:
+            engine = TrainingEngine()
+            _templates = WorkoutPlanTemplates(load_templates(engine=engine), engine)
+        return _templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='トレーニングプランのテンプレート生成')
+    parser.add_argument('--output', type=str, default=str(DEFAULT_TEMPLATE_PATH),
+                        help=f'出力先 (デフォルト: {DEFAULT_TEMPLATE_PATH})')
+    parser.add_argument('--check', action='store_true',
+                        help='書き込まずに、保存済みテンプレートが最新か確認する')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.check:
+        path = Path(args.output)
+        if not path.exists():
+            print(f"{path} がありません")
+            raise SystemExit(1)
+        with open(path, encoding='utf-8') as f:
+            fingerprint = json.load(f).get("fingerprint")
+        if fingerprint != engine_fingerprint():
+            print(f"{path} は古くなっています。再生成してください")
+            raise SystemExit(1)
+        print(f"{path} は最新です")
+        return
+
+    templates = compile_templates()
+    save_templates(templates, args.output)
+    print(f"{len(templates)}件のテンプレートを {args.output} に保存しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -311,7 +311,8 @@ class DatabaseInitializer:
                 session_id VARCHAR(255) UNIQUE NOT NULL,
                 user_id VARCHAR(255) NOT NULL,
                 exercise VARCHAR(100) NOT NULL,
-                pose_data JSONB NOT NULL,
+                pose_data JSONB,
+                pose_blob BYTEA,
                 metadata JSONB,
                 performance JSONB,
                 quality_score FLOAT,
@@ -15,12 +15,89 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from ml.models.exercise_classifier import ExerciseClassifier
+from ml.models.registry import model_registry
 from ml.data.preprocessor import PoseDataPreprocessor
+from utils.kinematics import LANDMARK_INDEX, LANDMARK_NAMES
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _x(coords: np.ndarray, name: str) -> np.ndarray:
+    """(frames, 33, 4) 配列から指定ランドマークのx座標列を取得"""
+    return coords[:, LANDMARK_INDEX[name], 0]
+
+
+def _y(coords: np.ndarray, name: str) -> np.ndarray:
+    """(frames, 33, 4) 配列から指定ランドマークのy座標列を取得"""
+    return coords[:, LANDMARK_INDEX[name], 1]
+
+# 種目別のフォーム評価ルール
+# landmarks が全て存在するフレームで check が真のとき penalty を減点し feedback を返す
+FORM_RULES = {
+    'squat': [
+        {'landmarks': ['LEFT_KNEE', 'LEFT_ANKLE'],
+         'check': lambda c: np.abs(_x(c, 'LEFT_KNEE') - _x(c, 'LEFT_ANKLE')) > 0.1,  # 閾値は調整が必要
+         'penalty': 15,
+         'feedback': "膝がつま先の方向と一致していません",
+         'correction': "膝をつま先と同じ方向に向けてください"},
+        {'landmarks': ['NOSE', 'LEFT_SHOULDER', 'LEFT_HIP'],
+         'check': lambda c: np.abs(_y(c, 'LEFT_SHOULDER') - _y(c, 'LEFT_HIP')) < 0.1,  # 体が水平すぎる
+         'penalty': 10,
+         'feedback': "上体が前傾しすぎています",
+         'correction': "胸を張って背筋を伸ばしてください"},
+        {'landmarks': ['LEFT_HIP', 'LEFT_KNEE'],
+         'check': lambda c: _y(c, 'LEFT_HIP') < _y(c, 'LEFT_KNEE'),  # 十分な深さ
+         'feedback': "良い深さまでしゃがめています"},
+        {'landmarks': ['LEFT_HIP', 'LEFT_KNEE'],
+         'check': lambda c: ~(_y(c, 'LEFT_HIP') < _y(c, 'LEFT_KNEE')),
+         'penalty': 20,
+         'feedback': "もう少し深くしゃがんでください",
+         'correction': "太ももが地面と平行になるまでしゃがんでください"},
+    ],
+    'push_up': [
+        {'landmarks': ['NOSE', 'LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_ANKLE'],
+         'check': lambda c: np.abs(
+             (_y(c, 'LEFT_SHOULDER') + _y(c, 'LEFT_HIP')) / 2 - (_y(c, 'NOSE') + _y(c, 'LEFT_ANKLE')) / 2
+         ) > 0.05,  # 閾値は調整が必要
+         'penalty': 15,
+         'feedback': "体のラインが真っ直ぐではありません",
+         'correction': "頭からかかとまで一直線を保ってください"},
+        {'landmarks': ['LEFT_WRIST', 'LEFT_SHOULDER'],
+         'check': lambda c: np.abs(_x(c, 'LEFT_WRIST') - _x(c, 'LEFT_SHOULDER')) > 0.15,  # 手が肩幅より大きく外れている
+         'penalty': 10,
+         'feedback': "手の位置を調整してください",
+         'correction': "手は肩幅程度に開いて配置してください"},
+    ],
+    'deadlift': [
+        {'landmarks': ['NOSE', 'LEFT_SHOULDER', 'LEFT_HIP'],
+         'check': lambda c: np.ones(len(c), dtype=bool),
+         'feedback': "背中の姿勢を確認中"},
+        {'landmarks': ['LEFT_KNEE', 'LEFT_ANKLE'],
+         'check': lambda c: np.ones(len(c), dtype=bool),
+         'feedback': "膝とつま先の位置関係を確認中"},
+    ],
+    'plank': [
+        {'landmarks': ['NOSE', 'LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_ANKLE'],
+         'check': lambda c: np.ones(len(c), dtype=bool),
+         'feedback': "体の一直線ラインを確認中"},
+        {'landmarks': ['LEFT_HIP', 'LEFT_SHOULDER'],
+         'check': lambda c: _y(c, 'LEFT_HIP') > _y(c, 'LEFT_SHOULDER') + 0.1,  # 腰が上がりすぎ
+         'penalty': 20,
+         'feedback': "腰が上がりすぎています",
+         'correction': "腰を下げて体を一直線に保ってください"},
+        {'landmarks': ['LEFT_HIP', 'LEFT_SHOULDER'],
+         'check': lambda c: _y(c, 'LEFT_HIP') < _y(c, 'LEFT_SHOULDER') - 0.1,  # 腰が下がりすぎ
+         'penalty': 20,
+         'feedback': "腰が下がりすぎています",
+         'correction': "腰を上げて体を一直線に保ってください"},
+        {'landmarks': ['LEFT_HIP', 'LEFT_SHOULDER'],
+         'check': lambda c: np.abs(_y(c, 'LEFT_HIP') - _y(c, 'LEFT_SHOULDER')) <= 0.1,
+         'feedback': "良い姿勢を保てています"},
+    ],
+}
+
+
 class MLInferenceEngine:
     """機械学習推論エンジン"""
     
@@ -58,214 +135,112 @@ class MLInferenceEngine:
             return self._error_response("MLエンジンが初期化されていません")
         
         try:
-            # 特徴量抽出
-            features = self.preprocessor.extract_pose_features(landmarks_data)
-            
-            if len(features) == 0:
+            # 1フレームのバッチとして同じ経路で処理
+            coords, present = self._landmarks_to_array([landmarks_data])
+            if not present.any():
                 return self._error_response("特徴量の抽出に失敗しました")
             
-            # 予測実行
-            features_array = features.reshape(1, -1)  # バッチ次元を追加
-            predictions, confidences = self.classifier.predict(features_array)
+            features = self.classifier.extract_features_batch(coords)
+            predictions, confidences = self.classifier.predict(features)
+            exercise_type = predictions[0] if predictions else 'unknown'
+            confidence = float(confidences[0]) if len(confidences) else 0.0
+            
+            scores, checks = self._evaluate_form_batch(np.array([exercise_type]), coords, present)
+            analysis = {'form_score': int(scores[0]), 'feedback': [], 'corrections': []}
+            for rule, mask in checks:
+                if mask[0]:
+                    analysis['feedback'].append(rule['feedback'])
+                    if rule.get('correction'):
+                        analysis['corrections'].append(rule['correction'])
             
-            # 結果をフォーマット
-            result = {
+            return {
                 'success': True,
-                'exercise_type': predictions[0] if predictions else 'unknown',
-                'confidence': float(confidences[0]) if confidences else 0.0,
+                'exercise_type': exercise_type,
+                'confidence': confidence,
                 'timestamp': datetime.now().isoformat(),
-                'feature_count': len(features),
-                'analysis': self._generate_form_analysis(landmarks_data, predictions[0] if predictions else 'unknown')
+                'feature_count': features.shape[1],
+                'analysis': analysis,
+                'quality': self._quality_labels(np.array([confidence]))[0]
             }
             
-            # 信頼度に基づく品質評価
-            if result['confidence'] > 0.8:
-                result['quality'] = 'excellent'
-            elif result['confidence'] > 0.6:
-                result['quality'] = 'good'
-            elif result['confidence'] > 0.4:
-                result['quality'] = 'fair'
-            else:
-                result['quality'] = 'poor'
-            
-            return result
-            
         except Exception as e:
             logger.error(f"ポーズ分析エラー: {e}")
             return self._error_response(f"分析中にエラーが発生: {str(e)}")
     
-    def _generate_form_analysis(self, landmarks_data: Dict, exercise_type: str) -> Dict:
-        """フォーム分析を生成"""
-        analysis = {
-            'form_score': 0,
-            'feedback': [],
-            'corrections': []
-        }
-        
-        try:
-            if exercise_type == 'squat':
-                analysis = self._analyze_squat_form(landmarks_data)
-            elif exercise_type == 'push_up':
-                analysis = self._analyze_pushup_form(landmarks_data)
-            elif exercise_type == 'deadlift':
-                analysis = self._analyze_deadlift_form(landmarks_data)
-            elif exercise_type == 'plank':
-                analysis = self._analyze_plank_form(landmarks_data)
-            else:
-                analysis['form_score'] = 70  # デフォルトスコア
-                analysis['feedback'].append("一般的なフォームチェックを実行中")
-                
-        except Exception as e:
-            logger.warning(f"フォーム分析エラー: {e}")
-            analysis['form_score'] = 50
-            analysis['feedback'].append("フォーム分析で問題が発生しました")
+    def _landmarks_to_array(self, frames: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        名前付きランドマークの辞書列を配列に変換
         
-        return analysis
-    
-    def _analyze_squat_form(self, landmarks: Dict) -> Dict:
-        """スクワットフォーム分析"""
-        analysis = {'form_score': 0, 'feedback': [], 'corrections': []}
-        score = 100
+        Returns:
+            (frames, 33, 4) の座標配列 [x, y, z, visibility] と (frames, 33) の存在マスク
+        """
+        coords = np.zeros((len(frames), len(LANDMARK_NAMES), 4))
+        coords[:, :, 3] = 1.0
+        present = np.zeros((len(frames), len(LANDMARK_NAMES)), dtype=bool)
         
-        try:
-            # 膝とつま先の方向チェック
-            if 'LEFT_KNEE' in landmarks and 'LEFT_ANKLE' in landmarks:
-                knee_x = landmarks['LEFT_KNEE'].get('x', 0)
-                ankle_x = landmarks['LEFT_ANKLE'].get('x', 0)
-                
-                if abs(knee_x - ankle_x) > 0.1:  # 閾値は調整が必要
-                    score -= 15
-                    analysis['feedback'].append("膝がつま先の方向と一致していません")
-                    analysis['corrections'].append("膝をつま先と同じ方向に向けてください")
-            
-            # 背中の角度チェック
-            if all(key in landmarks for key in ['NOSE', 'LEFT_SHOULDER', 'LEFT_HIP']):
-                # 簡単な姿勢チェック
-                shoulder_y = landmarks['LEFT_SHOULDER'].get('y', 0)
-                hip_y = landmarks['LEFT_HIP'].get('y', 0)
-                
-                if abs(shoulder_y - hip_y) < 0.1:  # 体が水平すぎる
-                    score -= 10
-                    analysis['feedback'].append("上体が前傾しすぎています")
-                    analysis['corrections'].append("胸を張って背筋を伸ばしてください")
-            
-            # スクワットの深さチェック
-            if 'LEFT_HIP' in landmarks and 'LEFT_KNEE' in landmarks:
-                hip_y = landmarks['LEFT_HIP'].get('y', 0)
-                knee_y = landmarks['LEFT_KNEE'].get('y', 0)
-                
-                if hip_y < knee_y:  # 十分な深さ
-                    analysis['feedback'].append("良い深さまでしゃがめています")
-                else:
-                    score -= 20
-                    analysis['feedback'].append("もう少し深くしゃがんでください")
-                    analysis['corrections'].append("太ももが地面と平行になるまでしゃがんでください")
-            
-        except Exception as e:
-            logger.warning(f"スクワット分析エラー: {e}")
-            score = 50
+        for i, landmarks in enumerate(frames):
+            for name, point in landmarks.items():
+                index = LANDMARK_INDEX.get(name)
+                if index is None or not isinstance(point, dict):
+                    continue
+                coords[i, index] = (
+                    point.get('x', 0.0), point.get('y', 0.0),
+                    point.get('z', 0.0), point.get('visibility', 1.0)
+                )
+                present[i, index] = True
         
-        analysis['form_score'] = max(0, score)
-        return analysis
+        return coords, present
     
-    def _analyze_pushup_form(self, landmarks: Dict) -> Dict:
-        """プッシュアップフォーム分析"""
-        analysis = {'form_score': 0, 'feedback': [], 'corrections': []}
-        score = 100
+    def _evaluate_form_batch(self, exercise_types: np.ndarray, coords: np.ndarray,
+                             present: np.ndarray) -> Tuple[np.ndarray, List[Tuple[Dict, np.ndarray]]]:
+        """
+        全フレームのフォーム評価を配列演算で実行
         
-        try:
-            # 体のライン（プランクポジション）チェック
-            if all(key in landmarks for key in ['NOSE', 'LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_ANKLE']):
-                # 各部位のY座標を取得
-                nose_y = landmarks['NOSE'].get('y', 0)
-                shoulder_y = landmarks['LEFT_SHOULDER'].get('y', 0)
-                hip_y = landmarks['LEFT_HIP'].get('y', 0)
-                ankle_y = landmarks['LEFT_ANKLE'].get('y', 0)
-                
-                # 体のラインの直線性をチェック
-                body_alignment = abs((shoulder_y + hip_y) / 2 - (nose_y + ankle_y) / 2)
-                
-                if body_alignment > 0.05:  # 閾値は調整が必要
-                    score -= 15
-                    analysis['feedback'].append("体のラインが真っ直ぐではありません")
-                    analysis['corrections'].append("頭からかかとまで一直線を保ってください")
-            
-            # 腕の位置チェック
-            if 'LEFT_WRIST' in landmarks and 'LEFT_SHOULDER' in landmarks:
-                wrist_x = landmarks['LEFT_WRIST'].get('x', 0)
-                shoulder_x = landmarks['LEFT_SHOULDER'].get('x', 0)
-                
-                if abs(wrist_x - shoulder_x) > 0.15:  # 手が肩幅より大きく外れている
-                    score -= 10
-                    analysis['feedback'].append("手の位置を調整してください")
-                    analysis['corrections'].append("手は肩幅程度に開いて配置してください")
+        Args:
+            exercise_types: フレームごとの予測種目
+            coords: (frames, 33, 4) の座標配列
+            present: (frames, 33) の存在マスク
             
-        except Exception as e:
-            logger.warning(f"プッシュアップ分析エラー: {e}")
-            score = 50
-        
-        analysis['form_score'] = max(0, score)
-        return analysis
-    
-    def _analyze_deadlift_form(self, landmarks: Dict) -> Dict:
-        """デッドリフトフォーム分析"""
-        analysis = {'form_score': 0, 'feedback': [], 'corrections': []}
-        score = 100
+        Returns:
+            フォームスコア配列と、各ルールとその該当フレームマスクのリスト
+        """
+        scores = np.full(len(exercise_types), 70, dtype=np.int64)
+        checks = []
         
-        try:
-            # 背中の丸まりチェック
-            if all(key in landmarks for key in ['NOSE', 'LEFT_SHOULDER', 'LEFT_HIP']):
-                # 簡単な背中の角度チェック
-                analysis['feedback'].append("背中の姿勢を確認中")
+        for exercise, rules in FORM_RULES.items():
+            target = exercise_types == exercise
+            if not target.any():
+                continue
             
-            # 膝とつま先の位置関係
-            if 'LEFT_KNEE' in landmarks and 'LEFT_ANKLE' in landmarks:
-                analysis['feedback'].append("膝とつま先の位置関係を確認中")
-            
-        except Exception as e:
-            logger.warning(f"デッドリフト分析エラー: {e}")
-            score = 50
+            scores[target] = 100
+            for rule in rules:
+                indices = [LANDMARK_INDEX[name] for name in rule['landmarks']]
+                mask = target & present[:, indices].all(axis=1) & rule['check'](coords)
+                scores -= np.where(mask, rule.get('penalty', 0), 0)
+                checks.append((rule, mask))
         
-        analysis['form_score'] = max(0, score)
-        return analysis
-    
-    def _analyze_plank_form(self, landmarks: Dict) -> Dict:
-        """プランクフォーム分析"""
-        analysis = {'form_score': 0, 'feedback': [], 'corrections': []}
-        score = 100
+        others = ~np.isin(exercise_types, list(FORM_RULES))
+        if others.any():
+            checks.append(({'feedback': "一般的なフォームチェックを実行中"}, others))
         
-        try:
-            # 体のライン（一直線）チェック
-            if all(key in landmarks for key in ['NOSE', 'LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_ANKLE']):
-                analysis['feedback'].append("体の一直線ラインを確認中")
-            
-            # 腰の位置チェック
-            if 'LEFT_HIP' in landmarks and 'LEFT_SHOULDER' in landmarks:
-                hip_y = landmarks['LEFT_HIP'].get('y', 0)
-                shoulder_y = landmarks['LEFT_SHOULDER'].get('y', 0)
-                
-                if hip_y > shoulder_y + 0.1:  # 腰が上がりすぎ
-                    score -= 20
-                    analysis['feedback'].append("腰が上がりすぎています")
-                    analysis['corrections'].append("腰を下げて体を一直線に保ってください")
-                elif hip_y < shoulder_y - 0.1:  # 腰が下がりすぎ
-                    score -= 20
-                    analysis['feedback'].append("腰が下がりすぎています")
-                    analysis['corrections'].append("腰を上げて体を一直線に保ってください")
-                else:
-                    analysis['feedback'].append("良い姿勢を保てています")
-            
-        except Exception as e:
-            logger.warning(f"プランク分析エラー: {e}")
-            score = 50
-        
-        analysis['form_score'] = max(0, score)
-        return analysis
+        return np.maximum(scores, 0), checks
+    
+    @staticmethod
+    def _quality_labels(confidences: np.ndarray) -> List[str]:
+        """信頼度に基づく品質評価"""
+        return np.select(
+            [confidences > 0.8, confidences > 0.6, confidences > 0.4],
+            ['excellent', 'good', 'fair'],
+            default='poor'
+        ).tolist()
     
     def batch_analyze(self, session_data: List[Dict]) -> Dict:
         """
         セッション全体のバッチ分析
         
+        全フレームの特徴量を1つの行列にまとめ、モデル呼び出しは1回で行う。
+        フレーム別の結果は列指向（キーごとのリスト）で返す。
+        
         Args:
             session_data: フレームデータのリスト
             
@@ -275,37 +250,53 @@ class MLInferenceEngine:
         if not session_data:
             return self._error_response("分析するデータがありません")
         
-        results = []
-        exercise_counts = {}
-        total_confidence = 0
-        
-        for frame_data in session_data:
-            if 'landmarks' in frame_data:
-                result = self.analyze_pose(frame_data['landmarks'])
-                results.append(result)
-                
-                if result['success']:
-                    exercise_type = result['exercise_type']
-                    exercise_counts[exercise_type] = exercise_counts.get(exercise_type, 0) + 1
-                    total_confidence += result['confidence']
-        
-        if not results:
+        frame_indices = [i for i, frame_data in enumerate(session_data) if 'landmarks' in frame_data]
+        if not frame_indices:
             return self._error_response("有効なフレームデータがありません")
         
+        try:
+            coords, present = self._landmarks_to_array(
+                [session_data[i]['landmarks'] for i in frame_indices]
+            )
+            features = self.classifier.extract_features_batch(coords)
+            predictions, confidences = self.classifier.predict(features)
+            exercise_types = np.array(predictions)
+            scores, checks = self._evaluate_form_batch(exercise_types, coords, present)
+        except Exception as e:
+            logger.error(f"バッチ分析エラー: {e}")
+            return self._error_response(f"分析中にエラーが発生: {str(e)}")
+        
         # セッション統計
-        avg_confidence = total_confidence / len(results) if results else 0
-        dominant_exercise = max(exercise_counts.items(), key=lambda x: x[1])[0] if exercise_counts else 'unknown'
+        labels, counts = np.unique(exercise_types, return_counts=True)
+        exercise_counts = {str(label): int(count) for label, count in zip(labels, counts)}
+        dominant_exercise = str(labels[np.argmax(counts)])
+        avg_confidence = float(np.mean(confidences))
+        
+        feedback_summary = {}
+        for rule, mask in checks:
+            frames_hit = int(np.count_nonzero(mask))
+            if frames_hit:
+                feedback_summary[rule['feedback']] = feedback_summary.get(rule['feedback'], 0) + frames_hit
         
         session_analysis = {
             'success': True,
             'session_summary': {
-                'total_frames': len(results),
+                'total_frames': len(frame_indices),
                 'dominant_exercise': dominant_exercise,
                 'average_confidence': avg_confidence,
+                'average_form_score': float(np.mean(scores)),
                 'exercise_distribution': exercise_counts,
+                'feedback_summary': feedback_summary,
                 'session_quality': 'excellent' if avg_confidence > 0.8 else 'good' if avg_confidence > 0.6 else 'fair'
             },
-            'frame_results': results,
+            'frame_results': {
+                'frame_index': frame_indices,
+                'exercise_type': exercise_types.tolist(),
+                'confidence': np.round(confidences, 4).tolist(),
+                'form_score': scores.tolist(),
+                'quality': self._quality_labels(confidences)
+            },
+            'feature_count': features.shape[1],
             'timestamp': datetime.now().isoformat()
         }
         
@@ -325,6 +316,8 @@ class MLInferenceEngine:
             'is_initialized': self.is_initialized,
             'model_type': 'machine_learning' if hasattr(self.classifier, 'model') and self.classifier.model else 'rule_based',
             'supported_exercises': self.classifier.exercise_labels,
+            'model_version': self.classifier.model_version,
+            'registry': model_registry.describe(),
             'timestamp': datetime.now().isoformat()
         }
         
@@ -0,0 +1,541 @@
+"""
+学習・前処理パイプラインのバックグラウンド実行
+
+モデル学習や前処理のような数分かかる処理を、Webワーカーとは別のプロセスプールで
+ジョブとして実行する。ジョブの状態・進捗・結果は ml/jobs/<job_id>/ 以下のファイルに
+保存するため、どのWebワーカーからでも状態を参照・キャンセルできる。
+同じパイプラインはロックファイルにより同時に1つしか実行しない。
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = os.environ.get('TRAINING_JOBS_DIR', 'ml/jobs')
+
+STATUS_FILE = 'status.json'
+RESULT_FILE = 'result.json'
+INPUT_FILE = 'input.json'
+CANCEL_FILE = 'cancel'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TERMINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(BaseException):
+    """
+    ジョブのキャンセル要求
+
+    パイプライン内の ``except Exception`` で握りつぶされないよう BaseException を継承する。
+    """
+
+
+class JobConflictError(RuntimeError):
+    """同じパイプラインのジョブが既に実行中"""
+
+    def __init__(self, pipeline: str, active_job_id: str):
+        super().__init__(f"パイプライン '{pipeline}' は実行中です (job_id={active_job_id})")
+        self.pipeline = pipeline
+        self.active_job_id = active_job_id
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """一時ファイル経由でアトミックに書き込む（読み手が途中状態を見ないように）"""
+    tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    """プロセスが生存しているか（同一ホスト上のみ判定可能）"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobContext:
+    """実行中のジョブからの進捗報告・キャンセル確認・成果物の保存"""
+
+    def __init__(self, job_dir: str):
+        self.job_dir = job_dir
+        self.status_path = os.path.join(job_dir, STATUS_FILE)
+
+    def update(self, **fields) -> Dict[str, Any]:
+        """状態ファイルを更新"""
+        with self._locked():
+            return self._write_status(_read_json(self.status_path) or {}, fields)
+
+    def update_if_active(self, **fields) -> Optional[Dict[str, Any]]:
+        """ジョブが終了していなければ状態ファイルを更新（終了状態は上書きしない）"""
+        with self._locked():
+            status = _read_json(self.status_path) or {}
+            if status.get('state') in TERMINAL_STATES:
+                return None
+            return self._write_status(status, fields)
+
+    @contextmanager
+    def _locked(self):
+        """
+        状態ファイルの読み込み～書き込みを排他
+
+        子プロセスの最終更新と、Webワーカーからのキャンセルが互いの更新を消さないようにする。
+        """
+        with open(f"{self.status_path}.lock", 'a', encoding='utf-8') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _write_status(self, status: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+        status.update(fields)
+        status['updated_at'] = datetime.now().isoformat()
+        _write_json(self.status_path, status)
+        return status
+
+    def progress(self, step: int, total: int, message: str = '') -> None:
+        """
+        進捗を報告（キャンセル要求があればここで JobCancelled を送出）
+
+        Args:
+            step: 完了したステップ数
+            total: 全ステップ数
+            message: 現在の処理内容
+        """
+        self.check_cancelled()
+        self.update(
+            progress=round(step / total, 4) if total else 0.0,
+            step=step,
+            total_steps=total,
+            message=message,
+        )
+
+    def check_cancelled(self) -> None:
+        """キャンセル要求を確認"""
+        if os.path.exists(os.path.join(self.job_dir, CANCEL_FILE)):
+            raise JobCancelled()
+
+    def artifact_path(self, filename: str) -> str:
+        """ジョブディレクトリ内の成果物パス"""
+        return os.path.join(self.job_dir, filename)
+
+
+# ===== パイプライン定義（子プロセスで実行される） =====
+
+def _run_ml_training(context: JobContext, days: int = 30) -> Dict[str, Any]:
+    """モデル学習パイプライン（学習済みモデルはモデルレジストリに公開される）"""
+    from ml.scripts.train_model import ModelTrainer
+    from ml.models.registry import model_registry
+
+    result = ModelTrainer().full_training_pipeline(days, progress=context.progress)
+    result['model_version'] = model_registry.current_version('exercise_classifier')
+    return result
+
+
+def _run_preprocessing(context: JobContext, exercise_filter: Optional[str] = None,
+                       limit: int = 500, augmentation_factor: int = 2) -> Dict[str, Any]:
+    """前処理パイプライン（読み込み→クリーニング→特徴量→正規化→拡張→保存）"""
+    from ml.scripts.preprocessing import TrainingDataPreprocessor
+
+    statistics = TrainingDataPreprocessor().run_pipeline(
+        exercise_filter=exercise_filter,
+        limit=limit,
+        augmentation_factor=augmentation_factor,
+        progress=context.progress,
+    )
+    return {'success': True, 'statistics': statistics}
+
+
+def _run_corpus_preprocessing(context: JobContext, exercise_filter: Optional[str] = None,
+                              augmentation_factor: int = 2, batch_size: int = 2000,
+                              workers: Optional[int] = None, seed: int = 0) -> Dict[str, Any]:
+    """コーパス全体の前処理（バッチ単位の配列処理をプロセスプールで並列実行）"""
+    from ml.scripts.preprocessing import TrainingDataPreprocessor
+
+    statistics = TrainingDataPreprocessor().run_corpus_pipeline(
+        exercise_filter=exercise_filter,
+        batch_size=batch_size,
+        augmentation_factor=augmentation_factor,
+        workers=workers,
+        seed=seed,
+        progress=context.progress,
+    )
+    return {'success': True, 'statistics': statistics}
+
+
+def _run_feature_engineering(context: JobContext, input_path: str, exercise: str = 'squat',
+                             metadata: Optional[Dict] = None) -> Dict[str, Any]:
+    """高度な特徴量エンジニアリング（入力のポーズデータは input.json、特徴量は features.json に保存）"""
+    from ml.scripts.feature_engineering import AdvancedFeatureEngineer
+
+    inputs = _read_json(input_path)
+    if not inputs or not inputs.get('pose_data'):
+        return {'success': False, 'error': f"入力ファイルを読み込めません: {input_path}"}
+    pose_data: List = inputs['pose_data']
+
+    engineer = AdvancedFeatureEngineer()
+
+    context.progress(0, 2, 'フォーム品質特徴量を抽出中')
+    form_features = engineer.extract_form_quality_features(pose_data, exercise, metadata or {})
+
+    # 時系列特徴量の抽出（複数フレームの場合）
+    context.progress(1, 2, '時系列特徴量を抽出中')
+    temporal_features = {}
+    if isinstance(pose_data[0], list) and len(pose_data) > 1:
+        temporal_features = engineer.extract_temporal_features(pose_data, exercise)
+
+    all_features = {**form_features, **temporal_features}
+    features_path = context.artifact_path('features.json')
+    _write_json(features_path, all_features)
+    context.progress(2, 2, '完了')
+
+    return {
+        'success': True,
+        'features': all_features,
+        'feature_count': len(all_features),
+        'exercise': exercise,
+        'artifact': features_path,
+    }
+
+
+PIPELINES: Dict[str, Callable[..., Dict[str, Any]]] = {
+    'ml_train': _run_ml_training,
+    'preprocessing': _run_preprocessing,
+    'corpus_preprocessing': _run_corpus_preprocessing,
+    'feature_engineering': _run_feature_engineering,
+}
+
+
+def _release_lock(lock_path: str, job_id: str) -> None:
+    """自分が保持しているロックのみ解放"""
+    try:
+        with open(lock_path, 'r', encoding='utf-8') as f:
+            holder = f.read().strip()
+        if holder == job_id:
+            os.remove(lock_path)
+    except OSError:
+        pass
+
+
+def _execute_job(job_dir: str, lock_path: str, job_id: str,
+                 func: Callable[..., Dict[str, Any]], params: Dict[str, Any]) -> str:
+    """子プロセスでジョブを実行し、最終状態を返す（func はモジュールトップレベルの関数）"""
+    context = JobContext(job_dir)
+    state = FAILED
+    try:
+        context.check_cancelled()
+        context.update(state=RUNNING, pid=os.getpid(), started_at=datetime.now().isoformat())
+
+        result = func(context, **params)
+        _write_json(context.artifact_path(RESULT_FILE), result)
+
+        # パイプラインが自前で失敗を返した場合も失敗として扱う
+        if isinstance(result, dict) and result.get('success') is False:
+            context.update(state=FAILED, error=result.get('error'))
+        else:
+            state = SUCCEEDED
+            context.update(state=SUCCEEDED, progress=1.0)
+    except JobCancelled:
+        state = CANCELLED
+        context.update(state=CANCELLED, message='キャンセルされました')
+    except Exception as e:
+        logger.error(f"ジョブ {job_id} ({func.__name__}) が失敗しました: {e}")
+        context.update(state=FAILED, error=str(e), traceback=traceback.format_exc())
+    finally:
+        context.update(finished_at=datetime.now().isoformat())
+        _release_lock(lock_path, job_id)
+    return state
+
+
+class TrainingJobManager:
+    """
+    バックグラウンドジョブの投入・状態参照・キャンセル
+
+    プロセスプールは spawn コンテキストで生成し、スレッドを持つWebワーカーを
+    fork しないようにする。
+    """
+
+    def __init__(self, jobs_dir: str = DEFAULT_JOBS_DIR, max_workers: int = 2,
+                 pipelines: Optional[Dict[str, Callable[..., Dict[str, Any]]]] = None):
+        """
+        Args:
+            jobs_dir: ジョブの状態と成果物を保存するディレクトリ
+            max_workers: 同時に実行するジョブ数の上限（パイプラインごとには1つ）
+            pipelines: パイプライン名 -> 実行関数（未指定時は PIPELINES）
+        """
+        self.jobs_dir = jobs_dir
+        self.pipelines = dict(pipelines or PIPELINES)
+        self.locks_dir = os.path.join(jobs_dir, 'locks')
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, pipeline: str, params: Optional[Dict[str, Any]] = None,
+               inputs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        ジョブを投入
+
+        Args:
+            pipeline: パイプライン名（PIPELINES のキー）
+            params: パイプラインに渡す引数（JSON 化できる値、状態ファイルにも記録される）
+            inputs: 大きな入力データ。ジョブディレクトリの input.json に保存し、
+                そのパスを引数 input_path として渡す
+
+        Returns:
+            投入直後のジョブ状態
+
+        Raises:
+            ValueError: 未知のパイプライン
+            JobConflictError: 同じパイプラインが実行中
+        """
+        if pipeline not in self.pipelines:
+            raise ValueError(f"未知のパイプラインです: {pipeline}")
+        params = params or {}
+
+        job_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        context = JobContext(job_dir)
+        if inputs is not None:
+            input_path = context.artifact_path(INPUT_FILE)
+            _write_json(input_path, inputs)
+            params = {**params, 'input_path': input_path}
+        status = context.update(
+            job_id=job_id,
+            pipeline=pipeline,
+            params=params,
+            state=QUEUED,
+            progress=0.0,
+            submitter_pid=os.getpid(),
+            submitted_at=datetime.now().isoformat(),
+        )
+
+        try:
+            lock_path = self._acquire_lock(pipeline, job_id)
+        except JobConflictError:
+            # 受け付けなかったジョブの記録は残さない
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        try:
+            future = self._submit_to_pool(
+                _execute_job, job_dir, lock_path, job_id, self.pipelines[pipeline], params
+            )
+        except Exception as e:
+            context.update(state=FAILED, error=f"ジョブを投入できませんでした: {e}")
+            _release_lock(lock_path, job_id)
+            raise
+
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+
+        logger.info(f"ジョブを投入しました: {pipeline} ({job_id})")
+        return status
+
+    def status(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        """ジョブの状態（終了していれば結果も含む）"""
+        job_dir = self._job_dir(job_id)
+        if job_dir is None:
+            return None
+        status = _read_json(os.path.join(job_dir, STATUS_FILE))
+        if status is None:
+            return None
+        if include_result and status.get('state') in TERMINAL_STATES:
+            result = _read_json(os.path.join(job_dir, RESULT_FILE))
+            if result is not None:
+                status['result'] = result
+        return status
+
+    def list_jobs(self, pipeline: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """新しい順のジョブ一覧"""
+        if not os.path.isdir(self.jobs_dir):
+            return []
+        jobs = []
+        for job_id in sorted(os.listdir(self.jobs_dir), reverse=True):
+            if job_id == 'locks':
+                continue
+            status = self.status(job_id, include_result=False)
+            if status and (pipeline is None or status.get('pipeline') == pipeline):
+                jobs.append(status)
+                if len(jobs) >= limit:
+                    break
+        return jobs
+
+    def active_job(self, pipeline: str) -> Optional[Dict[str, Any]]:
+        """パイプラインで実行中（または待機中）のジョブ"""
+        try:
+            with open(os.path.join(self.locks_dir, f"{pipeline}.lock"), 'r', encoding='utf-8') as f:
+                holder = f.read().strip()
+        except OSError:
+            return None
+        if self._is_stale(holder):
+            return None
+        return self.status(holder, include_result=False)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        ジョブをキャンセル
+
+        待機中のジョブはその場で取り消し、実行中のジョブは次の進捗報告の時点で停止する。
+        """
+        job_dir = self._job_dir(job_id)
+        if job_dir is None:
+            return None
+        status = self.status(job_id, include_result=False)
+        if status is None or status.get('state') in TERMINAL_STATES:
+            return status
+
+        with open(os.path.join(job_dir, CANCEL_FILE), 'w', encoding='utf-8') as f:
+            f.write(datetime.now().isoformat())
+
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # まだ子プロセスに渡っていなかった
+            JobContext(job_dir).update_if_active(state=CANCELLED, finished_at=datetime.now().isoformat())
+            _release_lock(os.path.join(self.locks_dir, f"{status['pipeline']}.lock"), job_id)
+        else:
+            JobContext(job_dir).update(cancel_requested=True)
+
+        return self.status(job_id, include_result=False)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """ジョブの終了を待つ（CLI・テスト用）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.status(job_id)
+            if status is None or status.get('state') in TERMINAL_STATES:
+                return status
+            if deadline is not None and time.monotonic() >= deadline:
+                return status
+            time.sleep(0.1)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """プロセスプールを停止"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def _submit_to_pool(self, fn: Callable, *args):
+        """プロセスプールに投入（子プロセスの異常終了で壊れたプールは作り直して1度だけ再試行）"""
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            logger.warning("プロセスプールが壊れているため作り直します")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return self._get_executor().submit(fn, *args)
+
+    def _on_done(self, job_id: str, future) -> None:
+        """子プロセスの異常終了（プール破損など）を状態に反映"""
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            job_dir = os.path.join(self.jobs_dir, job_id)
+            status = _read_json(os.path.join(job_dir, STATUS_FILE)) or {}
+            JobContext(job_dir).update_if_active(state=FAILED, error=str(error) or type(error).__name__,
+                                                 finished_at=datetime.now().isoformat())
+            if status.get('pipeline'):
+                _release_lock(os.path.join(self.locks_dir, f"{status['pipeline']}.lock"), job_id)
+
+    def _acquire_lock(self, pipeline: str, job_id: str) -> str:
+        """パイプラインのロックを取得（古いロックは回収）"""
+        os.makedirs(self.locks_dir, exist_ok=True)
+        lock_path = os.path.join(self.locks_dir, f"{pipeline}.lock")
+
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(lock_path, 'r', encoding='utf-8') as f:
+                        holder = f.read().strip()
+                except OSError:
+                    continue
+                if self._is_stale(holder):
+                    _release_lock(lock_path, holder)
+                    continue
+                raise JobConflictError(pipeline, holder)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(job_id)
+            return lock_path
+
+        raise JobConflictError(pipeline, 'unknown')
+
+    def _is_stale(self, holder: str) -> bool:
+        """ロック保持ジョブが終了済み、または実行プロセスが消えているか"""
+        status = self.status(holder, include_result=False) if holder else None
+        if status is None or status.get('state') in TERMINAL_STATES:
+            return True
+
+        owner_pid = status.get('pid') if status.get('state') == RUNNING else status.get('submitter_pid')
+        if _pid_alive(owner_pid):
+            return False
+
+        JobContext(os.path.join(self.jobs_dir, holder)).update_if_active(
+            state=FAILED, error='ジョブを実行していたプロセスが終了しました',
+            finished_at=datetime.now().isoformat(),
+        )
+        return True
+
+    def _job_dir(self, job_id: str) -> Optional[str]:
+        """ジョブIDを検証してディレクトリを返す（パス操作を防ぐ）"""
+        if not job_id or os.path.basename(job_id) != job_id or job_id.startswith('.') or job_id == 'locks':
+            return None
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        return job_dir if os.path.isdir(job_dir) else None
+
+
+# アプリ全体で共有するジョブマネージャ
+training_job_manager = TrainingJobManager()
@@ -0,0 +1,283 @@
+"""
+トレーニングデータのストリーミングエンコーダ
+レコードのイテレータを CSV / JSON / NDJSON / Parquet のバイト列チャンクへ逐次変換する
+（データ全体をメモリに載せないため、コーパスの大きさに関わらずメモリ使用量は一定）
+"""
+
+import io
+import csv
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from ml.data.pose_codec import resolve_pose_data
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+EXPORT_FORMATS = ('csv', 'json', 'ndjson', 'parquet')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# 1チャンクあたりの目安サイズ（バイト）とParquetの行グループサイズ
+DEFAULT_CHUNK_BYTES = 64 * 1024
+DEFAULT_ROW_GROUP_SIZE = 1000
+
+POSE_LANDMARK_COUNT = 33
+POSE_COORDS = ('x', 'y', 'z', 'visibility')
+
+CSV_FIELDNAMES = [
+    'session_id', 'timestamp', 'exercise',
+    'height', 'weight', 'experience',
+    'performance_weight', 'performance_reps', 'performance_form_score'
+] + [
+    f'pose_{i}_{coord}' for i in range(POSE_LANDMARK_COUNT) for coord in POSE_COORDS
+]
+
+
+def _load_json_field(value: Any) -> Any:
+    """JSONB 列（ドライバによっては文字列）を辞書/リストに変換"""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"JSONに変換できない型: {type(value).__name__}")
+
+
+def flatten_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    1レコードを CSV / Parquet 用の平坦な行に変換
+
+    Args:
+        record: session_id, timestamp, exercise, pose_data, metadata, performance を持つレコード
+
+    Returns:
+        CSV_FIELDNAMES をキーとする辞書（欠損は None）
+    """
+    timestamp = record.get('timestamp')
+    row = {
+        'session_id': record.get('session_id'),
+        'timestamp': timestamp.isoformat() if hasattr(timestamp, 'isoformat') else timestamp,
+        'exercise': record.get('exercise')
+    }
+
+    # メタデータ
+    metadata = _load_json_field(record.get('metadata')) or {}
+    row['height'] = metadata.get('height')
+    row['weight'] = metadata.get('weight')
+    row['experience'] = metadata.get('experience')
+
+    # パフォーマンスデータ
+    performance = _load_json_field(record.get('performance')) or {}
+    row['performance_weight'] = performance.get('weight')
+    row['performance_reps'] = performance.get('reps')
+    row['performance_form_score'] = performance.get('form_score')
+
+    # ポーズデータ（バイナリ形式の pose_blob を優先）
+    pose_data = resolve_pose_data(record) or []
+    for i, point in enumerate(pose_data[:POSE_LANDMARK_COUNT]):
+        if len(point) >= 4:
+            for coord, value in zip(POSE_COORDS, point):
+                row[f'pose_{i}_{coord}'] = value
+
+    return row
+
+
+def _serializable(record: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON出力用にレコードを変換（JSONB 列は入れ子のまま）"""
+    record_dict = dict(record)
+    if 'pose_blob' in record_dict or 'pose_data' in record_dict:
+        record_dict['pose_data'] = resolve_pose_data(record_dict)
+        record_dict.pop('pose_blob', None)
+    for key in ('metadata', 'performance'):
+        if key in record_dict:
+            record_dict[key] = _load_json_field(record_dict[key])
+    return record_dict
+
+
+def iter_csv(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """CSV 行を逐次生成（レコードが0件ならヘッダーも出力しない）"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDNAMES)
+    header_written = False
+
+    for record in records:
+        if not header_written:
+            writer.writeheader()
+            header_written = True
+        writer.writerow(flatten_record(record))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def iter_json(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """JSON 配列を要素ごとに逐次生成"""
+    first = True
+    for record in records:
+        yield ('[\n' if first else ',\n') + json.dumps(
+            _serializable(record), ensure_ascii=False, default=_json_default
+        )
+        first = False
+    yield '[]' if first else '\n]'
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """1行1レコードの NDJSON を逐次生成"""
+    for record in records:
+        yield json.dumps(_serializable(record), ensure_ascii=False, default=_json_default) + '\n'
+
+
+def _parquet_schema() -> 'pa.Schema':
+    fields = [
+        pa.field('session_id', pa.string()),
+        pa.field('timestamp', pa.string()),
+        pa.field('exercise', pa.string()),
+        pa.field('height', pa.float64()),
+        pa.field('weight', pa.float64()),
+        pa.field('experience', pa.string()),
+        pa.field('performance_weight', pa.float64()),
+        pa.field('performance_reps', pa.float64()),
+        pa.field('performance_form_score', pa.float64()),
+    ]
+    fields.extend(pa.field(name, pa.float64()) for name in CSV_FIELDNAMES[len(fields):])
+    return pa.schema(fields)
+
+
+class _DrainableSink(io.RawIOBase):
+    """ParquetWriter の出力を溜め、書き込まれた分だけ取り出せるシンク"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(records: Iterable[Dict[str, Any]],
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """
+    Parquet を行グループ単位で逐次生成（pyarrow が必要）
+
+    Args:
+        records: レコードのイテレータ
+        row_group_size: 1行グループの行数（メモリ上に保持するのはこの行数まで）
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet形式の出力には pyarrow が必要です")
+
+    schema = _parquet_schema()
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+    columns: Dict[str, list] = {name: [] for name in schema.names}
+    rows = 0
+
+    def flush() -> bytes:
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+        return sink.drain()
+
+    for record in records:
+        row = flatten_record(record)
+        for name, values in columns.items():
+            values.append(row.get(name))
+        rows += 1
+        if rows % row_group_size == 0:
+            yield flush()
+
+    if rows % row_group_size:
+        yield flush()
+    writer.close()
+    yield sink.drain()
+
+
+def validate_format(format: str) -> str:
+    """
+    出力形式の検証
+
+    Returns:
+        小文字に正規化した形式名
+
+    Raises:
+        ValueError: サポートされていない形式
+        RuntimeError: Parquet形式で pyarrow がない場合
+    """
+    format = format.lower()
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"サポートされていない形式: {format}")
+    if format == 'parquet' and not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet形式の出力には pyarrow が必要です")
+    return format
+
+
+def encode_records(records: Iterable[Dict[str, Any]], format: str = 'csv',
+                   compress: bool = False,
+                   chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    レコードを指定形式のバイト列チャンクに逐次エンコード
+
+    小さな行は chunk_bytes 程度にまとめてから出力する。形式の検証はジェネレータの
+    外で行うため、不正な形式はレスポンス開始前に ValueError になる。
+
+    Args:
+        records: レコードのイテレータ
+        format: 'csv' / 'json' / 'ndjson' / 'parquet'
+        compress: gzip 圧縮するか
+        chunk_bytes: 出力チャンクの目安サイズ
+
+    Returns:
+        バイト列チャンクのイテレータ
+    """
+    format = validate_format(format)
+    if format == 'parquet':
+        pieces = iter_parquet(records)
+    else:
+        encoder = {'csv': iter_csv, 'json': iter_json, 'ndjson': iter_ndjson}[format]
+        pieces = (text.encode('utf-8') for text in encoder(records))
+
+    return _rechunk(pieces, compress, chunk_bytes)
+
+
+def _rechunk(pieces: Iterable[bytes], compress: bool, chunk_bytes: int) -> Iterator[bytes]:
+    """小さな断片をまとめ、必要なら gzip で逐次圧縮"""
+    # wbits=31 で gzip ヘッダー付きのストリームになる
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = bytearray()
+
+    for piece in pieces:
+        buffer += compressor.compress(piece) if compressor else piece
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if compressor:
+        buffer += compressor.flush()
+    if buffer:
+        yield bytes(buffer)
+
+
+def export_filename(format: str, compress: bool = False, basename: str = 'training_data') -> str:
+    """ダウンロード用のファイル名"""
+    return f"{basename}.{format.lower()}" + ('.gz' if compress else '')
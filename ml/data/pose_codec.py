@@ -0,0 +1,238 @@
+"""
+ポーズデータのバイナリ保存形式
+ランドマークを (frames, 33, 4) の float16/float32 配列として小さなヘッダー付きで保存する
+
+形式:
+    magic 'TFPOSE' | version (uint8) | 予約 (1byte) | ヘッダー長 (uint32, little endian)
+    ヘッダー (UTF-8 JSON: 配列の dtype / shape / offset と任意のメタデータ)
+    配列データ（各配列は 64 バイト境界に整列）
+
+配列はリトルエンディアンの連続領域として置かれるため、ファイルは np.memmap で
+コピーなしに読め、同じバイト列をそのまま PostgreSQL の BYTEA に保存できる。
+JSON のランドマーク表現（1フレーム数KB）に比べ、float16 で 1フレーム 264 バイト。
+"""
+
+import os
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+MAGIC = b'TFPOSE'
+FORMAT_VERSION = 1
+POSE_FILE_SUFFIX = '.pose'
+LANDMARK_FIELDS = ('x', 'y', 'z', 'visibility')
+
+# ランドマーク配列の既定の精度（正規化座標なら float16 の誤差は 5e-4 未満）
+DEFAULT_DTYPE = 'float16'
+
+_PREFIX = struct.Struct('<6sBxI')
+_ALIGN = 64
+
+BufferLike = Union[bytes, bytearray, memoryview, np.ndarray]
+
+
+@dataclass
+class PoseArrays:
+    """デコード済みの配列とメタデータ（配列は元のバッファ/ファイルを参照する）"""
+    meta: Dict[str, Any] = field(default_factory=dict)
+    arrays: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.arrays
+
+    @property
+    def landmarks(self) -> np.ndarray:
+        """ランドマーク配列 (..., 33, 4)"""
+        return self.arrays['landmarks']
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def encode_pose_arrays(arrays: Dict[str, np.ndarray], meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    配列群をバイナリ形式にエンコード
+
+    Args:
+        arrays: 名前 -> 配列（'landmarks' を含むことを想定）
+        meta: JSON に変換可能なメタデータ
+
+    Returns:
+        エンコード済みのバイト列
+    """
+    entries = []
+    prepared = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        dtype = array.dtype.newbyteorder('<') if array.dtype.byteorder == '>' else array.dtype
+        array = array.astype(dtype, copy=False)
+        offset = _aligned(offset)
+        entries.append({
+            'name': name,
+            'dtype': dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+        })
+        prepared.append((offset, array))
+        offset += array.nbytes
+
+    header = json.dumps(
+        {'arrays': entries, 'meta': meta or {}}, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+    data_start = _aligned(_PREFIX.size + len(header))
+
+    buffer = bytearray(data_start + offset)
+    _PREFIX.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, len(header))
+    buffer[_PREFIX.size:_PREFIX.size + len(header)] = header
+    for array_offset, array in prepared:
+        start = data_start + array_offset
+        buffer[start:start + array.nbytes] = array.tobytes()
+    return bytes(buffer)
+
+
+def is_pose_blob(data: Optional[BufferLike]) -> bool:
+    """バイナリ形式のデータか判定"""
+    if data is None:
+        return False
+    try:
+        return bytes(memoryview(data)[:len(MAGIC)]) == MAGIC
+    except TypeError:
+        return False
+
+
+def decode_pose_arrays(data: BufferLike) -> PoseArrays:
+    """
+    バイナリ形式をデコード（配列はコピーせず data を参照するビュー）
+
+    Args:
+        data: バイト列、memoryview（psycopg2 の BYTEA）、または uint8 配列（np.memmap）
+
+    Returns:
+        PoseArrays
+    """
+    raw = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.uint8)
+    if raw.size < _PREFIX.size:
+        raise ValueError("ポーズデータが短すぎます")
+
+    magic, version, header_len = _PREFIX.unpack(raw[:_PREFIX.size].tobytes())
+    if magic != MAGIC:
+        raise ValueError("ポーズデータの形式が不正です")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"未対応のポーズデータ形式バージョン: {version}")
+
+    header = json.loads(raw[_PREFIX.size:_PREFIX.size + header_len].tobytes().decode('utf-8'))
+    data_start = _aligned(_PREFIX.size + header_len)
+
+    arrays = {}
+    for entry in header['arrays']:
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        start = data_start + entry['offset']
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        if start + nbytes > raw.size:
+            raise ValueError(f"ポーズデータが途中で切れています: {entry['name']}")
+        arrays[entry['name']] = raw[start:start + nbytes].view(dtype).reshape(shape)
+
+    return PoseArrays(meta=header.get('meta', {}), arrays=arrays)
+
+
+def write_pose_file(path: str, arrays: Dict[str, np.ndarray], meta: Optional[Dict[str, Any]] = None) -> int:
+    """
+    バイナリ形式でファイルに保存（一時ファイル経由で置き換え）
+
+    Returns:
+        書き込んだバイト数
+    """
+    data = encode_pose_arrays(arrays, meta)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def load_pose_file(path: str, mmap: bool = True) -> PoseArrays:
+    """
+    バイナリ形式のファイルを読み込み
+
+    Args:
+        path: ファイルパス
+        mmap: True ならメモリマップ（必要なページだけが読み込まれ、プロセス間で共有される）
+
+    Returns:
+        PoseArrays
+    """
+    if mmap:
+        return decode_pose_arrays(np.memmap(path, dtype=np.uint8, mode='r'))
+    with open(path, 'rb') as f:
+        return decode_pose_arrays(f.read())
+
+
+def landmarks_to_pose_array(frames: Iterable, dtype: str = DEFAULT_DTYPE) -> np.ndarray:
+    """
+    ランドマークを配列に変換
+
+    Args:
+        frames: フレームごとのランドマーク列。各ランドマークは [x, y, z, visibility]
+            または {'x', 'y', 'z', 'visibility'} の辞書（1フレームだけの (33, 4) も可）
+        dtype: 保存精度
+
+    Returns:
+        (frames, 33, 4) または (33, 4) の配列
+    """
+    def point(lm) -> List[float]:
+        if isinstance(lm, dict):
+            return [lm.get(name, 0.0) for name in LANDMARK_FIELDS]
+        return list(lm)[:4]
+
+    def convert(item):
+        if isinstance(item, dict) or (len(item) and np.isscalar(item[0])):
+            return point(item)
+        return [convert(child) for child in item]
+
+    return np.asarray(convert(list(frames)), dtype=dtype)
+
+
+def pose_array_to_lists(array: np.ndarray) -> list:
+    """配列を [x, y, z, visibility] のネストしたリストに戻す"""
+    return np.asarray(array, dtype=np.float64).tolist()
+
+
+def pose_array_to_dicts(array: np.ndarray) -> List[List[Dict[str, float]]]:
+    """(frames, 33, 4) 配列をフレームごとのランドマーク辞書のリストに戻す"""
+    return [
+        [dict(zip(LANDMARK_FIELDS, point)) for point in frame]
+        for frame in pose_array_to_lists(array)
+    ]
+
+
+def encode_landmarks(frames: Iterable, meta: Optional[Dict[str, Any]] = None,
+                     dtype: str = DEFAULT_DTYPE) -> bytes:
+    """ランドマークだけをバイナリ形式にエンコード"""
+    return encode_pose_arrays({'landmarks': landmarks_to_pose_array(frames, dtype)}, meta)
+
+
+def decode_landmarks(data: BufferLike) -> np.ndarray:
+    """バイナリ形式からランドマーク配列を取得"""
+    return decode_pose_arrays(data).landmarks
+
+
+def resolve_pose_data(record: Dict[str, Any]) -> Any:
+    """
+    DBレコードのポーズデータを [x, y, z, visibility] のリストで取得
+
+    新しいレコードはバイナリ形式の pose_blob 列、旧レコードは JSONB の pose_data 列に保存されている。
+    """
+    blob = record.get('pose_blob')
+    if is_pose_blob(blob):
+        return pose_array_to_lists(decode_landmarks(blob))
+    pose_data = record.get('pose_data')
+    return json.loads(pose_data) if isinstance(pose_data, str) else pose_data
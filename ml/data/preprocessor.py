@@ -36,6 +36,8 @@ from typing import Dict, List, Tuple, Optional
 import json
 import logging
 
+from utils.kinematics import point_angle
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -171,19 +173,9 @@ class PoseDataPreprocessor:
         return distances
     
     def _angle_between_points(self, p1: Dict, p2: Dict, p3: Dict) -> float:
-        """3点間の角度を計算"""
+        """3点間の角度を計算（x, y 平面）"""
         try:
-            # ベクトル計算
-            v1 = np.array([p1.get('x', 0) - p2.get('x', 0), 
-                          p1.get('y', 0) - p2.get('y', 0)])
-            v2 = np.array([p3.get('x', 0) - p2.get('x', 0), 
-                          p3.get('y', 0) - p2.get('y', 0)])
-            
-            # 角度計算
-            cosine_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-            angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-            
-            return np.degrees(angle)
+            return point_angle(p1, p2, p3, dims=2)
         except:
             return 0.0
     
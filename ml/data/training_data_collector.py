@@ -8,16 +8,21 @@ import uuid
 import hashlib
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
-import csv
-import io
+
+from ml.data.export_formats import encode_records, validate_format
+from ml.data.pose_codec import encode_landmarks
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# サーバーサイドカーソルで1回に取得する件数
+EXPORT_ITERSIZE = 500
+
+
 
 class TrainingDataCollector:
     """トレーニングデータ収集・管理クラス"""
@@ -47,7 +52,8 @@ class TrainingDataCollector:
                             user_hash VARCHAR(64) NOT NULL,
                             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                             exercise VARCHAR(50) NOT NULL,
-                            pose_data JSONB NOT NULL,
+                            pose_data JSONB,
+                            pose_blob BYTEA,
                             metadata JSONB NOT NULL,
                             performance JSONB NOT NULL,
                             consent_status BOOLEAN DEFAULT FALSE,
@@ -84,6 +90,17 @@ class TrainingDataCollector:
                         ON training_data_collection(user_hash)
                     """)
                     
+                    # 既存テーブルをバイナリ形式のポーズデータ列に対応させる
+                    # （旧レコードは ml/scripts/migrate_pose_storage.py で pose_blob へ移行）
+                    cur.execute("""
+                        ALTER TABLE training_data_collection 
+                        ADD COLUMN IF NOT EXISTS pose_blob BYTEA
+                    """)
+                    cur.execute("""
+                        ALTER TABLE training_data_collection 
+                        ALTER COLUMN pose_data DROP NOT NULL
+                    """)
+                    
                     conn.commit()
                     logger.info("トレーニングデータ収集テーブルを初期化しました")
                     
@@ -333,14 +350,14 @@ class TrainingDataCollector:
                 with conn.cursor() as cur:
                     cur.execute("""
                         INSERT INTO training_data_collection 
-                        (session_id, user_hash, exercise, pose_data, metadata, performance, consent_status, anonymized)
+                        (session_id, user_hash, exercise, pose_blob, metadata, performance, consent_status, anonymized)
                         VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                         RETURNING id
                     """, (
                         session_id,
                         user_hash,
                         exercise,
-                        json.dumps(pose_data),
+                        psycopg2.Binary(encode_landmarks(pose_data)),
                         json.dumps(metadata),
                         json.dumps(performance),
                         True,
@@ -413,6 +430,105 @@ class TrainingDataCollector:
             logger.error(f"統計取得エラー: {e}")
             return {'error': str(e)}
     
+    def _export_query(
+        self,
+        exercise_filter: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ) -> Tuple[str, List[Any]]:
+        """エクスポート用のクエリとパラメータを構築"""
+        query = """
+            SELECT session_id, timestamp, exercise, pose_data, pose_blob, metadata, performance
+            FROM training_data_collection
+            WHERE consent_status = TRUE
+        """
+        params = []
+        
+        # フィルター条件を追加
+        if exercise_filter:
+            query += " AND exercise = %s"
+            params.append(exercise_filter)
+        
+        if date_from:
+            query += " AND timestamp >= %s"
+            params.append(date_from)
+        
+        if date_to:
+            query += " AND timestamp <= %s"
+            params.append(date_to)
+        
+        query += " ORDER BY timestamp DESC"
+        return query, params
+    
+    def iter_training_data(
+        self,
+        exercise_filter: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        itersize: int = EXPORT_ITERSIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        同意済みのトレーニングデータを1件ずつ取得
+        
+        名前付き（サーバーサイド）カーソルを使い、itersize 件ずつ取得するため
+        クライアント側に保持するのは常に itersize 件まで。
+        接続とクエリの実行は呼び出し時に行うため、DBエラーはイテレータを
+        返す前に送出される（レスポンスのヘッダー送信前にエラーを返せる）。
+        """
+        query, params = self._export_query(exercise_filter, date_from, date_to)
+        
+        conn = self.get_connection()
+        try:
+            cursor_name = f"training_export_{uuid.uuid4().hex}"
+            cur = conn.cursor(name=cursor_name, cursor_factory=RealDictCursor)
+            cur.itersize = itersize
+            cur.execute(query, params)
+        except Exception:
+            conn.close()
+            raise
+        return self._iter_cursor(conn, cur)
+    
+    @staticmethod
+    def _iter_cursor(conn, cur) -> Iterator[Dict[str, Any]]:
+        """実行済みカーソルのレコードを返し、終了時に接続を閉じる"""
+        try:
+            with cur:
+                for record in cur:
+                    yield record
+        finally:
+            # 読み取り専用のトランザクションなのでそのまま閉じる
+            conn.close()
+    
+    def stream_training_data(
+        self,
+        exercise_filter: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        format: str = 'csv',
+        compress: bool = False,
+        itersize: int = EXPORT_ITERSIZE
+    ) -> Iterator[bytes]:
+        """
+        トレーニングデータを指定形式のバイト列チャンクとして逐次エクスポート
+        
+        Args:
+            exercise_filter: 種目フィルター
+            date_from: 開始日時
+            date_to: 終了日時
+            format: 'csv' / 'json' / 'ndjson' / 'parquet'
+            compress: gzip 圧縮するか
+            itersize: サーバーサイドカーソルの1回あたりの取得件数
+        
+        Returns:
+            バイト列チャンクのイテレータ
+        
+        Raises:
+            ValueError: サポートされていない形式（DBに接続する前に検証する）
+        """
+        validate_format(format)
+        records = self.iter_training_data(exercise_filter, date_from, date_to, itersize)
+        return encode_records(records, format=format, compress=compress)
+    
     def export_training_data(
         self, 
         exercise_filter: Optional[str] = None,
@@ -420,114 +536,23 @@ class TrainingDataCollector:
         date_to: Optional[str] = None,
         format: str = 'csv'
     ) -> str:
-        """トレーニングデータをエクスポート"""
+        """トレーニングデータを文字列としてエクスポート（大規模データは stream_training_data を使用）"""
         try:
-            query = """
-                SELECT session_id, timestamp, exercise, pose_data, metadata, performance
-                FROM training_data_collection
-                WHERE consent_status = TRUE
-            """
-            params = []
-            
-            # フィルター条件を追加
-            if exercise_filter:
-                query += " AND exercise = %s"
-                params.append(exercise_filter)
-            
-            if date_from:
-                query += " AND timestamp >= %s"
-                params.append(date_from)
-            
-            if date_to:
-                query += " AND timestamp <= %s"
-                params.append(date_to)
-            
-            query += " ORDER BY timestamp DESC"
-            
-            with self.get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(query, params)
-                    records = cur.fetchall()
-                    
-                    if format.lower() == 'csv':
-                        return self._export_to_csv(records)
-                    elif format.lower() == 'json':
-                        return self._export_to_json(records)
-                    else:
-                        raise ValueError(f"サポートされていない形式: {format}")
+            if format.lower() not in ('csv', 'json', 'ndjson'):
+                raise ValueError(f"サポートされていない形式: {format}")
+            
+            chunks = self.stream_training_data(
+                exercise_filter=exercise_filter,
+                date_from=date_from,
+                date_to=date_to,
+                format=format
+            )
+            return b''.join(chunks).decode('utf-8')
                         
         except Exception as e:
             logger.error(f"データエクスポートエラー: {e}")
             raise
     
-    def _export_to_csv(self, records: List[Dict]) -> str:
-        """CSVフォーマットでエクスポート"""
-        output = io.StringIO()
-        
-        if not records:
-            return ""
-        
-        # ヘッダー行
-        fieldnames = [
-            'session_id', 'timestamp', 'exercise',
-            'height', 'weight', 'experience',
-            'performance_weight', 'performance_reps', 'performance_form_score'
-        ]
-        
-        # ポーズデータのカラムを追加（33ポイント × 4次元）
-        for i in range(33):
-            for coord in ['x', 'y', 'z', 'visibility']:
-                fieldnames.append(f'pose_{i}_{coord}')
-        
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for record in records:
-            row = {
-                'session_id': record['session_id'],
-                'timestamp': record['timestamp'].isoformat(),
-                'exercise': record['exercise']
-            }
-            
-            # メタデータ
-            metadata = json.loads(record['metadata']) if isinstance(record['metadata'], str) else record['metadata']
-            row['height'] = metadata.get('height')
-            row['weight'] = metadata.get('weight')
-            row['experience'] = metadata.get('experience')
-            
-            # パフォーマンスデータ
-            performance = json.loads(record['performance']) if isinstance(record['performance'], str) else record['performance']
-            row['performance_weight'] = performance.get('weight')
-            row['performance_reps'] = performance.get('reps')
-            row['performance_form_score'] = performance.get('form_score')
-            
-            # ポーズデータ
-            pose_data = json.loads(record['pose_data']) if isinstance(record['pose_data'], str) else record['pose_data']
-            for i, point in enumerate(pose_data):
-                if len(point) >= 4:
-                    row[f'pose_{i}_x'] = point[0]
-                    row[f'pose_{i}_y'] = point[1]
-                    row[f'pose_{i}_z'] = point[2]
-                    row[f'pose_{i}_visibility'] = point[3]
-            
-            writer.writerow(row)
-        
-        return output.getvalue()
-    
-    def _export_to_json(self, records: List[Dict]) -> str:
-        """JSONフォーマットでエクスポート"""
-        export_data = []
-        
-        for record in records:
-            # タイムスタンプを文字列に変換
-            record_dict = dict(record)
-            if record_dict.get('timestamp'):
-                record_dict['timestamp'] = record_dict['timestamp'].isoformat()
-            
-            export_data.append(record_dict)
-        
-        return json.dumps(export_data, indent=2, ensure_ascii=False)
-    
     def delete_user_data(self, user_id: str) -> bool:
         """ユーザーのデータを削除（GDPR対応）"""
         try:
@@ -0,0 +1,442 @@
+"""
+Priority-heap annotation queue with leases and an append-only journal.
+
+Pending items live in a binary heap ordered by priority (higher first) and
+insertion order, so push and pop are O(log n). Handing an item to an
+annotator takes a time-bounded lease; leases that are not completed or
+renewed before they expire put the item back in its original place in the
+queue. Every state change is appended to a JSON-lines journal before it is
+applied, and replaying the journal on startup restores the exact state.
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+DEFAULT_LEASE_SECONDS = 15 * 60
+
+# The journal is rewritten as a snapshot once it holds this many records
+# and more than twice as many records as there are items
+DEFAULT_COMPACT_THRESHOLD = 100_000
+
+
+class AnnotationQueue:
+    """
+    Durable annotation work queue.
+
+    Any number of queues, in one process or several, may share a journal:
+    each operation locks it (with a lock file where ``fcntl`` is available)
+    and first catches up on records the other queues appended. All methods
+    are thread-safe.
+    """
+
+    def __init__(
+        self,
+        journal_path: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_leases_per_annotator: int = 1,
+        compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+        fsync: bool = False,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Open a queue, replaying its journal if one exists.
+
+        Args:
+            journal_path: Path of the JSON-lines journal
+            lease_seconds: Default lease duration
+            max_leases_per_annotator: Items one annotator may hold at once
+            compact_threshold: Journal size (records) that triggers compaction
+            fsync: fsync after every append (survives power loss, not just crashes)
+            clock: Time source in seconds (injectable for tests)
+        """
+        self.journal_path = Path(journal_path)
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_leases_per_annotator = max_leases_per_annotator
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.clock = clock
+
+        self._lock = threading.RLock()
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[Tuple[int, int, str]] = []
+        self._leases: List[Tuple[float, str, str]] = []
+        self._by_annotator: Dict[str, set] = {}
+        self._counts = {PENDING: 0, IN_PROGRESS: 0, COMPLETED: 0}
+        self._next_seq = 0
+        self._journal_records = 0
+
+        self._journal = None
+        self._journal_inode = None
+        self._journal_offset = 0
+
+        self._lock_file = open(f"{self.journal_path}.lock", "a")
+        try:
+            with self._locked():
+                pass  # replays the journal
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """Close the journal and its lock file."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def __enter__(self) -> "AnnotationQueue":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        """Number of pending items."""
+        with self._locked():
+            return self._counts[PENDING]
+
+    # Journal
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the journal for one operation.
+
+        The file lock is taken only for the duration of the operation, and
+        records appended by other queues since our last operation are applied
+        before it runs. Operations must not nest.
+        """
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                self._sync()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _sync(self):
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            stat = None
+
+        if self._journal is None or stat is None or stat.st_ino != self._journal_inode:
+            # First open, or another queue compacted the journal: rebuild from scratch
+            self._reset()
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+            stat = os.fstat(self._journal.fileno())
+            self._journal_inode = stat.st_ino
+            self._journal_offset = 0
+
+        if stat.st_size != self._journal_offset:
+            self._replay()
+
+    def _reset(self):
+        self._items.clear()
+        self._pending.clear()
+        self._leases.clear()
+        self._by_annotator.clear()
+        self._counts = {PENDING: 0, IN_PROGRESS: 0, COMPLETED: 0}
+        self._next_seq = 0
+        self._journal_records = 0
+
+    def _replay(self):
+        """Apply the records after our journal offset."""
+        valid_bytes = self._journal_offset
+        with open(self.journal_path, "rb") as f:
+            f.seek(valid_bytes)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn write from a crash: drop the incomplete record
+                    logger.warning(f"Discarding incomplete journal record in {self.journal_path}")
+                    break
+                self._apply(json.loads(line))
+                self._journal_records += 1
+                valid_bytes += len(line)
+
+        if valid_bytes != self.journal_path.stat().st_size:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        self._journal_offset = valid_bytes
+
+    def _record(self, records: Iterable[Dict[str, Any]]):
+        """Append records to the journal, then apply them (caller holds _locked)."""
+        records = list(records)
+        if not records:
+            return
+        self._journal.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._journal_offset = os.fstat(self._journal.fileno()).st_size
+        for record in records:
+            self._apply(record)
+        self._journal_records += len(records)
+
+        if self._journal_records > max(self.compact_threshold, 2 * len(self._items)):
+            self._compact()
+
+    def compact(self):
+        """Rewrite the journal as one snapshot record per item."""
+        with self._locked():
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self.journal_path.with_name(f"{self.journal_path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "snapshot", "next_seq": self._next_seq}) + "\n")
+            for item in self._items.values():
+                f.write(json.dumps({"op": "item", **item}, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal.close()
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        stat = os.fstat(self._journal.fileno())
+        self._journal_inode = stat.st_ino
+        self._journal_offset = stat.st_size
+        self._journal_records = len(self._items) + 1
+
+    # State transitions (used both live and during replay)
+
+    def _apply(self, record: Dict[str, Any]):
+        op = record["op"]
+        if op == "push":
+            self._apply_push(record)
+        elif op == "lease":
+            self._apply_lease(record)
+        elif op == "release":
+            item = self._items[record["id"]]
+            self._clear_lease(item)
+            self._set_status(item, PENDING)
+            heapq.heappush(self._pending, self._heap_key(item))
+        elif op == "complete":
+            item = self._items[record["id"]]
+            self._clear_lease(item)
+            self._set_status(item, COMPLETED)
+            item["completed_at"] = record["at"]
+        elif op == "remove":
+            item = self._items.pop(record["id"])
+            self._clear_lease(item)
+            self._counts[item["status"]] -= 1
+        elif op == "item":
+            item = {key: value for key, value in record.items() if key != "op"}
+            self._items[item["id"]] = item
+            self._counts[item["status"]] += 1
+            if item["status"] == PENDING:
+                heapq.heappush(self._pending, self._heap_key(item))
+            elif item["status"] == IN_PROGRESS:
+                self._track_lease(item)
+        elif op == "snapshot":
+            journal_records = self._journal_records
+            self._reset()
+            self._journal_records = journal_records
+            self._next_seq = record["next_seq"]
+        else:
+            raise ValueError(f"Unknown journal record: {op}")
+
+    def _apply_push(self, record: Dict[str, Any]):
+        item = self._items.get(record["id"])
+        if item is None:
+            item = {"id": record["id"], "seq": record["seq"], "status": PENDING}
+            self._items[record["id"]] = item
+            self._counts[PENDING] += 1
+        else:
+            self._clear_lease(item)
+            self._set_status(item, PENDING)
+        self._next_seq = max(self._next_seq, record["seq"] + 1)
+        item.update(priority=record["priority"], added_at=record["added_at"], seq=record["seq"])
+        item.pop("completed_at", None)
+        heapq.heappush(self._pending, self._heap_key(item))
+
+    def _apply_lease(self, record: Dict[str, Any]):
+        item = self._items[record["id"]]
+        self._clear_lease(item)
+        self._set_status(item, IN_PROGRESS)
+        item.update(annotator=record["annotator"], lease_id=record["lease_id"],
+                    leased_at=record["at"], expires_at=record["expires_at"])
+        self._track_lease(item)
+
+    def _set_status(self, item: Dict[str, Any], status: str):
+        self._counts[item["status"]] -= 1
+        self._counts[status] += 1
+        item["status"] = status
+
+    def _track_lease(self, item: Dict[str, Any]):
+        heapq.heappush(self._leases, (item["expires_at"], item["lease_id"], item["id"]))
+        self._by_annotator.setdefault(item["annotator"], set()).add(item["id"])
+
+    def _clear_lease(self, item: Dict[str, Any]):
+        annotator = item.pop("annotator", None)
+        if annotator is not None:
+            held = self._by_annotator.get(annotator)
+            if held is not None:
+                held.discard(item["id"])
+                if not held:
+                    del self._by_annotator[annotator]
+        for key in ("lease_id", "leased_at", "expires_at"):
+            item.pop(key, None)
+
+    @staticmethod
+    def _heap_key(item: Dict[str, Any]) -> Tuple[int, int, str]:
+        return (-item["priority"], item["seq"], item["id"])
+
+    def _is_current(self, entry: Tuple[int, int, str]) -> bool:
+        """Heap entries are invalidated lazily instead of being removed."""
+        item = self._items.get(entry[2])
+        return item is not None and item["status"] == PENDING and self._heap_key(item) == entry
+
+    def _expire_leases(self, now: float):
+        expired = []
+        while self._leases and self._leases[0][0] <= now:
+            _, lease_id, data_id = heapq.heappop(self._leases)
+            item = self._items.get(data_id)
+            if item is not None and item.get("lease_id") == lease_id:
+                expired.append({"op": "release", "id": data_id, "reason": "expired"})
+        self._record(expired)
+
+    # Public API
+
+    def push(self, data_id: str, priority: int = 5):
+        """Queue (or re-queue) a session for annotation."""
+        self.push_many([(data_id, priority)])
+
+    def push_many(self, items: Iterable[Tuple[str, int]]):
+        """Queue many sessions with a single journal write."""
+        with self._locked():
+            added_at = self.clock()
+            records = []
+            for data_id, priority in items:
+                existing = self._items.get(data_id)
+                # Re-queueing an item keeps its place among equal priorities
+                seq = existing["seq"] if existing is not None else self._next_seq + len(records)
+                records.append({"op": "push", "id": data_id, "priority": int(priority),
+                                "added_at": added_at, "seq": seq})
+            self._record(records)
+
+    def lease(self, annotator_id: str, lease_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next item to an annotator.
+
+        An annotator already holding max_leases_per_annotator items gets the
+        oldest of them back instead of a new one.
+
+        Returns:
+            The leased item, or None if nothing is pending
+        """
+        with self._locked():
+            now = self.clock()
+            self._expire_leases(now)
+
+            held = self._by_annotator.get(annotator_id, set())
+            if len(held) >= self.max_leases_per_annotator:
+                return dict(min((self._items[data_id] for data_id in held), key=lambda i: i["leased_at"]))
+
+            while self._pending and not self._is_current(self._pending[0]):
+                heapq.heappop(self._pending)
+            if not self._pending:
+                return None
+
+            data_id = heapq.heappop(self._pending)[2]
+            self._record([{
+                "op": "lease", "id": data_id, "annotator": annotator_id,
+                "lease_id": uuid.uuid4().hex, "at": now,
+                "expires_at": now + (lease_seconds or self.lease_seconds)
+            }])
+            return dict(self._items[data_id])
+
+    def renew(self, data_id: str, annotator_id: str, lease_seconds: Optional[float] = None) -> bool:
+        """Extend an annotator's lease. Returns False if they no longer hold it."""
+        with self._locked():
+            now = self.clock()
+            self._expire_leases(now)
+            item = self._items.get(data_id)
+            if item is None or item.get("annotator") != annotator_id:
+                return False
+            self._record([{
+                "op": "lease", "id": data_id, "annotator": annotator_id,
+                "lease_id": uuid.uuid4().hex, "at": item["leased_at"],
+                "expires_at": now + (lease_seconds or self.lease_seconds)
+            }])
+            return True
+
+    def release(self, data_id: str, annotator_id: Optional[str] = None) -> bool:
+        """Return a leased item to the queue (only the holder may, if annotator_id is given)."""
+        with self._locked():
+            item = self._items.get(data_id)
+            if item is None or item["status"] != IN_PROGRESS:
+                return False
+            if annotator_id is not None and item.get("annotator") != annotator_id:
+                return False
+            self._record([{"op": "release", "id": data_id}])
+            return True
+
+    def complete(self, data_id: str, annotator_id: Optional[str] = None) -> bool:
+        """
+        Mark an item completed.
+
+        With annotator_id, only succeeds while that annotator holds a valid lease.
+        """
+        with self._locked():
+            now = self.clock()
+            self._expire_leases(now)
+            item = self._items.get(data_id)
+            if item is None or item["status"] == COMPLETED:
+                return False
+            if annotator_id is not None and item.get("annotator") != annotator_id:
+                return False
+            self._record([{"op": "complete", "id": data_id, "at": now}])
+            return True
+
+    def remove(self, data_id: str) -> bool:
+        """Drop an item from the queue entirely."""
+        with self._locked():
+            if data_id not in self._items:
+                return False
+            self._record([{"op": "remove", "id": data_id}])
+            return True
+
+    def get(self, data_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of an item."""
+        with self._locked():
+            item = self._items.get(data_id)
+            return dict(item) if item is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        """Number of items per status."""
+        with self._locked():
+            self._expire_leases(self.clock())
+            return {
+                "total_queued": len(self._items),
+                "pending": self._counts[PENDING],
+                "in_progress": self._counts[IN_PROGRESS],
+                "completed": self._counts[COMPLETED],
+                "annotators": len(self._by_annotator)
+            }
@@ -10,6 +10,10 @@ from pathlib import Path
 import numpy as np
 import logging
 
+from .annotation_queue import COMPLETED, AnnotationQueue
+from .metadata_index import MetadataIndex
+from .user_data_collector import load_raw_package, resolve_landmarks
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -17,17 +21,27 @@ logger = logging.getLogger(__name__)
 class ExerciseAnnotationTool:
     """Tool for annotating exercise form data with quality labels and corrections."""
     
-    def __init__(self, data_dir: str = "data/user_contributions"):
+    def __init__(
+        self,
+        data_dir: str = "data/user_contributions",
+        lease_seconds: float = 15 * 60
+    ):
         self.data_dir = Path(data_dir)
         self.raw_dir = self.data_dir / "raw"
         self.annotated_dir = self.data_dir / "annotated"
-        self.annotation_queue_file = self.data_dir / "annotation_queue.json"
         
         # Ensure directories exist
         self.annotated_dir.mkdir(parents=True, exist_ok=True)
         
-        # Load annotation queue
-        self.annotation_queue = self._load_annotation_queue()
+        # Annotation summaries live in the shared metadata index
+        self.index = MetadataIndex(str(self.data_dir))
+        
+        # Work queue with per-annotator leases, recovered from its journal
+        queue_journal = self.data_dir / "annotation_queue.journal"
+        is_new_queue = not queue_journal.exists()
+        self.annotation_queue = AnnotationQueue(str(queue_journal), lease_seconds=lease_seconds)
+        if is_new_queue:
+            self._import_legacy_queue()
         
         # Annotation schema
         self.annotation_schema = {
@@ -63,75 +77,72 @@ class ExerciseAnnotationTool:
             }
         }
     
-    def _load_annotation_queue(self) -> List[Dict]:
-        """Load the annotation queue."""
-        if self.annotation_queue_file.exists():
-            try:
-                with open(self.annotation_queue_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading annotation queue: {e}")
-        return []
-    
-    def _save_annotation_queue(self):
-        """Save the annotation queue."""
+    def _import_legacy_queue(self):
+        """Import the queue from the JSON file used by earlier versions."""
+        legacy_file = self.data_dir / "annotation_queue.json"
+        if not legacy_file.exists():
+            return
         try:
-            with open(self.annotation_queue_file, 'w') as f:
-                json.dump(self.annotation_queue, f, indent=2)
+            with open(legacy_file, 'r') as f:
+                items = json.load(f)
         except Exception as e:
-            logger.error(f"Error saving annotation queue: {e}")
+            logger.error(f"Error loading annotation queue: {e}")
+            return
+        
+        # Oldest first so equal priorities keep their order
+        items = sorted(items, key=lambda x: x.get("added_at", ""))
+        self.annotation_queue.push_many((item["data_id"], item.get("priority", 5)) for item in items)
+        for item in items:
+            if item.get("status") == COMPLETED:
+                self.annotation_queue.complete(item["data_id"])
     
     def add_to_annotation_queue(self, data_id: str, priority: int = 5):
         """Add a data sample to the annotation queue."""
-        queue_item = {
-            "data_id": data_id,
-            "added_at": datetime.now().isoformat(),
-            "priority": priority,
-            "status": "pending"
-        }
-        
-        self.annotation_queue.append(queue_item)
-        self._save_annotation_queue()
+        self.annotation_queue.push(data_id, priority)
         
         logger.info(f"Added {data_id} to annotation queue")
     
-    def get_next_for_annotation(self) -> Optional[Dict]:
-        """Get the next item for annotation from the queue."""
-        # Sort by priority (higher first) and timestamp (older first)
-        pending_items = [item for item in self.annotation_queue if item["status"] == "pending"]
-        
-        if not pending_items:
-            return None
+    def get_next_for_annotation(self, annotator_id: str) -> Optional[Dict]:
+        """
+        Lease the next item for annotation from the queue.
         
-        sorted_items = sorted(
-            pending_items,
-            key=lambda x: (-x["priority"], x["added_at"])
-        )
+        Items are handed out by priority (higher first), then age. Each item
+        is leased to one annotator at a time; a lease that is not completed
+        before it expires returns the item to the queue.
         
-        if sorted_items:
-            next_item = sorted_items[0]
+        Args:
+            annotator_id: ID of the annotator requesting work; must be unique
+                per client, since leases are held per annotator
             
-            # Load the data
-            data_file = self.raw_dir / f"{next_item['data_id']}.json"
-            if data_file.exists():
-                try:
-                    with open(data_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    # Mark as in_progress
-                    for item in self.annotation_queue:
-                        if item["data_id"] == next_item["data_id"]:
-                            item["status"] = "in_progress"
-                            item["started_at"] = datetime.now().isoformat()
-                            break
-                    
-                    self._save_annotation_queue()
-                    return data
-                    
-                except Exception as e:
-                    logger.error(f"Error loading data {next_item['data_id']}: {e}")
-        
-        return None
+        Returns:
+            The raw data package with its lease expiry, or None if nothing is pending
+        """
+        if not annotator_id:
+            raise ValueError("annotator_id is required")
+        while True:
+            item = self.annotation_queue.lease(annotator_id)
+            if item is None:
+                return None
+            
+            data_file = self.raw_dir / f"{item['id']}.json"
+            try:
+                data = load_raw_package(data_file)
+            except Exception as e:
+                # Data removed (e.g. consent revoked) or unreadable: drop it and move on
+                logger.error(f"Error loading data {item['id']}: {e}")
+                self.annotation_queue.remove(item["id"])
+                continue
+            
+            data["lease_expires_at"] = datetime.fromtimestamp(item["expires_at"]).isoformat()
+            return data
+    
+    def renew_lease(self, data_id: str, annotator_id: str) -> bool:
+        """Extend an annotator's lease on an item they are still working on."""
+        return self.annotation_queue.renew(data_id, annotator_id)
+    
+    def release_annotation(self, data_id: str, annotator_id: str) -> bool:
+        """Give a leased item back to the queue without annotating it."""
+        return self.annotation_queue.release(data_id, annotator_id)
     
     def create_annotation(
         self,
@@ -142,6 +153,9 @@ class ExerciseAnnotationTool:
         """
         Create an annotation for a data sample.
         
+        The annotator must hold the lease on the sample (see
+        get_next_for_annotation); otherwise nothing is written.
+        
         Args:
             data_id: ID of the data to annotate
             annotator_id: ID of the annotator (anonymized)
@@ -161,6 +175,12 @@ class ExerciseAnnotationTool:
             logger.error(f"Data file not found: {data_id}")
             return False
         
+        # Renewing doubles as the ownership check and keeps the lease from
+        # expiring while the file is written
+        if not self.annotation_queue.renew(data_id, annotator_id):
+            logger.error(f"{annotator_id} does not hold the lease on {data_id}")
+            return False
+        
         try:
             with open(data_file, 'r') as f:
                 original_data = json.load(f)
@@ -177,23 +197,21 @@ class ExerciseAnnotationTool:
             
             # Add computed features
             annotated_data["computed_features"] = self._compute_annotation_features(
-                original_data["landmarks_sequence"],
+                resolve_landmarks(original_data, self.raw_dir),
                 annotations
             )
             
-            # Save annotated data
+            # Save annotated data together with its index row
             annotated_file = self.annotated_dir / f"{data_id}_annotated.json"
-            with open(annotated_file, 'w') as f:
-                json.dump(annotated_data, f, indent=2)
+            with self.index.write_files({
+                annotated_file: json.dumps(annotated_data, indent=2).encode("utf-8")
+            }) as conn:
+                self.index.add_annotation(annotated_data, conn=conn)
             
             # Update queue status
-            for item in self.annotation_queue:
-                if item["data_id"] == data_id:
-                    item["status"] = "completed"
-                    item["completed_at"] = datetime.now().isoformat()
-                    break
-            
-            self._save_annotation_queue()
+            if not self.annotation_queue.complete(data_id, annotator_id):
+                logger.error(f"Lease on {data_id} was lost before the annotation was recorded")
+                return False
             
             logger.info(f"Created annotation for {data_id}")
             return True
@@ -293,49 +311,18 @@ class ExerciseAnnotationTool:
         if "form_quality" in annotations:
             quality_scores = list(annotations["form_quality"].values())
             features["aggregate_quality"] = {
-                "mean": np.mean(quality_scores),
-                "std": np.std(quality_scores),
-                "min": np.min(quality_scores),
-                "max": np.max(quality_scores)
+                "mean": float(np.mean(quality_scores)),
+                "std": float(np.std(quality_scores)),
+                "min": float(np.min(quality_scores)),
+                "max": float(np.max(quality_scores))
             }
         
         return features
     
     def get_annotation_stats(self) -> Dict[str, Any]:
         """Get statistics about annotations."""
-        stats = {
-            "total_queued": len(self.annotation_queue),
-            "pending": sum(1 for item in self.annotation_queue if item["status"] == "pending"),
-            "in_progress": sum(1 for item in self.annotation_queue if item["status"] == "in_progress"),
-            "completed": sum(1 for item in self.annotation_queue if item["status"] == "completed"),
-            "annotated_files": len(list(self.annotated_dir.glob("*_annotated.json"))),
-            "quality_distribution": {},
-            "common_errors_frequency": {}
-        }
-        
-        # Analyze annotated files
-        for annotated_file in self.annotated_dir.glob("*_annotated.json"):
-            try:
-                with open(annotated_file, 'r') as f:
-                    data = json.load(f)
-                
-                # Quality distribution
-                if "computed_features" in data and "aggregate_quality" in data["computed_features"]:
-                    mean_quality = data["computed_features"]["aggregate_quality"]["mean"]
-                    quality_bucket = int(mean_quality / 10) * 10
-                    stats["quality_distribution"][quality_bucket] = \
-                        stats["quality_distribution"].get(quality_bucket, 0) + 1
-                
-                # Error frequency
-                if "annotations" in data and "common_errors" in data["annotations"]:
-                    for error, present in data["annotations"]["common_errors"].items():
-                        if present:
-                            stats["common_errors_frequency"][error] = \
-                                stats["common_errors_frequency"].get(error, 0) + 1
-                
-            except Exception as e:
-                logger.error(f"Error analyzing {annotated_file}: {e}")
-        
+        stats = self.annotation_queue.stats()
+        stats.update(self.index.annotation_stats())
         return stats
     
     def export_training_data(
@@ -357,34 +344,29 @@ class ExerciseAnnotationTool:
         """
         training_data = []
         
-        for annotated_file in self.annotated_dir.glob("*_annotated.json"):
+        # Quality and required fields are filtered in the index; only
+        # matching annotated files are read
+        for row in self.index.query_annotations(min_quality=min_quality):
+            if required_annotations and not all(field in row["fields"] for field in required_annotations):
+                continue
+            
+            annotated_file = self.annotated_dir / f"{row['data_id']}_annotated.json"
             try:
                 with open(annotated_file, 'r') as f:
                     data = json.load(f)
                 
-                # Check quality threshold
-                if "computed_features" in data and "aggregate_quality" in data["computed_features"]:
-                    if data["computed_features"]["aggregate_quality"]["mean"] < min_quality:
-                        continue
-                
-                # Check required annotations
-                if required_annotations:
-                    annotations = data.get("annotations", {})
-                    if not all(field in annotations for field in required_annotations):
-                        continue
-                
                 # Extract training sample
                 sample = {
                     "data_id": data["data_id"],
                     "exercise_type": data["original_data"]["exercise_type"],
-                    "landmarks_sequence": data["original_data"]["landmarks_sequence"],
+                    "landmarks_sequence": resolve_landmarks(data["original_data"], self.raw_dir),
                     "labels": {
                         "form_quality": data["annotations"].get("form_quality", {}),
                         "common_errors": data["annotations"].get("common_errors", {}),
                         "phase_boundaries": data["computed_features"].get("phase_boundaries", {})
                     },
                     "metadata": {
-                        "quality_score": data["computed_features"]["aggregate_quality"]["mean"],
+                        "quality_score": data["computed_features"].get("aggregate_quality", {}).get("mean"),
                         "annotated_at": data["annotated_at"]
                     }
                 }
@@ -426,9 +408,9 @@ class InteractiveAnnotator:
         self.current_data = None
         self.current_annotations = {}
     
-    def start_session(self) -> bool:
+    def start_session(self, annotator_id: str = "anonymous") -> bool:
         """Start a new annotation session."""
-        self.current_data = self.tool.get_next_for_annotation()
+        self.current_data = self.tool.get_next_for_annotation(annotator_id)
         if self.current_data:
             self.current_annotations = {
                 "form_quality": {},
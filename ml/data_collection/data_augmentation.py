@@ -4,16 +4,64 @@ Handles edge cases and expands training dataset.
 """
 
 import numpy as np
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Iterator, Sequence
 import random
 import logging
 from copy import deepcopy
 import json
+from datetime import datetime
 from pathlib import Path
 
+from ml.data.pose_codec import landmarks_to_pose_array, pose_array_to_dicts
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+NUM_LANDMARKS = 33
+HIP_INDICES = [23, 24]
+
+# MediaPipe left/right landmark pairs
+LEFT_RIGHT_PAIRS = [
+    (1, 4), (2, 5), (3, 6), (7, 8), (9, 10),
+    (11, 12), (13, 14), (15, 16), (17, 18),
+    (19, 20), (21, 22), (23, 24), (25, 26),
+    (27, 28), (29, 30), (31, 32)
+]
+
+FLIP_PERMUTATION = np.arange(NUM_LANDMARKS)
+for _left, _right in LEFT_RIGHT_PAIRS:
+    FLIP_PERMUTATION[_left], FLIP_PERMUTATION[_right] = _right, _left
+
+DEFAULT_AUGMENTATION_PARAMS = {
+    "spatial": {
+        "scale_range": (0.8, 1.2),  # Body size variation
+        "translate_range": (-0.1, 0.1),  # Position variation
+        "rotate_range": (-15, 15),  # Rotation in degrees
+        "horizontal_flip": True,  # Mirror image
+        "perspective_warp": (0.9, 1.1)  # Camera angle variation
+    },
+    "temporal": {
+        "speed_variation": (0.7, 1.3),  # Exercise speed
+        "frame_drop_rate": 0.1,  # Simulate lower FPS
+        "interpolation": True  # Add intermediate frames
+    },
+    "noise": {
+        "gaussian_noise": 0.02,  # Position noise
+        "visibility_noise": 0.1,  # Detection confidence noise
+        "occlusion_probability": 0.05  # Random landmark occlusion
+    },
+    "body_types": {
+        # Simulate different body proportions
+        "proportions": [
+            {"name": "tall_thin", "height_scale": 1.15, "width_scale": 0.9},
+            {"name": "short_stocky", "height_scale": 0.85, "width_scale": 1.1},
+            {"name": "athletic", "height_scale": 1.0, "width_scale": 1.05},
+            {"name": "average", "height_scale": 1.0, "width_scale": 1.0},
+            {"name": "large", "height_scale": 1.1, "width_scale": 1.2}
+        ]
+    }
+}
+
 
 class PoseDataAugmenter:
     """Augments pose data to handle edge cases and expand training data."""
@@ -28,36 +76,10 @@ class PoseDataAugmenter:
         np.random.seed(seed)
         random.seed(seed)
         
+        self.seed = seed
+        
         # Augmentation parameters
-        self.augmentation_params = {
-            "spatial": {
-                "scale_range": (0.8, 1.2),  # Body size variation
-                "translate_range": (-0.1, 0.1),  # Position variation
-                "rotate_range": (-15, 15),  # Rotation in degrees
-                "horizontal_flip": True,  # Mirror image
-                "perspective_warp": (0.9, 1.1)  # Camera angle variation
-            },
-            "temporal": {
-                "speed_variation": (0.7, 1.3),  # Exercise speed
-                "frame_drop_rate": 0.1,  # Simulate lower FPS
-                "interpolation": True  # Add intermediate frames
-            },
-            "noise": {
-                "gaussian_noise": 0.02,  # Position noise
-                "visibility_noise": 0.1,  # Detection confidence noise
-                "occlusion_probability": 0.05  # Random landmark occlusion
-            },
-            "body_types": {
-                # Simulate different body proportions
-                "proportions": [
-                    {"name": "tall_thin", "height_scale": 1.15, "width_scale": 0.9},
-                    {"name": "short_stocky", "height_scale": 0.85, "width_scale": 1.1},
-                    {"name": "athletic", "height_scale": 1.0, "width_scale": 1.05},
-                    {"name": "average", "height_scale": 1.0, "width_scale": 1.0},
-                    {"name": "large", "height_scale": 1.1, "width_scale": 1.2}
-                ]
-            }
-        }
+        self.augmentation_params = deepcopy(DEFAULT_AUGMENTATION_PARAMS)
         
         # MediaPipe landmark connections for maintaining structure
         self.pose_connections = [
@@ -155,6 +177,50 @@ class PoseDataAugmenter:
         
         return augmented_sequences
     
+    def augment_batch(
+        self,
+        sequences: List[List[List[Dict]]],
+        augmentation_types: List[str] = ["spatial", "temporal", "noise"],
+        num_augmentations: int = 1,
+        epoch: int = 0
+    ) -> List[List[List[List[Dict]]]]:
+        """
+        Augment many sequences at once with the vectorized batch engine.
+        
+        Sequences may have different lengths; each must have 33 landmarks per frame.
+        
+        Args:
+            sequences: Landmark sequences (landmark dicts or [x, y, z, visibility] lists)
+            augmentation_types: Types of augmentation to apply
+            num_augmentations: Number of augmented versions per sequence
+            epoch: Epoch number for the per-sample random streams
+            
+        Returns:
+            For each input sequence, the list of its augmented sequences
+        """
+        arrays = [landmarks_to_pose_array(sequence, dtype="float64") for sequence in sequences]
+        if not arrays:
+            return []
+        
+        lengths = np.array([len(array) for array in arrays])
+        poses = np.stack([
+            np.concatenate([array, np.repeat(array[-1:], lengths.max() - len(array), axis=0)])
+            for array in arrays
+        ])
+        
+        engine = BatchPoseAugmenter(self.augmentation_params, self.seed)
+        results = [[] for _ in arrays]
+        for copy in range(num_augmentations):
+            # Same sample ids as AugmentedPoseLoader, so both produce identical copies
+            augmented, new_lengths = engine.augment(
+                poses, augmentation_types, lengths,
+                sample_indices=copy * len(arrays) + np.arange(len(arrays)), epoch=epoch
+            )
+            for i, (array, length) in enumerate(zip(augmented, new_lengths)):
+                results[i].append(pose_array_to_dicts(array[:length]))
+        
+        return results
+    
     def _apply_spatial_augmentation(self, landmarks: List[Dict]) -> List[Dict]:
         """Apply spatial transformations to landmarks."""
         # Random parameters
@@ -218,16 +284,8 @@ class PoseDataAugmenter:
     
     def _swap_left_right_landmarks(self, points: np.ndarray) -> np.ndarray:
         """Swap left and right landmarks for horizontal flip."""
-        # MediaPipe left/right landmark pairs
-        swap_pairs = [
-            (1, 2), (3, 6), (4, 5), (7, 8), (9, 10),
-            (11, 12), (13, 14), (15, 16), (17, 18),
-            (19, 20), (21, 22), (23, 24), (25, 26),
-            (27, 28), (29, 30), (31, 32)
-        ]
-        
         swapped = points.copy()
-        for left_idx, right_idx in swap_pairs:
+        for left_idx, right_idx in LEFT_RIGHT_PAIRS:
             if left_idx < len(points) and right_idx < len(points):
                 swapped[left_idx] = points[right_idx]
                 swapped[right_idx] = points[left_idx]
@@ -492,25 +550,338 @@ class PoseDataAugmenter:
         return error_sequence
 
 
+def _homogeneous(linear: np.ndarray, offset: np.ndarray) -> np.ndarray:
+    """Stack (..., 2, 2) linear parts and (..., 2) offsets into (..., 3, 3) affine matrices."""
+    shape = np.broadcast_shapes(linear.shape[:-2], offset.shape[:-1])
+    matrices = np.zeros(shape + (3, 3))
+    matrices[..., :2, :2] = linear
+    matrices[..., :2, 2] = offset
+    matrices[..., 2, 2] = 1.0
+    return matrices
+
+
+def _translation(offset: np.ndarray) -> np.ndarray:
+    return _homogeneous(np.eye(2), offset)
+
+
+def _apply_affine(poses: np.ndarray, matrices: np.ndarray) -> np.ndarray:
+    """Apply per-frame (N, T, 3, 3) affine matrices to the x/y channels of (N, T, 33, C) poses."""
+    xy1 = np.concatenate([poses[..., :2], np.ones(poses.shape[:-1] + (1,))], axis=-1)
+    result = poses.copy()
+    result[..., :2] = np.einsum('ntij,ntlj->ntli', matrices, xy1)[..., :2]
+    return result
+
+
+class BatchPoseAugmenter:
+    """
+    Vectorized augmentation engine for batches of pose sequences.
+
+    Operates on ``(sequences, frames, 33, C)`` arrays, where C is 3 (x, y, z)
+    or 4 (x, y, z, visibility), instead of nested landmark dictionaries.
+    Spatial and body-proportion changes are composed into one affine matrix
+    per frame and applied to the whole batch at once.
+
+    Each sample draws its parameters and noise from its own
+    ``np.random.Generator`` keyed by ``(seed, epoch, sample_index)``, so the
+    output for a sample does not depend on batch composition, order or on
+    which worker produced it.
+    """
+    
+    def __init__(self, params: Optional[Dict[str, Any]] = None, seed: int = 42):
+        """
+        Initialize the engine.
+        
+        Args:
+            params: Augmentation parameters (defaults to DEFAULT_AUGMENTATION_PARAMS)
+            seed: Base seed for the per-sample random streams
+        """
+        self.params = deepcopy(params if params is not None else DEFAULT_AUGMENTATION_PARAMS)
+        self.seed = seed
+    
+    def sample_rng(self, sample_index: int, epoch: int = 0) -> np.random.Generator:
+        """Random stream for one sample in one epoch."""
+        return np.random.default_rng([self.seed, epoch, sample_index])
+    
+    def augment(
+        self,
+        poses: np.ndarray,
+        augmentation_types: Sequence[str] = ("spatial", "temporal", "noise"),
+        lengths: Optional[np.ndarray] = None,
+        sample_indices: Optional[np.ndarray] = None,
+        epoch: int = 0
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Augment a batch of sequences.
+        
+        Args:
+            poses: Array of shape (sequences, frames, 33, C)
+            augmentation_types: Any of "temporal", "spatial", "noise", "body_type"
+            lengths: Number of valid frames per sequence (defaults to all frames)
+            sample_indices: Stable per-sample ids used to key the random streams
+                (defaults to the position in the batch)
+            epoch: Epoch number, so repeated passes get fresh augmentations
+            
+        Returns:
+            Tuple of the augmented array and the valid length of each sequence.
+            Frames past a sequence's length repeat its last frame.
+        """
+        poses = np.array(poses, dtype=np.float64)
+        if poses.ndim != 4 or poses.shape[2] != NUM_LANDMARKS or poses.shape[3] < 3:
+            raise ValueError(f"Expected poses of shape (sequences, frames, 33, C>=3), got {poses.shape}")
+        
+        num_sequences, num_frames = poses.shape[:2]
+        lengths = (np.full(num_sequences, num_frames) if lengths is None
+                   else np.asarray(lengths, dtype=int))
+        sample_indices = (np.arange(num_sequences) if sample_indices is None
+                          else np.asarray(sample_indices))
+        if len(lengths) != num_sequences or len(sample_indices) != num_sequences:
+            raise ValueError("lengths and sample_indices must have one entry per sequence")
+        if num_sequences and (lengths.min() < 1 or lengths.max() > num_frames):
+            raise ValueError("Sequence lengths must be between 1 and the number of frames")
+        
+        rngs = [self.sample_rng(int(index), epoch) for index in sample_indices]
+        
+        # Same order as PoseDataAugmenter.augment_sequence
+        if "temporal" in augmentation_types:
+            poses, lengths = self._resample(poses, lengths, rngs)
+        if "spatial" in augmentation_types:
+            poses = self._apply_spatial(poses, rngs)
+        if "noise" in augmentation_types:
+            poses = self._apply_noise(poses, lengths, rngs)
+        if "body_type" in augmentation_types:
+            poses = self._apply_body_proportion(poses, rngs)
+        
+        return poses, lengths
+    
+    def _resample(
+        self,
+        poses: np.ndarray,
+        lengths: np.ndarray,
+        rngs: List[np.random.Generator]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Change speed and drop frames by linearly interpolating along the time axis."""
+        config = self.params["temporal"]
+        drop_rate = config["frame_drop_rate"]
+        
+        positions = []
+        for length, rng in zip(lengths, rngs):
+            speed = rng.uniform(*config["speed_variation"])
+            new_length = max(int(length * speed), 1)
+            source = np.interp(np.arange(new_length), [0, max(new_length - 1, 1)], [0, length - 1])
+            if drop_rate > 0 and new_length > 2:
+                # Always keep first and last frames
+                keep = rng.random(new_length) > drop_rate
+                keep[[0, -1]] = True
+                source = source[keep]
+            positions.append(source)
+        
+        new_lengths = np.array([len(source) for source in positions])
+        grid = np.empty((len(positions), new_lengths.max() if len(positions) else 0))
+        for i, source in enumerate(positions):
+            grid[i, :len(source)] = source
+            grid[i, len(source):] = source[-1]
+        
+        lower = np.floor(grid).astype(int)
+        upper = np.minimum(lower + 1, (lengths - 1)[:, None])
+        alpha = (grid - lower)[:, :, None, None]
+        rows = np.arange(len(poses))[:, None]
+        resampled = poses[rows, lower] * (1 - alpha) + poses[rows, upper] * alpha
+        
+        return resampled, new_lengths
+    
+    def _apply_spatial(self, poses: np.ndarray, rngs: List[np.random.Generator]) -> np.ndarray:
+        """Scale, rotate and translate around each frame's center, then optionally mirror."""
+        config = self.params["spatial"]
+        num_sequences = len(rngs)
+        
+        scale = np.empty(num_sequences)
+        angle = np.empty(num_sequences)
+        translate = np.empty((num_sequences, 2))
+        flip = np.zeros(num_sequences, dtype=bool)
+        for i, rng in enumerate(rngs):
+            scale[i] = rng.uniform(*config["scale_range"])
+            translate[i] = rng.uniform(*config["translate_range"], size=2)
+            angle[i] = np.radians(rng.uniform(*config["rotate_range"]))
+            flip[i] = config["horizontal_flip"] and rng.random() < 0.5
+        
+        cos, sin = np.cos(angle), np.sin(angle)
+        linear = scale[:, None, None] * np.stack([
+            np.stack([cos, -sin], axis=-1),
+            np.stack([sin, cos], axis=-1)
+        ], axis=1)
+        mirror = np.where(flip[:, None, None], np.diag([-1.0, 1.0]), np.eye(2))
+        
+        center = poses[..., :2].mean(axis=2)
+        matrices = (
+            _homogeneous(mirror, np.stack([flip.astype(float), np.zeros(num_sequences)], axis=-1))[:, None]
+            @ _translation(center + translate[:, None])
+            @ _homogeneous(linear, np.zeros(2))[:, None]
+            @ _translation(-center)
+        )
+        
+        augmented = _apply_affine(poses, matrices)
+        augmented[flip] = augmented[flip][:, :, FLIP_PERMUTATION]
+        augmented[..., :2] = np.clip(augmented[..., :2], 0, 1)
+        augmented[..., 2] *= scale[:, None, None]
+        return augmented
+    
+    def _apply_noise(
+        self,
+        poses: np.ndarray,
+        lengths: np.ndarray,
+        rngs: List[np.random.Generator]
+    ) -> np.ndarray:
+        """Add position/visibility noise and random occlusion."""
+        config = self.params["noise"]
+        has_visibility = poses.shape[-1] > 3
+        
+        noise = np.zeros(poses.shape)
+        occluded = np.zeros(poses.shape[:3], dtype=bool)
+        for i, (length, rng) in enumerate(zip(lengths, rngs)):
+            # Draw only for valid frames so the stream does not depend on batch padding
+            shape = (length, NUM_LANDMARKS)
+            if config["gaussian_noise"] > 0:
+                noise[i, :length, :, :3] = rng.normal(0, config["gaussian_noise"], size=shape + (3,))
+            if has_visibility and config["visibility_noise"] > 0:
+                noise[i, :length, :, 3] = rng.normal(0, config["visibility_noise"], size=shape)
+            if has_visibility and config["occlusion_probability"] > 0:
+                occluded[i, :length] = rng.random(shape) < config["occlusion_probability"]
+        
+        augmented = poses + noise
+        augmented[..., :2] = np.clip(augmented[..., :2], 0, 1)
+        if has_visibility:
+            augmented[..., 3] = np.clip(augmented[..., 3], 0, 1)
+            augmented[..., 3][occluded] = 0.0
+        return augmented
+    
+    def _apply_body_proportion(self, poses: np.ndarray, rngs: List[np.random.Generator]) -> np.ndarray:
+        """Stretch height and width around the hip center."""
+        proportions = self.params["body_types"]["proportions"]
+        chosen = [proportions[rng.integers(len(proportions))] for rng in rngs]
+        
+        # Width change is less aggressive for a natural look
+        linear = np.zeros((len(chosen), 2, 2))
+        linear[:, 0, 0] = [body_type["width_scale"] ** 0.5 for body_type in chosen]
+        linear[:, 1, 1] = [body_type["height_scale"] for body_type in chosen]
+        
+        hip_center = poses[:, :, HIP_INDICES, :2].mean(axis=2)
+        matrices = (
+            _translation(hip_center)
+            @ _homogeneous(linear, np.zeros(2))[:, None]
+            @ _translation(-hip_center)
+        )
+        
+        augmented = _apply_affine(poses, matrices)
+        augmented[..., :2] = np.clip(augmented[..., :2], 0, 1)
+        return augmented
+
+
+class AugmentedPoseLoader:
+    """
+    On-the-fly data loader yielding augmented mini-batches.
+
+    Augmented copies are generated batch by batch as they are consumed, so an
+    expanded training set never has to be materialized to JSON. Each pass
+    over the loader is one epoch with fresh, reproducible augmentations.
+    ``poses`` may be a memory-mapped array (e.g. ``PoseDataset.load_arrays``);
+    only the rows of the current batch are read.
+    """
+    
+    def __init__(
+        self,
+        poses: np.ndarray,
+        labels: Optional[Sequence[Any]] = None,
+        lengths: Optional[Sequence[int]] = None,
+        batch_size: int = 32,
+        augmentation_types: Sequence[str] = ("spatial", "temporal", "noise"),
+        augmentations_per_sample: int = 1,
+        shuffle: bool = True,
+        augmenter: Optional[BatchPoseAugmenter] = None,
+        seed: int = 42
+    ):
+        """
+        Initialize the loader.
+        
+        Args:
+            poses: Array of shape (sequences, frames, 33, C)
+            labels: Optional per-sequence labels returned alongside each batch
+            lengths: Valid frames per sequence (defaults to all frames)
+            batch_size: Sequences per batch
+            augmentation_types: Augmentations to apply
+            augmentations_per_sample: Augmented copies of each sequence per epoch
+            shuffle: Shuffle the copies every epoch
+            augmenter: Engine to use (defaults to BatchPoseAugmenter(seed=seed))
+            seed: Seed for shuffling and the default engine
+        """
+        if batch_size < 1 or augmentations_per_sample < 1:
+            raise ValueError("batch_size and augmentations_per_sample must be positive")
+        
+        self.poses = poses
+        self.labels = np.asarray(labels) if labels is not None else None
+        self.lengths = (np.full(len(poses), poses.shape[1]) if lengths is None
+                        else np.asarray(lengths, dtype=int))
+        self.batch_size = batch_size
+        self.augmentation_types = tuple(augmentation_types)
+        self.augmentations_per_sample = augmentations_per_sample
+        self.shuffle = shuffle
+        self.augmenter = augmenter or BatchPoseAugmenter(seed=seed)
+        self.seed = seed
+        self.epoch = 0
+    
+    def __len__(self) -> int:
+        total = len(self.poses) * self.augmentations_per_sample
+        return -(-total // self.batch_size)
+    
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+        """Yield (poses, lengths, labels) batches for one epoch."""
+        epoch = self.epoch
+        self.epoch += 1
+        
+        num_sequences = len(self.poses)
+        # Copy k of sequence i has id k * num_sequences + i
+        order = np.arange(num_sequences * self.augmentations_per_sample)
+        if self.shuffle:
+            order = np.random.default_rng([self.seed, epoch]).permutation(order)
+        
+        for start in range(0, len(order), self.batch_size):
+            ids = order[start:start + self.batch_size]
+            sources = ids % num_sequences
+            # Sorted reads keep memory-mapped access sequential
+            read_order = np.argsort(sources, kind="stable")
+            batch = np.empty((len(ids),) + self.poses.shape[1:])
+            batch[read_order] = self.poses[sources[read_order]]
+            
+            augmented, lengths = self.augmenter.augment(
+                batch, self.augmentation_types, self.lengths[sources], ids, epoch
+            )
+            yield augmented, lengths, self.labels[sources] if self.labels is not None else None
+
+
 def create_balanced_dataset(
     input_data_path: str,
     output_path: str,
     target_samples_per_class: int = 100,
-    exercise_types: List[str] = ['squat', 'bench_press', 'deadlift']
+    exercise_types: List[str] = ['squat', 'bench_press', 'deadlift'],
+    seed: int = 42
 ) -> Dict[str, int]:
     """
     Create a balanced dataset with augmented samples.
     
+    Each exercise type is augmented as one batch; augmented copies are spread
+    round-robin over the available samples. To train without writing the
+    augmented samples to disk, use AugmentedPoseLoader instead.
+    
     Args:
         input_data_path: Path to input data
         output_path: Path to save augmented dataset
         target_samples_per_class: Target number of samples per exercise type
         exercise_types: List of exercise types to balance
+        seed: Seed for the augmentation streams
         
     Returns:
         Statistics about the created dataset
     """
-    augmenter = PoseDataAugmenter()
+    augmenter = PoseDataAugmenter(seed=seed)
     stats = {ex_type: 0 for ex_type in exercise_types}
     augmented_data = []
     
@@ -544,32 +915,33 @@ def create_balanced_dataset(
         augmented_data.extend(current_samples)
         stats[ex_type] = current_count
         
-        # Calculate how many augmentations needed
-        if current_count < target_samples_per_class:
-            augmentations_needed = target_samples_per_class - current_count
-            augmentations_per_sample = augmentations_needed // current_count + 1
-            
-            for sample in current_samples[:augmentations_needed]:
-                # Augment the sequence
-                landmark_sequence = sample.get('landmarks_sequence', [])
-                if landmark_sequence:
-                    augmented_sequences = augmenter.augment_sequence(
-                        landmark_sequence,
-                        augmentation_types=["spatial", "temporal", "noise"],
-                        num_augmentations=augmentations_per_sample
-                    )
-                    
-                    for aug_seq in augmented_sequences[:augmentations_needed - stats[ex_type]]:
-                        augmented_sample = deepcopy(sample)
-                        augmented_sample['landmarks_sequence'] = aug_seq
-                        augmented_sample['is_augmented'] = True
-                        augmented_sample['augmentation_id'] = f"{sample.get('data_id', 'unknown')}_aug_{stats[ex_type]}"
-                        
-                        augmented_data.append(augmented_sample)
-                        stats[ex_type] += 1
-                        
-                        if stats[ex_type] >= target_samples_per_class:
-                            break
+        augmentations_needed = target_samples_per_class - current_count
+        sources = [
+            sample for sample in current_samples
+            if sample.get('landmarks_sequence')
+            and all(len(frame) == NUM_LANDMARKS for frame in sample['landmarks_sequence'])
+        ]
+        if augmentations_needed <= 0 or not sources:
+            continue
+        
+        augmentations_per_sample = -(-augmentations_needed // len(sources))
+        augmented_sequences = augmenter.augment_batch(
+            [sample['landmarks_sequence'] for sample in sources],
+            augmentation_types=["spatial", "temporal", "noise"],
+            num_augmentations=augmentations_per_sample
+        )
+        
+        for copy in range(augmentations_per_sample):
+            for sample, sequences in zip(sources, augmented_sequences):
+                if stats[ex_type] >= target_samples_per_class:
+                    break
+                augmented_sample = {k: v for k, v in sample.items() if k != 'landmarks_sequence'}
+                augmented_sample['landmarks_sequence'] = sequences[copy]
+                augmented_sample['is_augmented'] = True
+                augmented_sample['augmentation_id'] = f"{sample.get('data_id', 'unknown')}_aug_{stats[ex_type]}"
+                
+                augmented_data.append(augmented_sample)
+                stats[ex_type] += 1
     
     # Save augmented dataset
     output_path = Path(output_path)
@@ -9,6 +9,11 @@ import json
 from datetime import datetime
 import numpy as np
 
+from ml.data.pose_codec import (
+    DEFAULT_DTYPE, POSE_FILE_SUFFIX, PoseArrays, decode_pose_arrays,
+    encode_pose_arrays, load_pose_file, pose_array_to_lists
+)
+
 
 @dataclass
 class Landmark:
@@ -101,17 +106,115 @@ class PoseDataset:
             version=data.get('version', '1.0')
         )
     
+    def landmark_array(self, dtype: str = 'float32') -> np.ndarray:
+        """Landmarks as a (frames, landmarks, 4) array of x, y, z, visibility."""
+        if not self.frames:
+            return np.zeros((0, len(LandmarkMapping.POSE_LANDMARKS), 4), dtype=dtype)
+        counts = {len(frame.landmarks) for frame in self.frames}
+        if len(counts) > 1:
+            raise ValueError("All frames must have the same number of landmarks")
+        return np.array(
+            [[(lm.x, lm.y, lm.z, lm.visibility) for lm in frame.landmarks] for frame in self.frames],
+            dtype=dtype
+        )
+    
+    def to_bytes(self, dtype: str = DEFAULT_DTYPE) -> bytes:
+        """
+        Encode the dataset in the compact binary pose format.
+        
+        Landmarks are stored as one (frames, landmarks, 4) array. Per-frame
+        fields become parallel arrays. Landmark names and dataset metadata
+        go into the small JSON header.
+        
+        Args:
+            dtype: Storage precision of the landmark array (float16 or float32)
+        """
+        names = [lm.name for lm in self.frames[0].landmarks] if self.frames else []
+        arrays = {
+            'landmarks': self.landmark_array(dtype),
+            'timestamps': np.array([f.timestamp for f in self.frames], dtype=np.float64),
+            'frame_numbers': np.array([f.frame_number for f in self.frames], dtype=np.int32),
+            'confidences': np.array([f.confidence for f in self.frames], dtype=np.float32),
+            'landmark_ids': np.array(
+                [lm.landmark_id for lm in self.frames[0].landmarks] if self.frames else [],
+                dtype=np.int16
+            ),
+        }
+        meta = {
+            'dataset_id': self.dataset_id,
+            'user_hash': self.user_hash,
+            'metadata': self.metadata.to_dict(),
+            'created_at': self.created_at.isoformat(),
+            'version': self.version,
+            'landmark_names': names,
+        }
+        return encode_pose_arrays(arrays, meta)
+    
+    @classmethod
+    def from_bytes(cls, data) -> 'PoseDataset':
+        """Create from the binary pose format (bytes, memoryview or mapped array)."""
+        return cls._from_pose_arrays(decode_pose_arrays(data))
+    
+    @classmethod
+    def _from_pose_arrays(cls, decoded: PoseArrays) -> 'PoseDataset':
+        meta = decoded.meta
+        landmark_ids = decoded['landmark_ids'].tolist()
+        names = meta.get('landmark_names') or [LandmarkMapping.get_landmark_name(i) for i in landmark_ids]
+        
+        frames = []
+        for points, timestamp, frame_number, confidence in zip(
+            pose_array_to_lists(decoded.landmarks),
+            decoded['timestamps'].tolist(),
+            decoded['frame_numbers'].tolist(),
+            decoded['confidences'].tolist()
+        ):
+            landmarks = [
+                Landmark(x=x, y=y, z=z, visibility=v, name=name, landmark_id=landmark_id)
+                for (x, y, z, v), name, landmark_id in zip(points, names, landmark_ids)
+            ]
+            frames.append(PoseFrame(
+                landmarks=landmarks,
+                timestamp=timestamp,
+                frame_number=frame_number,
+                confidence=confidence
+            ))
+        
+        return cls(
+            dataset_id=meta['dataset_id'],
+            user_hash=meta['user_hash'],
+            frames=frames,
+            metadata=ExerciseMetadata(**meta['metadata']),
+            created_at=datetime.fromisoformat(meta['created_at']),
+            version=meta.get('version', '1.0')
+        )
+    
     def save(self, filepath: str):
-        """Save dataset to JSON file."""
+        """Save dataset to a binary ``.pose`` file or, otherwise, a JSON file."""
+        if filepath.endswith(POSE_FILE_SUFFIX):
+            with open(filepath, 'wb') as f:
+                f.write(self.to_bytes())
+            return
         with open(filepath, 'w') as f:
             json.dump(self.to_dict(), f, indent=2)
     
     @classmethod
     def load(cls, filepath: str) -> 'PoseDataset':
-        """Load dataset from JSON file."""
+        """Load dataset from a binary ``.pose`` file or a JSON file."""
+        if filepath.endswith(POSE_FILE_SUFFIX):
+            return cls._from_pose_arrays(load_pose_file(filepath, mmap=False))
         with open(filepath, 'r') as f:
             data = json.load(f)
         return cls.from_dict(data)
+    
+    @staticmethod
+    def load_arrays(filepath: str) -> PoseArrays:
+        """
+        Memory-map a binary ``.pose`` file without building frame objects.
+        
+        Training and history readers should use this: arrays are views
+        over the page cache, so only the pages that are touched get read.
+        """
+        return load_pose_file(filepath, mmap=True)
 
 
 class DataAnonymizer:
@@ -0,0 +1,431 @@
+"""
+Embedded SQLite index for user contribution metadata.
+
+Consent records, session metadata, quality scores and annotations are
+kept in one WAL-mode database next to the blob files (raw packages,
+``.pose`` sidecars, annotated JSON), so statistics, filtering and exports
+are indexed queries instead of scans over every file.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "metadata.db"
+
+# Consent records from before the index; imported once, then archived
+LEGACY_CONSENT_FILENAME = "consent_records.json"
+LEGACY_ARCHIVE_SUFFIX = ".imported"
+
+# How long a writer waits for another writer's transaction before failing
+BUSY_TIMEOUT_SECONDS = 30.0
+
+QUALITY_BUCKETS = {"high": 0.8, "medium": 0.6}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS consent (
+    user_hash TEXT PRIMARY KEY,
+    consent_id TEXT NOT NULL,
+    consent_type TEXT NOT NULL,
+    purposes TEXT NOT NULL,
+    granted_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    duration_days INTEGER,
+    revoked INTEGER NOT NULL DEFAULT 0,
+    revoked_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    data_id TEXT PRIMARY KEY,
+    user_hash TEXT NOT NULL,
+    exercise_type TEXT NOT NULL,
+    collected_at TEXT NOT NULL,
+    frame_count INTEGER NOT NULL,
+    quality_score REAL NOT NULL,
+    has_annotations INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_hash);
+CREATE INDEX IF NOT EXISTS idx_sessions_exercise ON sessions(exercise_type, quality_score);
+CREATE INDEX IF NOT EXISTS idx_sessions_quality ON sessions(quality_score);
+CREATE TABLE IF NOT EXISTS annotations (
+    data_id TEXT PRIMARY KEY,
+    user_hash TEXT,
+    exercise_type TEXT,
+    annotator_id TEXT NOT NULL,
+    annotated_at TEXT NOT NULL,
+    mean_quality REAL,
+    fields TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_annotations_user ON annotations(user_hash);
+CREATE INDEX IF NOT EXISTS idx_annotations_quality ON annotations(mean_quality);
+CREATE TABLE IF NOT EXISTS annotation_errors (
+    data_id TEXT NOT NULL,
+    error TEXT NOT NULL,
+    PRIMARY KEY (data_id, error)
+);
+CREATE INDEX IF NOT EXISTS idx_annotation_errors_error ON annotation_errors(error);
+"""
+
+
+def session_row(package: Dict[str, Any]) -> Tuple:
+    """Index row for a raw data package."""
+    return (
+        package["data_id"],
+        package["user_hash"],
+        package.get("exercise_type", "unknown"),
+        package.get("collected_at", ""),
+        int(package.get("frame_count", 0)),
+        float(package.get("quality_metrics", {}).get("overall_score", 0.0)),
+        int(bool(package.get("user_annotations")))
+    )
+
+
+def annotation_row(annotated: Dict[str, Any]) -> Tuple[Tuple, List[str]]:
+    """Index row and error labels for an annotated data file."""
+    original = annotated.get("original_data", {})
+    annotations = annotated.get("annotations", {})
+    quality = annotated.get("computed_features", {}).get("aggregate_quality")
+    errors = [error for error, present in annotations.get("common_errors", {}).items() if present]
+    row = (
+        annotated["data_id"],
+        original.get("user_hash"),
+        original.get("exercise_type"),
+        annotated.get("annotator_id", ""),
+        annotated.get("annotated_at", ""),
+        float(quality["mean"]) if quality else None,
+        json.dumps(sorted(annotations))
+    )
+    return row, errors
+
+
+class MetadataIndex:
+    """
+    SQLite (WAL) index over a user contribution data directory.
+
+    Every thread gets its own connection. Writes run in ``BEGIN IMMEDIATE``
+    transactions, so concurrent writers (threads or processes) serialize on
+    the database lock instead of overwriting each other, while readers keep
+    reading the last committed state.
+    """
+
+    def __init__(self, data_dir: str):
+        """
+        Open (and if needed create) the index for a data directory.
+
+        A new index is populated once from the files already present in the
+        directory. The legacy consent records JSON is imported at the same
+        time and then archived, so it can never override later revocations.
+
+        Args:
+            data_dir: Data directory containing raw/ and annotated/
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.data_dir / INDEX_FILENAME
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        with self.transaction() as conn:
+            imported = conn.execute(
+                "SELECT 1 FROM index_meta WHERE key = 'files_imported'"
+            ).fetchone()
+            if not imported:
+                self._import_legacy_consent(conn)
+                self._import_files(conn)
+                conn.execute("INSERT INTO index_meta (key, value) VALUES ('files_imported', '1')")
+        if not imported:
+            self._archive_legacy_consent()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are managed explicitly
+            conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; commits on success and rolls back on error."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def _write(self, conn: Optional[sqlite3.Connection]) -> Iterator[sqlite3.Connection]:
+        """Join the caller's transaction or open a new one."""
+        if conn is not None:
+            yield conn
+        else:
+            with self.transaction() as conn:
+                yield conn
+
+    @contextmanager
+    def write_files(self, files: Dict[Path, bytes]) -> Iterator[sqlite3.Connection]:
+        """
+        Write blob files and index rows as one unit.
+
+        Files are first written to temporary names, the index changes are
+        made inside the yielded transaction, and the files are renamed into
+        place just before the commit. If anything fails the transaction is
+        rolled back and the new files are removed, so an indexed row never
+        points to a missing file.
+
+        Args:
+            files: Target path -> content
+        """
+        staged = []
+        placed = []
+        try:
+            for path, content in files.items():
+                tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}.{threading.get_ident()}")
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                staged.append((tmp_path, path))
+
+            with self.transaction() as conn:
+                yield conn
+                for tmp_path, path in staged:
+                    os.replace(tmp_path, path)
+                    placed.append(path)
+        except BaseException:
+            for tmp_path, path in staged:
+                for leftover in ([tmp_path, path] if path in placed else [tmp_path]):
+                    try:
+                        leftover.unlink()
+                    except FileNotFoundError:
+                        pass
+            raise
+
+    # Consent
+
+    def upsert_consent(self, record: Dict[str, Any], conn: Optional[sqlite3.Connection] = None):
+        """Insert or replace a consent record."""
+        with self._write(conn) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO consent "
+                "(user_hash, consent_id, consent_type, purposes, granted_at, expires_at, "
+                "duration_days, revoked, revoked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record["user_hash"], record["consent_id"], record["consent_type"],
+                    json.dumps(record.get("purposes", [])), record["granted_at"],
+                    record["expires_at"], record.get("duration_days"),
+                    int(record.get("revoked", False)), record.get("revoked_at")
+                )
+            )
+
+    def get_consent(self, user_hash: str) -> Optional[Dict[str, Any]]:
+        """Consent record for a user, or None."""
+        row = self._connection().execute(
+            "SELECT * FROM consent WHERE user_hash = ?", (user_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["purposes"] = json.loads(record["purposes"])
+        record["revoked"] = bool(record["revoked"])
+        return record
+
+    def revoke_consent(self, user_hash: str, revoked_at: str,
+                       conn: Optional[sqlite3.Connection] = None) -> bool:
+        """Mark a user's consent as revoked. Returns False if there is no record."""
+        with self._write(conn) as conn:
+            cursor = conn.execute(
+                "UPDATE consent SET revoked = 1, revoked_at = ? WHERE user_hash = ?",
+                (revoked_at, user_hash)
+            )
+            return cursor.rowcount > 0
+
+    def consent_counts(self) -> Tuple[int, int]:
+        """(total users, users whose consent is not revoked)."""
+        row = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(revoked = 0), 0) FROM consent"
+        ).fetchone()
+        return row[0], row[1]
+
+    # Sessions
+
+    def add_session(self, package: Dict[str, Any], conn: Optional[sqlite3.Connection] = None):
+        """Index a raw data package."""
+        with self._write(conn) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (data_id, user_hash, exercise_type, collected_at, "
+                "frame_count, quality_score, has_annotations) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                session_row(package)
+            )
+
+    def query_sessions(
+        self,
+        min_quality: Optional[float] = None,
+        exercise_type: Optional[str] = None,
+        user_hash: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Sessions matching the filters, oldest first."""
+        clauses, params = [], []
+        if min_quality is not None:
+            clauses.append("quality_score >= ?")
+            params.append(min_quality)
+        if exercise_type is not None:
+            clauses.append("exercise_type = ?")
+            params.append(exercise_type)
+        if user_hash is not None:
+            clauses.append("user_hash = ?")
+            params.append(user_hash)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT * FROM sessions {where} ORDER BY collected_at, data_id", params
+        )
+        return [dict(row) for row in rows]
+
+    def session_stats(self) -> Dict[str, Any]:
+        """Session counts by exercise type and quality bucket."""
+        conn = self._connection()
+        total, high, medium = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(quality_score >= ?), 0), "
+            "COALESCE(SUM(quality_score >= ? AND quality_score < ?), 0) FROM sessions",
+            (QUALITY_BUCKETS["high"], QUALITY_BUCKETS["medium"], QUALITY_BUCKETS["high"])
+        ).fetchone()
+        exercise_types = dict(conn.execute(
+            "SELECT exercise_type, COUNT(*) FROM sessions GROUP BY exercise_type ORDER BY exercise_type"
+        ).fetchall())
+        return {
+            "total_sessions": total,
+            "exercise_types": exercise_types,
+            "quality_distribution": {"high": high, "medium": medium, "low": total - high - medium}
+        }
+
+    def remove_user(self, user_hash: str, conn: Optional[sqlite3.Connection] = None) -> List[str]:
+        """Remove every indexed row of a user. Returns the removed session ids."""
+        with self._write(conn) as conn:
+            data_ids = [row[0] for row in conn.execute(
+                "SELECT data_id FROM sessions WHERE user_hash = ? "
+                "UNION SELECT data_id FROM annotations WHERE user_hash = ?",
+                (user_hash, user_hash)
+            )]
+            conn.executemany("DELETE FROM annotation_errors WHERE data_id = ?", [(i,) for i in data_ids])
+            conn.execute("DELETE FROM annotations WHERE user_hash = ?", (user_hash,))
+            conn.execute("DELETE FROM sessions WHERE user_hash = ?", (user_hash,))
+            return data_ids
+
+    # Annotations
+
+    def add_annotation(self, annotated: Dict[str, Any], conn: Optional[sqlite3.Connection] = None):
+        """Index an annotated data file."""
+        row, errors = annotation_row(annotated)
+        with self._write(conn) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO annotations (data_id, user_hash, exercise_type, annotator_id, "
+                "annotated_at, mean_quality, fields) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+            conn.execute("DELETE FROM annotation_errors WHERE data_id = ?", (row[0],))
+            conn.executemany(
+                "INSERT INTO annotation_errors (data_id, error) VALUES (?, ?)",
+                [(row[0], error) for error in errors]
+            )
+
+    def query_annotations(self, min_quality: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Annotated sessions, oldest first.
+
+        min_quality only applies to sessions that have a quality score;
+        annotations without form quality ratings are always included.
+        """
+        sql = "SELECT * FROM annotations"
+        params = []
+        if min_quality is not None:
+            sql += " WHERE mean_quality IS NULL OR mean_quality >= ?"
+            params.append(min_quality)
+        rows = self._connection().execute(sql + " ORDER BY annotated_at, data_id", params)
+        results = []
+        for row in rows:
+            record = dict(row)
+            record["fields"] = json.loads(record["fields"])
+            results.append(record)
+        return results
+
+    def annotation_stats(self) -> Dict[str, Any]:
+        """Annotation counts, quality buckets (per 10 points) and error frequencies."""
+        conn = self._connection()
+        return {
+            "annotated_files": conn.execute("SELECT COUNT(*) FROM annotations").fetchone()[0],
+            "quality_distribution": dict(conn.execute(
+                "SELECT CAST(mean_quality / 10 AS INTEGER) * 10 AS bucket, COUNT(*) FROM annotations "
+                "WHERE mean_quality IS NOT NULL GROUP BY bucket ORDER BY bucket"
+            ).fetchall()),
+            "common_errors_frequency": dict(conn.execute(
+                "SELECT error, COUNT(*) FROM annotation_errors GROUP BY error ORDER BY error"
+            ).fetchall())
+        }
+
+    # Import of existing files
+
+    def rebuild(self):
+        """
+        Re-index every file in the data directory (e.g. after manual changes).
+
+        Consent lives only in the index and is left untouched.
+        """
+        with self.transaction() as conn:
+            for table in ("sessions", "annotations", "annotation_errors"):
+                conn.execute(f"DELETE FROM {table}")
+            self._import_files(conn)
+
+    def _import_legacy_consent(self, conn: sqlite3.Connection):
+        consent_file = self.data_dir / LEGACY_CONSENT_FILENAME
+        if consent_file.exists():
+            for record in _read_json(consent_file, {}).values():
+                self.upsert_consent(record, conn=conn)
+
+    def _archive_legacy_consent(self):
+        consent_file = self.data_dir / LEGACY_CONSENT_FILENAME
+        try:
+            os.replace(consent_file, consent_file.with_name(consent_file.name + LEGACY_ARCHIVE_SUFFIX))
+        except FileNotFoundError:
+            pass
+
+    def _import_files(self, conn: sqlite3.Connection):
+        for raw_file in sorted((self.data_dir / "raw").glob("*.json")):
+            package = _read_json(raw_file, None)
+            if isinstance(package, dict) and "data_id" in package and "user_hash" in package:
+                self.add_session(package, conn=conn)
+
+        for annotated_file in sorted((self.data_dir / "annotated").glob("*_annotated.json")):
+            annotated = _read_json(annotated_file, None)
+            if isinstance(annotated, dict) and "data_id" in annotated:
+                self.add_annotation(annotated, conn=conn)
+
+
+def _read_json(path: Path, default: Any) -> Any:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading {path}: {e}")
+        return default
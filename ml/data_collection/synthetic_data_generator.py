@@ -329,7 +329,7 @@ class SyntheticPoseGenerator:
         # Lower the hips and bend knees
         pose[23:25, 1] += 0.25  # hips down
         pose[25:27, 1] += 0.15  # knees slightly down
-        pose[25:27, 0] = [[0.42, 0], [0.58, 0]]  # knees out
+        pose[25:27, 0] = [0.42, 0.58]  # knees out
         
         # Lean torso forward slightly
         pose[11:13, 1] += 0.05  # shoulders forward
@@ -363,7 +363,7 @@ class SyntheticPoseGenerator:
         # Lower body (higher in frame)
         pose[23:25] = [[0.45, 0.75, 0.05], [0.55, 0.75, 0.05]]  # hips
         pose[25:27] = [[0.44, 0.85, 0.02], [0.56, 0.85, 0.02]]  # knees
-        pose[27:33] = [[0.43, 0.95, 0], [0.57, 0.95, 0]].repeat(3, axis=0)  # ankles/feet
+        pose[27:33] = np.tile([[0.43, 0.95, 0], [0.57, 0.95, 0]], (3, 1))  # ankles/feet
         
         return pose
     
@@ -6,16 +6,46 @@ import os
 import json
 import hashlib
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import logging
 from pathlib import Path
 import numpy as np
 
+from ml.data.pose_codec import (
+    POSE_FILE_SUFFIX, encode_landmarks, load_pose_file, pose_array_to_dicts
+)
+from .metadata_index import MetadataIndex
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def resolve_landmarks(data: Dict[str, Any], raw_dir: Path) -> List[List[Dict]]:
+    """
+    Landmark sequence of a raw data package.
+    
+    Packages written by current versions keep landmarks in a binary
+    ``.pose`` sidecar next to the JSON file. Older packages embed
+    ``landmarks_sequence`` directly.
+    """
+    if "landmarks_sequence" in data:
+        return data["landmarks_sequence"]
+    if data.get("landmarks_file"):
+        landmarks = load_pose_file(str(Path(raw_dir) / data["landmarks_file"])).landmarks
+        return pose_array_to_dicts(landmarks)
+    return []
+
+
+def load_raw_package(raw_file: Path) -> Dict[str, Any]:
+    """Load a raw data package with its landmark sequence resolved."""
+    raw_file = Path(raw_file)
+    with open(raw_file, 'r') as f:
+        data = json.load(f)
+    data["landmarks_sequence"] = resolve_landmarks(data, raw_file.parent)
+    return data
+
+
 class UserDataCollector:
     """Manages user data collection with consent and privacy protection."""
     
@@ -31,27 +61,10 @@ class UserDataCollector:
         for dir_path in [self.raw_dir, self.annotated_dir, self.metadata_dir]:
             dir_path.mkdir(exist_ok=True)
         
-        # Load consent records
+        # Consent, session metadata and quality scores are kept in an
+        # indexed SQLite database next to the blob files
         self.consent_file = self.data_dir / "consent_records.json"
-        self.consent_records = self._load_consent_records()
-    
-    def _load_consent_records(self) -> Dict[str, Any]:
-        """Load existing consent records."""
-        if self.consent_file.exists():
-            try:
-                with open(self.consent_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading consent records: {e}")
-        return {}
-    
-    def _save_consent_records(self):
-        """Save consent records to file."""
-        try:
-            with open(self.consent_file, 'w') as f:
-                json.dump(self.consent_records, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving consent records: {e}")
+        self.index = MetadataIndex(str(self.data_dir))
     
     def record_consent(
         self, 
@@ -84,13 +97,12 @@ class UserDataCollector:
             "consent_type": consent_type,
             "purposes": purposes,
             "granted_at": datetime.now().isoformat(),
-            "expires_at": (datetime.now() + datetime.timedelta(days=duration_days)).isoformat(),
+            "expires_at": (datetime.now() + timedelta(days=duration_days)).isoformat(),
             "duration_days": duration_days,
             "revoked": False
         }
         
-        self.consent_records[hashed_user_id] = consent_record
-        self._save_consent_records()
+        self.index.upsert_consent(consent_record)
         
         logger.info(f"Recorded consent for user {hashed_user_id}")
         return consent_record
@@ -99,11 +111,10 @@ class UserDataCollector:
         """Check if user has valid consent."""
         hashed_user_id = hashlib.sha256(user_id.encode()).hexdigest()[:16]
         
-        if hashed_user_id not in self.consent_records:
+        record = self.index.get_consent(hashed_user_id)
+        if record is None:
             return False
         
-        record = self.consent_records[hashed_user_id]
-        
         # Check if consent is revoked
         if record.get("revoked", False):
             return False
@@ -119,19 +130,17 @@ class UserDataCollector:
         """Revoke user consent and remove their data."""
         hashed_user_id = hashlib.sha256(user_id.encode()).hexdigest()[:16]
         
-        if hashed_user_id in self.consent_records:
-            # Mark consent as revoked
-            self.consent_records[hashed_user_id]["revoked"] = True
-            self.consent_records[hashed_user_id]["revoked_at"] = datetime.now().isoformat()
-            self._save_consent_records()
-            
-            # Remove user's data
-            self._remove_user_data(hashed_user_id)
-            
-            logger.info(f"Revoked consent and removed data for user {hashed_user_id}")
-            return True
+        with self.index.transaction() as conn:
+            # Mark consent as revoked and drop the user's index rows
+            if not self.index.revoke_consent(hashed_user_id, datetime.now().isoformat(), conn=conn):
+                return False
+            self.index.remove_user(hashed_user_id, conn=conn)
+        
+        # Remove user's data (no longer visible through the index)
+        self._remove_user_data(hashed_user_id)
         
-        return False
+        logger.info(f"Revoked consent and removed data for user {hashed_user_id}")
+        return True
     
     def _remove_user_data(self, hashed_user_id: str):
         """Remove all data associated with a user."""
@@ -142,8 +151,9 @@ class UserDataCollector:
             except Exception as e:
                 logger.error(f"Error removing file {file_path}: {e}")
         
-        # Remove annotated data
-        for file_path in self.annotated_dir.glob(f"{hashed_user_id}_*"):
+        # Remove annotated data and legacy metadata files
+        for file_path in [*self.annotated_dir.glob(f"{hashed_user_id}_*"),
+                          *self.metadata_dir.glob(f"{hashed_user_id}_*")]:
             try:
                 file_path.unlink()
             except Exception as e:
@@ -178,13 +188,14 @@ class UserDataCollector:
         hashed_user_id = hashlib.sha256(user_id.encode()).hexdigest()[:16]
         data_id = f"{hashed_user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         
-        # Prepare data package
+        # Prepare data package (landmarks go to a binary sidecar file)
+        landmarks_file = f"{data_id}{POSE_FILE_SUFFIX}"
         data_package = {
             "data_id": data_id,
             "user_hash": hashed_user_id,
             "collected_at": datetime.now().isoformat(),
             "exercise_type": exercise_type,
-            "landmarks_sequence": landmarks_sequence,
+            "landmarks_file": landmarks_file,
             "frame_count": len(landmarks_sequence),
             "analysis_results": analysis_results,
             "user_annotations": user_annotations or {},
@@ -195,27 +206,15 @@ class UserDataCollector:
         # Add quality metrics
         data_package["quality_metrics"] = self._calculate_quality_metrics(landmarks_sequence)
         
-        # Save data
+        # Save landmarks, raw data and the index row together
         try:
-            # Save raw data
             raw_file = self.raw_dir / f"{data_id}.json"
-            with open(raw_file, 'w') as f:
-                json.dump(data_package, f, indent=2)
-            
-            # Save metadata
-            metadata = {
-                "data_id": data_id,
-                "user_hash": hashed_user_id,
-                "exercise_type": exercise_type,
-                "collected_at": data_package["collected_at"],
-                "frame_count": data_package["frame_count"],
-                "quality_score": data_package["quality_metrics"]["overall_score"],
-                "has_annotations": bool(user_annotations)
-            }
-            
-            metadata_file = self.metadata_dir / f"{data_id}_meta.json"
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            with self.index.write_files({
+                # Landmarks as a compact (frames, 33, 4) array
+                self.raw_dir / landmarks_file: encode_landmarks(landmarks_sequence),
+                raw_file: json.dumps(data_package, indent=2).encode("utf-8")
+            }) as conn:
+                self.index.add_session(data_package, conn=conn)
             
             logger.info(f"Collected exercise data: {data_id}")
             return data_id
@@ -271,61 +270,42 @@ class UserDataCollector:
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about collected data."""
-        stats = {
-            "total_users": len(self.consent_records),
-            "active_consents": sum(1 for r in self.consent_records.values() if not r.get("revoked", False)),
-            "total_sessions": len(list(self.raw_dir.glob("*.json"))),
-            "annotated_sessions": len(list(self.annotated_dir.glob("*.json"))),
-            "exercise_types": {},
-            "quality_distribution": {"high": 0, "medium": 0, "low": 0}
-        }
+        total_users, active_consents = self.index.consent_counts()
+        session_stats = self.index.session_stats()
         
-        # Analyze metadata
-        for meta_file in self.metadata_dir.glob("*_meta.json"):
-            try:
-                with open(meta_file, 'r') as f:
-                    metadata = json.load(f)
-                    
-                    # Count exercise types
-                    ex_type = metadata.get("exercise_type", "unknown")
-                    stats["exercise_types"][ex_type] = stats["exercise_types"].get(ex_type, 0) + 1
-                    
-                    # Quality distribution
-                    quality_score = metadata.get("quality_score", 0)
-                    if quality_score >= 0.8:
-                        stats["quality_distribution"]["high"] += 1
-                    elif quality_score >= 0.6:
-                        stats["quality_distribution"]["medium"] += 1
-                    else:
-                        stats["quality_distribution"]["low"] += 1
-                        
-            except Exception as e:
-                logger.error(f"Error reading metadata {meta_file}: {e}")
-        
-        return stats
+        return {
+            "total_users": total_users,
+            "active_consents": active_consents,
+            "total_sessions": session_stats["total_sessions"],
+            "annotated_sessions": self.index.annotation_stats()["annotated_files"],
+            "exercise_types": session_stats["exercise_types"],
+            "quality_distribution": session_stats["quality_distribution"]
+        }
     
-    def export_anonymized_dataset(self, output_path: str, min_quality_score: float = 0.6) -> int:
+    def export_anonymized_dataset(
+        self,
+        output_path: str,
+        min_quality_score: float = 0.6,
+        exercise_type: Optional[str] = None
+    ) -> int:
         """
         Export anonymized dataset for training.
         
         Args:
             output_path: Path to save the dataset
             min_quality_score: Minimum quality score for inclusion
+            exercise_type: Only export this exercise type (all if None)
             
         Returns:
             Number of samples exported
         """
         exported_data = []
         
-        for data_file in self.raw_dir.glob("*.json"):
+        # Only sessions passing the filters are read from disk
+        for session in self.index.query_sessions(min_quality=min_quality_score, exercise_type=exercise_type):
+            data_file = self.raw_dir / f"{session['data_id']}.json"
             try:
-                with open(data_file, 'r') as f:
-                    data = json.load(f)
-                
-                # Check quality
-                quality_score = data.get("quality_metrics", {}).get("overall_score", 0)
-                if quality_score < min_quality_score:
-                    continue
+                data = load_raw_package(data_file)
                 
                 # Remove identifying information
                 anonymized_data = {
@@ -9,6 +9,9 @@ import logging
 import os
 from datetime import datetime
 
+from utils.kinematics import point_angle, triplet_angles
+from ml.models.registry import model_registry
+
 # Optional ML imports
 try:
     from sklearn.ensemble import RandomForestClassifier
@@ -26,6 +29,30 @@ logger = logging.getLogger(__name__)
 class ExerciseClassifier:
     """Classifies exercises based on pose landmarks."""
     
+    # Column order of the feature matrix (same order as _extract_features)
+    FEATURE_NAMES = [
+        'left_knee_angle', 'right_knee_angle',
+        'left_hip_angle', 'right_hip_angle',
+        'left_elbow_angle', 'right_elbow_angle',
+        'hip_height', 'shoulder_height', 'knee_height',
+        'torso_vertical_ratio', 'knee_forward_distance'
+    ]
+    
+    exercise_labels = ['squat', 'deadlift', 'bench_press', 'unknown']
+    
+    # Name of the trained model in the model registry
+    ARTIFACT_NAME = 'exercise_classifier'
+    
+    # Joint angle features (MediaPipe indices: end, vertex, end)
+    JOINT_TRIPLETS = {
+        'left_knee_angle': (23, 25, 27),
+        'right_knee_angle': (24, 26, 28),
+        'left_hip_angle': (11, 23, 25),
+        'right_hip_angle': (12, 24, 26),
+        'left_elbow_angle': (11, 13, 15),
+        'right_elbow_angle': (12, 14, 16),
+    }
+    
     def __init__(self, use_ml: bool = True):
         """
         Initialize the exercise classifier.
@@ -36,6 +63,8 @@ class ExerciseClassifier:
         self.use_ml = use_ml and ML_AVAILABLE
         self.model = None
         self.scaler = None
+        self.model_version = None
+        # Unversioned model file used before the registry existed
         self.model_path = "ml/models/exercise_classifier_model.pkl"
         
         if self.use_ml:
@@ -75,6 +104,7 @@ class ExerciseClassifier:
         features = self._extract_features(landmarks)
         
         # Try ML classification first if available
+        self._sync_model()
         if self.use_ml and self.model is not None:
             try:
                 return self._ml_classify(features)
@@ -173,14 +203,87 @@ class ExerciseClassifier:
         Returns:
             Angle in degrees
         """
-        v1 = p1 - p2
-        v2 = p3 - p2
+        return point_angle(p1, p2, p3)
+    
+    def extract_features_batch(self, landmarks: np.ndarray) -> np.ndarray:
+        """
+        Extract features for a whole sequence with array operations.
         
-        # Calculate angle using dot product
-        cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-6)
-        angle = np.arccos(np.clip(cos_angle, -1.0, 1.0))
+        Args:
+            landmarks: (frames, 33, >=3) array of pose landmarks
+            
+        Returns:
+            (frames, len(FEATURE_NAMES)) feature matrix
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64)[..., :3]
+        angles = triplet_angles(landmarks, self.JOINT_TRIPLETS)
+        
+        hip_height = (landmarks[:, 23, 1] + landmarks[:, 24, 1]) / 2
+        shoulder_height = (landmarks[:, 11, 1] + landmarks[:, 12, 1]) / 2
+        knee_height = (landmarks[:, 25, 1] + landmarks[:, 26, 1]) / 2
+        knee_forward = (
+            (landmarks[:, 25, 2] + landmarks[:, 26, 2]) / 2 -
+            (landmarks[:, 23, 2] + landmarks[:, 24, 2]) / 2
+        )
         
-        return np.degrees(angle)
+        return np.column_stack([
+            angles['left_knee_angle'], angles['right_knee_angle'],
+            angles['left_hip_angle'], angles['right_hip_angle'],
+            angles['left_elbow_angle'], angles['right_elbow_angle'],
+            hip_height, shoulder_height, knee_height,
+            np.abs(shoulder_height - hip_height), knee_forward
+        ])
+    
+    def predict(self, features: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """
+        Classify a batch of feature vectors with a single model call.
+        
+        Args:
+            features: (n, len(FEATURE_NAMES)) feature matrix
+            
+        Returns:
+            (labels, confidences) for each row
+        """
+        features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        if len(features) == 0:
+            return [], np.zeros(0)
+        
+        self._sync_model()
+        if self.use_ml and self._is_fitted():
+            try:
+                scaled = self.scaler.transform(features) if self.scaler is not None else features
+                probabilities = self.model.predict_proba(scaled)
+                best = np.argmax(probabilities, axis=1)
+                labels = [str(label) for label in self.model.classes_[best]]
+                return labels, probabilities[np.arange(len(best)), best]
+            except Exception as e:
+                logger.warning(f"Batch ML classification failed, falling back to rules: {e}")
+        
+        return self._rule_based_classify_batch(features)
+    
+    def _is_fitted(self) -> bool:
+        """Whether the ML model has been trained or loaded."""
+        return self.model is not None and hasattr(self.model, 'classes_')
+    
+    def _rule_based_classify_batch(self, features: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """Vectorized version of _rule_based_classify."""
+        column = {name: features[:, i] for i, name in enumerate(self.FEATURE_NAMES)}
+        avg_knee = (column['left_knee_angle'] + column['right_knee_angle']) / 2
+        avg_hip = (column['left_hip_angle'] + column['right_hip_angle']) / 2
+        avg_elbow = (column['left_elbow_angle'] + column['right_elbow_angle']) / 2
+        
+        bench_press = (
+            (column['torso_vertical_ratio'] < 0.3) &
+            (column['shoulder_height'] > column['hip_height']) &
+            (avg_elbow < 160)
+        )
+        squat = (avg_knee < 120) & (avg_hip < 160) & (column['knee_forward_distance'] > 0)
+        deadlift = (avg_hip < 90) & (avg_knee > 120)
+        
+        conditions = [bench_press, squat, deadlift]
+        labels = np.select(conditions, ['bench_press', 'squat', 'deadlift'], default='unknown')
+        confidences = np.select(conditions, [0.85, 0.90, 0.85], default=0.3)
+        return labels.tolist(), confidences
     
     def _rule_based_classify(self, features: Dict[str, float]) -> Dict[str, Any]:
         """
@@ -264,9 +367,8 @@ class ExerciseClassifier:
         X = np.array(X)
         y = np.array(y)
         
-        # Initialize model if needed
-        if self.model is None:
-            self._initialize_ml_model()
+        # Always train a fresh estimator: a loaded model is shared through the registry
+        self._initialize_ml_model()
         
         # Scale features
         X_scaled = self.scaler.fit_transform(X)
@@ -279,30 +381,55 @@ class ExerciseClassifier:
         self.save_model()
     
     def save_model(self):
-        """Save the trained model."""
+        """Publish the trained model as a new registry version."""
         if not ML_AVAILABLE or self.model is None:
             return
         
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        
+        timestamp = datetime.now().isoformat()
         model_data = {
             'model': self.model,
             'scaler': self.scaler,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp
         }
         
-        joblib.dump(model_data, self.model_path)
-        logger.info(f"Model saved to {self.model_path}")
+        self.model_version = model_registry.publish(
+            self.ARTIFACT_NAME,
+            model_data,
+            metadata={
+                'timestamp': timestamp,
+                'classes': [str(label) for label in getattr(self.model, 'classes_', [])],
+                'feature_names': self.FEATURE_NAMES,
+            }
+        )
+        logger.info(f"Model saved as {self.ARTIFACT_NAME}@{self.model_version}")
     
     def load_model(self):
-        """Load a pre-trained model."""
-        if not ML_AVAILABLE or not os.path.exists(self.model_path):
+        """Load the current model from the registry (shared by all instances in the process)."""
+        if not ML_AVAILABLE:
+            return
+        
+        artifact = model_registry.get(self.ARTIFACT_NAME, legacy_path=self.model_path)
+        if artifact is None:
             return
         
-        model_data = joblib.load(self.model_path)
-        self.model = model_data['model']
-        self.scaler = model_data['scaler']
-        logger.info(f"Model loaded from {self.model_path}")
+        self._apply_artifact(artifact)
+        logger.info(f"Model loaded: {self.ARTIFACT_NAME}@{artifact.version}")
+    
+    def _sync_model(self):
+        """Pick up a newer published model version (hot-swap after retraining)."""
+        if not self.use_ml:
+            return
+        
+        artifact = model_registry.get(self.ARTIFACT_NAME, legacy_path=self.model_path)
+        if artifact is not None and artifact.version != self.model_version:
+            self._apply_artifact(artifact)
+            logger.info(f"Model hot-swapped to {self.ARTIFACT_NAME}@{artifact.version}")
+    
+    def _apply_artifact(self, artifact):
+        """Adopt the estimator and scaler of a registry artifact."""
+        self.model = artifact.payload['model']
+        self.scaler = artifact.payload['scaler']
+        self.model_version = artifact.version
 
 
 # Batch classification for multiple frames
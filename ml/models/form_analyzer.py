@@ -11,6 +11,9 @@ import logging
 from datetime import datetime
 import json
 
+from utils.kinematics import point_angle
+from ml.models.registry import model_registry
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -137,19 +140,10 @@ class LiteFormAnalyzer(BaseFormAnalyzer):
         if len(landmarks) < 33:  # MediaPipe pose has 33 landmarks
             return angles
         
-        # Helper function to calculate angle between three points
+        # Angle at p2 in the image plane
         def calculate_angle(p1, p2, p3):
             """Calculate angle at p2."""
-            a = np.array([p1['x'], p1['y']])
-            b = np.array([p2['x'], p2['y']])
-            c = np.array([p3['x'], p3['y']])
-            
-            ba = a - b
-            bc = c - b
-            
-            cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-            angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-            return np.degrees(angle)
+            return point_angle(p1, p2, p3, dims=2)
         
         # Calculate key angles
         try:
@@ -410,20 +404,30 @@ class AdvancedFormAnalyzer(BaseFormAnalyzer):
     
     def _try_initialize_models(self):
         """Attempt to initialize ML models if environment supports it."""
+        # CPU-capable models come straight from the shared registry (loaded once per process)
+        for name in ('personal_adaptation', 'form_classifier'):
+            self._load_registered_model(name)
+        
         try:
             # Check if we have GPU support
             import torch
             if torch.cuda.is_available():
                 logger.info("GPU detected, attempting to load advanced models...")
-                # Model loading would happen here in production
-                # self.models['pose_3d'] = self._load_pose_3d_model()
-                # self.models['motion_lstm'] = self._load_motion_model()
-                # etc.
-                pass
+                for name in ('pose_3d', 'motion_lstm'):
+                    self._load_registered_model(name)
             else:
                 logger.info("No GPU detected, advanced features disabled")
         except ImportError:
             logger.info("PyTorch not available, advanced features disabled")
+        
+        self.models_initialized = any(model is not None for model in self.models.values())
+    
+    def _load_registered_model(self, name: str):
+        """Fetch a model artifact named ``form_<name>`` from the model registry."""
+        artifact = model_registry.get(f"form_{name}")
+        if artifact is not None:
+            self.models[name] = artifact.payload
+            logger.info(f"Loaded {name} model version {artifact.version}")
     
     def analyze(self, pose_data: Dict[str, Any], user_profile: Optional[Dict] = None) -> Dict[str, Any]:
         """
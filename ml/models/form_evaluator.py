@@ -8,6 +8,8 @@ from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 import logging
 
+from utils.kinematics import joint_angles, point_angle, triplet_angles, vector_angle, vector_angles
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -385,17 +387,11 @@ class FormEvaluator:
     
     def _calculate_angle(self, p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> float:
         """Calculate angle between three points."""
-        v1 = p1 - p2
-        v2 = p3 - p2
-        cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-6)
-        angle = np.arccos(np.clip(cos_angle, -1.0, 1.0))
-        return np.degrees(angle)
+        return point_angle(p1, p2, p3)
     
     def _angle_between_vectors(self, v1: np.ndarray, v2: np.ndarray) -> float:
         """Calculate angle between two vectors."""
-        cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-6)
-        angle = np.arccos(np.clip(cos_angle, -1.0, 1.0))
-        return np.degrees(angle)
+        return vector_angle(v1, v2)
     
     def _calculate_wrist_angle(self, elbow: np.ndarray, wrist: np.ndarray) -> float:
         """Calculate wrist deviation angle."""
@@ -436,6 +432,212 @@ class FormEvaluator:
             severity = 'error'
         
         return score, severity
+    
+    def evaluate_sequence(
+        self,
+        landmark_sequence: Any,
+        phase_sequence: Optional[List[Optional[str]]] = None
+    ) -> 'SequenceEvaluation':
+        """
+        Evaluate form for a whole sequence with array operations.
+        
+        Every criterion metric is computed as a (frames,) array and scored
+        with the vectorized tolerance function. No per-frame feedback objects
+        are created; use SequenceEvaluation.frame_feedback to build them for
+        a specific frame on request.
+        
+        Args:
+            landmark_sequence: (frames, 33, >=3) array or list of 33x3 arrays
+            phase_sequence: Optional list of phases for each frame
+            
+        Returns:
+            SequenceEvaluation holding per-frame scores and metrics
+        """
+        landmarks = np.asarray(landmark_sequence, dtype=np.float64)
+        if landmarks.ndim != 3 or len(landmarks) == 0:
+            landmarks = np.zeros((0, 33, 3))
+        landmarks = landmarks[..., :3]
+        phases = np.array(
+            phase_sequence if phase_sequence else [None] * len(landmarks),
+            dtype=object
+        )
+        
+        metrics = self._calculate_metrics_batch(landmarks, phases)
+        
+        criterion_scores = {}
+        criterion_severity = {}
+        total_score = np.zeros(len(landmarks))
+        total_weight = np.zeros(len(landmarks))
+        
+        for criterion, config in self.evaluation_criteria.items():
+            if criterion not in metrics:
+                continue
+            values = metrics[criterion]
+            present = ~np.isnan(values)
+            scores, severity = self._evaluate_criterion_batch(values, config['ideal'], config['tolerance'])
+            criterion_scores[criterion] = scores
+            criterion_severity[criterion] = severity
+            total_score += np.where(present, scores, 0.0) * config['weight']
+            total_weight += np.where(present, config['weight'], 0.0)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            overall = np.where(total_weight > 0, total_score / total_weight, 0.0)
+        
+        return SequenceEvaluation(
+            evaluator=self,
+            overall_scores=overall,
+            metrics=metrics,
+            criterion_scores=criterion_scores,
+            criterion_severity=criterion_severity,
+            phases=phases
+        )
+    
+    def _calculate_metrics_batch(self, landmarks: np.ndarray, phases: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Vectorized version of _calculate_metrics.
+        
+        Args:
+            landmarks: (frames, 33, 3) array of pose landmarks
+            phases: (frames,) array of phase names or None
+            
+        Returns:
+            Metric name -> (frames,) array, NaN where the metric does not apply
+        """
+        metrics = {}
+        if len(landmarks) == 0:
+            return metrics
+        
+        def center(left: int, right: int) -> np.ndarray:
+            return (landmarks[:, left] + landmarks[:, right]) / 2
+        
+        def gated(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+            return np.where(mask, values, np.nan)
+        
+        vertical = np.array([0.0, -1.0, 0.0])
+        bottom_or_none = (phases == 'bottom') | np.equal(phases, None)
+        
+        if self.exercise_type == 'squat':
+            angles = triplet_angles(landmarks, {'left_knee': (23, 25, 27), 'right_knee': (24, 26, 28)})
+            hip_center = center(23, 24)
+            shoulder_center = center(11, 12)
+            knee_x = center(25, 26)[:, 0]
+            ankle_x = center(27, 28)[:, 0]
+            
+            metrics['depth'] = (angles['left_knee'] + angles['right_knee']) / 2
+            metrics['knee_tracking'] = np.abs(knee_x - ankle_x)
+            metrics['back_angle'] = vector_angles(shoulder_center - hip_center, vertical)
+            metrics['balance'] = np.abs((shoulder_center[:, 0] + hip_center[:, 0]) / 2 - ankle_x)
+            metrics = {name: gated(values, bottom_or_none) for name, values in metrics.items()}
+        
+        elif self.exercise_type == 'bench_press':
+            angles = triplet_angles(landmarks, {'left_elbow': (11, 13, 15), 'right_elbow': (12, 14, 16)})
+            wrist_x = center(15, 16)[:, 0]
+            shoulder_x = center(11, 12)[:, 0]
+            vertical_2d = np.array([0.0, 1.0])
+            left_wrist = vector_angles((landmarks[:, 15] - landmarks[:, 13])[:, :2], vertical_2d) - 90
+            right_wrist = vector_angles((landmarks[:, 16] - landmarks[:, 14])[:, :2], vertical_2d) - 90
+            
+            metrics['elbow_angle'] = (angles['left_elbow'] + angles['right_elbow']) / 2
+            metrics['bar_path'] = np.abs(wrist_x - shoulder_x)
+            metrics['wrist_position'] = (np.abs(left_wrist) + np.abs(right_wrist)) / 2
+            metrics['stability'] = np.zeros(len(landmarks))  # Would need multiple frames
+            metrics = {name: gated(values, bottom_or_none) for name, values in metrics.items()}
+        
+        elif self.exercise_type == 'deadlift':
+            hip_center = center(23, 24)
+            shoulder_center = center(11, 12)
+            hip_angle = joint_angles(shoulder_center, hip_center, center(25, 26))
+            
+            metrics['back_straightness'] = vector_angles(shoulder_center - hip_center, vertical)
+            metrics['hip_hinge'] = 180 - hip_angle
+            metrics['bar_path'] = np.abs(center(15, 16)[:, 0] - center(27, 28)[:, 0])
+            metrics['lockout'] = gated(hip_angle, phases == 'top')
+        
+        return metrics
+    
+    @staticmethod
+    def _evaluate_criterion_batch(
+        values: np.ndarray,
+        ideal: float,
+        tolerance: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized version of _evaluate_criterion.
+        
+        Returns:
+            Tuple of (scores, severity index into SEVERITIES)
+        """
+        deviation = np.abs(values - ideal)
+        good = deviation <= tolerance
+        warning = ~good & (deviation <= tolerance * 2)
+        
+        scores = np.select(
+            [good, warning],
+            [100 - (deviation / tolerance) * 20,
+             80 - ((deviation - tolerance) / tolerance) * 30],
+            default=np.maximum(0, 50 - ((deviation - tolerance * 2) / tolerance) * 25)
+        )
+        severity = np.select([good, warning], [0, 1], default=2).astype(np.int8)
+        return scores, severity
+
+
+SEVERITIES = ('good', 'warning', 'error')
+
+
+@dataclass
+class SequenceEvaluation:
+    """Array-valued form evaluation of a whole sequence."""
+    evaluator: FormEvaluator
+    overall_scores: np.ndarray
+    metrics: Dict[str, np.ndarray]
+    criterion_scores: Dict[str, np.ndarray]
+    criterion_severity: Dict[str, np.ndarray]
+    phases: np.ndarray
+    
+    def issue_counts(self) -> Dict[str, int]:
+        """Number of frames with a warning or error per criterion."""
+        first_seen = []
+        for order, (criterion, severity) in enumerate(self.criterion_severity.items()):
+            issues = np.flatnonzero(~np.isnan(self.metrics[criterion]) & (severity > 0))
+            if len(issues):
+                first_seen.append((int(issues[0]), order, criterion, len(issues)))
+        
+        # Keep the order in which issues first appear in the sequence
+        return {criterion: count for _, _, criterion, count in sorted(first_seen)}
+    
+    def top_issues(self, limit: int = 3) -> List[Tuple[str, int]]:
+        """Most frequent issues as (criterion, frame count)."""
+        return sorted(self.issue_counts().items(), key=lambda x: x[1], reverse=True)[:limit]
+    
+    def issue_feedback(self, criterion: str) -> FormFeedback:
+        """Aggregated feedback for one criterion over the frames where it was evaluated."""
+        present = ~np.isnan(self.metrics[criterion])
+        severity = self.criterion_severity[criterion][present]
+        config = self.evaluator.evaluation_criteria[criterion]
+        
+        issues = severity[severity > 0]
+        dominant = SEVERITIES[int(np.bincount(issues).argmax())] if len(issues) else 'good'
+        return FormFeedback(
+            aspect=criterion,
+            score=float(np.mean(self.criterion_scores[criterion][present])) if present.any() else 0.0,
+            message=config['messages'][dominant],
+            severity=dominant
+        )
+    
+    def frame_feedback(self, index: int) -> List[FormFeedback]:
+        """Materialize the per-criterion feedback of a single frame."""
+        feedback = []
+        for criterion, scores in self.criterion_scores.items():
+            if np.isnan(self.metrics[criterion][index]):
+                continue
+            severity = SEVERITIES[int(self.criterion_severity[criterion][index])]
+            feedback.append(FormFeedback(
+                aspect=criterion,
+                score=float(scores[index]),
+                message=self.evaluator.evaluation_criteria[criterion]['messages'][severity],
+                severity=severity
+            ))
+        return feedback
 
 
 def evaluate_exercise_sequence(
@@ -455,34 +657,16 @@ def evaluate_exercise_sequence(
         Comprehensive evaluation results
     """
     evaluator = FormEvaluator(exercise_type)
-    
-    # Evaluate each frame
-    frame_evaluations = []
-    all_scores = []
-    
-    for i, landmarks in enumerate(landmark_sequence):
-        phase = phase_sequence[i] if phase_sequence else None
-        evaluation = evaluator.evaluate_form(landmarks, phase)
-        frame_evaluations.append(evaluation)
-        all_scores.append(evaluation['overall_score'])
+    evaluation = evaluator.evaluate_sequence(landmark_sequence, phase_sequence)
+    all_scores = evaluation.overall_scores
     
     # Aggregate results
-    avg_score = np.mean(all_scores) if all_scores else 0
-    min_score = np.min(all_scores) if all_scores else 0
-    max_score = np.max(all_scores) if all_scores else 0
-    
-    # Find most common issues
-    issue_counts = {}
-    for evaluation in frame_evaluations:
-        for feedback in evaluation['feedback']:
-            if feedback['severity'] in ['warning', 'error']:
-                issue = feedback['aspect']
-                if issue not in issue_counts:
-                    issue_counts[issue] = 0
-                issue_counts[issue] += 1
+    avg_score = float(np.mean(all_scores)) if len(all_scores) else 0
+    min_score = float(np.min(all_scores)) if len(all_scores) else 0
+    max_score = float(np.max(all_scores)) if len(all_scores) else 0
     
-    # Get top issues
-    top_issues = sorted(issue_counts.items(), key=lambda x: x[1], reverse=True)[:3]
+    # Get top issues (feedback objects are built only for these)
+    top_issues = evaluation.top_issues(3)
     
     # Generate summary feedback
     if avg_score >= 85:
@@ -500,6 +684,7 @@ def evaluate_exercise_sequence(
         'max_score': max_score,
         'frame_count': len(landmark_sequence),
         'top_issues': [{'issue': issue, 'count': count} for issue, count in top_issues],
+        'issue_feedback': [evaluation.issue_feedback(issue).to_dict() for issue, _ in top_issues],
         'summary': summary,
         'exercise_type': exercise_type
     }
@@ -8,10 +8,17 @@ from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 import logging
 from collections import deque
+from scipy.signal import find_peaks
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# MediaPipe landmark index pairs averaged for the tracked key position
+KEY_JOINT_INDICES = {
+    'hip': (23, 24),
+    'wrist': (15, 16),
+}
+
 
 @dataclass
 class PhaseInfo:
@@ -33,6 +40,38 @@ class PhaseInfo:
         }
 
 
+@dataclass
+class PhaseSignals:
+    """Whole-sequence motion signals shared by phase and rep segmentation."""
+    positions: np.ndarray
+    velocities: np.ndarray
+    smoothed_velocities: np.ndarray
+    fps: float
+    
+    def extrema(self, min_distance: float, descent_direction: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Locate movement bottoms and tops with peak detection.
+        
+        Args:
+            min_distance: Minimum travel (prominence) for an extremum to count
+            descent_direction: +1 when the descent increases the key position
+            
+        Returns:
+            Tuple of (bottom frame indices, top frame indices)
+        """
+        signal = self.positions * descent_direction
+        bottoms, _ = find_peaks(signal, prominence=min_distance)
+        tops, _ = find_peaks(-signal, prominence=min_distance)
+        return bottoms, tops
+    
+    def velocity_zero_crossings(self) -> np.ndarray:
+        """Frame indices where the smoothed velocity changes sign."""
+        signs = np.sign(self.smoothed_velocities)
+        nonzero = np.flatnonzero(signs)
+        changes = np.flatnonzero(signs[nonzero[1:]] != signs[nonzero[:-1]])
+        return nonzero[changes + 1]
+
+
 class PhaseDetector:
     """Detects exercise phases using state machine approach."""
     
@@ -53,6 +92,7 @@ class PhaseDetector:
         self.velocity_buffer = deque(maxlen=5)  # For smoothing
         self.position_buffer = deque(maxlen=5)
         self.phase_start_frame = 0
+        self.smoothing_window = 5
         
         # Phase transition parameters (adjustable per exercise)
         self.setup_velocity_threshold = 0.01  # Movement threshold to exit setup
@@ -61,6 +101,7 @@ class PhaseDetector:
         
         # Exercise-specific parameters
         self._set_exercise_parameters()
+        self.reset()
     
     def _set_exercise_parameters(self):
         """Set exercise-specific detection parameters."""
@@ -82,12 +123,40 @@ class PhaseDetector:
             self.descent_direction = 1
             self.min_descent_distance = 0.15
     
-    def detect_phases(self, landmark_sequence: List[np.ndarray]) -> List[PhaseInfo]:
+    def compute_signals(self, landmark_sequence) -> 'PhaseSignals':
+        """
+        Compute key-position and velocity signals for a whole sequence.
+        
+        Args:
+            landmark_sequence: (frames, 33, 3) array or list of 33x3 landmark arrays
+            
+        Returns:
+            PhaseSignals with positions, raw and smoothed velocities
+        """
+        landmarks = np.asarray(landmark_sequence, dtype=float)
+        joints = KEY_JOINT_INDICES.get(self.primary_joint, KEY_JOINT_INDICES['hip'])
+        positions = (landmarks[:, joints[0], 1] + landmarks[:, joints[1], 1]) / 2
+        
+        velocities = np.zeros_like(positions)
+        velocities[1:] = np.diff(positions) * self.fps  # First frame has zero velocity
+        
+        return PhaseSignals(
+            positions=positions,
+            velocities=velocities,
+            smoothed_velocities=self._smooth_array(velocities, self.smoothing_window),
+            fps=self.fps
+        )
+    
+    def detect_phases(self, landmark_sequence) -> List[PhaseInfo]:
         """
         Detect phases in a sequence of landmarks.
         
+        Transition conditions of the state machine are evaluated for every
+        frame at once; the walk then jumps straight from one phase boundary
+        to the next instead of stepping through each frame.
+        
         Args:
-            landmark_sequence: List of 33x3 landmark arrays
+            landmark_sequence: (frames, 33, 3) array or list of 33x3 landmark arrays
             
         Returns:
             List of detected phases with timing information
@@ -95,75 +164,223 @@ class PhaseDetector:
         if len(landmark_sequence) < 2:
             return []
         
-        # Reset state
-        self.current_phase = 'setup'
-        self.phase_history = []
-        self.velocity_buffer.clear()
-        self.position_buffer.clear()
-        self.phase_start_frame = 0
+        signals = self.compute_signals(landmark_sequence)
+        detected_phases = self._segment_phases(signals)
         
-        # Process each frame
-        positions = []
-        velocities = []
+        # Leave the detector in the same state as after frame-by-frame processing
+        self.reset()
+        self.phase_history = list(detected_phases)
+        self.current_phase = detected_phases[-1].phase
+        self.phase_start_frame = detected_phases[-1].start_frame
+        self.velocity_buffer.extend(signals.smoothed_velocities[-self.velocity_buffer.maxlen:])
+        self.position_buffer.extend(signals.positions[-self.position_buffer.maxlen:])
         
-        # Extract positions
-        for landmarks in landmark_sequence:
-            pos = self._extract_key_position(landmarks)
-            positions.append(pos)
+        return detected_phases
+    
+    def _segment_phases(self, signals: 'PhaseSignals') -> List[PhaseInfo]:
+        """
+        Split a sequence into phases from precomputed signals.
+        
+        Args:
+            signals: Signals from compute_signals
+            
+        Returns:
+            List of detected phases
+        """
+        positions = signals.positions
+        velocities = signals.smoothed_velocities
+        num_frames = len(positions)
+        frame_indices = np.arange(num_frames)
         
-        # Calculate velocities
-        for i in range(1, len(positions)):
-            vel = (positions[i] - positions[i-1]) * self.fps
-            velocities.append(vel)
-        velocities.insert(0, 0)  # First frame has zero velocity
+        # Position buffer holds the last N positions, so its oldest entry lags N-1 frames
+        lag = self.position_buffer.maxlen - 1
+        displacement = np.abs(positions - positions[np.maximum(frame_indices - lag, 0)])
+        has_history = frame_indices >= 1
+        speed = np.abs(velocities)
+        directed = velocities * self.descent_direction
+        still = speed < self.velocity_zero_threshold
         
-        # Smooth velocities
-        smoothed_velocities = self._smooth_signal(velocities)
+        transition_frames = {
+            'setup': np.flatnonzero(speed > self.setup_velocity_threshold),
+            'descent': np.flatnonzero(
+                still & has_history & (displacement >= self.min_descent_distance)
+            ),
+            'bottom': np.flatnonzero(directed < -self.velocity_zero_threshold),
+            'ascent': np.flatnonzero(
+                still & has_history & (displacement < self.min_descent_distance * 0.3)
+            ),
+            'top': np.flatnonzero(directed > self.setup_velocity_threshold),
+        }
+        next_phase = {'descent': 'bottom', 'bottom': 'ascent', 'ascent': 'top', 'top': 'descent'}
+        min_frames = self._min_phase_frames()
         
-        # State machine for phase detection
         detected_phases = []
+        phase = 'setup'
+        phase_start = 0
+        first_candidate = 0
         
-        for frame_idx in range(len(landmark_sequence)):
-            velocity = smoothed_velocities[frame_idx]
-            position = positions[frame_idx]
+        while True:
+            candidates = transition_frames[phase]
+            earliest = max(phase_start + min_frames, first_candidate)
+            position = np.searchsorted(candidates, earliest)
+            if position == len(candidates):
+                break
             
-            # Update buffers
-            self.velocity_buffer.append(velocity)
-            self.position_buffer.append(position)
+            frame_idx = int(candidates[position])
+            if phase == 'setup':
+                new_phase = 'descent' if directed[frame_idx] > 0 else 'ascent'
+            else:
+                new_phase = next_phase[phase]
             
-            # Detect phase transitions
-            new_phase = self._detect_phase_transition(
-                frame_idx, velocity, position
+            if frame_idx > phase_start:
+                detected_phases.append(self._make_phase(
+                    phase, phase_start, frame_idx - 1, velocities, frame_idx
+                ))
+            
+            phase = new_phase
+            phase_start = frame_idx
+            first_candidate = frame_idx + 1
+        
+        detected_phases.append(self._make_phase(
+            phase, phase_start, num_frames - 1, velocities, num_frames - 1
+        ))
+        return detected_phases
+    
+    def _make_phase(
+        self,
+        phase: str,
+        start_frame: int,
+        end_frame: int,
+        velocities: np.ndarray,
+        confidence_frame: int
+    ) -> PhaseInfo:
+        """Build a PhaseInfo, scoring confidence on the velocity window ending at confidence_frame."""
+        window_start = max(0, confidence_frame - self.velocity_buffer.maxlen + 1)
+        return PhaseInfo(
+            phase=phase,
+            start_frame=start_frame,
+            end_frame=end_frame,
+            duration_seconds=(end_frame + 1 - start_frame) / self.fps,
+            confidence=self._calculate_phase_confidence(
+                velocities[window_start:confidence_frame + 1]
             )
+        )
+    
+    def _min_phase_frames(self) -> int:
+        """Smallest frame count that satisfies min_phase_duration."""
+        frames = max(int(np.ceil(self.min_phase_duration * self.fps)), 0)
+        while frames > 0 and (frames - 1) / self.fps >= self.min_phase_duration:
+            frames -= 1
+        while frames / self.fps < self.min_phase_duration:
+            frames += 1
+        return frames
+    
+    def reset(self):
+        """Reset detector state before a new sequence or live session."""
+        self.current_phase = 'setup'
+        self.phase_history = []
+        self.velocity_buffer.clear()
+        self.position_buffer.clear()
+        self.phase_start_frame = 0
+        
+        half_window = self.smoothing_window // 2
+        self._frame_count = 0
+        self._processed_frames = 0
+        self._last_position = None
+        self._raw_velocities = deque(maxlen=2 * half_window + 1)
+        self._pending_positions = deque()
+    
+    def update(self, landmarks: np.ndarray) -> Optional[PhaseInfo]:
+        """
+        Feed one live frame and return a phase if one was completed.
+        
+        Velocity smoothing is centred, so a frame is classified once the
+        following smoothing_window // 2 frames have arrived. Call finish()
+        at the end of the session to flush the remaining frames.
+        
+        Args:
+            landmarks: 33x3 landmark array
             
-            if new_phase != self.current_phase:
-                # Save completed phase
-                if frame_idx > self.phase_start_frame:
-                    phase_info = PhaseInfo(
-                        phase=self.current_phase,
-                        start_frame=self.phase_start_frame,
-                        end_frame=frame_idx - 1,
-                        duration_seconds=(frame_idx - self.phase_start_frame) / self.fps,
-                        confidence=self._calculate_phase_confidence()
-                    )
-                    detected_phases.append(phase_info)
-                
-                # Transition to new phase
-                self.current_phase = new_phase
-                self.phase_start_frame = frame_idx
-        
-        # Add final phase
-        if len(landmark_sequence) > self.phase_start_frame:
-            phase_info = PhaseInfo(
+        Returns:
+            PhaseInfo of the phase that just ended, or None
+        """
+        position = self._extract_key_position(landmarks)
+        if self._last_position is None:
+            velocity = 0.0
+        else:
+            velocity = (position - self._last_position) * self.fps
+        self._last_position = position
+        self._frame_count += 1
+        self._raw_velocities.append(velocity)
+        self._pending_positions.append(position)
+        
+        if self._frame_count <= self.smoothing_window // 2:
+            return None
+        
+        smoothed = float(np.mean(self._raw_velocities))
+        return self._advance(self._pending_positions.popleft(), smoothed)
+    
+    def finish(self) -> List[PhaseInfo]:
+        """
+        Flush pending live frames and close the current phase.
+        
+        Returns:
+            Phases completed by the flushed frames, including the final one
+        """
+        completed = []
+        if self._frame_count < 2:
+            self.reset()
+            return completed
+        
+        half_window = self.smoothing_window // 2
+        raw = list(self._raw_velocities)
+        first_raw_frame = self._frame_count - len(raw)
+        
+        while self._pending_positions:
+            frame_idx = self._processed_frames
+            window_start = max(0, frame_idx - half_window) - first_raw_frame
+            smoothed = float(np.mean(raw[window_start:]))
+            phase = self._advance(self._pending_positions.popleft(), smoothed)
+            if phase is not None:
+                completed.append(phase)
+        
+        final_phase = PhaseInfo(
+            phase=self.current_phase,
+            start_frame=self.phase_start_frame,
+            end_frame=self._frame_count - 1,
+            duration_seconds=(self._frame_count - self.phase_start_frame) / self.fps,
+            confidence=self._calculate_phase_confidence()
+        )
+        self.phase_history.append(final_phase)
+        completed.append(final_phase)
+        return completed
+    
+    def _advance(self, position: float, velocity: float) -> Optional[PhaseInfo]:
+        """Run the state machine for the next frame in a live session."""
+        frame_idx = self._processed_frames
+        self._processed_frames += 1
+        
+        self.velocity_buffer.append(velocity)
+        self.position_buffer.append(position)
+        
+        new_phase = self._detect_phase_transition(frame_idx, velocity, position)
+        if new_phase == self.current_phase:
+            return None
+        
+        completed = None
+        if frame_idx > self.phase_start_frame:
+            completed = PhaseInfo(
                 phase=self.current_phase,
                 start_frame=self.phase_start_frame,
-                end_frame=len(landmark_sequence) - 1,
-                duration_seconds=(len(landmark_sequence) - self.phase_start_frame) / self.fps,
+                end_frame=frame_idx - 1,
+                duration_seconds=(frame_idx - self.phase_start_frame) / self.fps,
                 confidence=self._calculate_phase_confidence()
             )
-            detected_phases.append(phase_info)
+            self.phase_history.append(completed)
         
-        return detected_phases
+        self.current_phase = new_phase
+        self.phase_start_frame = frame_idx
+        return completed
     
     def _extract_key_position(self, landmarks: np.ndarray) -> float:
         """
@@ -175,21 +392,8 @@ class PhaseDetector:
         Returns:
             Key position value (typically y-coordinate)
         """
-        # MediaPipe landmark indices
-        LEFT_HIP = 23
-        RIGHT_HIP = 24
-        LEFT_WRIST = 15
-        RIGHT_WRIST = 16
-        
-        if self.primary_joint == 'hip':
-            # Average of left and right hip y-positions
-            return (landmarks[LEFT_HIP][1] + landmarks[RIGHT_HIP][1]) / 2
-        elif self.primary_joint == 'wrist':
-            # Average of left and right wrist y-positions
-            return (landmarks[LEFT_WRIST][1] + landmarks[RIGHT_WRIST][1]) / 2
-        else:
-            # Default to hip
-            return (landmarks[LEFT_HIP][1] + landmarks[RIGHT_HIP][1]) / 2
+        joints = KEY_JOINT_INDICES.get(self.primary_joint, KEY_JOINT_INDICES['hip'])
+        return (landmarks[joints[0]][1] + landmarks[joints[1]][1]) / 2
     
     def _smooth_signal(self, signal: List[float], window_size: int = 5) -> List[float]:
         """
@@ -202,15 +406,26 @@ class PhaseDetector:
         Returns:
             Smoothed signal
         """
-        smoothed = []
-        half_window = window_size // 2
-        
-        for i in range(len(signal)):
-            start = max(0, i - half_window)
-            end = min(len(signal), i + half_window + 1)
-            smoothed.append(np.mean(signal[start:end]))
+        return self._smooth_array(np.asarray(signal, dtype=float), window_size).tolist()
+    
+    @staticmethod
+    def _smooth_array(signal: np.ndarray, window_size: int = 5) -> np.ndarray:
+        """
+        Centred moving average; the window shrinks at the sequence edges.
         
-        return smoothed
+        Args:
+            signal: Input signal
+            window_size: Size of smoothing window
+            
+        Returns:
+            Smoothed signal
+        """
+        half_window = window_size // 2
+        kernel = np.ones(2 * half_window + 1)
+        num_samples = len(signal)
+        sums = np.convolve(signal, kernel)[half_window:half_window + num_samples]
+        counts = np.convolve(np.ones(num_samples), kernel)[half_window:half_window + num_samples]
+        return sums / counts
     
     def _detect_phase_transition(
         self, 
@@ -273,18 +488,23 @@ class PhaseDetector:
         
         return self.current_phase
     
-    def _calculate_phase_confidence(self) -> float:
+    def _calculate_phase_confidence(self, velocities: Optional[np.ndarray] = None) -> float:
         """
         Calculate confidence score for current phase detection.
         
+        Args:
+            velocities: Recent smoothed velocities (defaults to the velocity buffer)
+            
         Returns:
             Confidence score between 0 and 1
         """
+        if velocities is None:
+            velocities = list(self.velocity_buffer)
+        
         # Simple confidence based on velocity consistency
-        if len(self.velocity_buffer) < 2:
+        if len(velocities) < 2:
             return 0.5
         
-        velocities = list(self.velocity_buffer)
         velocity_std = np.std(velocities)
         
         # Lower variance = higher confidence
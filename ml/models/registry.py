@@ -0,0 +1,289 @@
+"""
+Process-wide registry of trained model artifacts.
+
+Artifacts are stored as versioned joblib files under
+``<root>/<name>/<version>.joblib``. A ``CURRENT`` pointer file in each
+artifact directory names the active version. Each artifact is loaded once
+per process, with ``mmap_mode`` so that the numpy buffers inside fitted
+estimators are backed by the page cache. Forked workers therefore share
+those pages instead of each holding a private copy.
+
+Publishing writes a new version and swaps the pointer atomically. Other
+processes notice the changed pointer on their next lookup and hot-swap
+the artifact without a restart.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import joblib
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.environ.get('MODEL_REGISTRY_DIR', 'ml/models/artifacts')
+POINTER_FILE = 'CURRENT'
+ARTIFACT_SUFFIX = '.joblib'
+_VERSION_RE = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+@dataclass
+class ModelArtifact:
+    """A loaded model artifact."""
+    name: str
+    version: str
+    path: str
+    payload: Any
+    loaded_at: float = field(default_factory=time.time)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Description without the payload (for status endpoints)."""
+        return {
+            'name': self.name,
+            'version': self.version,
+            'path': self.path,
+            'loaded_at': datetime.fromtimestamp(self.loaded_at).isoformat(),
+            'metadata': self.metadata,
+        }
+
+
+class ModelRegistry:
+    """
+    Loads each model artifact once per process and hot-swaps on publish.
+
+    Lookups are lock-free once an artifact is cached. The pointer file is
+    re-checked at most every ``check_interval`` seconds, which costs one
+    ``os.stat``. A lookup that finds no artifact is cached for the same
+    interval, so callers without a trained model do not hit the filesystem
+    on every request.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, mmap_mode: Optional[str] = 'r',
+                 check_interval: float = 2.0):
+        """
+        Initialize the registry.
+
+        Args:
+            root: Directory holding one sub-directory per artifact name
+            mmap_mode: joblib mmap mode for loading (None loads into memory)
+            check_interval: Seconds between pointer checks for hot-swap
+        """
+        self.root = root
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._artifacts: Dict[str, ModelArtifact] = {}
+        self._pointer_state: Dict[str, Any] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def get(self, name: str, legacy_path: Optional[str] = None) -> Optional[ModelArtifact]:
+        """
+        Get the current artifact, loading or hot-swapping it if needed.
+
+        Args:
+            name: Artifact name
+            legacy_path: Unversioned file to fall back to when no version
+                has been published yet
+
+        Returns:
+            The loaded artifact, or None if none exists
+        """
+        now = time.monotonic()
+        checked_at = self._checked_at.get(name)
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return self._artifacts.get(name)
+
+        with self._lock:
+            self._checked_at[name] = now
+            state = self._read_pointer_state(name)
+            artifact = self._artifacts.get(name)
+            if artifact is not None and state == self._pointer_state.get(name):
+                return artifact
+
+            version = state[1] if state else None
+            if version is not None:
+                path = self._artifact_path(name, version)
+            elif legacy_path and os.path.exists(legacy_path):
+                version, path = 'legacy', legacy_path
+            else:
+                return artifact
+
+            if artifact is not None and artifact.path == path and artifact.version == version:
+                self._pointer_state[name] = state
+                return artifact
+
+            loaded = self._load(name, version, path)
+            if loaded is not None:
+                self._artifacts[name] = loaded
+                self._pointer_state[name] = state
+            return self._artifacts.get(name)
+
+    def current_version(self, name: str) -> Optional[str]:
+        """Version of the cached artifact (None if not loaded)."""
+        artifact = self._artifacts.get(name)
+        return artifact.version if artifact is not None else None
+
+    def publish(self, name: str, payload: Any, metadata: Optional[Dict[str, Any]] = None,
+                version: Optional[str] = None) -> str:
+        """
+        Save a new artifact version and make it current.
+
+        The artifact file and the pointer are both written to a temporary
+        file first and then moved into place with ``os.replace``. Readers
+        therefore never observe a partially written model.
+
+        Args:
+            name: Artifact name
+            payload: Object to persist (e.g. dict of estimator and scaler)
+            metadata: JSON-serialisable information stored alongside
+            version: Explicit version label (defaults to a timestamp)
+
+        Returns:
+            The published version
+        """
+        if not JOBLIB_AVAILABLE:
+            raise RuntimeError("joblib is required to publish model artifacts")
+
+        version = version or datetime.now().strftime('%Y%m%d%H%M%S%f')
+        if not _VERSION_RE.match(version):
+            raise ValueError(f"Invalid artifact version: {version}")
+
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory, exist_ok=True)
+        path = self._artifact_path(name, version)
+
+        # Uncompressed so that numpy buffers can be memory-mapped on load
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        joblib.dump(payload, tmp_path)
+        os.replace(tmp_path, path)
+
+        if metadata is not None:
+            with open(f"{path}.json", 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+
+        self.activate(name, version)
+
+        # Swap in this process immediately; the payload is already in memory
+        with self._lock:
+            self._artifacts[name] = ModelArtifact(name, version, path, payload, metadata=metadata or {})
+            self._pointer_state[name] = self._read_pointer_state(name)
+            self._checked_at[name] = time.monotonic()
+
+        logger.info(f"Published model artifact {name}@{version}")
+        return version
+
+    def activate(self, name: str, version: str):
+        """
+        Point the artifact at an existing version (publish or rollback).
+
+        Args:
+            name: Artifact name
+            version: Version to activate
+        """
+        if not os.path.exists(self._artifact_path(name, version)):
+            raise FileNotFoundError(f"Unknown artifact version: {name}@{version}")
+
+        pointer = os.path.join(self.root, name, POINTER_FILE)
+        tmp_pointer = f"{pointer}.tmp{os.getpid()}"
+        with open(tmp_pointer, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_pointer, pointer)
+
+        # Force the next lookup in this process to re-read the pointer
+        self._checked_at.pop(name, None)
+
+    def versions(self, name: str) -> List[str]:
+        """Published versions, oldest first."""
+        directory = os.path.join(self.root, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            entry[:-len(ARTIFACT_SUFFIX)] for entry in os.listdir(directory)
+            if entry.endswith(ARTIFACT_SUFFIX)
+        )
+
+    def preload(self, names: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Load artifacts eagerly, e.g. in the gunicorn master before forking.
+
+        Returns:
+            Mapping of name to loaded version (None if unavailable)
+        """
+        return {name: getattr(self.get(name), 'version', None) for name in names}
+
+    def describe(self) -> Dict[str, Any]:
+        """Loaded artifacts and available versions (for status endpoints)."""
+        names = set(self._artifacts)
+        if os.path.isdir(self.root):
+            names.update(
+                entry for entry in os.listdir(self.root)
+                if os.path.isdir(os.path.join(self.root, entry))
+            )
+        return {
+            name: {
+                'loaded': self._artifacts[name].to_dict() if name in self._artifacts else None,
+                'versions': self.versions(name),
+            }
+            for name in sorted(names)
+        }
+
+    def clear(self):
+        """Drop all cached artifacts (mainly for tests)."""
+        with self._lock:
+            self._artifacts = {}
+            self._pointer_state = {}
+            self._checked_at = {}
+
+    def _artifact_path(self, name: str, version: str) -> str:
+        return os.path.join(self.root, name, f"{version}{ARTIFACT_SUFFIX}")
+
+    def _read_pointer_state(self, name: str) -> Optional[tuple]:
+        """(pointer mtime, version) or None when nothing has been published."""
+        pointer = os.path.join(self.root, name, POINTER_FILE)
+        try:
+            stat = os.stat(pointer)
+            with open(pointer, 'r', encoding='utf-8') as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, version) if version else None
+
+    def _load(self, name: str, version: str, path: str) -> Optional[ModelArtifact]:
+        """Load an artifact file; failures keep the previously loaded version."""
+        if not JOBLIB_AVAILABLE:
+            return None
+
+        start = time.perf_counter()
+        try:
+            payload = joblib.load(path, mmap_mode=self.mmap_mode)
+        except Exception as e:
+            logger.error(f"Failed to load model artifact {name}@{version}: {e}")
+            return None
+
+        metadata = {}
+        if os.path.exists(f"{path}.json"):
+            try:
+                with open(f"{path}.json", 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+        logger.info(
+            f"Loaded model artifact {name}@{version} in {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        return ModelArtifact(name, version, path, payload, metadata=metadata)
+
+
+# Global registry instance
+model_registry = ModelRegistry()
@@ -0,0 +1,541 @@
+"""
+コーパス全体を対象にした前処理パイプライン
+レコードをバッチ単位で (N, 33, 4) 配列にまとめて一括処理し、バッチをプロセスプールに分散する
+
+TrainingDataPreprocessor のレコード単位の処理（clean_data → extract_features →
+normalize_data → augment_data → save_processed_data）と同じ特徴量を計算するが、
+全件をメモリに載せないよう次の2パスで処理する。
+
+1. DBからバッチを逐次取得し、各ワーカーがクリーニング・特徴量抽出・拡張を行って
+   中間シャード（.npz）を書き出す。正規化用の統計量は Welford 法で逐次集計する。
+2. 全体の統計量で中間シャードを正規化し、分割（train/val/test）ごとの CSV シャードに書き出す。
+"""
+
+import os
+import csv
+import json
+import shutil
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.kinematics import joint_angles
+from ml.data.pose_codec import resolve_pose_data
+
+logger = logging.getLogger(__name__)
+
+# MediaPipeランドマークのインデックス（TrainingDataPreprocessor.landmark_indices と同じ）
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# 関節角度（名前, 3点）
+JOINT_ANGLES = [
+    ('left_elbow', (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST)),
+    ('right_elbow', (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST)),
+    ('left_knee', (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)),
+    ('right_knee', (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)),
+    ('left_hip', (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE)),
+    ('right_hip', (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE)),
+    ('torso_left', (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE)),
+    ('torso_right', (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE)),
+]
+
+# 距離特徴量（名前, 2点）
+DISTANCE_PAIRS = [
+    ('shoulder_width', LEFT_SHOULDER, RIGHT_SHOULDER),
+    ('hip_width', LEFT_HIP, RIGHT_HIP),
+    ('torso_length', LEFT_SHOULDER, LEFT_HIP),
+    ('left_arm_length', LEFT_SHOULDER, LEFT_WRIST),
+    ('right_arm_length', RIGHT_SHOULDER, RIGHT_WRIST),
+    ('left_leg_length', LEFT_HIP, LEFT_ANKLE),
+    ('right_leg_length', RIGHT_HIP, RIGHT_ANKLE),
+]
+
+FEATURE_NAMES = (
+    [f'angle_{name}' for name, _ in JOINT_ANGLES]
+    + [f'distance_{name}' for name, _, _ in DISTANCE_PAIRS]
+    + ['balance_shoulder_height', 'balance_hip_height', 'balance_knee_height',
+       'center_of_mass_x', 'center_of_mass_y',
+       'shoulder_slope', 'hip_slope', 'torso_lean',
+       'height_normalized', 'weight_normalized', 'bmi', 'experience_level']
+)
+
+EXPERIENCE_LEVELS = {'beginner': 0.0, 'intermediate': 0.5, 'advanced': 1.0}
+
+# 欠損補完に使う左右対称ペア
+SYMMETRY_PAIRS = {11: 12, 12: 11, 13: 14, 14: 13, 15: 16, 16: 15,
+                  23: 24, 24: 23, 25: 26, 26: 25, 27: 28, 28: 27}
+
+# 水平反転時の左右入れ替え（各インデックスの反転後の参照元）
+FLIP_PERMUTATION = np.array(
+    [0, 4, 5, 6, 1, 2, 3, 8, 7, 10, 9, 12, 11, 14, 13, 16, 15,
+     18, 17, 20, 19, 22, 21, 24, 23, 26, 25, 28, 27, 30, 29, 32, 31]
+)
+
+SPLITS = ('train', 'val', 'test')
+SPLIT_PROBABILITIES = (0.7, 0.15, 0.15)
+
+CSV_TRAILING_FIELDS = ['height', 'weight', 'experience',
+                       'performance_weight', 'performance_reps', 'performance_form_score']
+
+
+class RunningStats:
+    """
+    特徴量ごとの平均・標準偏差を逐次集計（Welford 法、バッチ同士は Chan の式で統合）
+
+    標準偏差は np.std と同じ母標準偏差（ddof=0）。
+    """
+
+    def __init__(self, n_features: int):
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    def update(self, values: np.ndarray) -> None:
+        """(n, n_features) の値を追加"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape[0] == 0:
+            return
+        other = RunningStats(values.shape[1])
+        other.count = values.shape[0]
+        other.mean = values.mean(axis=0)
+        other.m2 = ((values - other.mean) ** 2).sum(axis=0)
+        self.merge(other)
+
+    def merge(self, other: 'RunningStats') -> None:
+        """別の集計結果を統合"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / total)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / total)
+        self.count = total
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / self.count) if self.count else np.zeros_like(self.m2)
+
+    def to_dict(self, names: List[str]) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {'mean': float(mean), 'std': float(std), 'count': self.count}
+            for name, mean, std in zip(names, self.mean, self.std)
+        }
+
+
+def _json_field(value: Any) -> Dict[str, Any]:
+    value = json.loads(value) if isinstance(value, str) else value
+    return value if isinstance(value, dict) else {}
+
+
+def _as_float(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def records_to_arrays(records: List[Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    レコードのリストを列ごとの配列にまとめる（構造が不正なポーズは除外）
+
+    Returns:
+        (列名 -> 配列, 除外件数)
+    """
+    poses, columns = [], {
+        'session_id': [], 'exercise': [], 'timestamp': [],
+        'height': [], 'weight': [], 'experience': [], 'performance': [],
+    }
+    rejected = 0
+
+    for record in records:
+        try:
+            pose = np.asarray(resolve_pose_data(record) or [])
+        except (TypeError, ValueError):
+            # 長さの揃わないランドマーク（不揃いな配列）
+            pose = None
+        if pose is None or pose.shape != (33, 4) or pose.dtype.kind not in 'iuf':
+            rejected += 1
+            continue
+
+        metadata = _json_field(record.get('metadata'))
+        performance = _json_field(record.get('performance'))
+        timestamp = record.get('timestamp')
+
+        poses.append(pose.astype(np.float64))
+        columns['session_id'].append(str(record.get('session_id')))
+        columns['exercise'].append(str(record.get('exercise')))
+        columns['timestamp'].append(str(timestamp) if timestamp is not None else '')
+        columns['height'].append(_as_float(metadata.get('height', 170), 170.0))
+        columns['weight'].append(_as_float(metadata.get('weight', 70), 70.0))
+        columns['experience'].append(str(metadata.get('experience', 'beginner')))
+        columns['performance'].append([
+            _as_float(performance.get('weight', 0), 0.0),
+            _as_float(performance.get('reps', 1), 1.0),
+            _as_float(performance.get('form_score', 0.5), 0.5),
+        ])
+
+    arrays = {name: np.array(values) for name, values in columns.items()}
+    arrays['pose'] = np.array(poses).reshape(-1, 33, 4)
+    arrays['height'] = arrays['height'].astype(np.float64)
+    arrays['weight'] = arrays['weight'].astype(np.float64)
+    arrays['performance'] = arrays['performance'].reshape(-1, 3).astype(np.float64)
+    return arrays, rejected
+
+
+def fill_missing_landmarks(poses: np.ndarray) -> np.ndarray:
+    """
+    可視性の低いランドマークを補完（TrainingDataPreprocessor._fill_missing_landmarks の配列版）
+
+    左右対称の相手が見えていれば X を反転して流用し、そうでなければ既定値にする。
+    """
+    filled = poses.copy()
+    missing = poses[:, :, 3] < 0.3
+
+    default = np.array([0.5, 0.5, 0.0, 0.1])
+    filled[missing] = default
+
+    for index, pair in SYMMETRY_PAIRS.items():
+        source = poses[:, pair]
+        use_pair = missing[:, index] & (source[:, 3] > 0.5)
+        if use_pair.any():
+            filled[use_pair, index] = np.column_stack([
+                1.0 - source[use_pair, 0], source[use_pair, 1], source[use_pair, 2],
+                np.full(use_pair.sum(), 0.5)
+            ])
+    return filled
+
+
+def _distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sqrt(((a - b) ** 2).sum(axis=-1))
+
+
+def valid_pose_mask(poses: np.ndarray) -> np.ndarray:
+    """外れ値でないポーズのマスク（TrainingDataPreprocessor._detect_outliers の配列版）"""
+    x, y, z = poses[:, :, 0], poses[:, :, 1], poses[:, :, 2]
+    in_range = (
+        ((x >= -0.5) & (x <= 1.5) & (y >= -0.5) & (y <= 1.5)).all(axis=1)
+        & (np.abs(z) <= 1.0).all(axis=1)
+    )
+
+    shoulder_width = _distance(poses[:, LEFT_SHOULDER, :3], poses[:, RIGHT_SHOULDER, :3])
+    hip_width = _distance(poses[:, LEFT_HIP, :3], poses[:, RIGHT_HIP, :3])
+    shoulder_mid = (poses[:, LEFT_SHOULDER, :2] + poses[:, RIGHT_SHOULDER, :2]) / 2
+    hip_mid = (poses[:, LEFT_HIP, :2] + poses[:, RIGHT_HIP, :2]) / 2
+    torso_length = _distance(shoulder_mid, hip_mid)
+
+    checked = (shoulder_width > 0) & (hip_width > 0) & (torso_length > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shoulder_hip_ratio = shoulder_width / hip_width
+        torso_shoulder_ratio = torso_length / shoulder_width
+    proportions_ok = (
+        (shoulder_hip_ratio >= 0.8) & (shoulder_hip_ratio <= 1.5)
+        & (torso_shoulder_ratio >= 1.0) & (torso_shoulder_ratio <= 3.0)
+    )
+    return in_range & (~checked | proportions_ok)
+
+
+def compute_features(poses: np.ndarray, height: np.ndarray, weight: np.ndarray,
+                     experience: np.ndarray) -> np.ndarray:
+    """
+    特徴量を一括計算（TrainingDataPreprocessor.extract_features の配列版）
+
+    Returns:
+        (N, len(FEATURE_NAMES)) の配列
+    """
+    xyz = poses[:, :, :3]
+    columns = [joint_angles(xyz[:, a], xyz[:, b], xyz[:, c]) for _, (a, b, c) in JOINT_ANGLES]
+    columns += [_distance(xyz[:, a], xyz[:, b]) for _, a, b in DISTANCE_PAIRS]
+
+    ls, rs = poses[:, LEFT_SHOULDER], poses[:, RIGHT_SHOULDER]
+    lh, rh = poses[:, LEFT_HIP], poses[:, RIGHT_HIP]
+    lk, rk = poses[:, LEFT_KNEE], poses[:, RIGHT_KNEE]
+
+    # 左右バランス
+    columns += [
+        np.abs(ls[:, 1] - rs[:, 1]),
+        np.abs(lh[:, 1] - rh[:, 1]),
+        np.abs(lk[:, 1] - rk[:, 1]),
+        (ls[:, 0] + rs[:, 0] + lh[:, 0] + rh[:, 0]) / 4,
+        (ls[:, 1] + rs[:, 1] + lh[:, 1] + rh[:, 1]) / 4,
+    ]
+
+    # 身体姿勢
+    shoulder_mid = (ls[:, :2] + rs[:, :2]) / 2
+    hip_mid = (lh[:, :2] + rh[:, :2]) / 2
+    columns += [
+        np.degrees(np.arctan((rs[:, 1] - ls[:, 1]) / (rs[:, 0] - ls[:, 0] + 1e-6))),
+        np.degrees(np.arctan((rh[:, 1] - lh[:, 1]) / (rh[:, 0] - lh[:, 0] + 1e-6))),
+        np.degrees(np.arctan2(shoulder_mid[:, 0] - hip_mid[:, 0],
+                              hip_mid[:, 1] - shoulder_mid[:, 1] + 1e-6)),
+    ]
+
+    # メタデータ
+    with np.errstate(divide='ignore'):
+        bmi = np.where(height > 0, weight / (height / 100) ** 2, 22.0)
+    columns += [
+        (height - 170) / 30,
+        (weight - 70) / 20,
+        bmi,
+        np.array([EXPERIENCE_LEVELS.get(level, 0.0) for level in experience]),
+    ]
+
+    return np.column_stack(columns) if len(poses) else np.zeros((0, len(FEATURE_NAMES)))
+
+
+def augment_poses(poses: np.ndarray, aug_idx: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    拡張ポーズを一括生成（TrainingDataPreprocessor._create_augmented_sample の配列版）
+
+    aug_idx % 3 に応じて 左右反転 / ガウシアンノイズ / 重心まわりのスケール変更 を適用する。
+    """
+    method = aug_idx % 3
+    if method == 0:
+        augmented = poses[:, FLIP_PERMUTATION].copy()
+        augmented[:, :, 0] = 1.0 - augmented[:, :, 0]
+        return augmented
+
+    augmented = poses.copy()
+    if method == 1:
+        augmented[:, :, :3] += rng.normal(0.0, 0.02, size=augmented[:, :, :3].shape)
+    else:
+        scale = rng.uniform(0.95, 1.05, size=(len(poses), 1, 1))
+        center = poses[:, :, :2].mean(axis=1, keepdims=True)
+        augmented[:, :, :2] = center + (poses[:, :, :2] - center) * scale
+    augmented[:, :, :2] = np.clip(augmented[:, :, :2], 0.0, 1.0)
+    return augmented
+
+
+def featurize_batch(task: Tuple[int, List[Dict[str, Any]], str, int, int]) -> Dict[str, Any]:
+    """
+    1バッチ分のクリーニング・特徴量抽出・拡張を行い中間シャードに保存（ワーカーで実行）
+
+    Args:
+        task: (バッチ番号, レコードのリスト, 中間ディレクトリ, 拡張倍率, 乱数シード)
+
+    Returns:
+        件数と特徴量統計（RunningStats）の要約
+    """
+    batch_index, records, work_dir, augmentation_factor, seed = task
+    rng = np.random.default_rng([seed, batch_index])
+
+    arrays, rejected = records_to_arrays(records)
+    poses = fill_missing_landmarks(arrays['pose'])
+    keep = valid_pose_mask(poses)
+    arrays = {name: values[keep] for name, values in arrays.items()}
+    poses = poses[keep]
+
+    features = compute_features(poses, arrays['height'], arrays['weight'], arrays['experience'])
+    stats = RunningStats(len(FEATURE_NAMES))
+    stats.update(features)
+
+    # 分割は元サンプル単位で決め、拡張サンプルは元と同じ分割に入れる（分割間のリーク防止）
+    split = rng.choice(len(SPLITS), size=len(poses), p=SPLIT_PROBABILITIES)
+
+    feature_blocks = [features]
+    session_blocks = [arrays['session_id']]
+    for aug_idx in range(augmentation_factor):
+        augmented = augment_poses(poses, aug_idx, rng)
+        feature_blocks.append(
+            compute_features(augmented, arrays['height'], arrays['weight'], arrays['experience'])
+        )
+        session_blocks.append(np.char.add(arrays['session_id'].astype(str), f'_aug_{aug_idx}'))
+
+    repeats = augmentation_factor + 1
+    total = len(poses) * repeats
+    if total:
+        np.savez(
+            os.path.join(work_dir, f'part-{batch_index:06d}.npz'),
+            features=np.concatenate(feature_blocks),
+            session_id=np.concatenate(session_blocks).astype(str),
+            exercise=np.tile(arrays['exercise'], repeats).astype(str),
+            timestamp=np.tile(arrays['timestamp'], repeats).astype(str),
+            height=np.tile(arrays['height'], repeats),
+            weight=np.tile(arrays['weight'], repeats),
+            experience=np.tile(arrays['experience'], repeats).astype(str),
+            performance=np.tile(arrays['performance'], (repeats, 1)),
+            split=np.tile(split, repeats),
+        )
+
+    return {
+        'batch_index': batch_index,
+        'raw_samples': len(records),
+        'cleaned_samples': len(poses),
+        'rejected_structure': rejected,
+        'final_samples': total,
+        'stats': stats,
+    }
+
+
+def write_normalized_shard(task: Tuple[str, str, np.ndarray, np.ndarray]) -> Dict[str, int]:
+    """
+    中間シャードを正規化し、分割ごとの CSV シャードに書き出す（ワーカーで実行）
+
+    Returns:
+        分割名 -> 書き出した件数
+    """
+    part_path, output_dir, mean, std = task
+    shard_name = os.path.splitext(os.path.basename(part_path))[0]
+
+    with np.load(part_path, allow_pickle=False) as part:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            normalized = np.where(std > 0, (part['features'] - mean) / std, 0.0)
+        columns = {name: part[name] for name in
+                   ('session_id', 'exercise', 'timestamp', 'height', 'weight',
+                    'experience', 'performance', 'split')}
+
+    order = np.argsort(FEATURE_NAMES)
+    header = (['session_id', 'exercise', 'timestamp']
+              + [f'{FEATURE_NAMES[i]}_normalized' for i in order]
+              + CSV_TRAILING_FIELDS)
+
+    counts = {}
+    for code, split_name in enumerate(SPLITS):
+        rows = np.flatnonzero(columns['split'] == code)
+        counts[split_name] = int(rows.size)
+        if not rows.size:
+            continue
+
+        split_dir = os.path.join(output_dir, split_name)
+        os.makedirs(split_dir, exist_ok=True)
+        with open(os.path.join(split_dir, f'{shard_name}.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            values = normalized[rows][:, order].tolist()
+            performance = columns['performance'][rows].tolist()
+            for i, row in enumerate(rows.tolist()):
+                writer.writerow(
+                    [columns['session_id'][row], columns['exercise'][row], columns['timestamp'][row]]
+                    + values[i]
+                    + [float(columns['height'][row]), float(columns['weight'][row]),
+                       columns['experience'][row]]
+                    + performance[i]
+                )
+
+    os.remove(part_path)
+    return counts
+
+
+def _map_bounded(executor: Optional[ProcessPoolExecutor], func: Callable,
+                 tasks: Iterable, max_pending: int) -> Iterator[Any]:
+    """同時に投入するタスク数を制限しながら順に結果を返す（executor が None なら逐次実行）"""
+    if executor is None:
+        for task in tasks:
+            yield func(task)
+        return
+
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(func, task))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _picklable_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """ワーカープロセスへ渡せるよう memoryview（psycopg2 の BYTEA）を bytes に変換"""
+    return {key: bytes(value) if isinstance(value, memoryview) else value
+            for key, value in record.items()}
+
+
+class CorpusPreprocessor:
+    """バッチ単位・並列・定メモリの前処理パイプライン"""
+
+    def __init__(self, output_dir: str = 'ml/data/processed/corpus', workers: Optional[int] = None,
+                 augmentation_factor: int = 2, seed: int = 0):
+        """
+        Args:
+            output_dir: 出力ディレクトリ（train/val/test のサブディレクトリに CSV シャードを出力）
+            workers: ワーカープロセス数（0 なら現在のプロセスで逐次処理、None なら CPU 数）
+            augmentation_factor: データ拡張の倍率
+            seed: 分割・拡張の乱数シード（同じ入力・シードなら同じ出力）
+        """
+        self.output_dir = output_dir
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.augmentation_factor = augmentation_factor
+        self.seed = seed
+
+    def run(self, batches: Iterable[List[Dict[str, Any]]],
+            progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
+        """
+        レコードのバッチ列を前処理
+
+        Args:
+            batches: レコードのリストを順に返すイテラブル（DB の名前付きカーソルなど）
+            progress: 進捗通知コールバック (完了ステップ数, 全ステップ数, メッセージ)
+
+        Returns:
+            件数・分割ごとの件数・出力先を含む統計情報
+        """
+        report = progress or (lambda step, total, message: None)
+        work_dir = os.path.join(self.output_dir, '_work')
+        for split_name in SPLITS:
+            shutil.rmtree(os.path.join(self.output_dir, split_name), ignore_errors=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+
+        totals = {'raw_samples': 0, 'cleaned_samples': 0, 'rejected_structure': 0, 'final_samples': 0}
+        stats = RunningStats(len(FEATURE_NAMES))
+        split_counts = dict.fromkeys(SPLITS, 0)
+        max_pending = max(1, self.workers) * 2
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        try:
+            # パス1: 特徴量抽出と統計量の集計
+            tasks = (
+                (batch_index, [_picklable_record(r) for r in records], work_dir,
+                 self.augmentation_factor, self.seed)
+                for batch_index, records in enumerate(batches)
+            )
+            batch_count = 0
+            for summary in _map_bounded(executor, featurize_batch, tasks, max_pending):
+                for key in totals:
+                    totals[key] += summary[key]
+                stats.merge(summary['stats'])
+                batch_count += 1
+                report(0, 2, f'特徴量抽出: {batch_count}バッチ / {totals["raw_samples"]}件')
+
+            if stats.count == 0:
+                raise ValueError('処理対象のデータが見つかりません')
+
+            # パス2: 全体統計での正規化と書き出し
+            report(1, 2, '正規化・書き出し中')
+            parts = sorted(
+                os.path.join(work_dir, name) for name in os.listdir(work_dir) if name.endswith('.npz')
+            )
+            tasks = ((part, self.output_dir, stats.mean, stats.std) for part in parts)
+            for counts in _map_bounded(executor, write_normalized_shard, tasks, max_pending):
+                for split_name, count in counts.items():
+                    split_counts[split_name] += count
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        with open(os.path.join(self.output_dir, 'normalization_stats.json'), 'w', encoding='utf-8') as f:
+            json.dump(stats.to_dict(FEATURE_NAMES), f, indent=2, ensure_ascii=False)
+
+        result = {
+            **totals,
+            'featured_samples': totals['cleaned_samples'],
+            'total_samples': totals['final_samples'],
+            **{f'{name}_samples': count for name, count in split_counts.items()},
+            'batches': batch_count,
+            'output_dir': self.output_dir,
+            'processing_date': datetime.now().isoformat()
+        }
+        with open(os.path.join(self.output_dir, 'preprocessing_stats.json'), 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+        report(2, 2, '完了')
+        logger.info(f"コーパス前処理完了: {totals['raw_samples']}件 -> {totals['final_samples']}件")
+        return result
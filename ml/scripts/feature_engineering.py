@@ -8,9 +8,16 @@ import json
 import logging
 from typing import Dict, List, Tuple, Optional, Any
 import math
+import os
+import sys
 from scipy.signal import savgol_filter
 from scipy.spatial.distance import euclidean
 
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.kinematics import point_angle
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -385,14 +392,7 @@ class AdvancedFeatureEngineer:
     def _calculate_angle_3d(self, p1: List[float], p2: List[float], p3: List[float]) -> float:
         """3次元空間での角度計算"""
         try:
-            v1 = np.array([p1[0] - p2[0], p1[1] - p2[1], p1[2] - p2[2]])
-            v2 = np.array([p3[0] - p2[0], p3[1] - p2[1], p3[2] - p2[2]])
-            
-            cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-6)
-            cos_angle = np.clip(cos_angle, -1.0, 1.0)
-            
-            angle = np.arccos(cos_angle)
-            return np.degrees(angle)
+            return point_angle(p1, p2, p3)
         except Exception:
             return 0.0
     
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+ポーズデータ保存形式の移行スクリプト
+JSON のランドマーク表現で保存された既存データをバイナリ形式（ml/data/pose_codec.py）へ変換する
+
+対象:
+    --db          training_data_collection の JSONB pose_data -> BYTEA pose_blob
+    --user-data   UserDataCollector の raw/*.json 内の landmarks_sequence -> .pose サイドカー
+    --datasets    PoseDataset の *.json -> *.pose
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from ml.data.pose_codec import POSE_FILE_SUFFIX, encode_landmarks
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _new_stats() -> Dict[str, int]:
+    return {'migrated': 0, 'skipped': 0, 'failed': 0, 'bytes_before': 0, 'bytes_after': 0}
+
+
+def migrate_database(db_url: Optional[str] = None, batch_size: int = 500,
+                     keep_json: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    """
+    training_data_collection の JSONB pose_data を pose_blob 列へ移行
+
+    読み出しは名前付きカーソルで batch_size 件ずつ行い、更新は別接続でバッチごとにコミットする
+    （途中で中断しても、未移行の行だけが次回の対象になる）。
+
+    Args:
+        db_url: 接続文字列（未指定時は DATABASE_URL）
+        batch_size: 1回に取得・更新する行数
+        keep_json: True なら移行後も pose_data を残す
+        dry_run: True なら書き込まずにサイズだけ集計
+
+    Returns:
+        移行統計
+    """
+    import psycopg2
+    from psycopg2.extras import execute_batch
+
+    stats = _new_stats()
+    db_url = db_url or os.environ.get('DATABASE_URL')
+
+    read_conn = psycopg2.connect(db_url)
+    write_conn = psycopg2.connect(db_url)
+    try:
+        if dry_run:
+            # スキーマも変更しない（pose_blob 列がまだなければ全行が対象）
+            with read_conn.cursor() as cur:
+                cur.execute("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'training_data_collection' AND column_name = 'pose_blob'
+                """)
+                has_blob_column = cur.fetchone() is not None
+        else:
+            with write_conn.cursor() as cur:
+                cur.execute("ALTER TABLE training_data_collection ADD COLUMN IF NOT EXISTS pose_blob BYTEA")
+                cur.execute("ALTER TABLE training_data_collection ALTER COLUMN pose_data DROP NOT NULL")
+            write_conn.commit()
+            has_blob_column = True
+        pending_filter = "pose_blob IS NULL AND pose_data IS NOT NULL" if has_blob_column else "pose_data IS NOT NULL"
+
+        update_sql = (
+            "UPDATE training_data_collection SET pose_blob = %s WHERE id = %s"
+            if keep_json else
+            "UPDATE training_data_collection SET pose_blob = %s, pose_data = NULL WHERE id = %s"
+        )
+
+        with read_conn.cursor(name='pose_storage_migration') as read_cur:
+            read_cur.itersize = batch_size
+            read_cur.execute(f"""
+                SELECT id, pose_data::text
+                FROM training_data_collection
+                WHERE {pending_filter}
+                ORDER BY id
+            """)
+
+            while True:
+                rows = read_cur.fetchmany(batch_size)
+                if not rows:
+                    break
+
+                updates = []
+                for record_id, pose_text in rows:
+                    try:
+                        blob = encode_landmarks(json.loads(pose_text))
+                    except (TypeError, ValueError) as e:
+                        logger.warning(f"ポーズデータを変換できません (id={record_id}): {e}")
+                        stats['failed'] += 1
+                        continue
+                    stats['bytes_before'] += len(pose_text.encode('utf-8'))
+                    stats['bytes_after'] += len(blob)
+                    updates.append((psycopg2.Binary(blob), record_id))
+
+                if updates and not dry_run:
+                    with write_conn.cursor() as cur:
+                        execute_batch(cur, update_sql, updates, page_size=batch_size)
+                    write_conn.commit()
+                stats['migrated'] += len(updates)
+                logger.info(f"DB: {stats['migrated']}件移行")
+    finally:
+        read_conn.close()
+        write_conn.close()
+
+    return stats
+
+
+def migrate_user_data(data_dir: str, dry_run: bool = False) -> Dict[str, int]:
+    """
+    UserDataCollector の生データ JSON からランドマークを .pose サイドカーへ分離
+
+    Args:
+        data_dir: UserDataCollector の data_dir（raw/ を含むディレクトリ）
+        dry_run: True なら書き込まずにサイズだけ集計
+
+    Returns:
+        移行統計
+    """
+    stats = _new_stats()
+    raw_dir = Path(data_dir) / 'raw'
+
+    for raw_file in sorted(raw_dir.glob('*.json')):
+        try:
+            with open(raw_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"読み込みに失敗: {raw_file}: {e}")
+            stats['failed'] += 1
+            continue
+
+        if 'landmarks_sequence' not in data:
+            stats['skipped'] += 1
+            continue
+
+        landmarks_file = f"{data.get('data_id', raw_file.stem)}{POSE_FILE_SUFFIX}"
+        blob = encode_landmarks(data.pop('landmarks_sequence'))
+        data['landmarks_file'] = landmarks_file
+        stats['bytes_before'] += raw_file.stat().st_size
+
+        if not dry_run:
+            _write_bytes(raw_dir / landmarks_file, blob)
+            _write_json(raw_file, data)
+            stats['bytes_after'] += raw_file.stat().st_size + len(blob)
+        else:
+            stats['bytes_after'] += len(json.dumps(data, indent=2)) + len(blob)
+        stats['migrated'] += 1
+
+    return stats
+
+
+def migrate_datasets(directory: str, keep_json: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    """
+    PoseDataset の JSON ファイルを .pose ファイルへ変換
+
+    Args:
+        directory: 対象ディレクトリ（再帰的に探索）
+        keep_json: True なら元の JSON を残す
+        dry_run: True なら書き込まずにサイズだけ集計
+
+    Returns:
+        移行統計
+    """
+    from ml.data_collection.data_schema import PoseDataset
+
+    stats = _new_stats()
+    for json_file in sorted(Path(directory).rglob('*.json')):
+        try:
+            with open(json_file, 'r') as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or 'frames' not in data or 'dataset_id' not in data:
+                stats['skipped'] += 1
+                continue
+            blob = PoseDataset.from_dict(data).to_bytes()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"変換に失敗: {json_file}: {e}")
+            stats['failed'] += 1
+            continue
+
+        stats['bytes_before'] += json_file.stat().st_size
+        stats['bytes_after'] += len(blob)
+        if not dry_run:
+            _write_bytes(json_file.with_suffix(POSE_FILE_SUFFIX), blob)
+            if not keep_json:
+                json_file.unlink()
+        stats['migrated'] += 1
+
+    return stats
+
+
+def _write_bytes(path: Path, data: bytes):
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_json(path: Path, data: Dict[str, Any]):
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _report(label: str, stats: Dict[str, int]):
+    ratio = stats['bytes_before'] / stats['bytes_after'] if stats['bytes_after'] else 0.0
+    logger.info(
+        f"{label}: 移行 {stats['migrated']}件, スキップ {stats['skipped']}件, 失敗 {stats['failed']}件, "
+        f"{stats['bytes_before']:,} -> {stats['bytes_after']:,} bytes ({ratio:.1f}x)"
+    )
+
+
+def main():
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description='ポーズデータをバイナリ保存形式へ移行')
+
+    parser.add_argument('--db', action='store_true',
+                        help='training_data_collection の pose_data を pose_blob へ移行')
+    parser.add_argument('--db-url', type=str, default=None,
+                        help='データベース接続文字列 (デフォルト: DATABASE_URL)')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='DB移行のバッチサイズ (デフォルト: 500)')
+    parser.add_argument('--user-data', type=str, default=None,
+                        help='UserDataCollector のデータディレクトリ (例: data/user_contributions)')
+    parser.add_argument('--datasets', type=str, default=None,
+                        help='PoseDataset の JSON ファイルを含むディレクトリ')
+    parser.add_argument('--keep-json', action='store_true',
+                        help='移行後も元の JSON 表現を残す')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='書き込まずに移行対象とサイズを集計')
+
+    args = parser.parse_args()
+
+    if not (args.db or args.user_data or args.datasets):
+        parser.error('--db, --user-data, --datasets のいずれかを指定してください')
+
+    if args.db:
+        _report('DB', migrate_database(args.db_url, args.batch_size, args.keep_json, args.dry_run))
+    if args.user_data:
+        _report('ユーザーデータ', migrate_user_data(args.user_data, args.dry_run))
+    if args.datasets:
+        _report('データセット', migrate_datasets(args.datasets, args.keep_json, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,19 @@ import json
 import logging
 import os
 import csv
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 import math
+import sys
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.kinematics import point_angle
+from ml.data.pose_codec import resolve_pose_data
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -59,7 +66,7 @@ class TrainingDataPreprocessor:
             with self.get_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     query = """
-                        SELECT session_id, exercise, pose_data, metadata, performance, timestamp
+                        SELECT session_id, exercise, pose_data, pose_blob, metadata, performance, timestamp
                         FROM training_data_collection
                         WHERE consent_status = TRUE AND anonymized = TRUE
                     """
@@ -76,12 +83,90 @@ class TrainingDataPreprocessor:
                     raw_data = cur.fetchall()
                     
                     logger.info(f"生データを{len(raw_data)}件読み込みました")
-                    return [dict(row) for row in raw_data]
+                    records = []
+                    for row in raw_data:
+                        record = dict(row)
+                        # バイナリ形式（pose_blob）のレコードもリスト形式の pose_data に揃える
+                        record['pose_data'] = resolve_pose_data(record)
+                        record.pop('pose_blob', None)
+                        records.append(record)
+                    return records
                     
         except Exception as e:
             logger.error(f"データ読み込みエラー: {e}")
             return []
     
+    def iter_raw_batches(self, exercise_filter: Optional[str] = None,
+                         batch_size: int = 2000) -> Iterator[List[Dict]]:
+        """
+        生データをバッチ単位で逐次読み込み（件数上限なし）
+        
+        名前付き（サーバーサイド）カーソルを使うため、クライアント側に保持するのは
+        常に1バッチ分だけ。
+        """
+        query = """
+            SELECT session_id, exercise, pose_data, pose_blob, metadata, performance, timestamp
+            FROM training_data_collection
+            WHERE consent_status = TRUE AND anonymized = TRUE
+        """
+        params = []
+        
+        if exercise_filter:
+            query += " AND exercise = %s"
+            params.append(exercise_filter)
+        
+        query += " ORDER BY id"
+        
+        conn = self.get_connection()
+        try:
+            with conn.cursor(name='corpus_preprocessing', cursor_factory=RealDictCursor) as cur:
+                cur.itersize = batch_size
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    batch = [dict(row) for row in rows]
+                    for record in batch:
+                        # BYTEA は memoryview で返り、ワーカープロセスへ pickle できない
+                        if record.get('pose_blob') is not None:
+                            record['pose_blob'] = bytes(record['pose_blob'])
+                    yield batch
+        finally:
+            conn.close()
+    
+    def run_corpus_pipeline(self, exercise_filter: Optional[str] = None, batch_size: int = 2000,
+                            augmentation_factor: int = 2, output_dir: str = 'ml/data/processed/corpus',
+                            workers: Optional[int] = None, seed: int = 0,
+                            progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
+        """
+        同意済みコーパス全体を前処理（バッチ単位の配列処理をプロセスプールで並列実行）
+        
+        run_pipeline と同じ特徴量を計算するが、件数上限を設けず定メモリで処理し、
+        train/val/test ごとの CSV シャードを出力する。
+        
+        Args:
+            exercise_filter: 対象エクササイズ（None の場合は全件）
+            batch_size: 1バッチのレコード数
+            augmentation_factor: データ拡張の倍率
+            output_dir: 出力ディレクトリ
+            workers: ワーカープロセス数（None なら CPU 数）
+            seed: 分割・拡張の乱数シード
+            progress: 進捗通知コールバック (完了ステップ数, 全ステップ数, メッセージ)
+            
+        Returns:
+            各段階の件数と出力先を含む統計情報
+        """
+        from ml.scripts.corpus_preprocessing import CorpusPreprocessor
+        
+        corpus = CorpusPreprocessor(
+            output_dir=output_dir,
+            workers=workers,
+            augmentation_factor=augmentation_factor,
+            seed=seed
+        )
+        return corpus.run(self.iter_raw_batches(exercise_filter, batch_size), progress=progress)
+    
     def clean_data(self, raw_data: List[Dict]) -> List[Dict]:
         """データクリーニング処理"""
         cleaned_data = []
@@ -315,30 +400,7 @@ class TrainingDataPreprocessor:
     def _calculate_angle(self, p1: List[float], p2: List[float], p3: List[float]) -> float:
         """3点間の角度計算"""
         try:
-            # ベクトルの計算
-            v1 = [p1[0] - p2[0], p1[1] - p2[1], p1[2] - p2[2]]
-            v2 = [p3[0] - p2[0], p3[1] - p2[1], p3[2] - p2[2]]
-            
-            # 内積の計算
-            dot_product = sum(a * b for a, b in zip(v1, v2))
-            
-            # ベクトルの大きさ
-            magnitude1 = math.sqrt(sum(a * a for a in v1))
-            magnitude2 = math.sqrt(sum(a * a for a in v2))
-            
-            if magnitude1 == 0 or magnitude2 == 0:
-                return 0.0
-            
-            # コサインの計算
-            cos_angle = dot_product / (magnitude1 * magnitude2)
-            cos_angle = max(-1.0, min(1.0, cos_angle))  # クランプ
-            
-            # 角度（度）に変換
-            angle_rad = math.acos(cos_angle)
-            angle_deg = math.degrees(angle_rad)
-            
-            return angle_deg
-            
+            return point_angle(p1, p2, p3)
         except Exception:
             return 0.0
     
@@ -684,6 +746,55 @@ class TrainingDataPreprocessor:
         
         return scaled_pose
     
+    def run_pipeline(self, exercise_filter: Optional[str] = None, limit: int = 500,
+                     augmentation_factor: int = 2, output_dir: str = 'ml/data/processed',
+                     progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
+        """
+        前処理パイプライン全体（読み込み→クリーニング→特徴量→正規化→拡張→保存）を実行
+        
+        Args:
+            exercise_filter: 対象エクササイズ（None の場合は全件）
+            limit: 読み込む最大件数
+            augmentation_factor: データ拡張の倍率
+            output_dir: 処理済みデータの出力先
+            progress: 進捗通知コールバック (完了ステップ数, 全ステップ数, メッセージ)
+            
+        Returns:
+            各段階の件数と出力先を含む統計情報
+        """
+        total_steps = 6
+        report = progress or (lambda step, total, message: None)
+        
+        report(0, total_steps, '生データ読み込み中')
+        raw_data = self.load_raw_data(exercise_filter=exercise_filter, limit=limit)
+        if not raw_data:
+            raise ValueError('処理対象のデータが見つかりません')
+        
+        report(1, total_steps, 'データクリーニング中')
+        cleaned_data = self.clean_data(raw_data)
+        
+        report(2, total_steps, '特徴量抽出中')
+        featured_data = self.extract_features(cleaned_data)
+        
+        report(3, total_steps, '正規化中')
+        normalized_data = self.normalize_data(featured_data)
+        
+        report(4, total_steps, 'データ拡張中')
+        augmented_data = self.augment_data(normalized_data, augmentation_factor=augmentation_factor)
+        
+        report(5, total_steps, '保存中')
+        self.save_processed_data(augmented_data, output_dir=output_dir)
+        report(total_steps, total_steps, '完了')
+        
+        return {
+            'raw_samples': len(raw_data),
+            'cleaned_samples': len(cleaned_data),
+            'featured_samples': len(featured_data),
+            'final_samples': len(augmented_data),
+            'output_dir': output_dir,
+            'processing_date': datetime.now().isoformat()
+        }
+    
     def save_processed_data(self, augmented_data: List[Dict], output_dir: str = 'ml/data/processed'):
         """処理済みデータを保存"""
         os.makedirs(output_dir, exist_ok=True)
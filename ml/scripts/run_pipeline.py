@@ -43,6 +43,14 @@ def main():
                        help='処理後にデータ品質検証を実行')
     parser.add_argument('--skip-preprocessing', action='store_true',
                        help='前処理をスキップして検証のみ実行')
+    parser.add_argument('--corpus', action='store_true',
+                       help='同意済みコーパス全体をバッチ単位で並列処理（--limit は無視）')
+    parser.add_argument('--batch-size', type=int, default=2000,
+                       help='コーパスモードの1バッチのレコード数 (デフォルト: 2000)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='コーパスモードのワーカープロセス数 (デフォルト: CPU数)')
+    parser.add_argument('--seed', type=int, default=0,
+                       help='コーパスモードの分割・拡張の乱数シード (デフォルト: 0)')
     
     args = parser.parse_args()
     
@@ -51,7 +59,29 @@ def main():
                 f"augment={args.augment}, output_dir={args.output_dir}")
     
     try:
-        if not args.skip_preprocessing:
+        if args.corpus and not args.skip_preprocessing:
+            # コーパス全体の前処理（バッチ単位・並列・定メモリ）
+            logger.info("コーパス前処理パイプライン開始...")
+            
+            preprocessor = TrainingDataPreprocessor()
+            statistics = preprocessor.run_corpus_pipeline(
+                exercise_filter=args.exercise,
+                batch_size=args.batch_size,
+                augmentation_factor=args.augment,
+                output_dir=args.output_dir,
+                workers=args.workers,
+                seed=args.seed
+            )
+            
+            logger.info("=== 処理統計 ===")
+            logger.info(f"生データ: {statistics['raw_samples']}件")
+            logger.info(f"クリーニング後: {statistics['cleaned_samples']}件")
+            logger.info(f"最終データ: {statistics['final_samples']}件 "
+                        f"(train {statistics['train_samples']} / val {statistics['val_samples']} / "
+                        f"test {statistics['test_samples']})")
+            logger.info(f"出力ディレクトリ: {args.output_dir}")
+        
+        elif not args.skip_preprocessing:
             # 前処理パイプラインの実行
             logger.info("前処理パイプライン開始...")
             
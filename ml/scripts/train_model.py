@@ -8,7 +8,7 @@ import sys
 import json
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import argparse
 
 # プロジェクトルートをパスに追加
@@ -255,17 +255,20 @@ class ModelTrainer:
                 'timestamp': datetime.now().isoformat()
             }
     
-    def full_training_pipeline(self, days: int = 30) -> Dict:
+    def full_training_pipeline(self, days: int = 30,
+                               progress: Optional[Callable[[int, int, str], None]] = None) -> Dict:
         """
         完全な学習パイプラインを実行
         
         Args:
             days: データ収集日数
+            progress: 進捗通知コールバック (完了ステップ数, 全ステップ数, メッセージ)
             
         Returns:
             パイプライン実行結果
         """
         logger.info("完全な学習パイプラインを開始")
+        report = progress or (lambda step, total, message: None)
         
         pipeline_result = {
             'pipeline_start': datetime.now().isoformat(),
@@ -275,6 +278,7 @@ class ModelTrainer:
         try:
             # ステップ1: データ収集
             logger.info("ステップ1: データ収集")
+            report(0, 3, "データ収集中")
             raw_data_path = self.collect_training_data(days)
             pipeline_result['steps']['data_collection'] = {
                 'success': True,
@@ -283,6 +287,7 @@ class ModelTrainer:
             
             # ステップ2: データ前処理
             logger.info("ステップ2: データ前処理")
+            report(1, 3, "データ前処理中")
             processed_data_path = self.preprocess_data(raw_data_path)
             pipeline_result['steps']['preprocessing'] = {
                 'success': True,
@@ -291,10 +296,12 @@ class ModelTrainer:
             
             # ステップ3: モデル学習
             logger.info("ステップ3: モデル学習")
+            report(2, 3, "モデル学習中")
             training_result = self.train_model(processed_data_path)
             pipeline_result['steps']['training'] = training_result
             
             # パイプライン完了
+            report(3, 3, "完了")
             pipeline_result['pipeline_end'] = datetime.now().isoformat()
             pipeline_result['success'] = True
             
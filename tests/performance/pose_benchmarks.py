@@ -0,0 +1,518 @@
+"""
+Benchmark harness for the video and pose hot paths
+
+Drives the analysis steps, pose filters, unified-theory analyzers, ML batch
+inference and feature engineering with landmark sequences from
+SyntheticPoseGenerator, so no video file or GPU is needed. Each benchmark
+records throughput (frames/s), per-run latency percentiles and peak traced
+memory, and can be compared against a stored baseline JSON.
+
+Usage:
+    python tests/performance/pose_benchmarks.py                   # run and compare
+    python tests/performance/pose_benchmarks.py --update-baseline # rewrite baseline
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Sequence lengths in frames (5 s, 30 s and 60 s at 30 fps)
+SEQUENCE_LENGTHS = (150, 900, 1800)
+
+# A run is a regression when throughput drops below baseline / tolerance
+DEFAULT_TOLERANCE = float(os.environ.get('BENCHMARK_TOLERANCE', '1.5'))
+
+LANDMARK_NAMES = [
+    'NOSE', 'LEFT_EYE_INNER', 'LEFT_EYE', 'LEFT_EYE_OUTER',
+    'RIGHT_EYE_INNER', 'RIGHT_EYE', 'RIGHT_EYE_OUTER',
+    'LEFT_EAR', 'RIGHT_EAR', 'MOUTH_LEFT', 'MOUTH_RIGHT',
+    'LEFT_SHOULDER', 'RIGHT_SHOULDER', 'LEFT_ELBOW', 'RIGHT_ELBOW',
+    'LEFT_WRIST', 'RIGHT_WRIST', 'LEFT_PINKY', 'RIGHT_PINKY',
+    'LEFT_INDEX', 'RIGHT_INDEX', 'LEFT_THUMB', 'RIGHT_THUMB',
+    'LEFT_HIP', 'RIGHT_HIP', 'LEFT_KNEE', 'RIGHT_KNEE',
+    'LEFT_ANKLE', 'RIGHT_ANKLE', 'LEFT_HEEL', 'RIGHT_HEEL',
+    'LEFT_FOOT_INDEX', 'RIGHT_FOOT_INDEX'
+]
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements for one component at one sequence length"""
+    name: str
+    frames: int
+    repeats: int
+    frames_per_second: float
+    latency_ms: Dict[str, float]
+    peak_memory_mb: float
+    skipped: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.frames}"
+
+
+@dataclass
+class BenchmarkCase:
+    """A component under benchmark
+
+    ``setup`` turns a ``(frames, 33, 4)`` landmark array into the component's
+    native input and ``run`` consumes it. Setup time is excluded.
+    """
+    name: str
+    setup: Callable[[np.ndarray], Any]
+    run: Callable[[Any], Any]
+    repeats: int = 3
+    max_frames: Optional[int] = None
+    tags: List[str] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic input
+# ---------------------------------------------------------------------------
+
+_sequence_cache: Dict[tuple, np.ndarray] = {}
+
+
+def synthetic_sequence(num_frames: int, exercise: str = 'squat', seed: int = 42) -> np.ndarray:
+    """Generate a ``(num_frames, 33, 4)`` array of x, y, z, visibility"""
+    key = (num_frames, exercise, seed)
+    if key in _sequence_cache:
+        return _sequence_cache[key]
+
+    from ml.data_collection.synthetic_data_generator import SyntheticPoseGenerator
+
+    generator = SyntheticPoseGenerator(seed=seed)
+    generate = {
+        'squat': generator.generate_squat_sequence,
+        'bench_press': generator.generate_bench_press_sequence,
+        'deadlift': generator.generate_deadlift_sequence,
+    }[exercise]
+
+    frames = []
+    while len(frames) < num_frames:
+        frames.extend(generate(num_reps=5, fps=30.0, noise_level=0.02, variation_level=0.05))
+
+    array = np.array([
+        [[lm.x, lm.y, lm.z, lm.visibility] for lm in frame.landmarks]
+        for frame in frames[:num_frames]
+    ], dtype=np.float64)
+    _sequence_cache[key] = array
+    return array
+
+
+def to_named_frames(sequence: np.ndarray) -> List[Dict[str, Dict[str, float]]]:
+    """Frames as ``{LANDMARK_NAME: {x, y, z, visibility}}`` dicts"""
+    return [
+        {
+            LANDMARK_NAMES[i]: {
+                'x': float(row[0]), 'y': float(row[1]),
+                'z': float(row[2]), 'visibility': float(row[3])
+            }
+            for i, row in enumerate(frame)
+        }
+        for frame in sequence
+    ]
+
+
+def to_indexed_frames(sequence: np.ndarray) -> List[Dict[int, Dict[str, float]]]:
+    """Frames as ``{landmark_index: {x, y, z, visibility}}`` dicts"""
+    return [
+        {
+            i: {
+                'x': float(row[0]), 'y': float(row[1]),
+                'z': float(row[2]), 'visibility': float(row[3])
+            }
+            for i, row in enumerate(frame)
+        }
+        for frame in sequence
+    ]
+
+
+def to_step_input(sequence: np.ndarray) -> Dict[str, Any]:
+    """Input format of ``analysis.step01_cleanup.apply``"""
+    return {
+        str(i): {'landmarks': landmarks, 'timestamp': i / 30.0}
+        for i, landmarks in enumerate(to_named_frames(sequence))
+    }
+
+
+@contextmanager
+def repo_cwd():
+    """The analysis steps read config.yaml relative to the working directory"""
+    previous = os.getcwd()
+    os.chdir(REPO_ROOT)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _angle(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> float:
+    ba, bc = a - b, c - b
+    cosine = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc) + 1e-9)
+    return float(np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0))))
+
+
+def _joint_angle_form(frame: np.ndarray) -> Dict[str, float]:
+    """Left-side joint angles of one frame in OptimizationEngine's joint naming"""
+    p = frame[:, :3]
+    return {
+        'ankle': _angle(p[25], p[27], p[31]),
+        'knee': _angle(p[23], p[25], p[27]),
+        'hip': _angle(p[11], p[23], p[25]),
+        'shoulder': _angle(p[13], p[11], p[23]),
+        'elbow': _angle(p[11], p[13], p[15]),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+
+def _analysis_step_cases() -> List[BenchmarkCase]:
+    from analysis import (
+        step01_cleanup, step02_smooth, step03_normalize,
+        step04_temporal, step05_voting, step06_rulegate
+    )
+    steps = [step01_cleanup, step02_smooth, step03_normalize,
+             step04_temporal, step05_voting, step06_rulegate]
+
+    def make_setup(index):
+        def setup(sequence):
+            data = to_step_input(sequence)
+            with repo_cwd():
+                for previous in steps[:index]:
+                    data = previous.apply(data)
+            return data
+        return setup
+
+    def make_run(step):
+        def run(data):
+            with repo_cwd():
+                return step.apply(data)
+        return run
+
+    cases = [
+        BenchmarkCase(
+            name=step.__name__.split('.')[-1],
+            setup=make_setup(index),
+            run=make_run(step),
+            tags=['analysis'],
+        )
+        for index, step in enumerate(steps)
+    ]
+
+    def run_pipeline(data):
+        with repo_cwd():
+            for step in steps:
+                data = step.apply(data)
+        return data
+
+    cases.append(BenchmarkCase(
+        name='analysis_pipeline',
+        setup=to_step_input,
+        run=run_pipeline,
+        tags=['analysis'],
+    ))
+    return cases
+
+
+def _kinematics_cases() -> List[BenchmarkCase]:
+    from utils.kinematics import compute_kinematics, landmarks_to_array
+
+    return [
+        BenchmarkCase(name='kinematics_kernel', setup=lambda seq: seq[..., :3],
+                      run=lambda points: compute_kinematics(points, fps=30.0), tags=['kinematics']),
+        BenchmarkCase(name='kinematics_from_dicts', setup=to_named_frames,
+                      run=lambda frames: compute_kinematics(landmarks_to_array(frames), fps=30.0),
+                      tags=['kinematics']),
+    ]
+
+
+def _pose_filter_cases() -> List[BenchmarkCase]:
+    from core.pose_filters import PoseFilterManager
+
+    def run(frames):
+        manager = PoseFilterManager()
+        for landmarks in frames:
+            manager.process_landmarks(landmarks)
+
+    return [BenchmarkCase(name='pose_filter_manager', setup=to_indexed_frames, run=run, tags=['filters'])]
+
+
+def _unified_theory_cases() -> List[BenchmarkCase]:
+    from backend.core.unified_theory import ComplexSystemsAnalyzer, OptimizationEngine
+
+    def movement_setup(sequence):
+        return [
+            {LANDMARK_NAMES[i]: frame[i, :3].copy() for i in range(len(LANDMARK_NAMES))}
+            for frame in sequence
+        ]
+
+    def run_complex(movement):
+        analyzer = ComplexSystemsAnalyzer()
+        analyzer.calculate_movement_attractors(movement)
+        analyzer.assess_movement_variability(movement)
+        analyzer.analyze_system_dynamics(movement)
+
+    def optimization_setup(sequence):
+        # One optimisation per second of footage
+        return [_joint_angle_form(frame) for frame in sequence[::30]]
+
+    def run_optimization(forms):
+        engine = OptimizationEngine()
+        engine.define_objective_functions({'goals': ['strength']})
+        constraints = engine.apply_constraints({'height': 175})
+        for form in forms:
+            engine.solve_form_optimization(form, constraints, 'squat')
+
+    return [
+        BenchmarkCase(name='complex_systems_analyzer', setup=movement_setup, run=run_complex,
+                      repeats=1, tags=['unified_theory']),
+        BenchmarkCase(name='optimization_engine', setup=optimization_setup, run=run_optimization,
+                      repeats=1, tags=['unified_theory']),
+    ]
+
+
+def _ml_cases() -> List[BenchmarkCase]:
+    from ml.api.inference import MLInferenceEngine
+    from ml.models.form_evaluator import evaluate_exercise_sequence
+    from ml.models.phase_detector import PhaseDetector
+    from ml.scripts.feature_engineering import AdvancedFeatureEngineer
+
+    engine = MLInferenceEngine()
+    engineer = AdvancedFeatureEngineer()
+
+    def session_setup(sequence):
+        return [{'landmarks': landmarks} for landmarks in to_named_frames(sequence)]
+
+    def list_setup(sequence):
+        return sequence.tolist()
+
+    def xyz_setup(sequence):
+        return sequence[..., :3]
+
+    return [
+        BenchmarkCase(name='ml_batch_analyze', setup=session_setup,
+                      run=engine.batch_analyze, tags=['ml']),
+        BenchmarkCase(name='feature_engineering_temporal', setup=list_setup,
+                      run=lambda seq: engineer.extract_temporal_features(seq, 'squat'), tags=['ml']),
+        BenchmarkCase(name='form_evaluation_sequence', setup=xyz_setup,
+                      run=lambda seq: evaluate_exercise_sequence(seq, 'squat'), tags=['ml']),
+        BenchmarkCase(name='phase_detection', setup=xyz_setup,
+                      run=lambda seq: PhaseDetector('squat').detect_phases(seq), tags=['ml']),
+    ]
+
+
+CASE_FACTORIES = {
+    'analysis': _analysis_step_cases,
+    'kinematics': _kinematics_cases,
+    'filters': _pose_filter_cases,
+    'unified_theory': _unified_theory_cases,
+    'ml': _ml_cases,
+}
+
+
+def collect_cases() -> (List[BenchmarkCase], Dict[str, str]):
+    """Build all cases; factories whose imports fail are reported as skipped"""
+    cases = []
+    unavailable = {}
+    for group, factory in CASE_FACTORIES.items():
+        try:
+            cases.extend(factory())
+        except Exception as e:  # missing optional dependency or broken import
+            unavailable[group] = f"{type(e).__name__}: {e}"
+    return cases, unavailable
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def run_case(case: BenchmarkCase, num_frames: int) -> BenchmarkResult:
+    """Run one case at one sequence length"""
+    sequence = synthetic_sequence(num_frames)
+    durations = []
+    peak_bytes = 0
+
+    for _ in range(case.repeats):
+        payload = case.setup(sequence)
+        gc.collect()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        case.run(payload)
+        durations.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_bytes = max(peak_bytes, peak)
+
+    # Timing runs without tracemalloc overhead
+    timed = []
+    for _ in range(case.repeats):
+        payload = case.setup(sequence)
+        start = time.perf_counter()
+        case.run(payload)
+        timed.append(time.perf_counter() - start)
+
+    best = min(timed)
+    sorted_ms = sorted(d * 1000 for d in timed)
+    return BenchmarkResult(
+        name=case.name,
+        frames=num_frames,
+        repeats=case.repeats,
+        frames_per_second=num_frames / best if best > 0 else float('inf'),
+        latency_ms={
+            'min': sorted_ms[0],
+            'p50': statistics.median(sorted_ms),
+            'p95': float(np.percentile(sorted_ms, 95)),
+            'max': sorted_ms[-1],
+            'per_frame_us': best / num_frames * 1e6,
+        },
+        peak_memory_mb=peak_bytes / 1024 / 1024,
+    )
+
+
+def run_all(lengths=SEQUENCE_LENGTHS, names: Optional[List[str]] = None) -> List[BenchmarkResult]:
+    """Run every available case at every sequence length"""
+    cases, unavailable = collect_cases()
+    results = []
+
+    for group, reason in unavailable.items():
+        results.append(BenchmarkResult(name=group, frames=0, repeats=0, frames_per_second=0.0,
+                                       latency_ms={}, peak_memory_mb=0.0, skipped=reason))
+
+    for case in cases:
+        if names and case.name not in names:
+            continue
+        for length in lengths:
+            if case.max_frames and length > case.max_frames:
+                continue
+            try:
+                results.append(run_case(case, length))
+            except Exception as e:
+                results.append(BenchmarkResult(name=case.name, frames=length, repeats=0,
+                                               frames_per_second=0.0, latency_ms={},
+                                               peak_memory_mb=0.0,
+                                               skipped=f"{type(e).__name__}: {e}"))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Baseline
+# ---------------------------------------------------------------------------
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(results: List[BenchmarkResult], path: str = BASELINE_PATH) -> None:
+    """Write results into the baseline, keeping entries for cases that were not run"""
+    merged = load_baseline(path)
+    merged.update({
+        r.key: {
+            'frames_per_second': round(r.frames_per_second, 2),
+            'latency_ms': {k: round(v, 3) for k, v in r.latency_ms.items()},
+            'peak_memory_mb': round(r.peak_memory_mb, 3),
+        }
+        for r in results if not r.skipped
+    })
+    payload = {
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'numpy': np.__version__,
+        },
+        'results': merged,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare_to_baseline(result: BenchmarkResult, baseline: Dict[str, Dict[str, Any]],
+                        tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Return regression messages for a result (empty when within tolerance)"""
+    reference = baseline.get(result.key)
+    if not reference or result.skipped:
+        return []
+
+    problems = []
+    expected_fps = reference['frames_per_second']
+    if result.frames_per_second * tolerance < expected_fps:
+        problems.append(
+            f"{result.key}: throughput {result.frames_per_second:.1f} frames/s "
+            f"< baseline {expected_fps:.1f} / {tolerance}"
+        )
+
+    expected_memory = reference.get('peak_memory_mb', 0.0)
+    # Ignore noise on tiny allocations
+    if expected_memory > 1.0 and result.peak_memory_mb > expected_memory * tolerance:
+        problems.append(
+            f"{result.key}: peak memory {result.peak_memory_mb:.1f} MB "
+            f"> baseline {expected_memory:.1f} MB x {tolerance}"
+        )
+    return problems
+
+
+def format_table(results: List[BenchmarkResult]) -> str:
+    lines = [f"{'benchmark':<32}{'frames':>8}{'frames/s':>14}{'p50 ms':>12}{'peak MB':>10}"]
+    for r in results:
+        if r.skipped:
+            lines.append(f"{r.name:<32}{r.frames:>8}  skipped: {r.skipped}")
+            continue
+        lines.append(
+            f"{r.name:<32}{r.frames:>8}{r.frames_per_second:>14.1f}"
+            f"{r.latency_ms['p50']:>12.2f}{r.peak_memory_mb:>10.2f}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pose hot-path benchmarks')
+    parser.add_argument('--update-baseline', action='store_true', help='rewrite the stored baseline')
+    parser.add_argument('--lengths', type=int, nargs='+', default=list(SEQUENCE_LENGTHS))
+    parser.add_argument('--only', nargs='+', help='benchmark names to run')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_all(tuple(args.lengths), args.only)
+    print(format_table(results))
+
+    if args.update_baseline:
+        save_baseline(results)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    baseline = load_baseline()
+    problems = [p for r in results for p in compare_to_baseline(r, baseline, args.tolerance)]
+    if problems:
+        print('\nREGRESSIONS:')
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
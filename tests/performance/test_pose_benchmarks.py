@@ -0,0 +1,71 @@
+"""
+Benchmarks for the video and pose hot paths
+Fails when throughput or peak memory regresses past the stored baseline
+
+Run with:  RUN_POSE_BENCHMARKS=1 pytest tests/performance/test_pose_benchmarks.py -s
+Refresh:   python tests/performance/pose_benchmarks.py --update-baseline
+"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pose_benchmarks as bench
+
+
+CASES, UNAVAILABLE = bench.collect_cases()
+BASELINE = bench.load_baseline()
+
+requires_benchmarks = pytest.mark.skipif(not os.environ.get("RUN_POSE_BENCHMARKS"),
+                                         reason="Set RUN_POSE_BENCHMARKS=1 to run the pose benchmarks")
+
+
+@requires_benchmarks
+@pytest.mark.parametrize("group", sorted(bench.CASE_FACTORIES))
+def test_benchmark_group_is_available(group):
+    """A broken import must not silently drop a group of benchmarks"""
+    assert group not in UNAVAILABLE, f"{group} benchmarks unavailable: {UNAVAILABLE.get(group)}"
+
+
+@requires_benchmarks
+@pytest.mark.parametrize("num_frames", bench.SEQUENCE_LENGTHS)
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_pose_hot_path_benchmark(case, num_frames):
+    """Throughput and peak memory stay within tolerance of the baseline"""
+    if case.max_frames and num_frames > case.max_frames:
+        pytest.skip(f"{case.name} is limited to {case.max_frames} frames")
+
+    result = bench.run_case(case, num_frames)
+    print(
+        f"{result.key}: {result.frames_per_second:.1f} frames/s, "
+        f"p50 {result.latency_ms['p50']:.2f}ms, peak {result.peak_memory_mb:.2f}MB"
+    )
+
+    assert result.key in BASELINE, (
+        f"No baseline for {result.key}; run pose_benchmarks.py --update-baseline --only {case.name}"
+    )
+    problems = bench.compare_to_baseline(result, BASELINE)
+    assert not problems, "Performance regression:\n" + "\n".join(problems)
+
+
+def test_synthetic_sequence_shape():
+    """Synthetic input is deterministic and shaped (frames, 33, 4)"""
+    first = bench.synthetic_sequence(150)
+    bench._sequence_cache.clear()
+    second = bench.synthetic_sequence(150)
+
+    assert first.shape == (150, 33, 4)
+    assert (first == second).all()
+
+
+def test_compare_to_baseline_flags_regression():
+    """A run well below baseline throughput is reported"""
+    result = bench.BenchmarkResult(
+        name="example", frames=100, repeats=1, frames_per_second=100.0,
+        latency_ms={"p50": 1.0}, peak_memory_mb=10.0
+    )
+    baseline = {"example@100": {"frames_per_second": 400.0, "peak_memory_mb": 2.0}}
+
+    problems = bench.compare_to_baseline(result, baseline, tolerance=1.5)
+    assert len(problems) == 2
@@ -0,0 +1,119 @@
+"""
+Unit tests for the sub-analysis dependency graph executor
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.v3 import analysis_graph
+from api.v3.analysis_graph import AnalysisGraph, AnalysisGraphError
+
+
+class TestAnalysisGraph:
+    """Test cases for concurrent, dependency-ordered sub-analysis execution"""
+    
+    def test_independent_nodes_run_concurrently(self):
+        """Test that independent nodes overlap and dependents get their inputs"""
+        barrier = threading.Barrier(3, timeout=2)
+        
+        def independent(value):
+            def run():
+                barrier.wait()  # only passes if all three run at the same time
+                return value
+            return run
+        
+        graph = AnalysisGraph()
+        graph.add('a', independent(1))
+        graph.add('b', independent(2))
+        graph.add('c', independent(3))
+        graph.add('total', lambda a, b, c: a + b + c, inputs=['a', 'b', 'c'])
+        
+        execution = graph.run()
+        
+        assert execution.results['total'] == 6
+        assert not execution.partial
+        assert set(execution.node_timings) == {'a', 'b', 'c', 'total'}
+        assert all(t['status'] == 'ok' for t in execution.node_timings.values())
+        assert execution.node_timings['total']['start_ms'] >= execution.node_timings['a']['start_ms']
+    
+    def test_non_critical_failure_returns_partial_results(self):
+        """Test that failed optional nodes and their dependents are reported, not raised"""
+        def broken():
+            raise RuntimeError("engine unavailable")
+        
+        graph = AnalysisGraph()
+        graph.add('core', lambda: 'ok')
+        graph.add('optional', broken, critical=False)
+        graph.add('downstream', lambda value: value, inputs=['optional'], critical=False)
+        
+        execution = graph.run()
+        
+        assert execution.results == {'core': 'ok'}
+        assert execution.partial
+        assert execution.node_timings['optional']['status'] == 'failed'
+        assert execution.node_timings['downstream']['status'] == 'skipped'
+        assert execution.execution_report()['failed_nodes'] == ['downstream', 'optional']
+    
+    def test_timeout(self):
+        """Test per-node timeouts for critical and non-critical nodes"""
+        graph = AnalysisGraph()
+        graph.add('slow', lambda: time.sleep(1), critical=False, timeout=0.05)
+        graph.add('fast', lambda: 'done')
+        
+        started = time.perf_counter()
+        execution = graph.run()
+        
+        assert time.perf_counter() - started < 0.5
+        assert execution.results == {'fast': 'done'}
+        assert execution.node_timings['slow']['status'] == 'timeout'
+        
+        graph = AnalysisGraph()
+        graph.add('slow', lambda: time.sleep(1), timeout=0.05)
+        with pytest.raises(AnalysisGraphError) as error:
+            graph.run()
+        assert error.value.node_timings['slow']['status'] == 'timeout'
+    
+    def test_timeout_excludes_time_waiting_for_a_worker(self):
+        """Test that the timeout clock starts when the node starts running"""
+        graph = AnalysisGraph()
+        graph.add('busy', lambda: time.sleep(0.3))
+        graph.add('queued', lambda: 'done', timeout=0.1)
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            execution = graph.run(executor)
+        
+        assert execution.results['queued'] == 'done'
+        assert execution.node_timings['queued']['start_ms'] >= 250
+    
+    def test_abandoned_nodes_do_not_starve_the_shared_pool(self):
+        """Test that the shared pool is replaced once timed-out nodes hold its workers"""
+        release = threading.Event()
+        executor = analysis_graph.get_executor()
+        
+        for _ in range(analysis_graph.MAX_ABANDONED):
+            graph = AnalysisGraph()
+            graph.add('stuck', lambda: release.wait(5), critical=False, timeout=0.01)
+            assert graph.run().node_timings['stuck']['status'] == 'timeout'
+        
+        try:
+            assert analysis_graph.get_executor() is not executor
+            graph = AnalysisGraph()
+            graph.add('fast', lambda: 'done', timeout=1)
+            assert graph.run().results == {'fast': 'done'}
+        finally:
+            release.set()
+    
+    def test_critical_failure_raises(self):
+        """Test that a failing critical node aborts the graph"""
+        graph = AnalysisGraph()
+        graph.add('required', lambda: 1 / 0)
+        with pytest.raises(AnalysisGraphError, match="required"):
+            graph.run()
+    
+    def test_unknown_input_is_rejected(self):
+        """Test graph definition validation"""
+        graph = AnalysisGraph()
+        with pytest.raises(AnalysisGraphError):
+            graph.add('orphan', lambda x: x, inputs=['missing'])
@@ -0,0 +1,222 @@
+"""
+Unit tests for the leased, journal-backed annotation queue
+"""
+import json
+import threading
+
+from ml.data_collection.annotation_queue import AnnotationQueue
+from ml.data_collection.annotation_tool import ExerciseAnnotationTool
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _open(tmp_path, clock=None, **kwargs):
+    return AnnotationQueue(str(tmp_path / 'queue.journal'), lease_seconds=60,
+                           clock=clock or FakeClock(), **kwargs)
+
+
+def _drain(queue, annotator='a'):
+    order = []
+    while True:
+        item = queue.lease(annotator)
+        if item is None:
+            return order
+        order.append(item['id'])
+        queue.complete(item['id'], annotator)
+
+
+def test_priority_then_insertion_order(tmp_path):
+    with _open(tmp_path) as queue:
+        queue.push_many([('low', 1), ('high_1', 9), ('mid', 5), ('high_2', 9)])
+        queue.push('mid', 5)  # re-queue keeps its place
+        assert len(queue) == 4
+        assert _drain(queue) == ['high_1', 'high_2', 'mid', 'low']
+        assert queue.stats()['completed'] == 4
+
+
+def test_leases_are_exclusive_and_expire(tmp_path):
+    clock = FakeClock()
+    with _open(tmp_path, clock) as queue:
+        queue.push_many([('first', 5), ('second', 5)])
+
+        leased = queue.lease('alice')
+        assert leased['id'] == 'first' and leased['expires_at'] == 1060.0
+        assert queue.lease('alice')['id'] == 'first'  # already holding one
+        assert queue.lease('bob')['id'] == 'second'
+        assert queue.lease('carol') is None
+        assert not queue.complete('first', 'bob')
+
+        clock.now = 1050.0
+        assert queue.renew('second', 'bob')
+        clock.now = 1061.0
+        # alice's lease expired; the item goes back to its original place
+        assert queue.stats()['pending'] == 1
+        assert not queue.complete('first', 'alice')
+        assert queue.lease('carol')['id'] == 'first'
+        assert queue.complete('second', 'bob')
+        assert queue.release('first', 'carol') and queue.get('first')['status'] == 'pending'
+
+
+def test_journal_replay_restores_exact_state(tmp_path):
+    clock = FakeClock()
+    queue = _open(tmp_path, clock)
+    queue.push_many([(f'item{i}', i % 4) for i in range(20)])
+    for annotator in ('a', 'b', 'c'):
+        queue.lease(annotator)
+    queue.complete(queue.lease('d')['id'], 'd')
+    queue.remove('item1')
+    queue.push('item5', 9)
+    before = {data_id: queue.get(data_id) for data_id in (f'item{i}' for i in range(20))}
+    stats = queue.stats()
+    queue.close()
+
+    # Simulate a crash in the middle of an append
+    with open(tmp_path / 'queue.journal', 'a') as f:
+        f.write('{"op":"push","id":"torn"')
+
+    reopened = _open(tmp_path, clock)
+    assert reopened.stats() == stats
+    assert {data_id: reopened.get(data_id) for data_id in before} == before
+    assert reopened.get('torn') is None
+    held = next(data_id for data_id, item in before.items() if item and item.get('annotator') == 'a')
+    assert reopened.lease('a')['id'] == held
+    reopened.close()
+
+    with open(tmp_path / 'queue.journal') as f:
+        assert all(json.loads(line) for line in f)
+
+
+def test_compaction_preserves_state(tmp_path):
+    ids = [f'item{i}' for i in range(5)]
+    with _open(tmp_path, compact_threshold=50) as queue:
+        for _ in range(40):
+            queue.push_many((data_id, n % 3) for n, data_id in enumerate(ids))
+            queue.complete(queue.lease('a')['id'], 'a')
+        queue.lease('b')
+        snapshot = {data_id: queue.get(data_id) for data_id in ids}
+
+    with open(tmp_path / 'queue.journal') as f:
+        records = [json.loads(line) for line in f]
+    assert records[0]['op'] == 'snapshot'
+    assert len(records) < 60
+
+    with _open(tmp_path) as reopened:
+        assert {data_id: reopened.get(data_id) for data_id in ids} == snapshot
+        assert _drain(reopened, 'c') == [data_id for data_id in ('item2', 'item1', 'item4', 'item0', 'item3')
+                                         if snapshot[data_id]['status'] == 'pending']
+
+
+def test_concurrent_annotators_never_share_items(tmp_path):
+    with _open(tmp_path) as queue:
+        queue.push_many([(f'item{i}', i % 7) for i in range(400)])
+        claimed = []
+        lock = threading.Lock()
+
+        def work(annotator):
+            while True:
+                item = queue.lease(annotator)
+                if item is None:
+                    return
+                with lock:
+                    claimed.append(item['id'])
+                queue.complete(item['id'], annotator)
+
+        threads = [threading.Thread(target=work, args=(f'annotator{n}',)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(claimed) == sorted(f'item{i}' for i in range(400))
+
+
+def test_scales_to_large_queues(tmp_path):
+    with _open(tmp_path) as queue:
+        queue.push_many((f'session{i}', i % 10) for i in range(200_000))
+        assert len(queue) == 200_000
+        first = [queue.lease(f'a{n}')['id'] for n in range(3)]
+        assert first == ['session9', 'session19', 'session29']
+
+
+def test_queues_sharing_a_journal_see_each_others_changes(tmp_path):
+    clock = FakeClock()
+    with _open(tmp_path, clock) as first, _open(tmp_path, clock) as second:
+        first.push_many([('a', 1), ('b', 9)])
+        assert len(second) == 2
+        assert second.lease('bob')['id'] == 'b'
+        assert first.lease('alice')['id'] == 'a'
+        assert first.lease('carol') is None
+        assert first.complete('b', 'bob')
+
+        # Compaction by one queue replaces the journal under the other
+        second.compact()
+        second.push('c', 5)
+        assert first.get('b')['status'] == 'completed'
+        assert first.lease('carol')['id'] == 'c'
+        assert second.stats()['in_progress'] == 2
+
+
+def test_queues_sharing_a_journal_never_share_items(tmp_path):
+    with _open(tmp_path) as queue:
+        queue.push_many([(f'item{i}', i % 7) for i in range(200)])
+    queues = [_open(tmp_path, compact_threshold=50) for _ in range(4)]
+    claimed = []
+    lock = threading.Lock()
+
+    def work(queue, annotator):
+        while True:
+            item = queue.lease(annotator)
+            if item is None:
+                return
+            with lock:
+                claimed.append(item['id'])
+            queue.complete(item['id'], annotator)
+
+    threads = [threading.Thread(target=work, args=(queue, f'annotator{n}')) for n, queue in enumerate(queues)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for queue in queues:
+        queue.close()
+
+    assert sorted(claimed) == sorted(f'item{i}' for i in range(200))
+
+
+def test_tools_on_the_same_data_dir_coexist(tmp_path):
+    first = ExerciseAnnotationTool(str(tmp_path))
+    second = ExerciseAnnotationTool(str(tmp_path))
+    first.add_to_annotation_queue('s1')
+    assert second.get_annotation_stats()['pending'] == 1
+
+
+def test_tool_leases_per_annotator_and_imports_legacy_queue(tmp_path):
+    (tmp_path / 'raw').mkdir()
+    for data_id in ('s1', 's2', 's3'):
+        with open(tmp_path / 'raw' / f'{data_id}.json', 'w') as f:
+            json.dump({'data_id': data_id, 'user_hash': 'u', 'exercise_type': 'squat',
+                       'landmarks_sequence': []}, f)
+    with open(tmp_path / 'annotation_queue.json', 'w') as f:
+        json.dump([
+            {'data_id': 's1', 'priority': 5, 'added_at': '2024-01-01T00:00:00', 'status': 'pending'},
+            {'data_id': 'gone', 'priority': 9, 'added_at': '2024-01-01T00:00:01', 'status': 'pending'},
+            {'data_id': 's2', 'priority': 5, 'added_at': '2024-01-01T00:00:02', 'status': 'in_progress'},
+            {'data_id': 's3', 'priority': 5, 'added_at': '2024-01-01T00:00:03', 'status': 'completed'},
+        ], f)
+
+    tool = ExerciseAnnotationTool(str(tmp_path))
+    first = tool.get_next_for_annotation('alice')
+    assert first['data_id'] == 's1' and 'lease_expires_at' in first
+    assert tool.get_next_for_annotation('bob')['data_id'] == 's2'
+    assert tool.get_next_for_annotation('carol') is None
+
+    stats = tool.get_annotation_stats()
+    assert (stats['pending'], stats['in_progress'], stats['completed']) == (0, 2, 1)
+    assert tool.release_annotation('s1', 'alice')
+    assert tool.get_next_for_annotation('carol')['data_id'] == 's1'
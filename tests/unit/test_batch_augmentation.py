@@ -0,0 +1,136 @@
+"""
+Unit tests for the vectorized pose augmentation engine
+"""
+import json
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from ml.data_collection.data_augmentation import (
+    DEFAULT_AUGMENTATION_PARAMS,
+    AugmentedPoseLoader,
+    BatchPoseAugmenter,
+    PoseDataAugmenter,
+    create_balanced_dataset,
+)
+
+
+def _poses(n=4, frames=20, seed=0):
+    rng = np.random.default_rng(seed)
+    poses = rng.uniform(0.2, 0.8, size=(n, frames, 33, 4))
+    poses[..., 3] = rng.uniform(0.6, 1.0, size=(n, frames, 33))
+    return poses
+
+
+def _params(**overrides):
+    params = deepcopy(DEFAULT_AUGMENTATION_PARAMS)
+    for section, values in overrides.items():
+        params[section].update(values)
+    return params
+
+
+def test_samples_are_independent_of_batch_composition():
+    poses = _poses(6)
+    lengths = np.array([20, 15, 20, 8, 20, 12])
+    engine = BatchPoseAugmenter(seed=3)
+    types = ("temporal", "spatial", "noise", "body_type")
+
+    full, full_lengths = engine.augment(poses, types, lengths)
+    subset, subset_lengths = engine.augment(poses[[4, 1]], types, lengths[[4, 1]], sample_indices=[4, 1])
+
+    for row, index in enumerate([4, 1]):
+        assert subset_lengths[row] == full_lengths[index]
+        np.testing.assert_allclose(subset[row, :subset_lengths[row]], full[index, :full_lengths[index]])
+
+    again, _ = engine.augment(poses, types, lengths)
+    np.testing.assert_array_equal(again, full)
+    other_epoch, _ = engine.augment(poses, types, lengths, epoch=1)
+    assert not np.allclose(other_epoch[:, :5], full[:, :5])
+    assert ((full[..., :2] >= 0) & (full[..., :2] <= 1)).all()
+
+
+def test_spatial_transform_matches_per_frame_implementation():
+    poses = _poses(1, frames=3)
+    engine = BatchPoseAugmenter(_params(spatial={'horizontal_flip': True}), seed=5)
+    augmented, _ = engine.augment(poses, ("spatial",))
+
+    # Recover the parameters the engine drew for sample 0
+    rng = engine.sample_rng(0)
+    scale = rng.uniform(0.8, 1.2)
+    translate = rng.uniform(-0.1, 0.1, size=2)
+    rotate = rng.uniform(-15, 15)
+    flip = rng.random() < 0.5
+
+    legacy = PoseDataAugmenter()
+    for frame, expected in zip(poses[0], augmented[0]):
+        landmarks = [dict(zip(('x', 'y', 'z', 'visibility'), point)) for point in frame]
+        result = legacy._apply_spatial_transform(landmarks, scale, list(translate), rotate, flip)
+        xy = np.array([[lm['x'], lm['y']] for lm in result])
+        np.testing.assert_allclose(expected[:, :2], xy)
+
+
+def test_temporal_resampling_interpolates_between_frames():
+    # Linear motion stays linear after resampling, endpoints are preserved
+    poses = np.zeros((2, 11, 33, 3))
+    poses[..., 0] = np.linspace(0.0, 1.0, 11)[None, :, None]
+    engine = BatchPoseAugmenter(_params(temporal={'speed_variation': (0.5, 0.5), 'frame_drop_rate': 0.0}))
+
+    resampled, lengths = engine.augment(poses, ("temporal",), lengths=[11, 7])
+
+    assert lengths.tolist() == [5, 3]
+    np.testing.assert_allclose(resampled[0, :, 0, 0], [0.0, 0.25, 0.5, 0.75, 1.0])
+    np.testing.assert_allclose(resampled[1, :, 0, 0], [0.0, 0.3, 0.6, 0.6, 0.6])
+
+
+def test_loader_streams_same_copies_as_batch_api():
+    poses = _poses(5, frames=12)
+    labels = ['squat', 'squat', 'deadlift', 'bench_press', 'squat']
+    loader = AugmentedPoseLoader(poses, labels=labels, batch_size=4, augmentations_per_sample=2,
+                                 shuffle=False, seed=9)
+
+    batches = list(loader)
+    assert len(batches) == len(loader) == 3
+    streamed = [seq[:n] for batch, lengths, _ in batches for seq, n in zip(batch, lengths)]
+    assert [label for _, _, batch_labels in batches for label in batch_labels] == labels * 2
+
+    augmenter = PoseDataAugmenter(seed=9)
+    expected = augmenter.augment_batch(list(poses), num_augmentations=2)
+    for copy in range(2):
+        for i in range(5):
+            values = np.array([[list(lm.values()) for lm in frame] for frame in expected[i][copy]])
+            np.testing.assert_allclose(streamed[copy * 5 + i], values)
+
+    # The next pass is a new epoch
+    assert loader.epoch == 1
+    assert not np.allclose(next(iter(loader))[0][0, :3], batches[0][0][0, :3])
+
+
+def test_invalid_shape_raises():
+    with pytest.raises(ValueError):
+        BatchPoseAugmenter().augment(np.zeros((2, 5, 17, 3)))
+
+
+def test_create_balanced_dataset(tmp_path):
+    rng = np.random.default_rng(1)
+    samples = [
+        {'data_id': f'squat_{i}', 'exercise_type': 'squat',
+         'landmarks_sequence': [[{'x': float(x), 'y': float(y), 'z': 0.0, 'visibility': 1.0}
+                                 for x, y in rng.uniform(0.3, 0.7, size=(33, 2))]
+                                for _ in range(10 + i)]}
+        for i in range(3)
+    ]
+    input_path = tmp_path / 'input.json'
+    with open(input_path, 'w') as f:
+        json.dump({'samples': samples}, f)
+
+    stats = create_balanced_dataset(str(input_path), str(tmp_path / 'out.json'),
+                                    target_samples_per_class=8, exercise_types=['squat', 'deadlift'])
+
+    assert stats == {'squat': 8, 'deadlift': 0}
+    with open(tmp_path / 'out.json') as f:
+        output = json.load(f)
+    augmented = [s for s in output['samples'] if s.get('is_augmented')]
+    assert len(augmented) == 5
+    assert [s['data_id'] for s in augmented] == ['squat_0', 'squat_1', 'squat_2', 'squat_0', 'squat_1']
+    assert all(len(frame) == 33 for s in augmented for frame in s['landmarks_sequence'])
@@ -0,0 +1,144 @@
+"""
+Unit tests for the corpus-scale preprocessing pipeline
+"""
+import csv
+import json
+import os
+
+import numpy as np
+import pytest
+
+from ml.data.pose_codec import encode_landmarks
+from ml.scripts.corpus_preprocessing import (
+    FEATURE_NAMES,
+    CorpusPreprocessor,
+    RunningStats,
+    augment_poses,
+    compute_features,
+    fill_missing_landmarks,
+    records_to_arrays,
+    valid_pose_mask,
+)
+
+
+def _pose(rng):
+    pose = np.column_stack([
+        rng.uniform(0.3, 0.7, 33), rng.uniform(0.1, 0.9, 33),
+        rng.uniform(-0.2, 0.2, 33), rng.uniform(0.6, 1.0, 33),
+    ])
+    # Plausible shoulder/hip box so the proportion check passes
+    pose[[11, 12, 23, 24], :3] = [[0.4, 0.3, 0], [0.6, 0.3, 0], [0.42, 0.6, 0], [0.58, 0.6, 0]]
+    return pose
+
+
+def _records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'session_id': f'session-{i}',
+            'exercise': 'squat',
+            'timestamp': '2024-01-01 12:00:00',
+            'pose_data': _pose(rng).tolist(),
+            'metadata': json.dumps({'height': 170, 'weight': 65, 'experience': 'intermediate'}),
+            'performance': {'weight': 60, 'reps': 8, 'form_score': 0.7},
+        }
+        for i in range(n)
+    ]
+
+
+def _read_split(output_dir, split):
+    rows = []
+    split_dir = os.path.join(output_dir, split)
+    for name in sorted(os.listdir(split_dir)) if os.path.isdir(split_dir) else []:
+        with open(os.path.join(split_dir, name), newline='') as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+
+def test_running_stats_matches_numpy():
+    values = np.random.default_rng(3).normal(5.0, 2.0, size=(1000, 4))
+    stats = RunningStats(4)
+    for chunk in np.array_split(values, 13):
+        stats.update(chunk)
+
+    np.testing.assert_allclose(stats.mean, values.mean(axis=0))
+    np.testing.assert_allclose(stats.std, values.std(axis=0))
+
+
+def test_cleaning_and_features():
+    records = _records(3)
+    records[0]['pose_data'] = records[0]['pose_data'][:20]
+    records[1]['pose_data'][13][3] = 0.1  # left elbow hidden, right elbow visible
+    records[2]['pose_data'][0][:2] = [3.0, 3.0]  # outlier
+
+    arrays, rejected = records_to_arrays(records)
+    assert rejected == 1
+
+    filled = fill_missing_landmarks(arrays['pose'])
+    right_elbow = arrays['pose'][0, 14]
+    np.testing.assert_allclose(filled[0, 13], [1 - right_elbow[0], right_elbow[1], right_elbow[2], 0.5])
+    assert valid_pose_mask(filled).tolist() == [True, False]
+
+    features = compute_features(filled, arrays['height'], arrays['weight'], arrays['experience'])
+    assert features.shape == (2, len(FEATURE_NAMES))
+    assert features[0, FEATURE_NAMES.index('experience_level')] == 0.5
+    assert features[0, FEATURE_NAMES.index('distance_shoulder_width')] == pytest.approx(0.2)
+
+
+def test_ragged_pose_is_rejected():
+    records = _records(2)
+    records[0]['pose_data'][32] = [0.5]
+
+    arrays, rejected = records_to_arrays(records)
+    assert rejected == 1
+    assert arrays['session_id'].tolist() == ['session-1']
+
+
+def test_flip_twice_is_identity():
+    poses = np.stack([_pose(np.random.default_rng(i)) for i in range(4)])
+    rng = np.random.default_rng(0)
+    np.testing.assert_allclose(augment_poses(augment_poses(poses, 0, rng), 0, rng), poses)
+
+
+def test_pipeline_is_deterministic_across_worker_counts(tmp_path):
+    batches = [_records(40, seed=s) for s in range(3)]
+
+    serial = CorpusPreprocessor(str(tmp_path / 'serial'), workers=0, seed=7).run(batches)
+    parallel = CorpusPreprocessor(str(tmp_path / 'parallel'), workers=2, seed=7).run(batches)
+
+    assert serial['raw_samples'] == 120
+    assert serial['final_samples'] == serial['cleaned_samples'] * 3
+    assert serial['train_samples'] + serial['val_samples'] + serial['test_samples'] == serial['final_samples']
+    for split in ('train', 'val', 'test'):
+        assert _read_split(str(tmp_path / 'serial'), split) == _read_split(str(tmp_path / 'parallel'), split)
+
+    # Normalized with corpus-wide statistics; augmented copies stay in their source's split
+    train = _read_split(str(tmp_path / 'serial'), 'train')
+    values = np.array([float(row['angle_left_knee_normalized']) for row in train])
+    assert np.isfinite(values).all()
+    train_ids = {row['session_id'] for row in train}
+    assert all(f'{sid}_aug_0' in train_ids for sid in train_ids if '_aug_' not in sid)
+    assert not os.path.exists(tmp_path / 'serial' / '_work')
+
+    with open(tmp_path / 'serial' / 'normalization_stats.json') as f:
+        assert set(json.load(f)) == set(FEATURE_NAMES)
+
+
+def test_parallel_pipeline_accepts_memoryview_blobs(tmp_path):
+    # psycopg2 returns BYTEA columns as memoryview, which cannot be pickled
+    batches = [_records(20, seed=s) for s in range(2)]
+    blob_batches = [
+        [dict(r, pose_data=None, pose_blob=memoryview(encode_landmarks(r['pose_data']))) for r in batch]
+        for batch in batches
+    ]
+
+    expected = CorpusPreprocessor(str(tmp_path / 'json'), workers=0, seed=3).run(batches)
+    result = CorpusPreprocessor(str(tmp_path / 'blob'), workers=2, seed=3).run(blob_batches)
+
+    assert result['raw_samples'] == 40
+    assert result['final_samples'] == expected['final_samples']
+
+
+def test_pipeline_without_data_raises(tmp_path):
+    with pytest.raises(ValueError):
+        CorpusPreprocessor(str(tmp_path), workers=0).run([])
@@ -0,0 +1,117 @@
+"""
+Unit tests for the indexed exercise catalog
+"""
+import json
+
+import pytest
+
+from core.exercise_database import (
+    EXERCISE_DATABASE, ExerciseCatalog, add_custom_exercise, exercise_catalog,
+    get_all_exercises, get_exercise_by_id, get_exercises_by_category,
+    get_exercises_by_muscle, normalize_search_text, remove_custom_exercise, search_exercises
+)
+
+
+def _ids(results):
+    return [e['id'] for e in results]
+
+
+def test_lookups_match_database():
+    flat = [
+        exercise['id']
+        for category in EXERCISE_DATABASE.values()
+        for subcategory in category['subcategories'].values()
+        for exercise in subcategory['exercises']
+    ]
+    assert _ids(get_all_exercises()) == flat
+    assert get_exercise_by_id('squat')['subcategory'] == 'quadriceps'
+    assert get_exercise_by_id('missing') is None
+    assert len(get_exercises_by_category('legs')) == sum(
+        len(s['exercises']) for s in EXERCISE_DATABASE['legs']['subcategories'].values()
+    )
+    assert 'category' not in get_exercises_by_category('legs')[0]
+    assert get_exercises_by_category('unknown') == []
+    assert {e['subcategory'] for e in get_exercises_by_muscle('quadriceps')} == {'quadriceps'}
+
+
+def test_prefix_substring_and_kana_search():
+    assert _ids(search_exercises('スクワット'))[0] == 'squat'
+    squats = set(_ids(search_exercises('スク')))
+    assert {'squat', 'front_squat', 'goblet_squat'} <= squats
+    assert _ids(search_exercises('すくわっと')) == _ids(search_exercises('スクワット'))
+    assert _ids(search_exercises('SQUAT'))[0] == 'squat'
+    assert 'leg_press' in _ids(search_exercises('レッグプレ'))
+
+
+def test_category_and_fuzzy_search():
+    legs = {e['id'] for e in get_exercises_by_category('legs')}
+    assert set(_ids(search_exercises('脚部'))) == legs
+    assert _ids(search_exercises('スクワッド'))[0] == 'squat'
+    assert search_exercises('') == []
+    assert len(search_exercises('プレス', limit=3)) == 3
+
+
+def test_search_finds_everything_the_substring_search_found():
+    exercises = get_all_exercises()
+    fields = ('name', 'category_name', 'subcategory_name')
+
+    def substring_search(query):
+        query = query.lower()
+        return {e['id'] for e in exercises if any(query in e[f].lower() for f in fields)}
+
+    queries = {
+        text[i:j]
+        for e in exercises for text in (e[f] for f in fields)
+        for i in range(len(text)) for j in range(i + 1, len(text) + 1)
+    }
+    missing = {
+        query: substring_search(query) - set(_ids(search_exercises(query, limit=len(exercises))))
+        for query in queries
+    }
+    assert {query: ids for query, ids in missing.items() if ids} == {}
+    assert len(search_exercises('胸筋', limit=len(exercises))) == len(substring_search('胸筋'))
+
+
+def test_serialized_response_is_cached_and_invalidated():
+    catalog = ExerciseCatalog(EXERCISE_DATABASE)
+    body = catalog.serialized()
+    assert catalog.serialized() is body
+    assert len(json.loads(body)['exercises']) == len(catalog)
+
+    catalog.add_exercise({**catalog.get('squat'), 'id': 'box_squat', 'name': 'ボックススクワット'})
+    assert len(json.loads(catalog.serialized())['exercises']) == len(catalog)
+    assert 'box_squat' in _ids(catalog.search('ボックス'))
+    with pytest.raises(ValueError):
+        catalog.add_exercise(catalog.get('squat'))
+
+    assert catalog.remove_exercise('box_squat')
+    assert catalog.search('ボックス') == []
+
+
+def test_custom_exercises_are_per_owner():
+    add_custom_exercise({'id': 'zercher_squat', 'name': 'ザーチャースクワット', 'type': 'compound'},
+                        'legs', 'quadriceps', owner='alice')
+    try:
+        assert 'zercher_squat' in _ids(search_exercises('ザーチャー', owner='alice'))
+        assert search_exercises('ザーチャー', owner='bob') == []
+        assert search_exercises('ザーチャー') == []
+        assert get_exercise_by_id('zercher_squat', owner='alice')['custom']
+        assert 'zercher_squat' not in exercise_catalog
+        with pytest.raises(ValueError):
+            add_custom_exercise({'id': 'squat', 'name': 'x'}, 'legs', 'quadriceps', owner='alice')
+        with pytest.raises(ValueError):
+            add_custom_exercise({'id': 'new', 'name': 'x'}, 'legs', 'nope', owner='alice')
+    finally:
+        remove_custom_exercise('zercher_squat', owner='alice')
+
+
+def test_autocomplete_cost_does_not_grow_with_catalog():
+    catalog = ExerciseCatalog(EXERCISE_DATABASE)
+    base = catalog.all_exercises()
+    for i in range(5000):
+        entry = base[i % len(base)]
+        catalog.add_exercise({**entry, 'id': f"{entry['id']}_{i}", 'name': f"{entry['name']}{i}"})
+
+    node = catalog._find(normalize_search_text('スク'))
+    assert len(node.top) <= ExerciseCatalog.MAX_PREFIX_CANDIDATES
+    assert len(catalog.search('スク', limit=20)) == 20
@@ -0,0 +1,100 @@
+"""
+Unit tests for the streaming training data encoders
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from ml.data.export_formats import (
+    CSV_FIELDNAMES,
+    PARQUET_AVAILABLE,
+    encode_records,
+    export_filename,
+    iter_json,
+    validate_format,
+)
+
+
+def _record(i):
+    return {
+        'session_id': f'session-{i}',
+        'timestamp': datetime(2024, 1, 1, 12, 0, i % 60),
+        'exercise': 'squat',
+        'pose_data': [[0.1 * j, 0.2, 0.3, 0.9] for j in range(33)],
+        'metadata': {'height': 170, 'weight': 65, 'experience': 'beginner'},
+        'performance': json.dumps({'weight': 60, 'reps': 10, 'form_score': 0.8}),
+    }
+
+
+def _records(n):
+    # Passed as a generator: encoders must consume records lazily
+    return (_record(i) for i in range(n))
+
+
+def test_csv_streams_header_once_and_flattens_pose():
+    chunks = list(encode_records(_records(50), 'csv', chunk_bytes=1024))
+
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+    assert len(rows) == 50
+    assert list(rows[0].keys()) == CSV_FIELDNAMES
+    assert rows[0]['timestamp'] == '2024-01-01T12:00:00'
+    assert rows[0]['performance_reps'] == '10'
+    assert float(rows[3]['pose_2_x']) == pytest.approx(0.2)
+
+
+def test_empty_exports():
+    assert b''.join(encode_records(iter([]), 'csv')) == b''
+    assert json.loads(b''.join(encode_records(iter([]), 'json'))) == []
+
+
+def test_json_and_ndjson_round_trip():
+    records = json.loads(b''.join(encode_records(_records(3), 'json')))
+    assert [r['session_id'] for r in records] == ['session-0', 'session-1', 'session-2']
+    assert records[0]['performance']['form_score'] == 0.8
+
+    lines = b''.join(encode_records(_records(3), 'ndjson')).decode('utf-8').splitlines()
+    assert [json.loads(line)['session_id'] for line in lines] == ['session-0', 'session-1', 'session-2']
+
+    # One piece per element plus the closing bracket
+    assert len(list(iter_json(_records(3)))) == 4
+
+
+def test_gzip_output_decompresses_to_plain_output():
+    plain = b''.join(encode_records(_records(20), 'ndjson'))
+    compressed = b''.join(encode_records(_records(20), 'ndjson', compress=True, chunk_bytes=256))
+
+    assert gzip.decompress(compressed) == plain
+    assert export_filename('ndjson', compress=True) == 'training_data.ndjson.gz'
+
+
+def test_unsupported_format_fails_before_streaming():
+    consumed = []
+
+    def records():
+        consumed.append(True)
+        yield _record(0)
+
+    with pytest.raises(ValueError):
+        encode_records(records(), 'xml')
+    assert not consumed
+    with pytest.raises(ValueError):
+        validate_format('xml')
+    assert validate_format('NDJSON') == 'ndjson'
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow is not installed")
+def test_parquet_row_groups():
+    import pyarrow.parquet as pq
+    from ml.data import export_formats
+
+    data = b''.join(export_formats.iter_parquet(_records(25), row_group_size=10))
+    table = pq.read_table(io.BytesIO(data))
+
+    assert table.num_rows == 25
+    assert pq.ParquetFile(io.BytesIO(data)).num_row_groups == 3
+    assert table.column('session_id')[24].as_py() == 'session-24'
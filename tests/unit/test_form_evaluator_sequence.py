@@ -0,0 +1,55 @@
+"""
+Unit tests for sequence-level form evaluation
+"""
+import numpy as np
+import pytest
+
+from ml.data_collection.synthetic_data_generator import SyntheticPoseGenerator
+from ml.models.form_evaluator import FormEvaluator, evaluate_exercise_sequence
+
+
+def make_sequence(exercise):
+    generator = SyntheticPoseGenerator(seed=3)
+    generate = {
+        'squat': generator.generate_squat_sequence,
+        'bench_press': generator.generate_bench_press_sequence,
+        'deadlift': generator.generate_deadlift_sequence,
+    }[exercise]
+    frames = generate(num_reps=2, fps=30.0)
+    return np.array([[[lm.x, lm.y, lm.z] for lm in frame.landmarks] for frame in frames])
+
+
+@pytest.mark.parametrize("exercise", ["squat", "bench_press", "deadlift"])
+def test_sequence_scores_match_single_frame(exercise):
+    sequence = make_sequence(exercise)
+    phases = ['bottom', 'top', None, 'middle'] * (len(sequence) // 4 + 1)
+    phases = phases[:len(sequence)]
+    evaluator = FormEvaluator(exercise)
+    evaluation = evaluator.evaluate_sequence(sequence, phases)
+
+    for index in range(0, len(sequence), 7):
+        single = evaluator.evaluate_form(sequence[index], phases[index])
+        assert evaluation.overall_scores[index] == pytest.approx(single['overall_score'])
+
+        feedback = [f.to_dict() for f in evaluation.frame_feedback(index)]
+        assert [f['aspect'] for f in feedback] == [f['aspect'] for f in single['feedback']]
+        assert [f['message'] for f in feedback] == [f['message'] for f in single['feedback']]
+
+
+def test_evaluate_exercise_sequence_summary():
+    sequence = make_sequence('squat')
+    result = evaluate_exercise_sequence(list(sequence), 'squat')
+
+    assert result['frame_count'] == len(sequence)
+    assert result['min_score'] <= result['average_score'] <= result['max_score']
+    assert len(result['issue_feedback']) == len(result['top_issues'])
+    for issue, feedback in zip(result['top_issues'], result['issue_feedback']):
+        assert feedback['aspect'] == issue['issue']
+        assert feedback['severity'] in ('warning', 'error')
+
+
+def test_empty_sequence():
+    result = evaluate_exercise_sequence([], 'squat')
+    assert result['frame_count'] == 0
+    assert result['average_score'] == 0
+    assert result['top_issues'] == []
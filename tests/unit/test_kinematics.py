@@ -0,0 +1,90 @@
+"""
+Unit tests for the shared kinematics kernel
+"""
+import math
+
+import numpy as np
+import pytest
+
+from utils.kinematics import (
+    JOINT_TRIPLETS, LANDMARK_INDEX, LANDMARK_NAMES, compute_kinematics, derivative,
+    landmarks_to_array, point_angle, triplet_angles, vector_angles
+)
+
+
+def reference_angle(p1, p2, p3):
+    v1 = np.asarray(p1, dtype=float) - p2
+    v2 = np.asarray(p3, dtype=float) - p2
+    cosine = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
+    return math.degrees(math.acos(max(-1.0, min(1.0, cosine))))
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    return rng.uniform(0.0, 1.0, size=(50, 33, 3))
+
+
+class TestAngles:
+    """Batch and scalar angle paths"""
+
+    def test_triplet_angles_match_reference(self, points):
+        angles = triplet_angles(points)
+        for name, (a, b, c) in JOINT_TRIPLETS.items():
+            if name == 'torso':
+                continue
+            ia, ib, ic = LANDMARK_INDEX[a], LANDMARK_INDEX[b], LANDMARK_INDEX[c]
+            expected = [reference_angle(f[ia], f[ib], f[ic]) for f in points]
+            assert np.allclose(angles[name], expected)
+
+    def test_scalar_and_batch_agree(self, points):
+        angles = triplet_angles(points, {'knee': (23, 25, 27)})['knee']
+        for frame, angle in zip(points, angles):
+            p1, p2, p3 = ({'x': x, 'y': y, 'z': z} for x, y, z in frame[[23, 25, 27]])
+            assert point_angle(p1, p2, p3) == pytest.approx(angle)
+
+    def test_torso_uses_virtual_points(self):
+        frame = np.zeros((1, 33, 3))
+        frame[0, LANDMARK_INDEX['LEFT_SHOULDER']] = [0.4, 0.2, 0.0]
+        frame[0, LANDMARK_INDEX['RIGHT_SHOULDER']] = [0.6, 0.2, 0.0]
+        frame[0, LANDMARK_INDEX['LEFT_HIP']] = [0.4, 0.6, 0.0]
+        frame[0, LANDMARK_INDEX['RIGHT_HIP']] = [0.6, 0.6, 0.0]
+        assert triplet_angles(frame)['torso'][0] == pytest.approx(0.0)
+
+    def test_degenerate_and_missing(self):
+        assert point_angle((0, 0, 0), (0, 0, 0), (1, 0, 0)) == 0.0
+        assert vector_angles(np.zeros(3), np.ones(3)) == 0.0
+
+        frame = landmarks_to_array([{'LEFT_HIP': {'x': 0, 'y': 0, 'z': 0}}])
+        angles = triplet_angles(frame)
+        assert np.isnan(angles['left_knee'][0])
+
+    def test_two_dimensional(self):
+        p1, p2, p3 = {'x': 1, 'y': 0, 'z': 5}, {'x': 0, 'y': 0, 'z': 0}, {'x': 0, 'y': 1, 'z': -5}
+        assert point_angle(p1, p2, p3, dims=2) == pytest.approx(90.0)
+
+
+class TestConversion:
+    """Dictionary to array conversion"""
+
+    def test_named_and_indexed_keys(self, points):
+        named = [{name: dict(zip('xyz', f[i])) for i, name in enumerate(LANDMARK_NAMES)} for f in points[:3]]
+        indexed = [{str(i): dict(zip('xyz', f[i])) for i in range(33)} for f in points[:3]]
+        assert np.allclose(landmarks_to_array(named), points[:3])
+        assert np.allclose(landmarks_to_array(indexed, dims=2), points[:3, :, :2])
+
+
+class TestDerivatives:
+    """Angular velocity and acceleration"""
+
+    def test_derivative_scheme(self):
+        series = np.array([0.0, 1.0, 4.0, 9.0, 16.0])
+        # forward at the start, backward at the end, central in between
+        assert derivative(series, 2).tolist() == [1.0, 2.0, 4.0, 6.0, 7.0]
+
+    def test_compute_kinematics_units(self, points):
+        kinematics = compute_kinematics(points, fps=30.0)
+        per_frame = derivative(kinematics.angles['left_knee'])
+        assert np.allclose(kinematics.angular_velocity['left_knee'], per_frame * 30.0)
+        assert set(kinematics.segment_lengths) >= {'left_thigh', 'torso'}
+        assert kinematics.segment_lengths['left_thigh'].shape == (len(points),)
@@ -0,0 +1,169 @@
+"""
+Unit tests for the SQLite metadata index of user contributions
+"""
+import json
+import threading
+
+import pytest
+
+from ml.data_collection.annotation_tool import ExerciseAnnotationTool
+from ml.data_collection.metadata_index import MetadataIndex
+from ml.data_collection.user_data_collector import UserDataCollector
+
+
+def _sequence(visibility=0.75, frames=5):
+    return [[{'x': 0.5, 'y': 0.5, 'z': 0.0, 'visibility': visibility}] * 33] * frames
+
+
+def _collect(collector, user, exercise='squat', visibility=0.75):
+    return collector.collect_exercise_data(user, exercise, _sequence(visibility), {'scores': {}})
+
+
+def test_collection_stats_and_export_use_index(tmp_path):
+    collector = UserDataCollector(str(tmp_path))
+    collector.record_consent('alice')
+    collector.record_consent('bob')
+
+    high = _collect(collector, 'alice')
+    _collect(collector, 'alice', exercise='deadlift', visibility=0.1)
+    _collect(collector, 'bob', exercise='deadlift')
+    assert _collect(collector, 'carol') is None
+
+    stats = collector.get_collection_stats()
+    assert stats['total_users'] == 2 and stats['active_consents'] == 2
+    assert stats['total_sessions'] == 3
+    assert stats['exercise_types'] == {'deadlift': 2, 'squat': 1}
+    assert sum(stats['quality_distribution'].values()) == 3
+    assert stats['quality_distribution']['low'] == 1
+
+    output = tmp_path / 'export.json'
+    assert collector.export_anonymized_dataset(str(output), 0.6, exercise_type='squat') == 1
+    with open(output) as f:
+        sample = json.load(f)['samples'][0]
+    assert sample['landmarks_sequence'] == _sequence()
+    assert collector.export_anonymized_dataset(str(output), 0.6) == 2
+
+    # Revoking removes index rows and files together
+    assert collector.revoke_consent('alice')
+    assert not collector.check_consent('alice')
+    assert collector.get_collection_stats()['total_sessions'] == 1
+    assert not list((tmp_path / 'raw').glob(f'{high}*'))
+    assert not collector.revoke_consent('nobody')
+
+    # A second instance sees the same committed state
+    assert UserDataCollector(str(tmp_path)).get_collection_stats()['active_consents'] == 1
+
+
+def test_existing_files_are_imported_once(tmp_path):
+    (tmp_path / 'raw').mkdir()
+    with open(tmp_path / 'consent_records.json', 'w') as f:
+        json.dump({'abc': {'consent_id': 'c1', 'user_hash': 'abc', 'consent_type': 'full',
+                           'purposes': ['research'], 'granted_at': '2024-01-01T00:00:00',
+                           'expires_at': '2999-01-01T00:00:00', 'revoked': False}}, f)
+    with open(tmp_path / 'raw' / 'abc_1.json', 'w') as f:
+        json.dump({'data_id': 'abc_1', 'user_hash': 'abc', 'exercise_type': 'squat',
+                   'collected_at': '2024-01-01T00:00:00', 'frame_count': 3,
+                   'quality_metrics': {'overall_score': 0.9}}, f)
+
+    index = MetadataIndex(str(tmp_path))
+    assert index.get_consent('abc')['purposes'] == ['research']
+    assert [s['data_id'] for s in index.query_sessions(min_quality=0.8)] == ['abc_1']
+
+    (tmp_path / 'raw' / 'abc_1.json').unlink()
+    assert MetadataIndex(str(tmp_path)).session_stats()['total_sessions'] == 1
+    index.rebuild()
+    assert index.session_stats()['total_sessions'] == 0
+
+
+def test_rebuild_keeps_revoked_consent(tmp_path):
+    with open(tmp_path / 'consent_records.json', 'w') as f:
+        json.dump({'abc': {'consent_id': 'c1', 'user_hash': 'abc', 'consent_type': 'full',
+                           'purposes': ['research'], 'granted_at': '2024-01-01T00:00:00',
+                           'expires_at': '2999-01-01T00:00:00', 'revoked': False}}, f)
+
+    index = MetadataIndex(str(tmp_path))
+    assert not (tmp_path / 'consent_records.json').exists()
+    assert (tmp_path / 'consent_records.json.imported').exists()
+
+    assert index.revoke_consent('abc', '2024-06-01T00:00:00')
+    index.rebuild()
+    assert index.get_consent('abc')['revoked']
+    assert MetadataIndex(str(tmp_path)).get_consent('abc')['revoked']
+
+
+def test_failed_write_leaves_no_files_or_rows(tmp_path):
+    index = MetadataIndex(str(tmp_path))
+    target = tmp_path / 'blob.bin'
+
+    with pytest.raises(RuntimeError):
+        with index.write_files({target: b'data'}) as conn:
+            index.add_session({'data_id': 'x', 'user_hash': 'u'}, conn=conn)
+            raise RuntimeError('boom')
+
+    assert not target.exists()
+    assert list(tmp_path.glob('blob.bin*')) == []
+    assert index.query_sessions() == []
+
+
+def test_concurrent_writers(tmp_path):
+    MetadataIndex(str(tmp_path))
+    errors = []
+
+    def write(worker):
+        index = MetadataIndex(str(tmp_path))
+        try:
+            for i in range(25):
+                index.add_session({'data_id': f'{worker}_{i}', 'user_hash': f'user{worker}',
+                                   'exercise_type': 'squat', 'quality_metrics': {'overall_score': 0.7}})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    stats = MetadataIndex(str(tmp_path)).session_stats()
+    assert stats['total_sessions'] == 100
+    assert stats['quality_distribution']['medium'] == 100
+
+
+def test_annotation_workflow(tmp_path):
+    collector = UserDataCollector(str(tmp_path))
+    collector.record_consent('alice')
+    first = _collect(collector, 'alice')
+    second = _collect(collector, 'alice')
+
+    tool = ExerciseAnnotationTool(str(tmp_path))
+    tool.add_to_annotation_queue(first, priority=1)
+    tool.add_to_annotation_queue(second, priority=9)
+
+    # Only the lease holder may annotate
+    assert not tool.create_annotation(second, 'annotator', {'form_quality': {'overall': 85}})
+    assert tool.get_next_for_annotation('annotator')['data_id'] == second
+    assert not tool.create_annotation(second, 'someone_else', {'form_quality': {'overall': 85}})
+    assert not (tmp_path / 'annotated' / f'{second}_annotated.json').exists()
+    assert tool.create_annotation(second, 'annotator', {
+        'form_quality': {'overall': 85, 'depth': 75},
+        'common_errors': {'knee_cave': True, 'heel_rise': False},
+    })
+
+    stats = tool.get_annotation_stats()
+    assert (stats['pending'], stats['in_progress'], stats['completed']) == (1, 0, 1)
+    assert stats['annotated_files'] == 1
+    assert stats['quality_distribution'] == {80: 1}
+    assert stats['common_errors_frequency'] == {'knee_cave': 1}
+
+    output = tmp_path / 'training.json'
+    assert tool.export_training_data(str(output), min_quality=70) == 1
+    assert tool.export_training_data(str(output), min_quality=90) == 0
+    assert tool.export_training_data(str(output), required_annotations=['phase_labels']) == 0
+
+    # Annotations without form quality ratings are not dropped by the threshold
+    assert tool.get_next_for_annotation('annotator')['data_id'] == first
+    assert tool.create_annotation(first, 'annotator', {'common_errors': {'heel_rise': True}})
+    assert tool.export_training_data(str(output), min_quality=90) == 1
+    with open(output) as f:
+        assert json.load(f)['samples'][0]['metadata']['quality_score'] is None
@@ -0,0 +1,90 @@
+"""
+Unit tests for the batched MLInferenceEngine path
+"""
+import numpy as np
+import pytest
+
+from ml.api.inference import MLInferenceEngine, LANDMARK_NAMES
+from ml.data_collection.synthetic_data_generator import SyntheticPoseGenerator
+from ml.models.exercise_classifier import ExerciseClassifier
+
+
+def to_named(frame):
+    return {
+        name: {'x': float(x), 'y': float(y), 'z': float(z), 'visibility': float(v)}
+        for name, (x, y, z, v) in zip(LANDMARK_NAMES, frame)
+    }
+
+
+@pytest.fixture(scope="module")
+def squat_sequence():
+    generator = SyntheticPoseGenerator(seed=7)
+    frames = generator.generate_squat_sequence(num_reps=2, fps=30.0)
+    return np.array([
+        [[lm.x, lm.y, lm.z, lm.visibility] for lm in frame.landmarks]
+        for frame in frames
+    ])
+
+
+@pytest.fixture
+def engine():
+    engine = MLInferenceEngine()
+    engine.classifier = ExerciseClassifier(use_ml=False)
+    return engine
+
+
+class TestExerciseClassifierBatch:
+    """Batch feature extraction and prediction"""
+
+    def test_matches_per_frame_classification(self, squat_sequence):
+        classifier = ExerciseClassifier(use_ml=False)
+        features = classifier.extract_features_batch(squat_sequence)
+        labels, confidences = classifier.predict(features)
+
+        for frame, label, confidence in zip(squat_sequence, labels, confidences):
+            expected = classifier.classify_exercise(frame[:, :3].tolist())
+            assert label == expected['exercise']
+            assert confidence == pytest.approx(expected['confidence'])
+
+    def test_feature_columns(self, squat_sequence):
+        classifier = ExerciseClassifier(use_ml=False)
+        features = classifier.extract_features_batch(squat_sequence)
+        assert features.shape == (len(squat_sequence), len(ExerciseClassifier.FEATURE_NAMES))
+
+
+class TestBatchAnalyze:
+    """Session-level batch analysis"""
+
+    def test_single_model_call(self, engine, squat_sequence):
+        calls = []
+        predict = engine.classifier.predict
+
+        def counting_predict(features):
+            calls.append(len(features))
+            return predict(features)
+
+        engine.classifier.predict = counting_predict
+        session = [{'landmarks': to_named(frame)} for frame in squat_sequence]
+        result = engine.batch_analyze(session)
+
+        assert result['success']
+        assert calls == [len(session)]
+        assert len(result['frame_results']['form_score']) == len(session)
+        assert sum(result['session_summary']['exercise_distribution'].values()) == len(session)
+
+    def test_columnar_results_match_single_frame(self, engine, squat_sequence):
+        session = [{'landmarks': to_named(frame)} for frame in squat_sequence[::10]]
+        session.insert(1, {'timestamp': 0})  # frames without landmarks are skipped
+        result = engine.batch_analyze(session)
+        columns = result['frame_results']
+
+        for position, frame_index in enumerate(columns['frame_index']):
+            single = engine.analyze_pose(session[frame_index]['landmarks'])
+            assert columns['exercise_type'][position] == single['exercise_type']
+            assert columns['form_score'][position] == single['analysis']['form_score']
+            assert columns['quality'][position] == single['quality']
+        assert 1 not in columns['frame_index']
+
+    def test_empty_session(self, engine):
+        assert not engine.batch_analyze([])['success']
+        assert not engine.batch_analyze([{'timestamp': 0}])['success']
@@ -0,0 +1,90 @@
+"""
+Unit tests for the versioned model registry
+"""
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from ml.models.registry import ModelRegistry
+
+
+@pytest.fixture
+def registry_root(tmp_path):
+    return str(tmp_path / "artifacts")
+
+
+def test_publish_and_load_once(registry_root):
+    writer = ModelRegistry(registry_root, check_interval=0)
+    version = writer.publish('demo', {'weights': np.arange(1000.0)}, metadata={'accuracy': 0.9})
+
+    reader = ModelRegistry(registry_root, check_interval=60)
+    artifact = reader.get('demo')
+    assert artifact.version == version
+    assert artifact.metadata == {'accuracy': 0.9}
+    # Numpy buffers are memory-mapped rather than copied into the process
+    assert isinstance(artifact.payload['weights'], np.memmap)
+    assert reader.get('demo') is artifact
+
+
+def test_hot_swap_and_rollback(registry_root):
+    writer = ModelRegistry(registry_root, check_interval=0)
+    reader = ModelRegistry(registry_root, check_interval=0)
+
+    first = writer.publish('demo', {'value': 1}, version='v1')
+    assert reader.get('demo').payload == {'value': 1}
+
+    writer.publish('demo', {'value': 2}, version='v2')
+    assert reader.get('demo').version == 'v2'
+    assert reader.get('demo').payload == {'value': 2}
+
+    writer.activate('demo', first)
+    assert reader.get('demo').version == 'v1'
+    assert writer.versions('demo') == ['v1', 'v2']
+
+    with pytest.raises(FileNotFoundError):
+        writer.activate('demo', 'missing')
+
+
+def test_legacy_fallback_and_missing(registry_root, tmp_path):
+    registry = ModelRegistry(registry_root, check_interval=0)
+    assert registry.get('demo') is None
+
+    legacy = str(tmp_path / "legacy.pkl")
+    joblib.dump({'value': 'old'}, legacy)
+    artifact = registry.get('demo', legacy_path=legacy)
+    assert artifact.version == 'legacy'
+    assert artifact.payload == {'value': 'old'}
+
+    registry.publish('demo', {'value': 'new'})
+    assert registry.get('demo', legacy_path=legacy).payload == {'value': 'new'}
+
+
+def test_broken_artifact_keeps_previous_version(registry_root):
+    writer = ModelRegistry(registry_root, check_interval=0)
+    reader = ModelRegistry(registry_root, check_interval=0)
+    writer.publish('demo', {'value': 1}, version='v1')
+    assert reader.get('demo').version == 'v1'
+
+    writer.publish('demo', {'value': 2}, version='v2')
+    with open(os.path.join(registry_root, 'demo', 'v2.joblib'), 'wb') as f:
+        f.write(b'corrupt')
+
+    assert reader.get('demo').version == 'v1'
+    assert 'demo' in reader.describe()
+
+
+def test_missing_artifact_is_cached_for_check_interval(registry_root, monkeypatch):
+    registry = ModelRegistry(registry_root, check_interval=60)
+    assert registry.get('demo') is None
+
+    stats = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, 'stat', lambda path, *a, **kw: stats.append(path) or real_stat(path, *a, **kw))
+    assert registry.get('demo') is None
+    assert stats == []
+
+    # Publishing in this process is picked up immediately
+    registry.publish('demo', {'value': 1})
+    assert registry.get('demo').payload == {'value': 1}
@@ -0,0 +1,67 @@
+"""
+Unit tests for array-native and incremental phase detection
+"""
+import numpy as np
+import pytest
+
+from ml.models.phase_detector import PhaseDetector, analyze_exercise_phases
+
+
+def make_sequence(fps=30.0, seconds=30.0, period=3.0):
+    """Hip height alternating between top and bottom plateaus"""
+    t = np.arange(int(fps * seconds)) / fps
+    noise = np.random.default_rng(1).normal(0, 0.001, len(t))
+    hip_y = 0.5 + 0.1 * np.sign(np.sin(2 * np.pi * t / period + 0.3)) + noise
+    sequence = np.zeros((len(t), 33, 3))
+    sequence[:, :, 1] = hip_y[:, None]
+    return sequence
+
+
+def phase_tuples(phases):
+    return [(p.phase, p.start_frame, p.end_frame) for p in phases]
+
+
+@pytest.mark.parametrize("exercise", ["squat", "bench_press", "deadlift"])
+def test_streaming_matches_batch(exercise):
+    sequence = make_sequence()
+    batch = PhaseDetector(exercise).detect_phases(sequence)
+
+    detector = PhaseDetector(exercise)
+    streamed = [phase for phase in map(detector.update, sequence) if phase is not None]
+    streamed += detector.finish()
+
+    assert phase_tuples(streamed) == phase_tuples(batch)
+    assert [p.confidence for p in streamed] == pytest.approx([p.confidence for p in batch])
+
+
+def test_batch_accepts_list_and_array():
+    sequence = make_sequence()
+    detector = PhaseDetector('squat')
+    from_array = detector.detect_phases(sequence)
+    from_list = detector.detect_phases(list(sequence))
+
+    assert phase_tuples(from_array) == phase_tuples(from_list)
+    assert from_array[0].start_frame == 0
+    assert from_array[-1].end_frame == len(sequence) - 1
+    for previous, current in zip(from_array, from_array[1:]):
+        assert current.start_frame == previous.end_frame + 1
+
+
+def test_repetitions_and_extrema():
+    sequence = make_sequence()
+    results = analyze_exercise_phases(sequence, 'squat')
+    assert results['repetition_count'] >= 8
+
+    signals = PhaseDetector('squat').compute_signals(sequence)
+    bottoms, tops = signals.extrema(min_distance=0.1)
+    assert len(bottoms) == pytest.approx(10, abs=1)
+    assert len(tops) == pytest.approx(10, abs=1)
+    assert np.all(signals.positions[bottoms] > 0.55)
+
+
+def test_short_sequence():
+    assert PhaseDetector('squat').detect_phases(make_sequence()[:1]) == []
+
+    detector = PhaseDetector('squat')
+    detector.update(make_sequence()[0])
+    assert detector.finish() == []
@@ -0,0 +1,132 @@
+"""
+Unit tests for the binary pose storage format
+"""
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from ml.data.pose_codec import (
+    decode_pose_arrays,
+    encode_landmarks,
+    encode_pose_arrays,
+    is_pose_blob,
+    landmarks_to_pose_array,
+    load_pose_file,
+    resolve_pose_data,
+    write_pose_file,
+)
+from ml.data_collection.data_schema import (
+    ExerciseMetadata,
+    Landmark,
+    LandmarkMapping,
+    PoseDataset,
+    PoseFrame,
+)
+from ml.data_collection.user_data_collector import load_raw_package
+from ml.scripts.migrate_pose_storage import migrate_datasets, migrate_user_data
+
+
+def _dataset(n_frames=30):
+    rng = np.random.default_rng(0)
+    frames = []
+    for f in range(n_frames):
+        landmarks = [
+            Landmark(x=float(x), y=float(y), z=float(z), visibility=float(v),
+                     name=LandmarkMapping.get_landmark_name(i), landmark_id=i)
+            for i, (x, y, z, v) in enumerate(rng.random((33, 4)))
+        ]
+        frames.append(PoseFrame(landmarks=landmarks, timestamp=f / 30.0, frame_number=f, confidence=0.9))
+    metadata = ExerciseMetadata(exercise_type='squat', duration_seconds=n_frames / 30.0,
+                                fps=30.0, total_frames=n_frames)
+    return PoseDataset(dataset_id='squat_test', user_hash='abc123', frames=frames,
+                       metadata=metadata, created_at=datetime(2024, 1, 1, 12, 0))
+
+
+def test_arrays_round_trip_aligned_and_zero_copy():
+    arrays = {
+        'landmarks': np.arange(2 * 33 * 4, dtype=np.float32).reshape(2, 33, 4),
+        'timestamps': np.array([0.0, 0.5]),
+    }
+    blob = encode_pose_arrays(arrays, {'exercise': 'squat'})
+    decoded = decode_pose_arrays(memoryview(blob))
+
+    assert is_pose_blob(blob) and not is_pose_blob(b'[[0.1, 0.2]]')
+    assert decoded.meta == {'exercise': 'squat'}
+    np.testing.assert_array_equal(decoded.landmarks, arrays['landmarks'])
+    np.testing.assert_array_equal(decoded['timestamps'], arrays['timestamps'])
+    assert not decoded.landmarks.flags.owndata
+
+    with pytest.raises(ValueError):
+        decode_pose_arrays(blob[:-8])
+
+
+def test_landmark_dicts_and_lists_convert_to_same_array():
+    lists = [[[0.1, 0.2, 0.3, 0.9]] * 33] * 3
+    dicts = [[{'x': 0.1, 'y': 0.2, 'z': 0.3, 'visibility': 0.9}] * 33] * 3
+
+    assert landmarks_to_pose_array(lists).shape == (3, 33, 4)
+    np.testing.assert_array_equal(landmarks_to_pose_array(lists), landmarks_to_pose_array(dicts))
+    assert landmarks_to_pose_array(lists[0]).shape == (33, 4)
+
+
+def test_database_record_prefers_blob():
+    pose = [[0.5, 0.25, 0.0, 1.0]] * 33
+
+    assert resolve_pose_data({'pose_blob': encode_landmarks(pose), 'pose_data': None}) == pose
+    assert resolve_pose_data({'pose_blob': None, 'pose_data': json.dumps(pose)}) == pose
+
+
+def test_pose_dataset_bytes_round_trip_is_compact():
+    dataset = _dataset()
+    blob = dataset.to_bytes()
+    restored = PoseDataset.from_bytes(blob)
+
+    assert restored.dataset_id == dataset.dataset_id
+    assert restored.metadata == dataset.metadata
+    assert restored.created_at == dataset.created_at
+    assert [f.frame_number for f in restored.frames] == list(range(30))
+    assert restored.frames[3].landmarks[12].name == 'right_shoulder'
+    np.testing.assert_allclose(restored.landmark_array(), dataset.landmark_array(), atol=1e-3)
+
+    json_size = len(json.dumps(dataset.to_dict(), indent=2))
+    assert json_size / len(blob) > 10
+
+
+def test_pose_dataset_save_load_and_memory_map(tmp_path):
+    dataset = _dataset(5)
+    path = str(tmp_path / 'squat.pose')
+    dataset.save(path)
+
+    assert PoseDataset.load(path).frames[4].timestamp == pytest.approx(4 / 30.0)
+    arrays = PoseDataset.load_arrays(path)
+    assert isinstance(arrays.landmarks.base, np.memmap)
+    assert arrays.landmarks.shape == (5, 33, 4)
+    assert arrays.meta['metadata']['exercise_type'] == 'squat'
+
+    write_pose_file(str(tmp_path / 'plain.pose'), {'landmarks': np.zeros((1, 33, 4), np.float16)})
+    assert load_pose_file(str(tmp_path / 'plain.pose'), mmap=False).landmarks.shape == (1, 33, 4)
+
+
+def test_migrate_user_data_and_datasets(tmp_path):
+    raw_dir = tmp_path / 'user' / 'raw'
+    raw_dir.mkdir(parents=True)
+    sequence = [[{'x': 0.5, 'y': 0.5, 'z': 0.0, 'visibility': 1.0}] * 33] * 4
+    with open(raw_dir / 'u_1.json', 'w') as f:
+        json.dump({'data_id': 'u_1', 'landmarks_sequence': sequence, 'frame_count': 4}, f)
+
+    stats = migrate_user_data(str(tmp_path / 'user'))
+    assert stats['migrated'] == 1
+    with open(raw_dir / 'u_1.json') as f:
+        assert 'landmarks_sequence' not in json.load(f)
+    assert load_raw_package(raw_dir / 'u_1.json')['landmarks_sequence'] == sequence
+    assert migrate_user_data(str(tmp_path / 'user'))['skipped'] == 1
+
+    datasets = tmp_path / 'datasets'
+    datasets.mkdir()
+    _dataset(3).save(str(datasets / 'squat.json'))
+    stats = migrate_datasets(str(datasets))
+    assert stats['migrated'] == 1 and stats['bytes_before'] > 10 * stats['bytes_after']
+    assert not (datasets / 'squat.json').exists()
+    assert len(PoseDataset.load(str(datasets / 'squat.pose')).frames) == 3
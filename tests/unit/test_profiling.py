@@ -0,0 +1,77 @@
+"""
+Unit tests for pipeline profiling spans and traces
+"""
+import json
+import os
+import pytest
+
+from utils import profiling
+from utils.profiling import trace, span, traced, current_trace
+
+
+class RecordingRegistry:
+    """Minimal metrics registry capturing observations"""
+
+    def __init__(self):
+        self.observations = []
+
+    def observe(self, family, label, seconds):
+        self.observations.append((family, label, seconds))
+
+
+@pytest.fixture
+def registry():
+    recording = RecordingRegistry()
+    profiling.set_metrics_registry(recording)
+    yield recording
+    profiling.set_metrics_registry(None)
+
+
+class TestTrace:
+    """Test per-video stage breakdowns"""
+
+    def test_breakdown_aggregates_stages(self, registry):
+        with trace('unit_pipeline') as pipeline_trace:
+            for _ in range(3):
+                with span('decode'):
+                    pass
+            with span('pose_process'):
+                pass
+
+        breakdown = pipeline_trace.breakdown()
+        assert breakdown['pipeline'] == 'unit_pipeline'
+        assert breakdown['stages']['decode']['count'] == 3
+        assert breakdown['stages']['pose_process']['count'] == 1
+        assert breakdown['total_seconds'] >= 0
+
+        labels = {label for _, label, _ in registry.observations}
+        assert 'unit_pipeline.decode' in labels
+        assert 'unit_pipeline.total' in labels
+        assert current_trace() is None
+
+    def test_traced_decorator(self, registry):
+        @traced('step_under_test')
+        def step(value):
+            return value * 2
+
+        with trace('unit_pipeline') as pipeline_trace:
+            assert step(21) == 42
+
+        assert pipeline_trace.breakdown()['stages']['step_under_test']['count'] == 1
+
+    def test_span_outside_trace_records_metrics_only(self, registry):
+        with span('orphan'):
+            pass
+        assert registry.observations[-1][1] == 'untraced.orphan'
+
+    def test_chrome_trace_dump(self, registry, tmp_path):
+        with trace('unit_pipeline', dump_dir=str(tmp_path), video='sample.mp4'):
+            with span('decode'):
+                pass
+
+        files = os.listdir(tmp_path)
+        assert len(files) == 1
+        with open(tmp_path / files[0]) as f:
+            data = json.load(f)
+        names = [event['name'] for event in data['traceEvents']]
+        assert 'decode' in names and 'unit_pipeline' in names
@@ -0,0 +1,95 @@
+"""
+Unit tests for the shared rep segmentation engine
+"""
+import numpy as np
+import pytest
+
+from utils.rep_counter import RepCounter, count_reps, rep_angle_series, rep_start_at
+
+
+def knee_angles(reps=5, fps=30.0, period=2.0, noise=2.0, seed=0):
+    """Knee angle oscillating between ~170 (standing) and ~80 (bottom)"""
+    t = np.arange(int(fps * period * reps)) / fps
+    angles = 125 + 45 * np.cos(2 * np.pi * t / period)
+    return angles + np.random.default_rng(seed).normal(0, noise, len(t))
+
+
+def test_counts_reps_despite_noise():
+    segments = count_reps(knee_angles(reps=6), fps=30.0)
+
+    assert segments.count == 6
+    assert np.all(segments.rom > 70)
+    assert np.all(segments.min_angles < 90)
+    assert np.all(segments.max_angles > 160)
+    assert segments.durations == pytest.approx(np.full(6, 2.0), abs=0.3)
+    assert np.all(segments.start_frames < segments.turn_frames)
+    assert np.all(segments.turn_frames < segments.end_frames)
+    # Consecutive reps share their boundary extremum
+    assert np.array_equal(segments.start_frames[1:], segments.end_frames[:-1])
+
+
+def test_streaming_matches_batch():
+    angles = knee_angles(reps=4, noise=1.0)
+    batch = count_reps(angles, fps=30.0, hysteresis=20.0)
+
+    counter = RepCounter(fps=30.0, hysteresis=20.0)
+    completed = [rep for rep in map(counter.update, angles) if rep is not None]
+    final = counter.finish()
+    if final is not None:
+        completed.append(final)
+
+    assert len(completed) == batch.count
+    assert [rep.start_frame for rep in completed] == batch.start_frames.tolist()
+    assert [rep.end_frame for rep in completed] == batch.end_frames.tolist()
+    assert [rep.rom for rep in completed] == pytest.approx(batch.rom.tolist())
+
+
+def test_missing_frames_and_flat_signal():
+    angles = knee_angles(reps=3, noise=0.5)
+    angles[10:25] = np.nan
+    assert count_reps(angles).count == 3
+
+    assert count_reps(np.full(200, 170.0)).count == 0
+    assert count_reps([]).count == 0
+    assert count_reps([]).summary() == {'rep_count': 0, 'reps': []}
+
+
+def test_start_at_valley():
+    # Deadlift-style: starts flexed, extends, returns to the floor
+    angles = -knee_angles(reps=3, noise=0.5) + 250
+    assert count_reps(angles, start_at='valley').count == 3
+
+    with pytest.raises(ValueError):
+        RepCounter(start_at='middle')
+
+
+def test_rep_angle_series_averages_sides():
+    left = np.array([100.0, np.nan, 120.0, np.nan])
+    right = np.array([110.0, 90.0, np.nan, np.nan])
+    series = rep_angle_series({'left_knee': left, 'right_knee': right}, 'squat')
+
+    assert series[:3].tolist() == [105.0, 90.0, 120.0]
+    assert np.isnan(series[3])
+    assert rep_angle_series({'left_knee': left}, 'unknown') is None
+
+
+def test_deadlift_reps_start_at_the_floor():
+    # Hip angle: flexed at the floor (~80), extended at lockout (~170)
+    hip = 250 - knee_angles(reps=5, noise=1.0)
+    series = rep_angle_series({'left_hip': hip, 'right_hip': hip}, 'deadlift')
+
+    segments = count_reps(series, fps=30.0, start_at=rep_start_at('deadlift'))
+    assert segments.count == 5
+    assert np.all(segments.min_angles < 90)
+    assert rep_start_at('squat') == 'peak'
+
+
+def test_bench_press_reps_follow_the_elbow():
+    # The elbow flexes on each rep while the knee stays still
+    elbow = knee_angles(reps=4, noise=1.0)
+    knee = np.full(len(elbow), 90.0)
+    angles = {'left_elbow': elbow, 'right_elbow': elbow, 'left_knee': knee, 'right_knee': knee}
+
+    series = rep_angle_series(angles, 'bench_press')
+    assert count_reps(series, fps=30.0, start_at=rep_start_at('bench_press')).count == 4
+    assert count_reps(rep_angle_series(angles, 'squat')).count == 0
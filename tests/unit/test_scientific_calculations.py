@@ -2,6 +2,7 @@
 Unit tests for Scientific Calculation Engine
 Tests accuracy of BMR, TDEE, body fat estimation, and other calculations
 """
+import numpy as np
 import pytest
 from core.scientific_calculations import ScientificCalculationEngine
 
@@ -300,4 +301,63 @@ class TestBodyFatGoals:
         # Below essential fat for female
         result = ScientificCalculationEngine.check_body_fat_goals(8, "female")
         assert result["is_healthy"] == False
-        assert result["category"] == "極度に低い"
\ No newline at end of file
+        assert result["category"] == "極度に低い"
+
+class TestProfileCalculation:
+    """Test cases for the memoized profile and vectorized batch calculations"""
+    
+    def test_profile_matches_individual_formulas(self):
+        """Test that the profile chain equals the step-by-step results"""
+        result = ScientificCalculationEngine.calculate_profile(70, 170, 25, "male", "moderate", "muscle_gain")
+        assert result["bmr"] == 1642.5
+        assert result["tdee"] == 2545.9
+        assert result["target_calories"] == 2927.8
+        assert result["macros"]["protein"]["grams"] == 219.6
+        assert result["calorie_safety"]["severity"] == "low"
+    
+    def test_profile_cache_returns_independent_copies(self):
+        """Test that quantized inputs share a cache entry without sharing state"""
+        first = ScientificCalculationEngine.calculate_profile(70.00001, 170, 25, "male", "light", "fat_loss")
+        first["macros"]["protein"]["grams"] = 0
+        first["calorie_safety"]["warnings"].append("mutated")
+        
+        second = ScientificCalculationEngine.calculate_profile(70, 170, 25, "male", "light", "fat_loss")
+        assert second["macros"]["protein"]["grams"] > 0
+        assert "mutated" not in second["calorie_safety"]["warnings"]
+    
+    def test_batch_matches_scalar_profiles(self):
+        """Test that the vectorized batch agrees with the scalar path"""
+        profiles = [
+            (70, 170, 25, "male", "moderate", "muscle_gain"),
+            (55, 160, 25, "female", "sedentary", "fat_loss"),
+            (120.3, 185.5, 44, "male", "very_active", "maintenance"),
+            (38, 150, 80, "female", "light", "fat_loss"),
+        ]
+        rng = np.random.default_rng(0)
+        for _ in range(2000):
+            profiles.append((
+                round(float(rng.uniform(35, 150)), 1), round(float(rng.uniform(140, 210)), 1),
+                int(rng.integers(18, 90)), str(rng.choice(["male", "female"])),
+                str(rng.choice(list(ScientificCalculationEngine.ACTIVITY_COEFFICIENTS))),
+                str(rng.choice(list(ScientificCalculationEngine.GOAL_ADJUSTMENTS))),
+            ))
+        batch = ScientificCalculationEngine.calculate_profiles_batch(*zip(*profiles))
+        
+        # Rounding ties must break the same way, so the results are identical
+        for i, profile in enumerate(profiles):
+            scalar = ScientificCalculationEngine.calculate_profile(*profile)
+            for key in ("bmi", "body_fat_percentage", "bmr", "tdee", "target_calories"):
+                assert batch[key][i] == scalar[key]
+            for macro in ("protein", "fat", "carbs"):
+                assert batch[f"{macro}_g"][i] == scalar["macros"][macro]["grams"]
+            assert batch["percentage_of_bmr"][i] == scalar["calorie_safety"]["percentage_of_bmr"]
+            assert batch["severity"][i] == scalar["calorie_safety"]["severity"]
+    
+    def test_batch_rejects_invalid_profiles(self):
+        """Test validation of batch inputs"""
+        with pytest.raises(ValueError):
+            ScientificCalculationEngine.calculate_profiles_batch([70], [170], [25], ["male"], ["lazy"], ["fat_loss"])
+        with pytest.raises(ValueError):
+            ScientificCalculationEngine.calculate_profiles_batch([70], [170], [0], ["male"], ["light"], ["fat_loss"])
+        with pytest.raises(ValueError):
+            ScientificCalculationEngine.calculate_profiles_batch([70, 80], [170], [25], ["male"], ["light"], ["fat_loss"])
@@ -0,0 +1,132 @@
+"""
+Unit tests for the background training job executor
+"""
+import json
+import os
+import time
+
+import pytest
+
+from ml.api.training_jobs import JobConflictError, JobContext, TrainingJobManager
+
+
+def quick_pipeline(context, value=1):
+    context.progress(0, 1, 'working')
+    return {'success': True, 'value': value * 2}
+
+
+def slow_pipeline(context, steps=200):
+    for step in range(steps):
+        context.progress(step, steps, f'step {step}')
+        time.sleep(0.02)
+    return {'success': True}
+
+
+def broken_pipeline(context):
+    raise RuntimeError('boom')
+
+
+def dying_pipeline(context):
+    os._exit(1)
+
+
+def input_pipeline(context, input_path, scale=1):
+    with open(input_path) as f:
+        values = json.load(f)['values']
+    return {'success': True, 'total': sum(values) * scale}
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = TrainingJobManager(
+        str(tmp_path / 'jobs'),
+        pipelines={'quick': quick_pipeline, 'slow': slow_pipeline, 'broken': broken_pipeline,
+                   'input': input_pipeline, 'dying': dying_pipeline},
+    )
+    yield manager
+    manager.shutdown()
+
+
+def wait_for(manager, job_id, predicate, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = manager.status(job_id)
+        if predicate(status):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f'timed out waiting for job {job_id}: {manager.status(job_id)}')
+
+
+def test_job_runs_in_background_and_stores_result(manager):
+    job = manager.submit('quick', {'value': 21})
+    assert job['state'] == 'queued'
+
+    status = manager.wait(job['job_id'], timeout=60)
+    assert status['state'] == 'succeeded'
+    assert status['progress'] == 1.0
+    assert status['result'] == {'success': True, 'value': 42}
+    assert manager.list_jobs('quick')[0]['job_id'] == job['job_id']
+
+
+def test_one_job_per_pipeline_and_cancellation(manager):
+    job = manager.submit('slow')
+    wait_for(manager, job['job_id'], lambda s: s['state'] == 'running' and s.get('step', 0) > 0, timeout=60)
+
+    with pytest.raises(JobConflictError) as excinfo:
+        manager.submit('slow')
+    assert excinfo.value.active_job_id == job['job_id']
+    assert manager.active_job('slow')['job_id'] == job['job_id']
+
+    manager.cancel(job['job_id'])
+    status = manager.wait(job['job_id'], timeout=30)
+    assert status['state'] == 'cancelled'
+    assert manager.active_job('slow') is None
+
+    # The lock is released, so the pipeline can run again
+    assert manager.submit('slow', {'steps': 1})['state'] == 'queued'
+
+
+def test_failure_is_recorded(manager):
+    job = manager.submit('broken')
+    status = manager.wait(job['job_id'], timeout=60)
+    assert status['state'] == 'failed'
+    assert 'boom' in status['error']
+
+
+def test_unknown_pipeline_and_job(manager):
+    with pytest.raises(ValueError):
+        manager.submit('missing')
+    assert manager.status('../etc') is None
+    assert manager.cancel('nope') is None
+
+
+def test_large_inputs_are_stored_outside_the_status_file(manager):
+    job = manager.submit('input', {'scale': 2}, inputs={'values': list(range(1000))})
+    assert job['params'] == {'scale': 2, 'input_path': job['params']['input_path']}
+    assert job['params']['input_path'].endswith('input.json')
+
+    status = manager.wait(job['job_id'], timeout=60)
+    assert status['state'] == 'succeeded'
+    assert status['result']['total'] == 999000
+    assert 'values' not in json.dumps(status)
+
+
+def test_pool_is_rebuilt_after_a_worker_dies(manager):
+    job = manager.submit('dying')
+    status = manager.wait(job['job_id'], timeout=60)
+    assert status['state'] == 'failed'
+
+    # The dead worker broke the pool; the next submission must still run
+    job = manager.submit('quick', {'value': 5})
+    status = manager.wait(job['job_id'], timeout=60)
+    assert status['state'] == 'succeeded'
+    assert status['result']['value'] == 10
+
+
+def test_terminal_state_is_not_overwritten(manager):
+    job = manager.submit('quick')
+    assert manager.wait(job['job_id'], timeout=60)['state'] == 'succeeded'
+
+    context = JobContext(os.path.join(manager.jobs_dir, job['job_id']))
+    assert context.update_if_active(state='failed') is None
+    assert manager.status(job['job_id'])['state'] == 'succeeded'
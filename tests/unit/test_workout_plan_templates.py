@@ -0,0 +1,78 @@
+"""
+Unit tests for precompiled workout plan templates
+"""
+import json
+
+import pytest
+
+from core.training_engine import TrainingEngine
+from core.workout_plan_templates import (
+    WorkoutPlanTemplates, compile_templates, load_templates, save_templates
+)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return TrainingEngine()
+
+
+@pytest.fixture(scope="module")
+def templates(engine):
+    return WorkoutPlanTemplates(compile_templates(engine), engine)
+
+
+class TestWorkoutPlanTemplates:
+    """Test cases for template lookup, personalization and persistence"""
+    
+    def test_templates_match_live_generation(self, engine, templates):
+        """Test that every grid entry equals a freshly built plan"""
+        assert len(templates.templates) == 3 * 3 * 7 * 2
+        for experience in engine.experience_levels:
+            for goal in engine.training_parameters:
+                for days in (1, 3, 4, 6):
+                    for equipment in ("full_gym", "bodyweight"):
+                        assert templates.plan(experience, goal, days, equipment) == \
+                            engine.build_workout_plan(experience, goal, days, equipment)
+    
+    def test_plan_does_not_expose_template_top_level(self, templates):
+        """Test that per-user fields never leak into the shared template"""
+        plan = templates.personalize("beginner", "hypertrophy", 3, weight_kg=80)
+        assert "calorie_estimates" in plan
+        assert "calorie_estimates" not in templates.get("beginner", "hypertrophy", 3)
+    
+    def test_plan_sections_are_not_shared(self, templates):
+        """Test that editing a returned plan leaves the template untouched"""
+        template = json.loads(json.dumps(templates.get("beginner", "strength", 3)))
+        plan = templates.plan("beginner", "strength", 3)
+        for value in plan.values():
+            if isinstance(value, dict):
+                value.clear()
+            elif isinstance(value, list):
+                value.append("edited")
+        assert templates.get("beginner", "strength", 3) == template
+    
+    def test_personalized_calories(self, engine, templates):
+        """Test calorie estimates scale with body weight and frequency"""
+        plan = templates.personalize("intermediate", "strength", 4, weight_kg=70)
+        estimate = plan["calorie_estimates"]
+        
+        expected = engine.calculate_exercise_calories("strength", "intense", 70, 67.5)
+        assert estimate["session_minutes"] == 67.5
+        assert estimate["per_session"] == expected
+        assert estimate["weekly_total"] == expected["total_calories"] * 4
+    
+    def test_off_grid_parameters_fall_back_to_live_build(self, engine, templates):
+        """Test parameters outside the template grid"""
+        assert templates.get("advanced", "endurance", 9) is None
+        assert templates.plan("advanced", "endurance", 9) == engine.build_workout_plan("advanced", "endurance", 9)
+    
+    def test_saved_templates_are_reloaded_unless_stale(self, engine, tmp_path):
+        """Test persistence and fingerprint check"""
+        path = tmp_path / "templates.json"
+        save_templates({"marker": {"frequency": "1日/週"}}, path)
+        assert load_templates(path, engine) == {"marker": {"frequency": "1日/週"}}
+        
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        payload["fingerprint"] = "outdated"
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        assert len(load_templates(path, engine)) == 126
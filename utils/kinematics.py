@@ -0,0 +1,339 @@
+"""
+関節角度・体節長・角速度の共通計算カーネル
+
+(frames, 33, 3) のランドマーク配列から、関節3点の定義表に従って全関節角度・
+体節長・角速度・角加速度をブロードキャスト演算1回でまとめて計算する。
+各解析器の1点ずつの角度計算もここの point_angle / vector_angles に統一し、
+どの経路でも同じ数値になるようにする。
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# MediaPipe Pose のランドマーク名（インデックス順）
+LANDMARK_NAMES = [
+    'NOSE', 'LEFT_EYE_INNER', 'LEFT_EYE', 'LEFT_EYE_OUTER',
+    'RIGHT_EYE_INNER', 'RIGHT_EYE', 'RIGHT_EYE_OUTER',
+    'LEFT_EAR', 'RIGHT_EAR', 'MOUTH_LEFT', 'MOUTH_RIGHT',
+    'LEFT_SHOULDER', 'RIGHT_SHOULDER', 'LEFT_ELBOW', 'RIGHT_ELBOW',
+    'LEFT_WRIST', 'RIGHT_WRIST', 'LEFT_PINKY', 'RIGHT_PINKY',
+    'LEFT_INDEX', 'RIGHT_INDEX', 'LEFT_THUMB', 'RIGHT_THUMB',
+    'LEFT_HIP', 'RIGHT_HIP', 'LEFT_KNEE', 'RIGHT_KNEE',
+    'LEFT_ANKLE', 'RIGHT_ANKLE', 'LEFT_HEEL', 'RIGHT_HEEL',
+    'LEFT_FOOT_INDEX', 'RIGHT_FOOT_INDEX'
+]
+LANDMARK_INDEX = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+
+# 仮想点（定義順に計算するため、他の仮想点を参照する場合は後に置く）
+#   ('midpoint', a, b): 2点の中点
+#   ('offset', a, (dx, dy, dz)): 点からの平行移動
+VIRTUAL_POINTS = {
+    'SHOULDER_CENTER': ('midpoint', 'LEFT_SHOULDER', 'RIGHT_SHOULDER'),
+    'HIP_CENTER': ('midpoint', 'LEFT_HIP', 'RIGHT_HIP'),
+    'HIP_VERTICAL_REF': ('offset', 'HIP_CENTER', (0.0, -1.0, 0.0)),  # 画像座標で腰の真上
+}
+
+# 関節角度の定義表: 名前 -> (端点, 頂点, 端点)
+JOINT_TRIPLETS = {
+    'left_elbow': ('LEFT_SHOULDER', 'LEFT_ELBOW', 'LEFT_WRIST'),
+    'right_elbow': ('RIGHT_SHOULDER', 'RIGHT_ELBOW', 'RIGHT_WRIST'),
+    'left_shoulder': ('LEFT_ELBOW', 'LEFT_SHOULDER', 'LEFT_HIP'),
+    'right_shoulder': ('RIGHT_ELBOW', 'RIGHT_SHOULDER', 'RIGHT_HIP'),
+    'left_hip': ('LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_KNEE'),
+    'right_hip': ('RIGHT_SHOULDER', 'RIGHT_HIP', 'RIGHT_KNEE'),
+    'left_knee': ('LEFT_HIP', 'LEFT_KNEE', 'LEFT_ANKLE'),
+    'right_knee': ('RIGHT_HIP', 'RIGHT_KNEE', 'RIGHT_ANKLE'),
+    'left_ankle': ('LEFT_KNEE', 'LEFT_ANKLE', 'LEFT_FOOT_INDEX'),
+    'right_ankle': ('RIGHT_KNEE', 'RIGHT_ANKLE', 'RIGHT_FOOT_INDEX'),
+    'left_wrist': ('LEFT_ELBOW', 'LEFT_WRIST', 'LEFT_INDEX'),
+    'right_wrist': ('RIGHT_ELBOW', 'RIGHT_WRIST', 'RIGHT_INDEX'),
+    'torso': ('SHOULDER_CENTER', 'HIP_CENTER', 'HIP_VERTICAL_REF'),
+}
+
+# 体節長の定義表: 名前 -> (始点, 終点)
+SEGMENTS = {
+    'left_upper_arm': ('LEFT_SHOULDER', 'LEFT_ELBOW'),
+    'right_upper_arm': ('RIGHT_SHOULDER', 'RIGHT_ELBOW'),
+    'left_forearm': ('LEFT_ELBOW', 'LEFT_WRIST'),
+    'right_forearm': ('RIGHT_ELBOW', 'RIGHT_WRIST'),
+    'left_thigh': ('LEFT_HIP', 'LEFT_KNEE'),
+    'right_thigh': ('RIGHT_HIP', 'RIGHT_KNEE'),
+    'left_shank': ('LEFT_KNEE', 'LEFT_ANKLE'),
+    'right_shank': ('RIGHT_KNEE', 'RIGHT_ANKLE'),
+    'shoulder_width': ('LEFT_SHOULDER', 'RIGHT_SHOULDER'),
+    'hip_width': ('LEFT_HIP', 'RIGHT_HIP'),
+    'torso': ('SHOULDER_CENTER', 'HIP_CENTER'),
+}
+
+# これより短いベクトルは向きが定まらないため角度 0 とする
+MIN_VECTOR_LENGTH = 1e-6
+
+PointRef = Union[str, int]
+
+
+@dataclass
+class Kinematics:
+    """compute_kinematics の結果（各値は (frames,) 配列、欠損は NaN）"""
+    angles: Dict[str, np.ndarray] = field(default_factory=dict)
+    segment_lengths: Dict[str, np.ndarray] = field(default_factory=dict)
+    angular_velocity: Dict[str, np.ndarray] = field(default_factory=dict)
+    angular_acceleration: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def frame(self, index: int) -> Dict[str, float]:
+        """1フレーム分の関節角度（欠損関節は含めない）"""
+        return {
+            name: float(values[index])
+            for name, values in self.angles.items()
+            if not np.isnan(values[index])
+        }
+
+
+def vector_angles(v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+    """
+    2ベクトルのなす角（度）を最後の軸に沿って計算
+
+    Args:
+        v1, v2: (..., D) のベクトル配列
+
+    Returns:
+        (...) の角度配列。どちらかが極短ベクトルなら 0、NaN を含めば NaN
+    """
+    v1 = np.asarray(v1, dtype=np.float64)
+    v2 = np.asarray(v2, dtype=np.float64)
+    norm1 = np.sqrt(np.einsum('...i,...i->...', v1, v1))
+    norm2 = np.sqrt(np.einsum('...i,...i->...', v2, v2))
+    dot = np.einsum('...i,...i->...', v1, v2)
+
+    degenerate = (norm1 < MIN_VECTOR_LENGTH) | (norm2 < MIN_VECTOR_LENGTH)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cosine = np.clip(dot / (norm1 * norm2), -1.0, 1.0)
+    angles = np.degrees(np.arccos(cosine))
+    return np.where(degenerate, 0.0, angles)
+
+
+def joint_angles(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """b を頂点とする a-b-c の角度（度）を配列のまま計算"""
+    b = np.asarray(b, dtype=np.float64)
+    return vector_angles(np.asarray(a, dtype=np.float64) - b, np.asarray(c, dtype=np.float64) - b)
+
+
+def _point_coords(point: Any, dims: int) -> Tuple[float, ...]:
+    """dict / 属性付きオブジェクト / 座標列から先頭 dims 成分を取り出す"""
+    if isinstance(point, Mapping):
+        values = (point.get('x', 0.0), point.get('y', 0.0), point.get('z', 0.0))
+    elif hasattr(point, 'x') and hasattr(point, 'y'):
+        values = (point.x, point.y, getattr(point, 'z', 0.0))
+    else:
+        values = tuple(point[:3]) + (0.0,) * max(0, 3 - len(point))
+    return tuple(float(v) for v in values[:dims])
+
+
+def point_angle(p1: Any, p2: Any, p3: Any, dims: int = 3) -> float:
+    """
+    1組の3点の角度（p2が頂点、度）
+
+    1フレームだけ処理する経路用のスカラー版。vector_angles と同じ規則
+    （極短ベクトルは 0、cos はクリップ）で計算する。
+
+    Args:
+        p1, p2, p3: {'x','y','z'} の dict、x/y/z 属性を持つオブジェクト、または座標列
+        dims: 使用する次元数（2 なら x, y のみ）
+    """
+    a, b, c = _point_coords(p1, dims), _point_coords(p2, dims), _point_coords(p3, dims)
+    v1 = [ai - bi for ai, bi in zip(a, b)]
+    v2 = [ci - bi for ci, bi in zip(c, b)]
+    return vector_angle(v1, v2)
+
+
+def vector_angle(v1: Sequence[float], v2: Sequence[float]) -> float:
+    """2ベクトルのなす角（度）のスカラー版"""
+    norm1 = math.sqrt(sum(x * x for x in v1))
+    norm2 = math.sqrt(sum(x * x for x in v2))
+    if norm1 < MIN_VECTOR_LENGTH or norm2 < MIN_VECTOR_LENGTH:
+        return 0.0
+    cosine = sum(x * y for x, y in zip(v1, v2)) / (norm1 * norm2)
+    return math.degrees(math.acos(max(-1.0, min(1.0, cosine))))
+
+
+def landmarks_to_array(frames: Iterable[Mapping], dims: int = 3) -> np.ndarray:
+    """
+    フレームごとのランドマーク辞書を (frames, 33, dims) 配列に変換
+
+    キーはランドマーク名・インデックス（int または数字文字列）のいずれでもよい。
+    存在しないランドマークは NaN になる。
+    """
+    frames = list(frames)
+    points = np.full((len(frames), len(LANDMARK_NAMES), dims), np.nan)
+    flat_index = []
+    coords = []
+    for i, landmarks in enumerate(frames):
+        offset = i * len(LANDMARK_NAMES)
+        for key, point in landmarks.items():
+            index = _KEY_INDEX.get(key)
+            if index is None or point is None:
+                continue
+            flat_index.append(offset + index)
+            if type(point) is dict:
+                coords.append((point.get('x', 0.0), point.get('y', 0.0), point.get('z', 0.0))[:dims])
+            else:
+                coords.append(_point_coords(point, dims))
+
+    if coords:
+        points.reshape(-1, dims)[flat_index] = coords
+    return points
+
+
+# 名前・インデックス・数字文字列のいずれのキーからもインデックスを引ける表
+_KEY_INDEX: Dict[Any, int] = {
+    **LANDMARK_INDEX,
+    **{i: i for i in range(len(LANDMARK_NAMES))},
+    **{str(i): i for i in range(len(LANDMARK_NAMES))},
+}
+
+
+def _landmark_index(key: PointRef) -> Optional[int]:
+    if isinstance(key, np.integer):
+        key = int(key)
+    return _KEY_INDEX.get(key)
+
+
+def _with_virtual_points(points: np.ndarray, names: Iterable[PointRef]) -> Tuple[np.ndarray, Dict[str, int]]:
+    """必要な仮想点だけを末尾に追加した配列とそのインデックスを返す"""
+    required = []
+
+    def require(name):
+        if name in VIRTUAL_POINTS and name not in required:
+            for ref in VIRTUAL_POINTS[name][1:]:
+                if isinstance(ref, str):
+                    require(ref)
+            required.append(name)
+
+    for name in names:
+        require(name)
+    if not required:
+        return points, {}
+
+    extra = {}
+    columns = []
+    dims = points.shape[-1]
+    for name in required:
+        kind, ref, arg = VIRTUAL_POINTS[name]
+        base = columns[extra[ref]] if ref in extra else points[:, LANDMARK_INDEX[ref]]
+        if kind == 'midpoint':
+            other = columns[extra[arg]] if arg in extra else points[:, LANDMARK_INDEX[arg]]
+            column = (base + other) / 2
+        else:
+            column = base + np.asarray(arg[:dims])
+        extra[name] = len(columns)
+        columns.append(column)
+
+    offset = points.shape[1]
+    extended = np.concatenate([points, np.stack(columns, axis=1)], axis=1)
+    return extended, {name: offset + i for name, i in extra.items()}
+
+
+def _resolve(ref: PointRef, virtual: Dict[str, int]) -> int:
+    if ref in virtual:
+        return virtual[ref]
+    index = _landmark_index(ref)
+    if index is None:
+        raise KeyError(f"Unknown landmark: {ref}")
+    return index
+
+
+def triplet_angles(points: np.ndarray,
+                   triplets: Mapping[str, Tuple[PointRef, PointRef, PointRef]] = JOINT_TRIPLETS) -> Dict[str, np.ndarray]:
+    """
+    定義表の全関節角度を1回のブロードキャスト演算で計算
+
+    Args:
+        points: (frames, 33, D) のランドマーク配列
+        triplets: 名前 -> (端点, 頂点, 端点)。名前・インデックス・仮想点名を使用可
+
+    Returns:
+        関節名 -> (frames,) の角度配列
+    """
+    points = np.asarray(points, dtype=np.float64)
+    names = list(triplets)
+    if not names:
+        return {}
+
+    extended, virtual = _with_virtual_points(points, (ref for t in triplets.values() for ref in t))
+    index = np.array([[_resolve(ref, virtual) for ref in triplets[name]] for name in names])
+    angles = joint_angles(extended[:, index[:, 0]], extended[:, index[:, 1]], extended[:, index[:, 2]])
+    return {name: angles[:, j] for j, name in enumerate(names)}
+
+
+def segment_lengths(points: np.ndarray,
+                    segments: Mapping[str, Tuple[PointRef, PointRef]] = SEGMENTS) -> Dict[str, np.ndarray]:
+    """定義表の全体節長を計算（名前 -> (frames,) 配列）"""
+    points = np.asarray(points, dtype=np.float64)
+    names = list(segments)
+    if not names:
+        return {}
+
+    extended, virtual = _with_virtual_points(points, (ref for s in segments.values() for ref in s))
+    index = np.array([[_resolve(ref, virtual) for ref in segments[name]] for name in names])
+    lengths = np.linalg.norm(extended[:, index[:, 1]] - extended[:, index[:, 0]], axis=-1)
+    return {name: lengths[:, j] for j, name in enumerate(names)}
+
+
+def derivative(series: np.ndarray, window: int = 2) -> np.ndarray:
+    """
+    時系列の差分（先頭軸に沿って計算）
+
+    先頭 window//2 フレームは前方差分、末尾は後方差分、それ以外は
+    (a[i+h] - a[i-h]) / window の中心差分を用いる。
+    """
+    series = np.asarray(series, dtype=np.float64)
+    n = len(series)
+    result = np.zeros_like(series)
+    if n < 2:
+        return result
+
+    half = window // 2
+    index = np.arange(n)
+    forward = index < half
+    backward = ~forward & (index >= n - half)
+    central = index[~forward & ~backward]
+
+    result[central] = (series[central + half] - series[central - half]) / window
+    forward_index = index[forward & (index + 1 < n)]
+    result[forward_index] = series[forward_index + 1] - series[forward_index]
+    backward_index = index[backward & (index > 0)]
+    result[backward_index] = series[backward_index] - series[backward_index - 1]
+    return result
+
+
+def compute_kinematics(points: np.ndarray,
+                       fps: Optional[float] = None,
+                       triplets: Mapping[str, Tuple[PointRef, PointRef, PointRef]] = JOINT_TRIPLETS,
+                       segments: Optional[Mapping[str, Tuple[PointRef, PointRef]]] = SEGMENTS,
+                       window: int = 2) -> Kinematics:
+    """
+    関節角度・体節長・角速度・角加速度をまとめて計算
+
+    Args:
+        points: (frames, 33, D) のランドマーク配列（欠損は NaN）
+        fps: 指定時は角速度を度/秒、角加速度を度/秒^2 で返す（未指定時はフレーム単位）
+        triplets: 関節角度の定義表
+        segments: 体節長の定義表（None で省略）
+        window: 差分の窓サイズ
+    """
+    angles = triplet_angles(points, triplets)
+    result = Kinematics(angles=angles)
+    if segments:
+        result.segment_lengths = segment_lengths(points, segments)
+    if not angles:
+        return result
+
+    scale = float(fps) if fps else 1.0
+    matrix = np.column_stack(list(angles.values()))
+    velocity = derivative(matrix, window) * scale
+    acceleration = derivative(velocity, window) * scale
+    for j, name in enumerate(angles):
+        result.angular_velocity[name] = velocity[:, j]
+        result.angular_acceleration[name] = acceleration[:, j]
+    return result
@@ -0,0 +1,221 @@
+"""
+解析パイプライン用の軽量プロファイリング（スパン／トレース）
+
+動画解析の各ステージ（デコード、色変換、pose.process、ランドマーク変換、
+可視化、JSON保存など）の処理時間を計測し、動画ごとの内訳を結果に付与する。
+環境変数 PIPELINE_TRACE_DIR を設定すると Chrome trace 形式の JSON を出力する。
+"""
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIR_ENV = 'PIPELINE_TRACE_DIR'
+
+_current_trace: ContextVar[Optional['Trace']] = ContextVar('pipeline_trace', default=None)
+_current_depth: ContextVar[int] = ContextVar('pipeline_span_depth', default=0)
+
+_metrics_registry = None
+_metrics_resolved = False
+
+
+def set_metrics_registry(registry) -> None:
+    """スパンの計測値を送るメトリクスレジストリを設定（observe(family, label, seconds) を持つもの）"""
+    global _metrics_registry, _metrics_resolved
+    _metrics_registry = registry
+    _metrics_resolved = True
+
+
+def get_metrics_registry():
+    """
+    バックエンドのメトリクスレジストリを遅延解決（利用できなければ None）
+
+    Flask アプリは /api/metrics/prometheus でこのレジストリを公開する。
+    """
+    global _metrics_registry, _metrics_resolved
+    if not _metrics_resolved:
+        _metrics_resolved = True
+        try:
+            from backend.utils.metrics import metrics_registry
+            _metrics_registry = metrics_registry
+        except Exception:
+            _metrics_registry = None
+    return _metrics_registry
+
+
+class Trace:
+    """1回のパイプライン実行（動画1本）のステージ別計測"""
+
+    def __init__(self, name: str, record_events: bool = False, **metadata):
+        """
+        Args:
+            name: パイプライン名（メトリクスのラベル接頭辞にも使用）
+            record_events: Chrome trace 出力用に個々のスパンを保持するか
+            **metadata: トレースに付与する任意の情報
+        """
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.metadata = metadata
+        self.record_events = record_events
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.events: List[Dict[str, Any]] = []
+
+    def add_span(self, name: str, start: float, duration: float, depth: int = 0) -> None:
+        """計測済みスパンを集計に追加"""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'seconds': 0.0, 'count': 0, 'max': 0.0}
+        stage['seconds'] += duration
+        stage['count'] += 1
+        if duration > stage['max']:
+            stage['max'] = duration
+
+        if self.record_events:
+            self.events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': (start - self.start) * 1e6,
+                'dur': duration * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': {'depth': depth},
+            })
+
+    @property
+    def total_seconds(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def breakdown(self) -> Dict[str, Any]:
+        """ステージ別の処理時間内訳"""
+        total = self.total_seconds
+        stages = {}
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            stages[name] = {
+                'seconds': round(stage['seconds'], 6),
+                'count': stage['count'],
+                'avg_ms': round(stage['seconds'] / stage['count'] * 1000, 3),
+                'max_ms': round(stage['max'] * 1000, 3),
+                'percent': round(stage['seconds'] / total * 100, 1) if total > 0 else 0.0,
+            }
+        return {
+            'pipeline': self.name,
+            'trace_id': self.trace_id,
+            'total_seconds': round(total, 6),
+            'stages': stages,
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """chrome://tracing / Perfetto で読める形式に変換"""
+        events = list(self.events)
+        events.append({
+            'name': self.name,
+            'ph': 'X',
+            'ts': 0,
+            'dur': self.total_seconds * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': dict(self.metadata),
+        })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump_chrome_trace(self, directory: str) -> str:
+        """Chrome trace JSON をファイルに保存してパスを返す"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.name}_{self.trace_id}.trace.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f)
+        return path
+
+
+@contextmanager
+def trace(name: str, dump_dir: Optional[str] = None, **metadata) -> Iterator[Trace]:
+    """
+    パイプライン実行全体を計測するトレースを開始
+
+    Args:
+        name: パイプライン名
+        dump_dir: Chrome trace の出力先（未指定時は環境変数 PIPELINE_TRACE_DIR）
+        **metadata: トレースに付与する情報（動画パスなど）
+    """
+    dump_dir = dump_dir or os.environ.get(TRACE_DIR_ENV)
+    current = Trace(name, record_events=bool(dump_dir), **metadata)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        current.end = time.perf_counter()
+        _current_trace.reset(token)
+
+        registry = get_metrics_registry()
+        if registry is not None:
+            registry.observe('pipeline_stage', f"{name}.total", current.total_seconds)
+
+        if dump_dir:
+            try:
+                path = current.dump_chrome_trace(dump_dir)
+                logger.info(f"Chrome trace saved: {path}")
+            except OSError as e:
+                logger.warning(f"Failed to write chrome trace: {e}")
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    ステージの処理時間を計測
+
+    アクティブなトレースがあれば内訳に加算し、メトリクスレジストリにも記録する。
+    トレース外で呼ばれた場合はメトリクスのみ記録する。
+    """
+    depth = _current_depth.get()
+    depth_token = _current_depth.set(depth + 1)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        _current_depth.reset(depth_token)
+
+        current = _current_trace.get()
+        if current is not None:
+            current.add_span(name, start, duration, depth)
+
+        registry = get_metrics_registry()
+        if registry is not None:
+            prefix = current.name if current is not None else 'untraced'
+            registry.observe('pipeline_stage', f"{prefix}.{name}", duration)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    関数全体をスパンとして計測するデコレータ
+
+    Args:
+        name: スパン名（未指定時は関数名）
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_trace() -> Optional[Trace]:
+    """実行中のトレースを取得"""
+    return _current_trace.get()
@@ -0,0 +1,331 @@
+"""
+反復回数（レップ）検出の共通エンジン
+
+事前計算済みの関節角度系列から、ヒステリシス付きの極値検出（ジグザグ法）で
+1パス O(N) にレップ境界を求め、レップごとの可動域・テンポ・最小/最大角度を
+配列で返す。動画全体の一括処理（count_reps）とフレーム逐次処理（RepCounter）
+は同じ状態機械を共有するため、同じ系列に対して同じ結果になる。
+"""
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# 種目ごとにレップ検出に使う関節（全アナライザー共通の定義）
+REP_JOINT_BY_EXERCISE = {
+    'squat': 'knee',
+    'pushup': 'elbow',
+    'push_up': 'elbow',
+    'deadlift': 'hip',
+    'bench_press': 'elbow',
+    'overhead_press': 'shoulder',
+}
+
+# レップ開始時の関節角度が極小（屈曲位）の種目。それ以外は伸展位（極大）から開始する
+# デッドリフトは床から引き始め（股関節屈曲）、オーバーヘッドプレスはラック位置（肩が閉じた状態）から押し上げる
+REP_START_BY_EXERCISE = {
+    'deadlift': 'valley',
+    'overhead_press': 'valley',
+}
+
+# 上記の左右の関節（JOINT_TRIPLETS の名前、左右は平均）
+REP_JOINTS = {
+    exercise: (f'left_{joint}', f'right_{joint}')
+    for exercise, joint in REP_JOINT_BY_EXERCISE.items()
+}
+
+# ヒステリシス幅（度）の既定値と自動設定時の下限
+DEFAULT_HYSTERESIS = 15.0
+MIN_HYSTERESIS = 10.0
+# 自動設定時に角度の振れ幅（5-95パーセンタイル）に掛ける比率
+ADAPTIVE_HYSTERESIS_RATIO = 0.3
+
+
+@dataclass
+class Rep:
+    """1回分のレップ（フレーム番号は角度系列のインデックス）"""
+    start_frame: int
+    turn_frame: int
+    end_frame: int
+    start_angle: float
+    turn_angle: float
+    end_angle: float
+    fps: float
+
+    @property
+    def min_angle(self) -> float:
+        return min(self.start_angle, self.turn_angle, self.end_angle)
+
+    @property
+    def max_angle(self) -> float:
+        return max(self.start_angle, self.turn_angle, self.end_angle)
+
+    @property
+    def rom(self) -> float:
+        return self.max_angle - self.min_angle
+
+    @property
+    def duration(self) -> float:
+        return (self.end_frame - self.start_frame) / self.fps
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'start_frame': self.start_frame,
+            'turn_frame': self.turn_frame,
+            'end_frame': self.end_frame,
+            'min_angle': round(self.min_angle, 2),
+            'max_angle': round(self.max_angle, 2),
+            'rom': round(self.rom, 2),
+            'duration': round(self.duration, 3),
+            'eccentric_seconds': round((self.turn_frame - self.start_frame) / self.fps, 3),
+            'concentric_seconds': round((self.end_frame - self.turn_frame) / self.fps, 3),
+        }
+
+
+@dataclass
+class RepSegments:
+    """検出したレップ境界とレップごとの統計量（すべて長さ count の配列）"""
+    start_frames: np.ndarray
+    turn_frames: np.ndarray
+    end_frames: np.ndarray
+    min_angles: np.ndarray
+    max_angles: np.ndarray
+    fps: float
+
+    @classmethod
+    def from_reps(cls, reps: Sequence[Rep], fps: float) -> 'RepSegments':
+        """Rep のリストから配列形式に変換"""
+        return cls(
+            start_frames=np.array([r.start_frame for r in reps], dtype=np.int64),
+            turn_frames=np.array([r.turn_frame for r in reps], dtype=np.int64),
+            end_frames=np.array([r.end_frame for r in reps], dtype=np.int64),
+            min_angles=np.array([r.min_angle for r in reps], dtype=float),
+            max_angles=np.array([r.max_angle for r in reps], dtype=float),
+            fps=fps,
+        )
+
+    @property
+    def count(self) -> int:
+        return len(self.start_frames)
+
+    @property
+    def rom(self) -> np.ndarray:
+        """可動域（度）"""
+        return self.max_angles - self.min_angles
+
+    @property
+    def durations(self) -> np.ndarray:
+        """レップ全体の所要時間（秒）"""
+        return (self.end_frames - self.start_frames) / self.fps
+
+    @property
+    def eccentric_seconds(self) -> np.ndarray:
+        """開始から折り返しまでの時間（秒）"""
+        return (self.turn_frames - self.start_frames) / self.fps
+
+    @property
+    def concentric_seconds(self) -> np.ndarray:
+        """折り返しから終了までの時間（秒）"""
+        return (self.end_frames - self.turn_frames) / self.fps
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON 出力用のレップ統計"""
+        if self.count == 0:
+            return {'rep_count': 0, 'reps': []}
+
+        durations = self.durations
+        return {
+            'rep_count': self.count,
+            'average_rom': round(float(np.mean(self.rom)), 2),
+            'average_duration': round(float(np.mean(durations)), 3),
+            'tempo_consistency': round(float(1.0 - min(np.std(durations) / np.mean(durations), 1.0)), 3)
+            if np.mean(durations) > 0 else 0.0,
+            'reps': [
+                {
+                    'start_frame': int(self.start_frames[i]),
+                    'turn_frame': int(self.turn_frames[i]),
+                    'end_frame': int(self.end_frames[i]),
+                    'min_angle': round(float(self.min_angles[i]), 2),
+                    'max_angle': round(float(self.max_angles[i]), 2),
+                    'rom': round(float(self.rom[i]), 2),
+                    'duration': round(float(durations[i]), 3),
+                    'eccentric_seconds': round(float(self.eccentric_seconds[i]), 3),
+                    'concentric_seconds': round(float(self.concentric_seconds[i]), 3),
+                }
+                for i in range(self.count)
+            ],
+        }
+
+
+class RepCounter:
+    """
+    ヒステリシス付き極値検出によるレップカウンタ（逐次処理用）
+
+    角度がヒステリシス幅以上戻った時点で直前の極値を確定させ、
+    「開始極値 → 折り返し極値 → 終了極値」の3点で1レップとする。
+    終了極値は次のレップの開始極値を兼ねる。
+    """
+
+    def __init__(self, fps: float = 30.0, hysteresis: float = DEFAULT_HYSTERESIS,
+                 start_at: str = 'peak'):
+        """
+        Args:
+            fps: フレームレート（テンポ計算用）
+            hysteresis: 極値を確定させるのに必要な戻り幅（度）
+            start_at: レップ開始の極値 'peak'（伸展位から開始）または 'valley'
+        """
+        if start_at not in ('peak', 'valley'):
+            raise ValueError(f"start_at must be 'peak' or 'valley': {start_at}")
+        self.fps = fps
+        self.hysteresis = hysteresis
+        self.start_at = start_at
+        self.reset()
+
+    def reset(self) -> None:
+        """状態を初期化"""
+        self.reps: List[Rep] = []
+        self._frame = 0
+        self._direction = 0  # +1: 山を探索中, -1: 谷を探索中, 0: 未確定
+        self._high = self._low = None
+        self._high_frame = self._low_frame = 0
+        self._pivots: List[tuple] = []  # 確定した (frame, angle, kind)
+
+    @property
+    def count(self) -> int:
+        return len(self.reps)
+
+    def update(self, angle: Optional[float]) -> Optional[Rep]:
+        """
+        1フレーム分の角度を追加
+
+        Args:
+            angle: 角度（度）。欠損フレームは None または NaN
+
+        Returns:
+            このフレームで確定したレップ（なければ None）
+        """
+        frame = self._frame
+        self._frame += 1
+        if angle is None or math.isnan(angle):
+            return None
+
+        if self._high is None:
+            self._high = self._low = angle
+            self._high_frame = self._low_frame = frame
+            return None
+
+        threshold = self.hysteresis
+        if self._direction >= 0 and angle > self._high:
+            self._high, self._high_frame = angle, frame
+        if self._direction <= 0 and angle < self._low:
+            self._low, self._low_frame = angle, frame
+
+        if self._direction >= 0 and angle <= self._high - threshold:
+            # 山を確定して谷の探索へ
+            pivot = (self._high_frame, self._high, 'peak')
+            self._direction = -1
+            self._low, self._low_frame = angle, frame
+            return self._add_pivot(pivot)
+        if self._direction <= 0 and angle >= self._low + threshold:
+            # 谷を確定して山の探索へ
+            pivot = (self._low_frame, self._low, 'valley')
+            self._direction = 1
+            self._high, self._high_frame = angle, frame
+            return self._add_pivot(pivot)
+        return None
+
+    def finish(self) -> Optional[Rep]:
+        """
+        系列の終端で未確定の極値を確定させる
+
+        最後のレップは終了極値の後に戻り動作がないため、終端で閉じる。
+
+        Returns:
+            終端で確定したレップ（なければ None）
+        """
+        if self._direction > 0:
+            return self._add_pivot((self._high_frame, self._high, 'peak'))
+        if self._direction < 0:
+            return self._add_pivot((self._low_frame, self._low, 'valley'))
+        return None
+
+    def segments(self) -> RepSegments:
+        """これまでに確定したレップを配列形式で取得"""
+        return RepSegments.from_reps(self.reps, self.fps)
+
+    def _add_pivot(self, pivot: tuple) -> Optional[Rep]:
+        """確定した極値を追加し、3点揃えばレップを返す"""
+        if not self._pivots and pivot[2] != self.start_at:
+            # 開始側の極値が出るまでは読み飛ばす
+            return None
+        self._pivots.append(pivot)
+        if len(self._pivots) < 3:
+            return None
+
+        (start_frame, start_angle, _), (turn_frame, turn_angle, _), (end_frame, end_angle, _) = self._pivots
+        rep = Rep(start_frame, turn_frame, end_frame, start_angle, turn_angle, end_angle, self.fps)
+        self.reps.append(rep)
+        self._pivots = [pivot]
+        return rep
+
+
+def rep_start_at(exercise: Optional[str]) -> str:
+    """種目のレップ開始の極値（'peak' または 'valley'、不明な種目は 'peak'）"""
+    return REP_START_BY_EXERCISE.get(exercise, 'peak')
+
+
+def adaptive_hysteresis(angles: np.ndarray) -> float:
+    """角度の振れ幅からヒステリシス幅を決める（ノイズ程度の揺れはレップにしない）"""
+    valid = angles[~np.isnan(angles)]
+    if valid.size == 0:
+        return DEFAULT_HYSTERESIS
+    low, high = np.percentile(valid, [5, 95])
+    return max(MIN_HYSTERESIS, float(high - low) * ADAPTIVE_HYSTERESIS_RATIO)
+
+
+def count_reps(angles: Iterable[float], fps: float = 30.0, hysteresis: Optional[float] = None,
+               start_at: str = 'peak') -> RepSegments:
+    """
+    角度系列全体からレップを検出
+
+    Args:
+        angles: 角度系列（度）。欠損は NaN
+        fps: フレームレート
+        hysteresis: ヒステリシス幅（度）。未指定時は振れ幅から自動設定
+        start_at: レップ開始の極値 'peak' または 'valley'
+
+    Returns:
+        RepSegments
+    """
+    series = np.asarray(angles, dtype=float)
+    if hysteresis is None:
+        hysteresis = adaptive_hysteresis(series)
+
+    counter = RepCounter(fps=fps, hysteresis=hysteresis, start_at=start_at)
+    update = counter.update
+    for angle in series.tolist():
+        update(angle)
+    counter.finish()
+    return counter.segments()
+
+
+def rep_angle_series(angles: Mapping[str, np.ndarray], exercise: str) -> Optional[np.ndarray]:
+    """
+    種目に応じたレップ検出用の角度系列（左右平均、片側のみのフレームはその値）
+
+    Args:
+        angles: 関節名 -> 角度配列（JOINT_TRIPLETS の名前）
+        exercise: 種目名
+
+    Returns:
+        角度配列（対象関節がなければ None）
+    """
+    joints = [angles[name] for name in REP_JOINTS.get(exercise, ()) if name in angles]
+    if not joints:
+        return None
+    stacked = np.vstack(joints)
+    counts = np.sum(~np.isnan(stacked), axis=0)
+    sums = np.nansum(stacked, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)